@@ -0,0 +1,79 @@
+-- Continuous aggregates for yield curve and volatility history (served by /api/v1/yield-curve and /api/v1/volatility)
+-- Weekly and monthly buckets are materialized; real-time aggregation covers the not-yet-refreshed tail.
+-- Idempotent: safe to re-run.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS yield_curve_weekly
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT time_bucket(INTERVAL '1 week', time) AS bucket,
+       region,
+       first(spread_2y10y, time) AS open,
+       max(spread_2y10y)         AS high,
+       min(spread_2y10y)         AS low,
+       last(spread_2y10y, time)  AS close,
+       last(yield_2y, time)      AS yield_2y,
+       last(yield_10y, time)     AS yield_10y,
+       count(*)                  AS points
+FROM yield_curve_snapshot
+GROUP BY bucket, region
+WITH NO DATA;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS yield_curve_monthly
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT time_bucket(INTERVAL '1 month', time) AS bucket,
+       region,
+       first(spread_2y10y, time) AS open,
+       max(spread_2y10y)         AS high,
+       min(spread_2y10y)         AS low,
+       last(spread_2y10y, time)  AS close,
+       last(yield_2y, time)      AS yield_2y,
+       last(yield_10y, time)     AS yield_10y,
+       count(*)                  AS points
+FROM yield_curve_snapshot
+GROUP BY bucket, region
+WITH NO DATA;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS volatility_weekly
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT time_bucket(INTERVAL '1 week', time) AS bucket,
+       symbol,
+       first(value, time) AS open,
+       max(value)         AS high,
+       min(value)         AS low,
+       last(value, time)  AS close,
+       count(*)           AS points
+FROM volatility_snapshot
+GROUP BY bucket, symbol
+WITH NO DATA;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS volatility_monthly
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT time_bucket(INTERVAL '1 month', time) AS bucket,
+       symbol,
+       first(value, time) AS open,
+       max(value)         AS high,
+       min(value)         AS low,
+       last(value, time)  AS close,
+       count(*)           AS points
+FROM volatility_snapshot
+GROUP BY bucket, symbol
+WITH NO DATA;
+
+-- Refresh policies: re-materialize the recent window (late and revised snapshots land there)
+SELECT add_continuous_aggregate_policy('yield_curve_weekly',
+    start_offset => INTERVAL '1 month', end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '1 hour', if_not_exists => true);
+SELECT add_continuous_aggregate_policy('yield_curve_monthly',
+    start_offset => INTERVAL '3 months', end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '1 day', if_not_exists => true);
+SELECT add_continuous_aggregate_policy('volatility_weekly',
+    start_offset => INTERVAL '1 month', end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '1 hour', if_not_exists => true);
+SELECT add_continuous_aggregate_policy('volatility_monthly',
+    start_offset => INTERVAL '3 months', end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '1 day', if_not_exists => true);
+
+-- Backfill existing history once (refresh procedures cannot run inside a transaction block)
+CALL refresh_continuous_aggregate('yield_curve_weekly', NULL, NULL);
+CALL refresh_continuous_aggregate('yield_curve_monthly', NULL, NULL);
+CALL refresh_continuous_aggregate('volatility_weekly', NULL, NULL);
+CALL refresh_continuous_aggregate('volatility_monthly', NULL, NULL);
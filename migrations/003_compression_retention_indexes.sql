@@ -0,0 +1,74 @@
+-- Native compression on old chunks, retention for derived stats, and indexes shaped like
+-- the scorer / processing / API queries (see scripts/bench_queries.py for before/after plans).
+-- Applied once by scripts/migrate.py (tracked in schema_migrations).
+
+-- ========== COMPRESSION ==========
+-- Segment by the per-series key so a compressed chunk decompresses only the series a
+-- query asks for; newest first within a segment, matching ORDER BY time DESC reads.
+-- Chunks older than the policy interval are compressed by a background job. Recent data
+-- (re-normalized surprises, late revisions) stays uncompressed.
+ALTER TABLE macro_observation SET (
+    timescaledb.compress,
+    timescaledb.compress_segmentby = 'indicator_id',
+    timescaledb.compress_orderby = 'time DESC'
+);
+SELECT add_compression_policy('macro_observation', INTERVAL '180 days', if_not_exists => true);
+
+ALTER TABLE bias_score SET (
+    timescaledb.compress,
+    timescaledb.compress_segmentby = 'index_id',
+    timescaledb.compress_orderby = 'time DESC'
+);
+SELECT add_compression_policy('bias_score', INTERVAL '90 days', if_not_exists => true);
+
+ALTER TABLE macro_rolling_stats SET (
+    timescaledb.compress,
+    timescaledb.compress_segmentby = 'indicator_id, window_days',
+    timescaledb.compress_orderby = 'time DESC'
+);
+SELECT add_compression_policy('macro_rolling_stats', INTERVAL '180 days', if_not_exists => true);
+
+ALTER TABLE yield_curve_snapshot SET (
+    timescaledb.compress,
+    timescaledb.compress_segmentby = 'region',
+    timescaledb.compress_orderby = 'time DESC'
+);
+SELECT add_compression_policy('yield_curve_snapshot', INTERVAL '180 days', if_not_exists => true);
+
+ALTER TABLE volatility_snapshot SET (
+    timescaledb.compress,
+    timescaledb.compress_segmentby = 'symbol',
+    timescaledb.compress_orderby = 'time DESC'
+);
+SELECT add_compression_policy('volatility_snapshot', INTERVAL '90 days', if_not_exists => true);
+
+-- ========== RETENTION ==========
+-- Rolling stats are derived from macro_observation and can be recomputed; raw series are kept.
+SELECT add_retention_policy('macro_rolling_stats', INTERVAL '5 years', if_not_exists => true);
+
+-- ========== INDEXES ==========
+-- Scorer (get_latest_surprises) and correlation: release_date window over all indicators,
+-- only normalized rows. Partial + covering, so the read is an index-only scan of scored rows.
+CREATE INDEX IF NOT EXISTS idx_macro_obs_release_scored
+    ON macro_observation (release_date DESC, indicator_id)
+    INCLUDE (surprise_normalized)
+    WHERE surprise_normalized IS NOT NULL;
+
+-- Surprise normalization: per-indicator release_date window over rows with a surprise.
+CREATE INDEX IF NOT EXISTS idx_macro_obs_indicator_surprise
+    ON macro_observation (indicator_id, release_date DESC)
+    INCLUDE (surprise)
+    WHERE surprise IS NOT NULL;
+
+-- Bias history / export filtered by index: covering the returned columns.
+CREATE INDEX IF NOT EXISTS idx_bias_score_index_time_cover
+    ON bias_score (index_id, time DESC)
+    INCLUDE (bias_score, confidence_pct, risk_flag, regime_id);
+
+-- Latest VIX (scorer) and per-symbol volatility history.
+CREATE INDEX IF NOT EXISTS idx_volatility_symbol_time
+    ON volatility_snapshot (symbol, time DESC)
+    INCLUDE (value);
+
+-- Superseded by idx_bias_score_index_time_cover (same keys).
+DROP INDEX IF EXISTS idx_bias_score_index_time;
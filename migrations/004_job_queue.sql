@@ -0,0 +1,39 @@
+-- Work queue for backfills (services/orchestration/queue.py): any number of worker processes
+-- or hosts claim units with SELECT ... FOR UPDATE SKIP LOCKED, so two workers never get the
+-- same row and neither waits on the other's lock.
+-- Applied once by scripts/migrate.py (tracked in schema_migrations).
+
+CREATE TABLE IF NOT EXISTS job_queue (
+    id            BIGSERIAL PRIMARY KEY,
+    batch         VARCHAR(64) NOT NULL,           -- groups the units of one backfill
+    kind          VARCHAR(32) NOT NULL,           -- normalize | bias | ingest
+    params        JSONB NOT NULL DEFAULT '{}',    -- e.g. {"indicator_id": 3} or {"start": ..., "end": ...}
+    status        VARCHAR(16) NOT NULL DEFAULT 'queued'
+                  CHECK (status IN ('queued', 'running', 'done', 'failed')),
+    priority      INT NOT NULL DEFAULT 0,         -- higher first
+    attempts      INT NOT NULL DEFAULT 0,
+    max_attempts  INT NOT NULL DEFAULT 3,
+    run_after     TIMESTAMPTZ NOT NULL DEFAULT NOW(),  -- retry backoff
+    claimed_by    VARCHAR(128),
+    claimed_at    TIMESTAMPTZ,
+    heartbeat_at  TIMESTAMPTZ,
+    progress      REAL NOT NULL DEFAULT 0,        -- 0..1 within the unit
+    progress_note TEXT,
+    result        JSONB,
+    error         TEXT,
+    created_at    TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at   TIMESTAMPTZ
+);
+
+-- Claim: next runnable unit. Partial, so done/failed history does not slow the scan.
+CREATE INDEX IF NOT EXISTS idx_job_queue_claim
+    ON job_queue (priority DESC, id)
+    WHERE status = 'queued';
+
+-- Reaper: running units whose worker stopped heartbeating.
+CREATE INDEX IF NOT EXISTS idx_job_queue_heartbeat
+    ON job_queue (heartbeat_at)
+    WHERE status = 'running';
+
+-- Progress per backfill.
+CREATE INDEX IF NOT EXISTS idx_job_queue_batch ON job_queue (batch, status);
@@ -0,0 +1,17 @@
+-- Materialized daily feature matrix (services/processing/features.py): one row per day,
+-- per-indicator arrays aligned with indicator_ids. Row d is built from row d-1 plus day d's
+-- releases and market data; consumers read a contiguous range of rows.
+-- Applied once by scripts/migrate.py (tracked in schema_migrations).
+
+CREATE TABLE IF NOT EXISTS daily_feature (
+    time              TIMESTAMPTZ PRIMARY KEY,          -- the day at UTC midnight
+    indicator_ids     INT[] NOT NULL,                   -- sorted; positions of the arrays below
+    surprise          DOUBLE PRECISION[] NOT NULL,      -- latest surprise_normalized (NaN: none yet)
+    days_since        INT[] NOT NULL,                   -- days since that release (-1: none yet)
+    surprise_ewm      DOUBLE PRECISION[] NOT NULL,      -- EW mean / variance of surprise_normalized per release
+    surprise_ewm_var  DOUBLE PRECISION[] NOT NULL,
+    vix               DOUBLE PRECISION,                 -- latest VIX as of the day's midnight
+    regions           TEXT[] NOT NULL,
+    spread_2y10y      DOUBLE PRECISION[] NOT NULL,      -- latest 2Y/10Y spread per region
+    computed_at       TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
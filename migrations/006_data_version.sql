@@ -0,0 +1,10 @@
+-- Persisted data version per API cache namespace ("bias", "macro"): the source of the ETag
+-- and Last-Modified validators (services/core/cache.py). Pipeline stages bump it after they
+-- commit, so every API worker derives the same validators and they only change with the data.
+-- Applied once by scripts/migrate.py (tracked in schema_migrations).
+
+CREATE TABLE IF NOT EXISTS data_version (
+    namespace  VARCHAR(32) PRIMARY KEY,
+    version    BIGINT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL
+);
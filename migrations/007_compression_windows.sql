@@ -0,0 +1,8 @@
+-- Compression windows sized to the writers (replaces the intervals set in 003).
+-- Routine writers must never touch compressed chunks: ingestion re-upserts the last two
+-- years of every series on each run, so macro_observation compresses after 800 days.
+-- Rewrites reaching further back (full-history normalization, bias backfills and replays)
+-- decompress the chunks they touch first (services.core.archive.decompress_range), and the
+-- policy job compresses them again on its next run.
+SELECT remove_compression_policy('macro_observation', if_exists => true);
+SELECT add_compression_policy('macro_observation', INTERVAL '800 days', if_not_exists => true);
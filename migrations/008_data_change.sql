@@ -0,0 +1,11 @@
+-- One row per data_version bump: the earliest day the write changed (NULL: unknown, treat
+-- as everything). Readers holding derived state at an older version (the correlation cache)
+-- recompute only from MIN(since) over the versions they missed instead of from scratch.
+-- Bumps prune rows more than a few thousand versions old.
+
+CREATE TABLE IF NOT EXISTS data_change (
+    namespace VARCHAR(32) NOT NULL,
+    version   BIGINT NOT NULL,
+    since     DATE,
+    PRIMARY KEY (namespace, version)
+);
@@ -0,0 +1,176 @@
+"""
+Load benchmark for the read API: req/s and latency percentiles per endpoint under concurrency.
+Run it against a server before and after a change and compare:
+
+  PYTHONPATH=. python scripts/bench_api.py --url http://localhost:8000 --save before.json
+  PYTHONPATH=. python scripts/bench_api.py --url http://localhost:8000 --compare before.json
+
+--serialize runs an offline micro-benchmark instead (no server or DB): per-field row
+conversion plus stdlib json vs. the orjson fast path in services/api/responses.py.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+DEFAULT_PATHS = [
+    "/api/v1/bias/summary",
+    "/api/v1/macro/latest",
+    "/api/v1/bias/history?limit=1000",
+    "/api/v1/bias/matrix",
+]
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+async def bench_path(client: Any, path: str, requests: int, concurrency: int) -> dict[str, Any]:
+    latencies: list[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker() -> None:
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            t0 = time.perf_counter()
+            try:
+                r = await client.get(path)
+                await r.aread()
+                if r.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "path": path,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+    }
+
+
+async def run_http(url: str, paths: list[str], requests: int, concurrency: int, warmup: int) -> list[dict[str, Any]]:
+    import httpx
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        results = []
+        for path in paths:
+            if warmup:
+                await bench_path(client, path, warmup, min(concurrency, warmup))
+            results.append(await bench_path(client, path, requests, concurrency))
+        return results
+
+
+def run_serialize(rows: int, repeat: int) -> list[dict[str, Any]]:
+    """Old per-field conversion + json.dumps vs. dict(r) + orjson on a bias-history-sized payload."""
+    from datetime import datetime, timedelta, timezone
+    from decimal import Decimal
+
+    from services.api.responses import dumps, records
+
+    t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    # What asyncpg returns without casts (NUMERIC -> Decimal) vs. with ::float8 casts
+    raw = [
+        {"time": t0 - timedelta(days=k), "index_code": "SPX", "bias_score": Decimal("12.34"),
+         "confidence_pct": Decimal("81.50"), "risk_flag": "low"}
+        for k in range(rows)
+    ]
+    cast = [{**r, "bias_score": 12.34, "confidence_pct": 81.5} for r in raw]
+
+    def legacy() -> bytes:
+        series = [
+            {
+                "time": r["time"].isoformat(),
+                "date": r["time"].date().isoformat(),
+                "index": r["index_code"],
+                "bias_score": round(float(r["bias_score"]), 2),
+                "confidence_pct": round(float(r["confidence_pct"]), 2),
+                "risk_flag": r["risk_flag"],
+            }
+            for r in raw
+        ]
+        return json.dumps({"series": series, "count": len(series)}).encode()
+
+    def fast() -> bytes:
+        series = records(cast)
+        return dumps({"series": series, "count": len(series)})
+
+    out = []
+    for name, fn in (("legacy", legacy), ("fast", fast)):
+        timings = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - t)
+        timings.sort()
+        out.append({
+            "path": f"serialize:{name}:{rows}rows",
+            "requests": repeat,
+            "errors": 0,
+            "rps": round(repeat / sum(timings), 1),
+            "p50_ms": round(percentile(timings, 50) * 1000, 3),
+            "p99_ms": round(percentile(timings, 99) * 1000, 3),
+            "mean_ms": round(statistics.fmean(timings) * 1000, 3),
+        })
+    return out
+
+
+def print_results(results: list[dict[str, Any]], baseline: dict[str, dict[str, Any]] | None = None) -> None:
+    print(f"{'endpoint':48} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for r in results:
+        line = f"{r['path']:48} {r['rps']:>10} {r['p50_ms']:>9} {r['p99_ms']:>9} {r['errors']:>7}"
+        base = (baseline or {}).get(r["path"])
+        if base:
+            line += f"   rps x{r['rps'] / max(base['rps'], 1e-9):.2f}  p99 {base['p99_ms']} -> {r['p99_ms']}"
+        print(line)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--url", default="http://localhost:8000")
+    p.add_argument("--path", action="append", dest="paths", help="Endpoint path (repeatable)")
+    p.add_argument("-n", "--requests", type=int, default=2000, help="Requests per endpoint")
+    p.add_argument("-c", "--concurrency", type=int, default=50)
+    p.add_argument("--warmup", type=int, default=100)
+    p.add_argument("--serialize", action="store_true", help="Offline serialization micro-benchmark")
+    p.add_argument("--rows", type=int, default=1000, help="Rows per payload for --serialize")
+    p.add_argument("--save", type=Path, help="Write results as JSON")
+    p.add_argument("--compare", type=Path, help="Baseline JSON from an earlier --save")
+    args = p.parse_args()
+
+    if args.serialize:
+        results = run_serialize(args.rows, args.requests)
+    else:
+        results = asyncio.run(run_http(args.url, args.paths or DEFAULT_PATHS, args.requests, args.concurrency, args.warmup))
+    baseline = None
+    if args.compare:
+        baseline = {r["path"]: r for r in json.loads(args.compare.read_text())["results"]}
+    print_results(results, baseline)
+    if args.save:
+        args.save.write_text(json.dumps({"concurrency": args.concurrency, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
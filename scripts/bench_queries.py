@@ -0,0 +1,183 @@
+"""
+Query-plan benchmark for the scorer / processing / API read shapes: runs each under
+EXPLAIN (ANALYZE, BUFFERS) and reports time, buffers touched, rows read vs. returned,
+chunks scanned and scan types. Run before and after a migration and compare:
+
+  PYTHONPATH=. python scripts/bench_queries.py --save before.json
+  PYTHONPATH=. python scripts/migrate.py
+  PYTHONPATH=. python scripts/bench_queries.py --compare before.json
+
+EXPLAIN ANALYZE executes the statements; all of them are reads.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def _midnight(d: date) -> datetime:
+    return datetime(d.year, d.month, d.day, tzinfo=timezone.utc)
+
+
+def query_shapes(as_of: date) -> list[tuple[str, str, tuple[Any, ...]]]:
+    """(name, SQL, args) for the hot read paths, with representative parameters."""
+    from services.api.payloads import BIAS_SUMMARY_SQL, MACRO_LATEST_SQL
+
+    start14 = as_of - timedelta(days=14)
+    start30 = as_of - timedelta(days=30)
+    start252 = as_of - timedelta(days=252)
+    end_ts = _midnight(as_of) + timedelta(days=1)
+    return [
+        ("scorer_latest_surprises", """
+            SELECT DISTINCT ON (o.indicator_id) o.indicator_id, m.direction, o.surprise_normalized, o.release_date
+            FROM macro_observation o
+            JOIN macro_indicator m ON m.id = o.indicator_id
+            WHERE o.release_date >= $1 AND o.release_date <= $2
+              AND o.time >= $3 AND o.time < $4
+              AND o.surprise_normalized IS NOT NULL
+            ORDER BY o.indicator_id, o.release_date DESC
+        """, (start14, as_of, _midnight(start14), end_ts)),
+        ("surprise_rolling_stats", """
+            SELECT AVG(surprise), STDDEV(surprise)
+            FROM macro_observation
+            WHERE indicator_id = (SELECT MIN(id) FROM macro_indicator)
+              AND release_date >= $1 AND release_date <= $2
+              AND time >= $3 AND time < $4
+              AND surprise IS NOT NULL
+        """, (start252, as_of, _midnight(start252), end_ts)),
+        ("surprise_window", """
+            SELECT time, release_date, surprise
+            FROM macro_observation
+            WHERE indicator_id = (SELECT MIN(id) FROM macro_indicator)
+              AND release_date >= $1 AND release_date <= $2
+              AND time >= $3 AND time < $4
+              AND surprise IS NOT NULL
+            ORDER BY release_date DESC
+        """, (start30, as_of, _midnight(start30), end_ts)),
+        ("correlation_macro", """
+            SELECT o.release_date, m.code, o.surprise_normalized::float8
+            FROM macro_observation o
+            JOIN macro_indicator m ON m.id = o.indicator_id
+            WHERE o.release_date > $1 AND o.release_date <= $2
+              AND o.surprise_normalized IS NOT NULL
+        """, (as_of - timedelta(days=90), as_of)),
+        ("macro_latest", MACRO_LATEST_SQL, (30,)),
+        ("bias_summary", BIAS_SUMMARY_SQL, ()),
+        ("bias_history_index", """
+            SELECT bs.time, bs.bias_score::float8, bs.confidence_pct::float8, bs.risk_flag
+            FROM bias_score bs
+            WHERE bs.index_id = (SELECT MIN(id) FROM index) AND bs.time >= $1
+            ORDER BY bs.time DESC LIMIT 1000
+        """, (_midnight(as_of - timedelta(days=365)),)),
+        ("vix_latest", """
+            SELECT value FROM volatility_snapshot
+            WHERE symbol = 'VIX' AND time <= $1
+            ORDER BY time DESC LIMIT 1
+        """, (_midnight(as_of),)),
+    ]
+
+
+def _walk(node: dict[str, Any]):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _walk(child)
+
+
+def plan_stats(explain: list[dict[str, Any]]) -> dict[str, Any]:
+    """Summarize one EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) result."""
+    top = explain[0]
+    root = top["Plan"]
+    rows_read = 0
+    removed = 0
+    chunks = set()
+    scans: dict[str, int] = {}
+    for node in _walk(root):
+        kind = node["Node Type"]
+        loops = node.get("Actual Loops", 1)
+        removed += node.get("Rows Removed by Filter", 0) * loops
+        if "Scan" in kind and "Relation Name" in node:
+            rows_read += node.get("Actual Rows", 0) * loops + node.get("Rows Removed by Filter", 0) * loops
+            scans[kind] = scans.get(kind, 0) + 1
+            if node["Relation Name"].startswith("_hyper_") or node["Relation Name"].startswith("compress_hyper_"):
+                chunks.add(node["Relation Name"])
+    return {
+        "ms": round(top.get("Execution Time", 0.0), 3),
+        "buffers": root.get("Shared Hit Blocks", 0) + root.get("Shared Read Blocks", 0),
+        "rows_read": rows_read,
+        "rows_removed": removed,
+        "rows_out": root.get("Actual Rows", 0),
+        "chunks": len(chunks),
+        "scans": scans,
+    }
+
+
+async def run(as_of: date, repeat: int, show_plans: bool) -> list[dict[str, Any]]:
+    from services.core.config import get_settings
+    from services.core.db import _asyncpg_url
+
+    import asyncpg
+
+    conn = await asyncpg.connect(_asyncpg_url(get_settings().database_url))
+    results = []
+    try:
+        for name, sql, args in query_shapes(as_of):
+            runs = []
+            for _ in range(repeat):
+                row = await conn.fetchval(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", *args)
+                runs.append(plan_stats(json.loads(row) if isinstance(row, str) else row))
+            # Buffers/rows are stable across runs; time is the median
+            stats = {**runs[-1], "ms": round(statistics.median(r["ms"] for r in runs), 3)}
+            results.append({"query": name, **stats})
+            if show_plans:
+                text = await conn.fetch(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", *args)
+                print(f"--- {name}\n" + "\n".join(r[0] for r in text))
+    finally:
+        await conn.close()
+    return results
+
+
+def print_results(results: list[dict[str, Any]], baseline: dict[str, dict[str, Any]] | None = None) -> None:
+    print(f"{'query':28} {'ms':>9} {'buffers':>9} {'rows read':>10} {'removed':>9} {'out':>7} {'chunks':>7}  scans")
+    for r in results:
+        scans = ",".join(f"{k}x{v}" for k, v in sorted(r["scans"].items()))
+        line = (
+            f"{r['query']:28} {r['ms']:>9} {r['buffers']:>9} {r['rows_read']:>10} "
+            f"{r['rows_removed']:>9} {r['rows_out']:>7} {r['chunks']:>7}  {scans}"
+        )
+        base = (baseline or {}).get(r["query"])
+        if base:
+            line += (
+                f"   buffers {base['buffers']} -> {r['buffers']}, rows read {base['rows_read']} -> {r['rows_read']},"
+                f" chunks {base['chunks']} -> {r['chunks']}, ms x{r['ms'] / max(base['ms'], 1e-9):.2f}"
+            )
+        print(line)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--as-of", type=date.fromisoformat, default=date.today())
+    p.add_argument("-n", "--repeat", type=int, default=5, help="EXPLAIN ANALYZE runs per query")
+    p.add_argument("--plans", action="store_true", help="Also print the text plans")
+    p.add_argument("--save", type=Path, help="Write results as JSON")
+    p.add_argument("--compare", type=Path, help="Baseline JSON from an earlier --save")
+    args = p.parse_args()
+
+    results = asyncio.run(run(args.as_of, args.repeat, args.plans))
+    baseline = None
+    if args.compare:
+        baseline = {r["query"]: r for r in json.loads(args.compare.read_text())["results"]}
+    print_results(results, baseline)
+    if args.save:
+        args.save.write_text(json.dumps({"as_of": args.as_of.isoformat(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Throughput benchmarks on a synthetic dataset (scripts/synth_data.py) in a local
+Postgres/TimescaleDB: ingestion writes, surprise normalization, bias scoring and replay,
+and the hot API endpoints (in-process ASGI, no server needed). Results go to JSON with the
+dataset spec and git revision; --compare flags regressions against a stored baseline.
+
+  PYTHONPATH=. python scripts/bench_suite.py --load --save baseline.json
+  PYTHONPATH=. python scripts/bench_suite.py --compare baseline.json --tolerance 0.15
+  PYTHONPATH=. python scripts/bench_suite.py --only bias_replay --replay-days 120
+
+Use a dedicated database (DATABASE_URL): --load replaces VIX/yields in the synthetic date
+range. CACHE_BACKEND=none measures the API without its response cache.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from scripts.bench_api import bench_path, percentile  # noqa: E402
+from scripts.synth_data import PREFIX, SynthSpec, connect, generate, load  # noqa: E402
+
+API_PATHS = [
+    "/api/v1/bias/summary",
+    "/api/v1/macro/latest",
+    "/api/v1/bias/history?limit=1000",
+    "/api/v1/bias/matrix",
+    "/api/v1/yield-curve/latest",
+    "/api/v1/volatility/history?max_points=500",
+]
+
+
+def result(name: str, ops: int, seconds: float, unit: str = "ops/s", **extra: Any) -> dict[str, Any]:
+    """Throughput result: higher is better."""
+    return {"name": name, "value": round(ops / max(seconds, 1e-9), 2), "unit": unit, "better": "higher",
+            "ops": ops, "seconds": round(seconds, 3), **extra}
+
+
+def latency(name: str, timings: list[float], **extra: Any) -> dict[str, Any]:
+    """Latency result (median ms): lower is better."""
+    timings = sorted(timings)
+    return {"name": name, "value": round(statistics.median(timings) * 1000, 3), "unit": "ms", "better": "lower",
+            "ops": len(timings), "p99_ms": round(percentile(timings, 99) * 1000, 3), **extra}
+
+
+async def _synthetic_ids() -> tuple[list[int], list[int]]:
+    from services.core.db import get_conn
+
+    async with get_conn() as conn:
+        ind = await conn.fetch("SELECT id FROM macro_indicator WHERE code LIKE $1 ORDER BY id", f"{PREFIX}%")
+        idx = await conn.fetch("SELECT id FROM index WHERE code LIKE $1 ORDER BY id", f"{PREFIX}%")
+    if not ind:
+        raise SystemExit("No synthetic data in this database: run with --load (or scripts/synth_data.py) first")
+    return [r["id"] for r in ind], [r["id"] for r in idx]
+
+
+async def bench_ingest_write(spec: SynthSpec, args: argparse.Namespace) -> list[dict[str, Any]]:
+    """The ingestion upsert path, row at a time: fresh inserts, then the same rows unchanged (no-op guard)."""
+    from services.core.db import get_conn
+    from services.ingestion.storage import ensure_data_source, ensure_macro_indicator, upsert_macro_observation
+
+    # One row per release date: the target is a single indicator, so dates must not repeat
+    by_date = {o[1]: o for o in reversed(generate(spec).observations)}
+    rows = [by_date[d] for d in sorted(by_date)][: args.write_rows]
+    source_id = await ensure_data_source("SYNTH", "Synthetic", "synthetic", "UTC")
+    ind_id = await ensure_macro_indicator(f"{PREFIX}WRITE", "Synthetic write target", None, None, source_id)
+    async with get_conn() as conn:
+        await conn.execute("DELETE FROM macro_observation WHERE indicator_id = $1", ind_id)
+    out = []
+    for name in ("ingest_write_insert", "ingest_write_unchanged"):
+        t0 = time.perf_counter()
+        for _, d, actual, forecast, previous, surprise in rows:
+            await upsert_macro_observation(ind_id, d, actual, forecast, previous, surprise)
+        out.append(result(name, len(rows), time.perf_counter() - t0, unit="rows/s"))
+    return out
+
+
+async def bench_normalization(spec: SynthSpec, args: argparse.Namespace) -> list[dict[str, Any]]:
+    """Full-history surprise normalization of every synthetic indicator."""
+    from services.processing.surprise import run_surprise_normalization
+
+    ind_ids, _ = await _synthetic_ids()
+    t0 = time.perf_counter()
+    r = await run_surprise_normalization(indicator_ids=ind_ids, since=spec.start)
+    return [result("surprise_normalization", r["rows_updated"], time.perf_counter() - t0, unit="rows/s",
+                   indicators=len(ind_ids))]
+
+
+async def bench_bias(spec: SynthSpec, args: argparse.Namespace) -> list[dict[str, Any]]:
+    """One day's scoring (median of repeats, shared context) and a multi-day replay."""
+    from services.bias_engine.context import load_scoring_context
+    from services.bias_engine.scorer import run_bias_backfill, run_bias_computation
+
+    ctx = await load_scoring_context()
+    out = []
+    if "bias" in args.only_set:
+        timings = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            await run_bias_computation(spec.end, ctx)
+            timings.append(time.perf_counter() - t0)
+        out.append(latency("bias_scoring_day", timings, indices=len(ctx.index_ids)))
+    if "bias_replay" in args.only_set:
+        start = spec.end - timedelta(days=args.replay_days - 1)
+        t0 = time.perf_counter()
+        r = await run_bias_backfill(start, spec.end)
+        out.append(result("bias_replay", r["days"], time.perf_counter() - t0, unit="days/s"))
+    return out
+
+
+async def bench_api(spec: SynthSpec, args: argparse.Namespace) -> list[dict[str, Any]]:
+    import httpx
+
+    from services.api.main import app
+
+    out = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=30) as client:
+        for path in API_PATHS:
+            await bench_path(client, path, args.warmup, min(args.concurrency, args.warmup))
+            r = await bench_path(client, path, args.requests, args.concurrency)
+            out.append({"name": f"api {path}", "value": r["rps"], "unit": "req/s", "better": "higher",
+                        "ops": r["requests"], "p50_ms": r["p50_ms"], "p99_ms": r["p99_ms"], "errors": r["errors"]})
+    return out
+
+
+# name -> runner; bias_replay runs inside the bias runner (shares its context)
+BENCHMARKS: dict[str, Callable[[SynthSpec, argparse.Namespace], Awaitable[list[dict[str, Any]]]]] = {
+    "ingest_write": bench_ingest_write,
+    "surprise_normalization": bench_normalization,
+    "bias": bench_bias,
+    "api": bench_api,
+}
+SELECTABLE = ["ingest_write", "surprise_normalization", "bias", "bias_replay", "api"]
+
+
+def compare(results: list[dict[str, Any]], baseline: list[dict[str, Any]], tolerance: float) -> list[dict[str, Any]]:
+    """
+    Per benchmark in both runs: ratio (current / baseline value) and whether it regressed by
+    more than tolerance in the benchmark's "better" direction.
+    """
+    base = {b["name"]: b for b in baseline}
+    out = []
+    for r in results:
+        b = base.get(r["name"])
+        if b is None or not b["value"]:
+            continue
+        ratio = r["value"] / b["value"]
+        worse = ratio < 1 - tolerance if r["better"] == "higher" else ratio > 1 + tolerance
+        out.append({"name": r["name"], "baseline": b["value"], "current": r["value"], "ratio": round(ratio, 3),
+                    "regressed": worse})
+    return out
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(spec: SynthSpec, args: argparse.Namespace) -> dict[str, Any]:
+    from services.core.db import close_pool
+
+    meta: dict[str, Any] = {
+        "spec": {**asdict(spec), "end": spec.end.isoformat()},
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "host": platform.node(),
+        "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    if args.load:
+        conn = await connect()
+        try:
+            meta["load"] = await load(conn, generate(spec))
+        finally:
+            await conn.close()
+    results: list[dict[str, Any]] = []
+    try:
+        for name, runner in BENCHMARKS.items():
+            if name in args.only_set or (name == "bias" and "bias_replay" in args.only_set):
+                results.extend(await runner(spec, args))
+    finally:
+        await close_pool()
+    return {"meta": meta, "results": results}
+
+
+def print_results(results: list[dict[str, Any]], comparison: list[dict[str, Any]] | None = None) -> None:
+    by_name = {c["name"]: c for c in comparison or ()}
+    print(f"{'benchmark':44} {'value':>12} {'unit':8} {'ops':>7}")
+    for r in results:
+        line = f"{r['name']:44} {r['value']:>12} {r['unit']:8} {r['ops']:>7}"
+        c = by_name.get(r["name"])
+        if c:
+            line += f"   baseline {c['baseline']} x{c['ratio']}" + ("  REGRESSED" if c["regressed"] else "")
+        print(line)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--indicators", type=int, default=20)
+    p.add_argument("--indices", type=int, default=8)
+    p.add_argument("--years", type=int, default=10)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--end", type=date.fromisoformat, default=date.today())
+    p.add_argument("--load", action="store_true", help="(Re)load the synthetic dataset first")
+    p.add_argument("--only", action="append", choices=SELECTABLE, help="Run only this benchmark (repeatable)")
+    p.add_argument("--write-rows", type=int, default=2000, help="ingest_write: rows upserted")
+    p.add_argument("--replay-days", type=int, default=60)
+    p.add_argument("-r", "--repeat", type=int, default=5, help="bias_scoring_day repeats")
+    p.add_argument("-n", "--requests", type=int, default=500, help="api: requests per endpoint")
+    p.add_argument("-c", "--concurrency", type=int, default=20)
+    p.add_argument("--warmup", type=int, default=50)
+    p.add_argument("--save", type=Path, help="Write results as JSON")
+    p.add_argument("--compare", type=Path, help="Baseline JSON from an earlier --save")
+    p.add_argument("--tolerance", type=float, default=0.10, help="Allowed slowdown before REGRESSED (0.10 = 10%%)")
+    args = p.parse_args()
+    args.only_set = set(args.only or SELECTABLE)
+    spec = SynthSpec(args.indicators, args.indices, args.years, args.seed, args.end)
+
+    report = asyncio.run(run(spec, args))
+    comparison = None
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        if baseline["meta"]["spec"] != report["meta"]["spec"]:
+            print(f"note: baseline dataset spec differs: {baseline['meta']['spec']}")
+        comparison = compare(report["results"], baseline["results"], args.tolerance)
+        report["comparison"] = comparison
+    print_results(report["results"], comparison)
+    if args.save:
+        args.save.write_text(json.dumps(report, indent=2))
+    if comparison and any(c["regressed"] for c in comparison):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
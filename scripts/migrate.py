@@ -1,14 +1,44 @@
 """
-Run SQL migrations. Requires sync postgres URL.
-Usage: PYTHONPATH=. python scripts/migrate.py
+Run SQL migrations in order (migrations/NNN_name.sql). Requires sync postgres URL.
+Each file is applied once and recorded in schema_migrations (version, checksum, time);
+re-running only applies new files. Databases created before tracking existed cannot re-run
+001 (create_hypertable and the market_regime seed fail on existing objects), so when
+schema_migrations is empty the files whose objects already exist (BASELINE) are recorded
+as applied without running. --fake VERSION records every file up to VERSION the same way,
+for schemas built by other means.
+
+Usage: PYTHONPATH=. python scripts/migrate.py              apply pending migrations
+       PYTHONPATH=. python scripts/migrate.py --status     list applied / pending
+       PYTHONPATH=. python scripts/migrate.py --fake 002   record 001..002 as applied, run nothing
 """
+import argparse
 import asyncio
+import hashlib
 import os
+import re
 import sys
 from pathlib import Path
 
 # Project root
 ROOT = Path(__file__).resolve().parent.parent
+MIGRATIONS_DIR = ROOT / "migrations"
+
+_VERSION_RE = re.compile(r"^(\d+)_.+\.sql$")
+
+TRACKING_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version    VARCHAR(255) PRIMARY KEY,
+    checksum   VARCHAR(64) NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+)
+"""
+
+
+# Files that predate schema_migrations -> a relation each one creates
+BASELINE = {
+    "001_initial_schema": "macro_observation",
+    "002_market_aggregates": "yield_curve_weekly",
+}
 
 
 def get_sync_url() -> str:
@@ -16,43 +46,159 @@ def get_sync_url() -> str:
     return url.replace("postgresql+asyncpg://", "postgresql://", 1)
 
 
-async def run_migration(sql_path: Path) -> None:
+def discover(migrations_dir: Path = MIGRATIONS_DIR) -> list[Path]:
+    """Migration files ordered by numeric prefix. Files without one are an error, not skipped."""
+    files = []
+    for f in migrations_dir.glob("*.sql"):
+        m = _VERSION_RE.match(f.name)
+        if not m:
+            raise ValueError(f"Migration without NNN_ prefix: {f.name}")
+        files.append((int(m.group(1)), f))
+    numbers = [n for n, _ in files]
+    dupes = sorted({n for n in numbers if numbers.count(n) > 1})
+    if dupes:
+        raise ValueError(f"Duplicate migration numbers: {dupes}")
+    return [f for _, f in sorted(files)]
+
+
+def checksum(sql: str) -> str:
+    return hashlib.sha256(sql.encode("utf-8")).hexdigest()
+
+
+def split_statements(sql: str) -> list[str]:
+    """Split on semicolons (no DO blocks / functions in migrations) and drop -- comments."""
+    # Drop comments first: a statement preceded by a comment still runs, and a semicolon
+    # inside a comment does not split one
+    sql = "\n".join(_strip_comment(line) for line in sql.splitlines())
+    return [stmt.strip() + ";" for stmt in sql.split(";") if stmt.strip()]
+
+
+def _strip_comment(line: str) -> str:
+    """line without a trailing -- comment (one outside a quoted string)."""
+    quoted = False
+    for i, ch in enumerate(line):
+        if ch == "'":
+            quoted = not quoted
+        elif not quoted and line.startswith("--", i):
+            return line[:i].rstrip()
+    return line
+
+
+def pending(files: list[Path], applied: dict[str, str]) -> list[Path]:
+    """Files not yet recorded. Warns when an applied file changed since (it is not re-run)."""
+    todo = []
+    for f in files:
+        if f.stem not in applied:
+            todo.append(f)
+        elif applied[f.stem] != checksum(f.read_text(encoding="utf-8")):
+            print(f"  (warning) {f.name} changed after it was applied; add a new migration instead")
+    return todo
+
+
+def baseline(files: list[Path], applied: dict[str, str], existing: set[str]) -> list[Path]:
+    """Pre-tracking files whose objects exist, when nothing is recorded yet (a pre-tracking database)."""
+    if applied:
+        return []
+    return [f for f in files if BASELINE.get(f.stem) in existing]
+
+
+def fake_through(files: list[Path], version: str) -> list[Path]:
+    """Files up to and including version ("002" or "002_market_aggregates")."""
+    number = int(version.split("_", 1)[0])
+    numbers = [int(f.name.split("_", 1)[0]) for f in files]
+    if number not in numbers:
+        raise ValueError(f"No migration {version}")
+    return [f for f, n in zip(files, numbers) if n <= number]
+
+
+async def _connect():
     import asyncpg
 
     url = get_sync_url()
     if url.startswith("postgresql://"):
         url = url.replace("postgresql://", "postgres://", 1)
-    conn = await asyncpg.connect(url)
+    return await asyncpg.connect(url)
+
+
+async def applied_versions(conn) -> dict[str, str]:
+    await conn.execute(TRACKING_TABLE)
+    rows = await conn.fetch("SELECT version, checksum FROM schema_migrations")
+    return {r["version"]: r["checksum"] for r in rows}
+
+
+async def existing_relations(conn) -> set[str]:
+    names = list(BASELINE.values())
+    rows = await conn.fetch("SELECT name FROM unnest($1::text[]) AS name WHERE to_regclass(name) IS NOT NULL", names)
+    return {r["name"] for r in rows}
+
+
+async def record(conn, sql_path: Path) -> None:
+    await conn.execute(
+        """
+        INSERT INTO schema_migrations (version, checksum) VALUES ($1, $2)
+        ON CONFLICT (version) DO UPDATE SET checksum = EXCLUDED.checksum, applied_at = NOW()
+        """,
+        sql_path.stem,
+        checksum(sql_path.read_text(encoding="utf-8")),
+    )
+
+
+async def run_migration(conn, sql_path: Path) -> None:
+    # Not one transaction per file: continuous aggregates and refresh_continuous_aggregate
+    # cannot run inside one. A failed file stays unrecorded and is retried next run.
+    sql = sql_path.read_text(encoding="utf-8")
+    for stmt in split_statements(sql):
+        try:
+            if stmt.upper().startswith("SELECT"):
+                await conn.fetch(stmt)
+            else:
+                await conn.execute(stmt)
+        except Exception as e:
+            if "already exists" in str(e).lower():
+                print(f"  (skip) {e}")
+            else:
+                raise
+    await record(conn, sql_path)
+
+
+async def migrate(status_only: bool = False, fake: str | None = None) -> None:
+    files = discover()
+    conn = await _connect()
     try:
-        sql = sql_path.read_text(encoding="utf-8")
-        # Split by semicolon but keep inside CREATE TABLE etc.; simple split
-        for stmt in sql.split(";"):
-            stmt = stmt.strip()
-            if not stmt or stmt.startswith("--"):
-                continue
-            stmt = stmt + ";"
-            try:
-                if stmt.strip().upper().startswith("SELECT"):
-                    await conn.fetch(stmt)
-                else:
-                    await conn.execute(stmt)
-            except Exception as e:
-                if "already exists" in str(e).lower():
-                    print(f"  (skip) {e}")
-                else:
-                    raise
+        applied = await applied_versions(conn)
+        if fake:
+            for f in pending(fake_through(files, fake), applied):
+                print(f"Recording {f.name} as applied (not run)")
+                await record(conn, f)
+            return
+        if not status_only:
+            for f in baseline(files, applied, await existing_relations(conn)):
+                print(f"Baseline: {f.name} predates tracking and its schema exists; recorded as applied")
+                await record(conn, f)
+            applied = await applied_versions(conn)
+        todo = pending(files, applied)
+        if status_only:
+            for f in files:
+                print(f"  {'pending' if f in todo else 'applied'}  {f.name}")
+            return
+        for f in todo:
+            print(f"Running {f.name}...")
+            await run_migration(conn, f)
+        if not todo:
+            print("Up to date.")
     finally:
         await conn.close()
 
 
 def main() -> None:
-    migrations_dir = ROOT / "migrations"
-    if not migrations_dir.exists():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--status", action="store_true", help="List applied and pending migrations")
+    p.add_argument("--fake", metavar="VERSION", help="Record migrations up to VERSION as applied without running them")
+    args = p.parse_args()
+    if not MIGRATIONS_DIR.exists():
         print("No migrations dir")
         sys.exit(1)
-    for f in sorted(migrations_dir.glob("*.sql")):
-        print(f"Running {f.name}...")
-        asyncio.run(run_migration(f))
+    asyncio.run(migrate(status_only=args.status, fake=args.fake))
     print("Done.")
 
 
@@ -1,10 +1,17 @@
 """
-Daily pipeline: ingestion -> surprise normalization -> bias computation.
-Run: PYTHONPATH=. python scripts/run_daily.py [--skip-ingestion] [--skip-bias]
+Daily pipeline: ingestion (per source) -> surprise normalization -> bias computation (per region),
+run as a DAG (services.orchestration). Independent stages run concurrently; completed stages
+are checkpointed per date, so re-running after a failure resumes from the failed stage.
+Each stage prints one JSON line (status, wall_s, cpu_s, rows); the last line is the run summary.
+
+Run: PYTHONPATH=. python scripts/run_daily.py [--skip-ingestion] [--skip-bias] [--seed]
+     [--date YYYY-MM-DD] [--fresh] [--concurrency N] [--metrics-out runs.jsonl]
+     [--profile [sample|cprofile]]   per-stage profiles in PROFILE_DIR (stages then run one at a time)
 """
 import argparse
 import asyncio
 import sys
+from datetime import date
 from pathlib import Path
 
 # Project root
@@ -13,44 +20,53 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 
-async def run_ingestion() -> dict:
-    from services.ingestion.job import run_daily_ingestion
-    return await run_daily_ingestion()
+async def main(
+    as_of: date,
+    skip_ingestion: bool,
+    skip_bias: bool,
+    seed_weights: bool,
+    fresh: bool,
+    concurrency: int,
+    metrics_out: Path | None,
+    profile: str | None = None,
+) -> int:
+    from services.core.config import get_settings
+    from services.orchestration.dag import CheckpointStore, Pipeline, json_lines, run_pipeline
+    from services.orchestration.daily import build_daily_pipeline
 
+    pipeline = build_daily_pipeline(as_of, skip_ingestion, skip_bias, seed_weights)
+    if profile:
+        from dataclasses import replace
 
-async def run_processing() -> dict:
-    from services.processing.surprise import run_surprise_normalization
-    return await run_surprise_normalization()
+        from services.core.profiling import profiled_fn
 
+        # One stage at a time, so each stage's profile holds only its own work
+        pipeline = Pipeline(pipeline.name, [
+            replace(s, fn=profiled_fn(f"{pipeline.name}-{as_of}-{s.name}", s.fn, profile))
+            for s in pipeline.stages.values()
+        ])
+        concurrency = 1
+    checkpoints = CheckpointStore(get_settings().pipeline_checkpoint_dir, pipeline.name, as_of.isoformat())
+    if fresh:
+        checkpoints.clear()
+    else:
+        checkpoints.load()
 
-async def run_bias(seed: bool = False) -> dict:
-    from services.bias_engine.run import main_async
-    from datetime import date
-    if seed:
-        from services.bias_engine.seed_weights import run_seed
-        await run_seed()
-    from services.bias_engine.scorer import run_bias_computation
-    return await run_bias_computation(date.today())
+    to_stdout = json_lines()
+    sink = metrics_out.open("a", encoding="utf-8") if metrics_out else None
+    to_file = json_lines(sink) if sink else None
 
+    def emit(record: dict) -> None:
+        to_stdout(record)
+        if to_file:
+            to_file(record)
 
-async def main(skip_ingestion: bool, skip_bias: bool, seed_weights: bool) -> None:
-    print("=== MacroEdge daily pipeline ===")
-    if not skip_ingestion:
-        print("1. Ingestion...")
-        r = await run_ingestion()
-        print("   ", r)
-        print("2. Surprise normalization...")
-        r2 = await run_processing()
-        print("   ", r2)
-    else:
-        print("2. Surprise normalization...")
-        r2 = await run_processing()
-        print("   ", r2)
-    if not skip_bias:
-        print("3. Bias computation" + (" (with seed)" if seed_weights else "") + "...")
-        r3 = await run_bias(seed=seed_weights)
-        print("   ", r3)
-    print("Done.")
+    try:
+        summary = await run_pipeline(pipeline, checkpoints, concurrency=concurrency, emit=emit)
+    finally:
+        if sink:
+            sink.close()
+    return 0 if summary["status"] == "done" else 1
 
 
 def cli() -> None:
@@ -58,8 +74,23 @@ def cli() -> None:
     p.add_argument("--skip-ingestion", action="store_true", help="Skip FRED ingestion")
     p.add_argument("--skip-bias", action="store_true", help="Skip bias computation")
     p.add_argument("--seed", action="store_true", help="Seed indices/weights before bias run")
+    p.add_argument("--date", type=date.fromisoformat, default=None, help="As-of date (default today); also the run key")
+    p.add_argument("--fresh", action="store_true", help="Ignore checkpoints and run every stage")
+    p.add_argument("--concurrency", type=int, default=4, help="Stages running at once")
+    p.add_argument("--metrics-out", type=Path, help="Also append the JSON lines to this file")
+    p.add_argument("--profile", nargs="?", const="sample", choices=["sample", "cprofile"],
+                   help="Profile each stage (default mode: sample)")
     args = p.parse_args()
-    asyncio.run(main(args.skip_ingestion, args.skip_bias, args.seed))
+    sys.exit(asyncio.run(main(
+        args.date or date.today(),
+        args.skip_ingestion,
+        args.skip_bias,
+        args.seed,
+        args.fresh,
+        args.concurrency,
+        args.metrics_out,
+        args.profile,
+    )))
 
 
 if __name__ == "__main__":
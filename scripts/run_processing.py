@@ -1,7 +1,8 @@
 """
 Run only surprise normalization (processing layer).
-PYTHONPATH=. python scripts/run_processing.py
+PYTHONPATH=. python scripts/run_processing.py [--profile [sample|cprofile]]
 """
+import argparse
 import asyncio
 import sys
 from pathlib import Path
@@ -11,11 +12,15 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 
-async def main() -> None:
+async def main(profile: str | None = None) -> None:
+    from services.core.profiling import profiled
     from services.processing.surprise import run_surprise_normalization
-    r = await run_surprise_normalization()
+    r = await profiled("surprise_normalization", run_surprise_normalization(), profile)
     print(r)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    p = argparse.ArgumentParser()
+    p.add_argument("--profile", nargs="?", const="sample", choices=["sample", "cprofile"],
+                   help="Write a profile to PROFILE_DIR (default mode: sample)")
+    asyncio.run(main(p.parse_args().profile))
@@ -0,0 +1,277 @@
+"""
+Deterministic synthetic dataset for benchmarks: N indicators x M indices x Y years of
+releases (actual, consensus forecast, previous, surprise), index weights, daily VIX and
+2Y/10Y yields per region. Same spec (seed and end date) -> identical data; end defaults
+to today so the "latest" windows of the scorer and API have data.
+
+Synthetic metadata uses SYN_ codes and the SYNTH data source, so it can be reloaded or
+removed without touching real series. VIX and yields use the real symbols/regions (the
+scorer and API read those), so load into a dedicated benchmark database.
+
+  PYTHONPATH=. python scripts/synth_data.py --indicators 20 --indices 8 --years 10
+  PYTHONPATH=. python scripts/synth_data.py --drop
+"""
+import argparse
+import asyncio
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+SOURCE_CODE = "SYNTH"
+PREFIX = "SYN_"
+REGIONS = [
+    ("US", "USD", "America/New_York"),
+    ("EU", "EUR", "Europe/Berlin"),
+    ("JP", "JPY", "Asia/Tokyo"),
+    ("UK", "GBP", "Europe/London"),
+]
+CATEGORIES = ["inflation", "growth", "labor", "sentiment", "housing"]
+
+
+@dataclass(frozen=True)
+class SynthSpec:
+    indicators: int = 20
+    indices: int = 8
+    years: int = 10
+    seed: int = 0
+    end: date = field(default_factory=date.today)
+
+    @property
+    def start(self) -> date:
+        return date(self.end.year - self.years, self.end.month, 1)
+
+
+@dataclass
+class SynthData:
+    spec: SynthSpec
+    indicators: list[dict[str, Any]]
+    indices: list[dict[str, Any]]
+    weights: list[tuple[str, str, float]]  # (indicator code, index code, weight)
+    observations: list[tuple[str, date, float, float, float | None, float]]  # code, release, actual, forecast, previous, surprise
+    vix: list[tuple[date, float]]
+    yields: list[tuple[date, str, float, float]]  # day, region, 2y, 10y
+
+    def counts(self) -> dict[str, int]:
+        return {
+            "indicators": len(self.indicators),
+            "indices": len(self.indices),
+            "weights": len(self.weights),
+            "observations": len(self.observations),
+            "vix": len(self.vix),
+            "yields": len(self.yields),
+        }
+
+
+def _business_days(start: date, end: date) -> list[date]:
+    days = np.arange(np.datetime64(start), np.datetime64(end) + 1)
+    return [d.astype(object) for d in days[np.is_busday(days)]]
+
+
+def _release_dates(start: date, end: date, weekly: bool, offset: int) -> list[date]:
+    """Weekly (one fixed weekday) or monthly (a fixed business day of the month) release calendar."""
+    if weekly:
+        first = start + timedelta(days=(offset % 5 - start.weekday()) % 7)
+        return [first + timedelta(weeks=k) for k in range((end - first).days // 7 + 1)]
+    out = []
+    y, m = start.year, start.month
+    while date(y, m, 1) <= end:
+        d = np.busday_offset(np.datetime64(date(y, m, 1)), offset % 20, roll="forward").astype(object)
+        if start <= d <= end:
+            out.append(d)
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return out
+
+
+def generate(spec: SynthSpec) -> SynthData:
+    """Build the dataset. Actuals are AR(1) around a per-indicator level; the consensus is the AR forecast plus noise."""
+    rng = np.random.default_rng(spec.seed)
+    start, end = spec.start, spec.end
+
+    indicators = []
+    observations = []
+    for i in range(spec.indicators):
+        code = f"{PREFIX}IND_{i:03d}"
+        weekly = i % 5 == 4
+        indicators.append({
+            "code": code,
+            "name": f"Synthetic indicator {i}",
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "unit": "index" if weekly else "%",
+            "direction": "negative" if i % 3 == 2 else "positive",
+        })
+        level, vol, phi = rng.uniform(-1.0, 5.0), rng.uniform(0.05, 0.5), 0.8
+        dates = _release_dates(start, end, weekly, int(rng.integers(0, 20)))
+        shocks = rng.normal(0.0, vol, len(dates))
+        noise = rng.normal(0.0, vol * 0.3, len(dates))
+        prev = None
+        x = level
+        for d, shock, n in zip(dates, shocks, noise):
+            expected = level + phi * (x - level)
+            x = expected + shock
+            actual, forecast = round(float(x), 4), round(float(expected + n), 4)
+            observations.append((code, d, actual, forecast, prev, round(actual - forecast, 4)))
+            prev = actual
+
+    indices = []
+    weights = []
+    for j in range(spec.indices):
+        region, currency, tz = REGIONS[j % len(REGIONS)]
+        code = f"{PREFIX}IDX_{j:03d}"
+        indices.append({"code": code, "name": f"Synthetic index {j}", "region": region, "currency": currency, "timezone": tz})
+        picks = rng.random(spec.indicators) < 0.6
+        w = rng.uniform(0.05, 1.0, spec.indicators)
+        weights.extend(
+            (indicators[i]["code"], code, round(float(w[i]), 4)) for i in range(spec.indicators) if picks[i]
+        )
+
+    days = _business_days(start, end)
+    # VIX: mean-reverting in logs around 18
+    log_vix = np.empty(len(days))
+    log_vix[0] = np.log(18.0)
+    eps = rng.normal(0.0, 0.07, len(days))
+    for t in range(1, len(days)):
+        log_vix[t] = log_vix[t - 1] + 0.05 * (np.log(18.0) - log_vix[t - 1]) + eps[t]
+    vix = [(d, round(float(v), 4)) for d, v in zip(days, np.exp(log_vix))]
+
+    yields = []
+    regions = sorted({idx["region"] for idx in indices}) or ["US"]
+    for region in regions:
+        y2 = rng.uniform(0.0, 4.0) + np.cumsum(rng.normal(0.0, 0.03, len(days)))
+        spread = rng.uniform(-0.5, 1.5) + np.cumsum(rng.normal(0.0, 0.02, len(days)))
+        yields.extend(
+            (d, region, round(float(a), 4), round(float(a + s), 4)) for d, a, s in zip(days, y2, spread)
+        )
+
+    return SynthData(spec, indicators, indices, weights, observations, vix, yields)
+
+
+def _midnight(d: date) -> datetime:
+    return datetime(d.year, d.month, d.day, tzinfo=timezone.utc)
+
+
+def _num(x: float | None) -> Decimal | None:
+    return None if x is None else Decimal(str(x))
+
+
+async def drop(conn: Any) -> None:
+    """Remove synthetic metadata and the rows that reference it."""
+    async with conn.transaction():
+        await conn.execute(
+            f"DELETE FROM macro_observation WHERE indicator_id IN (SELECT id FROM macro_indicator WHERE code LIKE '{PREFIX}%')"
+        )
+        await conn.execute(f"DELETE FROM bias_score WHERE index_id IN (SELECT id FROM index WHERE code LIKE '{PREFIX}%')")
+        await conn.execute(
+            f"""
+            DELETE FROM index_indicator_weight
+            WHERE indicator_id IN (SELECT id FROM macro_indicator WHERE code LIKE '{PREFIX}%')
+               OR index_id IN (SELECT id FROM index WHERE code LIKE '{PREFIX}%')
+            """
+        )
+        await conn.execute(f"DELETE FROM macro_indicator WHERE code LIKE '{PREFIX}%'")
+        await conn.execute(f"DELETE FROM index WHERE code LIKE '{PREFIX}%'")
+        await conn.execute("DELETE FROM data_source WHERE code = $1", SOURCE_CODE)
+
+
+async def load(conn: Any, data: SynthData) -> dict[str, Any]:
+    """Replace any earlier synthetic load with data (COPY for the series). Returns counts and seconds."""
+    t0 = time.perf_counter()
+    await drop(conn)
+    start, end = _midnight(data.spec.start), _midnight(data.spec.end) + timedelta(days=1)
+    async with conn.transaction():
+        source_id = await conn.fetchval(
+            "INSERT INTO data_source (code, name, provider, timezone) VALUES ($1, 'Synthetic', 'synthetic', 'UTC') RETURNING id",
+            SOURCE_CODE,
+        )
+        ind_ids = {}
+        for ind in data.indicators:
+            ind_ids[ind["code"]] = await conn.fetchval(
+                """
+                INSERT INTO macro_indicator (code, name, category, unit, source_id, direction)
+                VALUES ($1, $2, $3, $4, $5, $6) RETURNING id
+                """,
+                ind["code"], ind["name"], ind["category"], ind["unit"], source_id, ind["direction"],
+            )
+        idx_ids = {}
+        for idx in data.indices:
+            idx_ids[idx["code"]] = await conn.fetchval(
+                "INSERT INTO index (code, name, region, currency, timezone) VALUES ($1, $2, $3, $4, $5) RETURNING id",
+                idx["code"], idx["name"], idx["region"], idx["currency"], idx["timezone"],
+            )
+        await conn.executemany(
+            "INSERT INTO index_indicator_weight (indicator_id, index_id, weight) VALUES ($1, $2, $3)",
+            [(ind_ids[i], idx_ids[j], _num(w)) for i, j, w in data.weights],
+        )
+        await conn.copy_records_to_table(
+            "macro_observation",
+            columns=["time", "indicator_id", "release_date", "actual", "forecast", "previous", "surprise"],
+            records=[
+                (_midnight(d), ind_ids[code], d, _num(a), _num(f), _num(p), _num(s))
+                for code, d, a, f, p, s in data.observations
+            ],
+        )
+        await conn.execute("DELETE FROM volatility_snapshot WHERE symbol = 'VIX' AND time >= $1 AND time < $2", start, end)
+        await conn.copy_records_to_table(
+            "volatility_snapshot",
+            columns=["time", "symbol", "value"],
+            records=[(_midnight(d), "VIX", _num(v)) for d, v in data.vix],
+        )
+        regions = sorted({r for _, r, _, _ in data.yields})
+        await conn.executemany(
+            "DELETE FROM yield_curve_snapshot WHERE region = $1 AND time >= $2 AND time < $3",
+            [(r, start, end) for r in regions],
+        )
+        await conn.copy_records_to_table(
+            "yield_curve_snapshot",
+            columns=["time", "region", "yield_2y", "yield_10y", "spread_2y10y"],
+            records=[(_midnight(d), r, _num(a), _num(b), _num(round(b - a, 4))) for d, r, a, b in data.yields],
+        )
+    return {**data.counts(), "seconds": round(time.perf_counter() - t0, 2)}
+
+
+async def connect() -> Any:
+    import asyncpg
+
+    from services.core.config import get_settings
+    from services.core.db import _asyncpg_url
+
+    return await asyncpg.connect(_asyncpg_url(get_settings().database_url))
+
+
+async def main_async(spec: SynthSpec, drop_only: bool) -> None:
+    conn = await connect()
+    try:
+        if drop_only:
+            await drop(conn)
+            print("synthetic data removed")
+            return
+        data = generate(spec)
+        print({"spec": {**asdict(spec), "end": spec.end.isoformat()}, **await load(conn, data)})
+    finally:
+        await conn.close()
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--indicators", type=int, default=20)
+    p.add_argument("--indices", type=int, default=8)
+    p.add_argument("--years", type=int, default=10)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--end", type=date.fromisoformat, default=date.today(), help="Last day (default today)")
+    p.add_argument("--drop", action="store_true", help="Only remove synthetic data")
+    args = p.parse_args()
+    spec = SynthSpec(args.indicators, args.indices, args.years, args.seed, args.end)
+    asyncio.run(main_async(spec, args.drop))
+
+
+if __name__ == "__main__":
+    main()
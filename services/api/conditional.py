@@ -0,0 +1,75 @@
+"""
+Conditional GET for polled read endpoints. Validators come from the namespace's persisted
+data version (services.core.cache), the same in every worker and unchanged until a write;
+while it is cached a 304 costs one cache lookup and no DB query.
+"""
+import hashlib
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any
+
+from fastapi import Request, Response
+
+from services.core.cache import get_cache
+
+
+@dataclass
+class Validators:
+    version: dict[str, Any]
+    headers: dict[str, str] = field(default_factory=dict)
+    not_modified: bool = False
+
+    def not_modified_response(self) -> Response:
+        return Response(status_code=304, headers=self.headers)
+
+
+def make_etag(namespace: str, version: str, key: str) -> str:
+    """Strong ETag: namespace version plus the request's path and query."""
+    digest = hashlib.sha1(f"{namespace}:{version}:{key}".encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (t.strip().removeprefix("W/") for t in if_none_match.split(","))
+    return etag in candidates
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+async def check_conditional(request: Request, namespace: str, extra: str = "") -> Validators:
+    """
+    Read the namespace version and compare with If-None-Match (or If-Modified-Since
+    when no ETag was sent, per RFC 9110). Handlers return validators.not_modified_response()
+    when not_modified is set, otherwise copy validators.headers onto their response.
+    extra: anything besides the URL the payload depends on (e.g. the current date).
+    """
+    cache = await get_cache()
+    version = await cache.version(namespace)
+    key = request.url.path
+    if request.url.query:
+        key += "?" + "&".join(sorted(request.url.query.split("&")))
+    etag = make_etag(namespace, version["v"], key + extra)
+    last_modified = datetime.fromtimestamp(version["ts"], tz=timezone.utc)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        ims = request.headers.get("if-modified-since")
+        not_modified = ims is not None and _not_modified_since(ims, last_modified)
+    return Validators(version=version, headers=headers, not_modified=not_modified)
@@ -0,0 +1,224 @@
+"""
+Export endpoints: bias scores and macro observations over arbitrary ranges as CSV or Parquet.
+Rows stream from a server-side cursor in fixed-size batches straight into the response,
+so memory stays constant regardless of range or number of indices.
+"""
+import csv
+import io
+from collections.abc import AsyncIterator
+from datetime import date, datetime, time, timezone
+from typing import Any
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from services.core.db import get_conn
+
+router = APIRouter(prefix="/api/v1/export", tags=["export"])
+
+BATCH_ROWS = 5000
+
+# Per dataset: output columns with Arrow types, base SELECT, range/code filter columns, sort order
+DATASETS: dict[str, dict[str, Any]] = {
+    "bias": {
+        "columns": [
+            ("time", "timestamp"),
+            ("index", "string"),
+            ("bias_score", "float64"),
+            ("confidence_pct", "float64"),
+            ("risk_flag", "string"),
+            ("regime", "string"),
+        ],
+        "select": """
+            SELECT bs.time, i.code AS index, bs.bias_score::float8, bs.confidence_pct::float8,
+                   bs.risk_flag, r.code AS regime
+            FROM bias_score bs
+            JOIN index i ON i.id = bs.index_id
+            LEFT JOIN market_regime r ON r.id = bs.regime_id
+        """,
+        "time_col": "bs.time",
+        "code_col": "i.code",
+        "order_by": "bs.time, i.code",
+    },
+    "macro": {
+        "columns": [
+            ("release_date", "date"),
+            ("indicator", "string"),
+            ("actual", "float64"),
+            ("forecast", "float64"),
+            ("previous", "float64"),
+            ("surprise", "float64"),
+            ("surprise_normalized", "float64"),
+            ("data_version", "int32"),
+        ],
+        "select": """
+            SELECT o.release_date, m.code AS indicator, o.actual::float8, o.forecast::float8,
+                   o.previous::float8, o.surprise::float8, o.surprise_normalized::float8,
+                   o.data_version
+            FROM macro_observation o
+            JOIN macro_indicator m ON m.id = o.indicator_id
+        """,
+        "time_col": "o.time",
+        "code_col": "m.code",
+        "order_by": "o.time, m.code",
+    },
+}
+
+
+def _parse_day(value: str | None, end_of_day: bool = False) -> datetime | None:
+    if not value:
+        return None
+    try:
+        d = date.fromisoformat(value[:10])
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+    return datetime.combine(d, time.max if end_of_day else time.min, tzinfo=timezone.utc)
+
+
+def build_export_query(
+    dataset: str,
+    code: str | None,
+    from_date: str | None,
+    to_date: str | None,
+) -> tuple[str, list[Any]]:
+    spec = DATASETS.get(dataset)
+    if spec is None:
+        raise HTTPException(status_code=400, detail=f"Unknown dataset: {dataset} (use {', '.join(DATASETS)})")
+    q = spec["select"] + " WHERE 1=1"
+    params: list[Any] = []
+    for col, op, val in (
+        (spec["code_col"], "=", code),
+        (spec["time_col"], ">=", _parse_day(from_date)),
+        (spec["time_col"], "<=", _parse_day(to_date, end_of_day=True)),
+    ):
+        if val is not None:
+            params.append(val)
+            q += f" AND {col} {op} ${len(params)}"
+    q += f" ORDER BY {spec['order_by']}"
+    return q, params
+
+
+async def stream_batches(query: str, params: list[Any], batch_rows: int = BATCH_ROWS) -> AsyncIterator[list[Any]]:
+    """Server-side cursor (needs a transaction); holds one pooled read connection while streaming."""
+    async with get_conn(readonly=True) as conn:
+        async with conn.transaction(readonly=True):
+            cur = await conn.cursor(query, *params)
+            while True:
+                batch = await cur.fetch(batch_rows)
+                if not batch:
+                    break
+                yield batch
+
+
+def _csv_cell(v: Any) -> Any:
+    return v.isoformat() if isinstance(v, (date, datetime)) else v
+
+
+async def csv_chunks(columns: list[str], batches: AsyncIterator[list[Any]]) -> AsyncIterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    yield buf.getvalue().encode()
+    async for batch in batches:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows([_csv_cell(v) for v in rec] for rec in batch)
+        yield buf.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object for ParquetWriter; bytes are drained after each row group."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b: Any) -> int:
+        data = bytes(b)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+def _arrow_schema(columns: list[tuple[str, str]]) -> Any:
+    import pyarrow as pa
+
+    types = {
+        "timestamp": pa.timestamp("us", tz="UTC"),
+        "date": pa.date32(),
+        "string": pa.string(),
+        "float64": pa.float64(),
+        "int32": pa.int32(),
+    }
+    return pa.schema([(name, types[t]) for name, t in columns])
+
+
+async def parquet_chunks(columns: list[tuple[str, str]], batches: AsyncIterator[list[Any]]) -> AsyncIterator[bytes]:
+    """One Parquet row group per cursor batch."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(columns)
+    names = [name for name, _ in columns]
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        async for batch in batches:
+            arrays = [pa.array([rec[i] for rec in batch], type=schema.field(i).type) for i in range(len(names))]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def _filename(dataset: str, from_date: str | None, to_date: str | None, ext: str) -> str:
+    return f"{dataset}_{(from_date or 'start')[:10]}_{(to_date or 'latest')[:10]}.{ext}"
+
+
+@router.get("/csv")
+async def export_csv(
+    dataset: str = "bias",
+    code: str | None = None,
+    from_date: str | None = None,
+    to_date: str | None = None,
+) -> StreamingResponse:
+    """Stream a dataset (bias | macro) as CSV. code filters by index or indicator code."""
+    query, params = build_export_query(dataset, code, from_date, to_date)
+    columns = [name for name, _ in DATASETS[dataset]["columns"]]
+    return StreamingResponse(
+        csv_chunks(columns, stream_batches(query, params)),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{_filename(dataset, from_date, to_date, "csv")}"'},
+    )
+
+
+@router.get("/parquet")
+async def export_parquet(
+    dataset: str = "bias",
+    code: str | None = None,
+    from_date: str | None = None,
+    to_date: str | None = None,
+) -> StreamingResponse:
+    """Stream a dataset (bias | macro) as Parquet (zstd, one row group per batch). Needs pyarrow."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow (pip install pyarrow)")
+    query, params = build_export_query(dataset, code, from_date, to_date)
+    return StreamingResponse(
+        parquet_chunks(DATASETS[dataset]["columns"], stream_batches(query, params)),
+        media_type="application/vnd.apache.parquet",
+        headers={"Content-Disposition": f'attachment; filename="{_filename(dataset, from_date, to_date, "parquet")}"'},
+    )
@@ -3,18 +3,42 @@ FastAPI application — MacroEdge API.
 Run from project root: PYTHONPATH=. uvicorn services.api.main:app --reload
 """
 from contextlib import asynccontextmanager
+from datetime import date
 from typing import Any
 
-from fastapi import FastAPI
+import structlog
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel, Field
 
+from services.api.conditional import check_conditional
+from services.api.export import router as export_router
+from services.api.markets import router as markets_router
+from services.api.pagination import MAX_PAGE_ROWS
+from services.api.middleware import AdmissionMiddleware, ReplicaReadsMiddleware
+from services.api.payloads import macro_latest_key, render_bias_summary, render_macro_latest
+from services.api.responses import FastJSONResponse, dumps, json_response
+from services.api.stream import broadcaster
+from services.api.stream import router as stream_router
+from services.core.cache import close_cache, get_cache
 from services.core.config import get_settings
-from services.core.db import close_pool, get_pool
+from services.core.db import close_pool, get_pool, get_replica_pools, prepared, warm_pool
+from services.core.metrics import CONTENT_TYPE, render as render_metrics
+
+log = structlog.get_logger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    if get_settings().db_pool_warmup:
+        try:
+            await warm_pool()
+        except Exception as e:
+            # Serve anyway: /ready reports the database, connections retry per request
+            log.warning("db_pool_warmup_failed", error=str(e))
     yield
+    await broadcaster.stop()
+    await close_cache()
     await close_pool()
 
 
@@ -23,6 +47,17 @@ app = FastAPI(
     description="Macro Monitoring & Bias Trading Support System",
     version="0.1.0",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
+_settings = get_settings()
+app.add_middleware(ReplicaReadsMiddleware, enabled=_settings.api_read_from_replicas)
+app.add_middleware(
+    AdmissionMiddleware,
+    max_concurrency=_settings.api_max_concurrency,
+    max_queue=_settings.api_max_queue,
+    queue_timeout=_settings.api_queue_timeout_ms / 1000.0,
+    pool_wait_budget=_settings.api_pool_wait_budget_ms / 1000.0,
+    route_limits=_settings.api_route_limits,
 )
 app.add_middleware(
     CORSMiddleware,
@@ -30,7 +65,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified"],
 )
+if _settings.api_profiling_enabled:
+    from services.core.profiling import ProfilingMiddleware
+
+    app.add_middleware(ProfilingMiddleware)
+app.include_router(export_router)
+app.include_router(markets_router)
+app.include_router(stream_router)
 
 
 @app.get("/health", tags=["health"])
@@ -46,11 +89,18 @@ async def ready() -> dict[str, Any]:
         pool = await get_pool()
         async with pool.acquire() as conn:
             await conn.fetchval("SELECT 1")
-        return {"status": "ok", "database": "connected"}
+        replicas = await get_replica_pools()
+        return {"status": "ok", "database": "connected", "replicas": len(replicas)}
     except Exception as e:
         return {"status": "error", "database": str(e)}
 
 
+@app.get("/metrics", tags=["health"])
+async def metrics() -> Response:
+    """Prometheus text exposition (pool wait, pool size, ...)."""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
+
 @app.get("/api/v1/indices", tags=["indices"])
 async def list_indices() -> dict[str, Any]:
     """List supported indices (from DB or config). Placeholder: return config."""
@@ -61,127 +111,249 @@ async def list_indices() -> dict[str, Any]:
 
 
 @app.get("/api/v1/bias/summary", tags=["bias"])
-async def bias_summary() -> dict[str, Any]:
-    """Latest bias score per index from DB."""
-    from services.core.db import fetch_all
-
-    rows = await fetch_all(
-        """
-        SELECT bs.time, bs.bias_score, bs.confidence_pct, bs.risk_flag, bs.regime_id,
-               i.code AS index_code, i.name AS index_name,
-               r.code AS regime_code
-        FROM bias_score bs
-        JOIN index i ON i.id = bs.index_id
-        LEFT JOIN market_regime r ON r.id = bs.regime_id
-        WHERE bs.time = (SELECT MAX(time) FROM bias_score)
-        ORDER BY i.code
-        """
-    )
-    if not rows:
-        return {"date": None, "scores": [], "message": "No bias scores yet. Run ingestion, then processing, then bias engine."}
-    date_val = rows[0]["time"].date() if rows[0]["time"] else None
-    scores = [
-        {
-            "index": r["index_code"],
-            "name": r["index_name"],
-            "bias_score": float(r["bias_score"]),
-            "confidence_pct": float(r["confidence_pct"]),
-            "risk_flag": r["risk_flag"],
-            "regime": r["regime_code"],
-        }
-        for r in rows
-    ]
-    return {"date": date_val.isoformat() if date_val else None, "scores": scores}
+async def bias_summary(request: Request) -> Response:
+    """Latest bias score per index from DB. Pre-encoded until the bias stage commits."""
+    validators = await check_conditional(request, "bias")
+    if validators.not_modified:
+        return validators.not_modified_response()
+    cache = await get_cache()
+    body = await cache.get_or_set("bias", "summary", render_bias_summary, validators.version)
+    return json_response(body, validators.headers)
 
 
 @app.get("/api/v1/bias/history", tags=["bias"])
 async def bias_history(
+    request: Request,
     index: str | None = None,
     from_date: str | None = None,
     to_date: str | None = None,
-    limit: int = 365,
-) -> dict[str, Any]:
-    """Time series of bias scores. Optional filter by index code."""
+    limit: int = Query(365, ge=1),
+    cursor: str | None = None,
+    bucket: str | None = None,
+    max_points: int | None = Query(None, ge=1, le=MAX_PAGE_ROWS),
+) -> Response:
+    """
+    Time series of bias scores, newest first. Optional filter by index code.
+    Pages of up to limit rows (at most 1000, larger values are clamped); pass next_cursor
+    back as cursor for the next page.
+    bucket ('1 week') or max_points (per index) downsample with time_bucket.
+    """
     from datetime import datetime, timezone
-    from services.core.db import fetch_all
+    from services.api.pagination import (
+        bucket_for_max_points,
+        build_history_query,
+        decode_cursor,
+        encode_cursor,
+        normalize_bucket,
+    )
+    from services.core.db import fetch_all, fetch_one
 
-    q = """
-        SELECT bs.time, bs.bias_score, bs.confidence_pct, bs.risk_flag, i.code AS index_code
-        FROM bias_score bs
-        JOIN index i ON i.id = bs.index_id
-        WHERE 1=1
-    """
-    params: list[Any] = []
-    n = 0
-    if index:
-        n += 1
-        q += f" AND i.code = ${n}"
-        params.append(index)
+    validators = await check_conditional(request, "bias")
+    if validators.not_modified:
+        return validators.not_modified_response()
+
+    start = end = None
     if from_date:
-        n += 1
-        q += f" AND bs.time >= ${n}"
         try:
-            dt = datetime.strptime(from_date[:10], "%Y-%m-%d").replace(tzinfo=timezone.utc)
+            start = datetime.strptime(from_date[:10], "%Y-%m-%d").replace(tzinfo=timezone.utc)
         except (ValueError, TypeError):
-            dt = datetime.now(timezone.utc)
-        params.append(dt)
+            start = datetime.now(timezone.utc)
     if to_date:
-        n += 1
-        q += f" AND bs.time <= ${n}"
         try:
-            dt = datetime.strptime(to_date[:10], "%Y-%m-%d").replace(hour=23, minute=59, second=59, tzinfo=timezone.utc)
+            end = datetime.strptime(to_date[:10], "%Y-%m-%d").replace(hour=23, minute=59, second=59, tzinfo=timezone.utc)
         except (ValueError, TypeError):
-            dt = datetime.now(timezone.utc)
-        params.append(dt)
-    params.append(min(limit, 1000))
-    n += 1
-    q += f" ORDER BY bs.time DESC LIMIT ${n}"
+            end = datetime.now(timezone.utc)
+    after = decode_cursor(cursor) if cursor else None
+    if bucket:
+        bucket = normalize_bucket(bucket)
+    elif max_points:
+        lo, hi = start, end
+        if lo is None or hi is None:
+            span = await fetch_one("SELECT MIN(time) AS lo, MAX(time) AS hi FROM bias_score")
+            lo = lo or (span["lo"] if span else None)
+            hi = hi or (span["hi"] if span else None)
+        if lo is not None and hi is not None:
+            bucket = bucket_for_max_points(lo, hi, max_points)
+
+    q, params = build_history_query(index, start, end, limit, after, bucket)
     rows = await fetch_all(q, *params)
-    series = [
-        {
-            "time": r["time"].isoformat() if r["time"] else None,
-            "date": r["time"].date().isoformat() if r["time"] else None,
-            "index": r["index_code"],
-            "bias_score": float(r["bias_score"]),
-            "confidence_pct": float(r["confidence_pct"]),
-            "risk_flag": r["risk_flag"],
-        }
-        for r in rows
-    ]
-    return {"series": series, "count": len(series)}
+    page_size = min(limit, MAX_PAGE_ROWS)
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1]["time"], rows[-1]["index_id"])
+    # Scores come rounded and as float8 from SQL; orjson formats time and date
+    if bucket:
+        series = [
+            {"time": r["time"], "date": r["time"].date(), "index": r["index_code"],
+             "bias_score": r["bias_score"], "confidence_pct": r["confidence_pct"],
+             "risk_flag": r["risk_flag"], "points": r["points"]}
+            for r in rows
+        ]
+    else:
+        series = [
+            {"time": r["time"], "date": r["time"].date(), "index": r["index_code"],
+             "bias_score": r["bias_score"], "confidence_pct": r["confidence_pct"],
+             "risk_flag": r["risk_flag"]}
+            for r in rows
+        ]
+    return json_response(
+        {"series": series, "count": len(series), "bucket": bucket, "next_cursor": next_cursor},
+        validators.headers,
+    )
 
 
-@app.get("/api/v1/macro/latest", tags=["macro"])
-async def macro_latest(days: int = 30) -> dict[str, Any]:
-    """Latest macro observations per indicator (for heatmap/surprise tracker)."""
+@app.get("/api/v1/bias/matrix", tags=["bias"])
+async def bias_matrix(
+    request: Request,
+    from_date: str | None = None,
+    to_date: str | None = None,
+    indices: str | None = None,
+) -> Response:
+    """
+    Dates x indices grid for the heatmap, in one query. Columnar layout: a shared
+    dates axis plus per-index arrays aligned to it (null where an index has no score).
+    from_date defaults to one year back; indices is a comma-separated list of codes.
+    """
+    from datetime import timedelta
+
+    validators = await check_conditional(request, "bias")
+    if validators.not_modified:
+        return validators.not_modified_response()
+    try:
+        end = date.fromisoformat(to_date[:10]) if to_date else date.today()
+        start = date.fromisoformat(from_date[:10]) if from_date else end - timedelta(days=365)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    codes = sorted({c.strip() for c in indices.split(",") if c.strip()}) if indices else None
+    cache = await get_cache()
+    key = f"matrix:{start}:{end}:{','.join(codes or [])}"
+    body = await cache.get_or_set(
+        "bias", key, lambda: _render_bias_matrix(start, end, codes), validators.version
+    )
+    return json_response(body, validators.headers)
+
+
+BIAS_MATRIX_SQL = prepared("bias_matrix", """
+    WITH d AS (
+        SELECT DISTINCT time FROM bias_score WHERE time >= $1 AND time <= $2
+    ), ix AS (
+        SELECT id, code FROM index WHERE $3::text[] IS NULL OR code = ANY($3::text[])
+    )
+    SELECT ix.code AS index_code,
+           array_agg(d.time ORDER BY d.time) AS dates,
+           array_agg(bs.bias_score::float8 ORDER BY d.time) AS bias,
+           array_agg(bs.confidence_pct::float8 ORDER BY d.time) AS confidence,
+           array_agg(bs.risk_flag ORDER BY d.time) AS risk_flag
+    FROM ix
+    CROSS JOIN d
+    LEFT JOIN bias_score bs ON bs.index_id = ix.id AND bs.time = d.time
+    GROUP BY ix.code
+    ORDER BY ix.code
+""")
+
+
+async def _render_bias_matrix(start: date, end: date, codes: list[str] | None) -> bytes:
+    return dumps(await _build_bias_matrix(start, end, codes))
+
+
+async def _build_bias_matrix(start: date, end: date, codes: list[str] | None) -> dict[str, Any]:
+    from datetime import datetime, time, timezone
     from services.core.db import fetch_all
 
     rows = await fetch_all(
-        """
-        SELECT DISTINCT ON (m.id)
-            m.code, m.name, m.category, m.unit, m.direction,
-            o.release_date, o.actual, o.forecast, o.previous, o.surprise, o.surprise_normalized
-        FROM macro_observation o
-        JOIN macro_indicator m ON m.id = o.indicator_id
-        WHERE o.release_date >= CURRENT_DATE - $1::int
-        ORDER BY m.id, o.release_date DESC
-        """,
-        min(days, 365),
+        BIAS_MATRIX_SQL,
+        datetime.combine(start, time.min, tzinfo=timezone.utc),
+        datetime.combine(end, time.max, tzinfo=timezone.utc),
+        codes,
+    )
+    dates = [t.date().isoformat() for t in rows[0]["dates"]] if rows else []
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "dates": dates,
+        "indices": [r["index_code"] for r in rows],
+        "series": {
+            r["index_code"]: {
+                "bias": list(r["bias"]),
+                "confidence": list(r["confidence"]),
+                "risk_flag": list(r["risk_flag"]),
+            }
+            for r in rows
+        },
+    }
+
+
+@app.get("/api/v1/correlation", tags=["analytics"])
+async def correlation(
+    request: Request,
+    kind: str = "bias",
+    window: int = 90,
+    as_of: str | None = None,
+) -> Response:
+    """
+    Rolling correlation matrix over the last `window` calendar days up to as_of:
+    kind=bias between indices' bias scores, kind=surprise between indicator surprises.
+    """
+    from services.processing.correlation import KINDS, NAMESPACES, correlation_cache
+
+    if kind not in KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(KINDS)}")
+    if not 2 <= window <= 3650:
+        raise HTTPException(status_code=400, detail="window must be between 2 and 3650 days")
+    try:
+        day = date.fromisoformat(as_of[:10]) if as_of else date.today()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="as_of must be YYYY-MM-DD")
+    validators = await check_conditional(request, NAMESPACES[kind], extra=day.isoformat())
+    if validators.not_modified:
+        return validators.not_modified_response()
+    result = await correlation_cache.get(kind, window, day, validators.version["v"])
+    return json_response(result, validators.headers)
+
+
+@app.get("/api/v1/macro/latest", tags=["macro"])
+async def macro_latest(request: Request, days: int = 30) -> Response:
+    """Latest macro observations per indicator (for heatmap/surprise tracker)."""
+    # The window is relative to CURRENT_DATE, so the day is part of the key and the ETag
+    validators = await check_conditional(request, "macro", extra=date.today().isoformat())
+    if validators.not_modified:
+        return validators.not_modified_response()
+    days = min(days, 365)
+    cache = await get_cache()
+    body = await cache.get_or_set(
+        "macro", macro_latest_key(days), lambda: render_macro_latest(days), validators.version
     )
-    items = [
-        {
-            "code": r["code"],
-            "name": r["name"],
-            "category": r["category"],
-            "unit": r["unit"],
-            "direction": r["direction"],
-            "release_date": r["release_date"].isoformat() if r["release_date"] else None,
-            "actual": float(r["actual"]) if r["actual"] is not None else None,
-            "forecast": float(r["forecast"]) if r["forecast"] is not None else None,
-            "previous": float(r["previous"]) if r["previous"] is not None else None,
-            "surprise": float(r["surprise"]) if r["surprise"] is not None else None,
-            "surprise_normalized": float(r["surprise_normalized"]) if r["surprise_normalized"] is not None else None,
-        }
-        for r in rows
+    return json_response(body, validators.headers)
+
+
+class ScenarioRequest(BaseModel):
+    """Hypothetical inputs: normalized surprise per indicator code, optional VIX and regime."""
+
+    surprises: dict[str, float] = Field(default_factory=dict)
+    vix: float | None = None
+    regime: str = "neutral"
+
+
+@app.post("/api/v1/bias/scenario", tags=["bias"])
+async def bias_scenario(req: ScenarioRequest) -> dict[str, Any]:
+    """What-if bias per index for the given surprises. Nothing is written. 422 for an unknown regime."""
+    from services.bias_engine.context import get_scoring_context
+
+    ctx = await get_scoring_context()
+    if req.regime not in ctx.weights:
+        raise HTTPException(
+            status_code=422, detail={"unknown_regime": req.regime, "regimes": sorted(ctx.weights)}
+        )
+    code_to_id = dict(zip(ctx.indicator_codes, ctx.indicator_ids))
+    surprises = [
+        {"indicator_id": code_to_id[code], "surprise_normalized": value}
+        for code, value in req.surprises.items()
+        if code in code_to_id
+    ]
+    unknown = sorted(code for code in req.surprises if code not in code_to_id)
+    scores = [
+        {k: v for k, v in out.items() if k not in ("index_id", "regime_id")}
+        for out in ctx.score(surprises, req.vix, req.regime)
     ]
-    return {"observations": items, "count": len(items)}
+    return {"regime": req.regime, "scores": scores, "unknown_indicators": unknown}
@@ -0,0 +1,221 @@
+"""
+Yield curve (2Y-10Y spread) and volatility history endpoints.
+Bucketed series are OHLC of the spread / index level per time_bucket. Buckets of whole
+weeks or months (including those chosen for max_points) read the continuous aggregates in
+migrations/002, rolled up for multiples; other widths aggregate raw chunks. A range holding
+more than MAX_POINTS rows returns the newest ones ("truncated").
+"""
+import math
+from datetime import date, datetime, time, timezone
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import Response
+
+from services.api.pagination import bucket_for_max_points, normalize_bucket
+from services.api.responses import json_response, records
+from services.core.db import prepared
+
+router = APIRouter(prefix="/api/v1", tags=["markets"])
+
+MAX_POINTS = 10000
+
+YIELD_CURVE_LATEST_SQL = prepared("yield_curve_latest", """
+    SELECT DISTINCT ON (region) region, time, yield_2y::float8 AS yield_2y,
+           yield_10y::float8 AS yield_10y, spread_2y10y::float8 AS spread_2y10y
+    FROM yield_curve_snapshot
+    ORDER BY region, time DESC
+""")
+
+# Per series: raw table, key column, raw value columns, bucket aggregates, continuous aggregates by width
+SERIES: dict[str, dict[str, Any]] = {
+    "yield_curve": {
+        "table": "yield_curve_snapshot",
+        "key": "region",
+        "raw": ["yield_2y", "yield_10y", "spread_2y10y"],
+        "ohlc_of": "spread_2y10y",
+        "last": ["yield_2y", "yield_10y"],
+        "caggs": {"1 week": "yield_curve_weekly", "1 month": "yield_curve_monthly"},
+    },
+    "volatility": {
+        "table": "volatility_snapshot",
+        "key": "symbol",
+        "raw": ["value"],
+        "ohlc_of": "value",
+        "last": [],
+        "caggs": {"1 week": "volatility_weekly", "1 month": "volatility_monthly"},
+    },
+}
+
+
+def _parse_day(value: str | None, end_of_day: bool = False) -> datetime | None:
+    if not value:
+        return None
+    try:
+        d = date.fromisoformat(value[:10])
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+    return datetime.combine(d, time.max if end_of_day else time.min, tzinfo=timezone.utc)
+
+
+def _cagg_width(bucket: str) -> tuple[str, int] | None:
+    """(continuous aggregate width, multiple) a bucket can be rolled up from, or None."""
+    n, unit = bucket.split()
+    n = int(n)
+    if unit.startswith("day") and n % 7 == 0:
+        n, unit = n // 7, "week"
+    if unit.startswith("week"):
+        return "1 week", n
+    if unit.startswith("month"):
+        return "1 month", n
+    return None
+
+
+def build_series_query(
+    series: str,
+    key: str,
+    start: datetime | None,
+    end: datetime | None,
+    bucket: str | None,
+    limit: int = MAX_POINTS,
+) -> tuple[str, list[Any], str]:
+    """
+    Oldest-first rows for one region/symbol: the newest limit rows when the range holds more.
+    Returns (query, params, source table or view).
+    """
+    spec = SERIES[series]
+    params: list[Any] = [key]
+
+    def bind(value: Any) -> str:
+        params.append(value)
+        return f"${len(params)}"
+
+    def newest(q: str, order: str) -> str:
+        # Newest rows under the limit, returned oldest first
+        return f"SELECT * FROM ({q} ORDER BY {order} DESC LIMIT {bind(limit)}) t ORDER BY time"
+
+    cagg = _cagg_width(bucket) if bucket else None
+    view = spec["caggs"].get(cagg[0]) if cagg else None
+    if view:
+        # Buckets overlapping the range, already aggregated; multiples of the width rolled up
+        where = [f"{spec['key']} = $1"]
+        if start:
+            where.append(f"bucket > {bind(start)}::timestamptz - {bind(cagg[0])}::text::interval")
+        if end:
+            where.append(f"bucket <= {bind(end)}")
+        if cagg[1] == 1:
+            cols = ["open", "high", "low", "close", *spec["last"]]
+            select = ", ".join(f"{c}::float8 AS {c}" for c in cols)
+            q = f"SELECT bucket AS time, {select}, points FROM {view} WHERE {' AND '.join(where)}"
+            return newest(q, "bucket"), params, view
+        lasts = "".join(f", last({c}, bucket)::float8 AS {c}" for c in spec["last"])
+        q = f"""
+            SELECT time_bucket({bind(bucket)}::text::interval, bucket) AS time,
+                   first(open, bucket)::float8 AS open, max(high)::float8 AS high,
+                   min(low)::float8 AS low, last(close, bucket)::float8 AS close{lasts},
+                   sum(points)::bigint AS points
+            FROM {view}
+            WHERE {" AND ".join(where)}
+            GROUP BY 1
+        """
+        return newest(q, "1"), params, view
+
+    where = [f"{spec['key']} = $1"]
+    if start:
+        where.append(f"time >= {bind(start)}")
+    if end:
+        where.append(f"time <= {bind(end)}")
+    if bucket is None:
+        select = ", ".join(f"{c}::float8 AS {c}" for c in spec["raw"])
+        q = f"SELECT time, {select} FROM {spec['table']} WHERE {' AND '.join(where)}"
+        return newest(q, "time"), params, spec["table"]
+
+    v = spec["ohlc_of"]
+    lasts = "".join(f", last({c}, time)::float8 AS {c}" for c in spec["last"])
+    q = f"""
+        SELECT time_bucket({bind(bucket)}::text::interval, time) AS time,
+               first({v}, time)::float8 AS open, max({v})::float8 AS high,
+               min({v})::float8 AS low, last({v}, time)::float8 AS close{lasts},
+               count(*) AS points
+        FROM {spec['table']}
+        WHERE {" AND ".join(where)}
+        GROUP BY 1
+    """
+    return newest(q, "1"), params, spec["table"]
+
+
+async def _series(
+    series: str,
+    key: str,
+    from_date: str | None,
+    to_date: str | None,
+    bucket: str | None,
+    max_points: int | None,
+) -> dict[str, Any]:
+    from services.core.db import fetch_all, fetch_one
+
+    spec = SERIES[series]
+    start, end = _parse_day(from_date), _parse_day(to_date, end_of_day=True)
+    if bucket:
+        bucket = normalize_bucket(bucket)
+    elif max_points:
+        lo, hi = start, end
+        if lo is None or hi is None:
+            span = await fetch_one(
+                f"SELECT MIN(time) AS lo, MAX(time) AS hi FROM {spec['table']} WHERE {spec['key']} = $1", key
+            )
+            lo = lo or (span["lo"] if span else None)
+            hi = hi or (span["hi"] if span else None)
+        if lo is not None and hi is not None:
+            bucket = bucket_for_max_points(lo, hi, max_points)
+        if bucket and int(bucket.split()[0]) >= 7:
+            # Whole weeks: rolled up from the weekly aggregate instead of raw chunks
+            weeks = math.ceil(int(bucket.split()[0]) / 7)
+            bucket = f"{weeks} week" + ("s" if weeks > 1 else "")
+    q, params, source = build_series_query(series, key, start, end, bucket)
+    rows = await fetch_all(q, *params)
+    points = records(rows)
+    return {
+        spec["key"]: key,
+        "bucket": bucket,
+        "source": source,
+        "points": points,
+        "count": len(points),
+        "truncated": len(points) >= MAX_POINTS,
+    }
+
+
+@router.get("/yield-curve/latest")
+async def yield_curve_latest() -> Response:
+    """Latest 2Y/10Y yields and spread per region."""
+    from services.core.db import fetch_all
+
+    rows = await fetch_all(YIELD_CURVE_LATEST_SQL)
+    return json_response({"curves": records(rows)})
+
+
+@router.get("/yield-curve/history")
+async def yield_curve_history(
+    region: str = "US",
+    from_date: str | None = None,
+    to_date: str | None = None,
+    bucket: str | None = None,
+    max_points: int | None = Query(None, ge=1, le=MAX_POINTS),
+) -> Response:
+    """
+    2Y/10Y yields and spread for one region, oldest first. With bucket ('1 week') or
+    max_points: spread OHLC plus last 2Y/10Y yield per bucket.
+    """
+    return json_response(await _series("yield_curve", region, from_date, to_date, bucket, max_points))
+
+
+@router.get("/volatility/history")
+async def volatility_history(
+    symbol: str = "VIX",
+    from_date: str | None = None,
+    to_date: str | None = None,
+    bucket: str | None = None,
+    max_points: int | None = Query(None, ge=1, le=MAX_POINTS),
+) -> Response:
+    """Volatility index level for one symbol, oldest first; OHLC per bucket when bucketed."""
+    return json_response(await _series("volatility", symbol, from_date, to_date, bucket, max_points))
@@ -0,0 +1,175 @@
+"""ASGI middleware for the API."""
+import asyncio
+import json
+import time
+from typing import Any
+
+from starlette.routing import Match
+
+from services.core.db import recent_pool_wait, use_replicas
+from services.core.metrics import Counter, Gauge, Histogram
+
+REQUEST_SECONDS = Histogram(
+    "http_request_seconds", "Request latency by route", ("route", "method", "status")
+)
+QUEUE_SECONDS = Histogram("http_request_queue_seconds", "Wait for a concurrency slot", ("route",))
+IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being handled", ("route",))
+QUEUED = Gauge("http_requests_queued", "Requests waiting for a slot", ("route",))
+SHED = Counter("http_requests_shed_total", "Requests rejected by admission control", ("route", "reason"))
+
+# Probes, metrics and long-lived streams are never limited or timed
+EXEMPT_PATHS = frozenset({"/health", "/ready", "/metrics", "/api/v1/stream", "/api/v1/ws"})
+
+UNMATCHED = "<unmatched>"
+
+
+class ReplicaReadsMiddleware:
+    """
+    Run each request with reads routed to replicas (a no-op without DATABASE_REPLICA_URLS).
+    Writes still go to the primary and pin that request's later reads there.
+    """
+
+    def __init__(self, app: Any, enabled: bool = True):
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if not self.enabled or scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        with use_replicas():
+            await self.app(scope, receive, send)
+
+
+class _RouteLimit:
+    """Concurrency slots for one route plus the number of requests waiting for one."""
+
+    def __init__(self, concurrency: int):
+        self.sem = asyncio.Semaphore(concurrency)
+        self.waiting = 0
+
+    async def acquire(self, timeout: float) -> bool:
+        if not self.sem.locked():
+            await self.sem.acquire()
+            return True
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.sem.acquire(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+
+    def release(self) -> None:
+        self.sem.release()
+
+
+class AdmissionMiddleware:
+    """
+    Per-route latency/in-flight metrics and admission control. Each route gets
+    max_concurrency slots and at most max_queue waiters: beyond that 429; waiting longer
+    than queue_timeout, or arriving while the DB pool wait averages over pool_wait_budget,
+    gets a fast 503 with Retry-After instead of joining a queue that only grows.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        max_concurrency: int = 32,
+        max_queue: int = 64,
+        queue_timeout: float = 1.0,
+        pool_wait_budget: float = 0.2,
+        route_limits: dict[str, int] | None = None,
+    ):
+        self.app = app
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.pool_wait_budget = pool_wait_budget
+        self.route_limits = route_limits or {}
+        self._routes: dict[str, str] = {}
+        self._limits: dict[str, _RouteLimit] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _route(self, scope: dict[str, Any]) -> str:
+        """Route template for the path (bounded label set: unknown paths share one label)."""
+        path = scope["path"]
+        route = self._routes.get(path)
+        if route is None:
+            route = UNMATCHED
+            for r in getattr(scope.get("app"), "routes", ()):
+                match, _ = r.matches(scope)
+                if match == Match.FULL:
+                    route = getattr(r, "path", path)
+                    break
+            if route != UNMATCHED or len(self._routes) < 1024:
+                self._routes[path] = route
+        return route
+
+    def _limit(self, route: str) -> _RouteLimit:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Semaphores bind to the loop they first wait on
+            self._limits.clear()
+            self._loop = loop
+        limit = self._limits.get(route)
+        if limit is None:
+            limit = self._limits[route] = _RouteLimit(self.route_limits.get(route, self.max_concurrency))
+        return limit
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        route = self._route(scope)
+        if self.pool_wait_budget > 0 and recent_pool_wait() > self.pool_wait_budget:
+            await self._shed(send, route, 503, "db_saturated")
+            return
+        limit = self._limit(route)
+        if limit.sem.locked() and limit.waiting >= self.max_queue:
+            await self._shed(send, route, 429, "queue_full")
+            return
+        t0 = time.perf_counter()
+        QUEUED.inc(route=route)
+        try:
+            admitted = await limit.acquire(self.queue_timeout)
+        finally:
+            QUEUED.dec(route=route)
+        if not admitted:
+            await self._shed(send, route, 503, "queue_timeout")
+            return
+        started = time.perf_counter()
+        QUEUE_SECONDS.observe(started - t0, route=route)
+        IN_FLIGHT.inc(route=route)
+        status = 500
+
+        async def send_wrapper(message: dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            limit.release()
+            IN_FLIGHT.dec(route=route)
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started, route=route, method=scope["method"], status=status
+            )
+
+    @staticmethod
+    async def _shed(send: Any, route: str, status: int, reason: str) -> None:
+        SHED.inc(route=route, reason=reason)
+        body = json.dumps({"detail": "Server busy, retry shortly", "reason": reason}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", b"1"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
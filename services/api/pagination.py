@@ -0,0 +1,120 @@
+"""
+Keyset pagination and time-bucket downsampling for /api/v1/bias/history.
+Pages walk (time, index_id) descending, matching idx_bias_score_index_time, so page N
+costs the same as page 1. Cursors are opaque base64 of the last row's key.
+"""
+import base64
+import math
+import re
+from datetime import datetime
+from typing import Any
+
+from fastapi import HTTPException
+
+MAX_PAGE_ROWS = 1000
+
+_BUCKET_RE = re.compile(r"^(\d{1,4})\s*(hour|day|week|month)s?$")
+
+
+def encode_cursor(time: datetime, index_id: int) -> str:
+    raw = f"{time.isoformat()}|{index_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        t, index_id = raw.split("|", 1)
+        return datetime.fromisoformat(t), int(index_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def normalize_bucket(bucket: str) -> str:
+    """Validate a bucket width like '1 week' / '3days' -> '3 days'."""
+    m = _BUCKET_RE.match(bucket.strip().lower())
+    if not m or int(m.group(1)) == 0:
+        raise HTTPException(status_code=400, detail=f"Invalid bucket: {bucket} (e.g. '1 day', '1 week', '1 month')")
+    n, unit = int(m.group(1)), m.group(2)
+    return f"{n} {unit}" + ("s" if n > 1 else "")
+
+
+def bucket_for_max_points(start: datetime, end: datetime, max_points: int) -> str | None:
+    """Smallest whole-day bucket keeping each index series at or under max_points. None = no bucketing."""
+    span_days = (end - start).total_seconds() / 86400 + 1
+    days = math.ceil(span_days / max(1, max_points))
+    if days <= 1:
+        return None
+    return f"{days} days"
+
+
+def build_history_query(
+    index: str | None,
+    start: datetime | None,
+    end: datetime | None,
+    limit: int,
+    cursor: tuple[datetime, int] | None = None,
+    bucket: str | None = None,
+) -> tuple[str, list[Any]]:
+    """
+    Newest-first page of bias_score rows (or bucket aggregates), limit+1 rows fetched so
+    the caller can tell whether another page exists.
+    """
+    params: list[Any] = []
+
+    def bind(value: Any) -> str:
+        params.append(value)
+        return f"${len(params)}"
+
+    where = ["1=1"]
+    if index:
+        # Resolve the id up front so the planner can use (index_id, time DESC)
+        where.append(f"bs.index_id = (SELECT id FROM index WHERE code = {bind(index)})")
+    if start:
+        where.append(f"bs.time >= {bind(start)}")
+    if end:
+        where.append(f"bs.time <= {bind(end)}")
+
+    if bucket is None:
+        if cursor:
+            if index:
+                where.append(f"bs.time < {bind(cursor[0])}")
+            else:
+                where.append(f"(bs.time, bs.index_id) < ({bind(cursor[0])}, {bind(cursor[1])})")
+        q = f"""
+            SELECT bs.time, bs.index_id, round(bs.bias_score, 2)::float8 AS bias_score,
+                   round(bs.confidence_pct, 2)::float8 AS confidence_pct, bs.risk_flag, i.code AS index_code
+            FROM bias_score bs
+            JOIN index i ON i.id = bs.index_id
+            WHERE {" AND ".join(where)}
+            ORDER BY bs.time DESC, bs.index_id DESC
+            LIMIT {bind(min(limit, MAX_PAGE_ROWS) + 1)}
+        """
+        return q, params
+
+    # Bound as text and cast, so month-sized buckets work (asyncpg maps interval to timedelta)
+    b = f"{bind(bucket)}::text::interval"
+    outer = ""
+    if cursor:
+        # Rows of earlier buckets all precede the cursor bucket's end; the outer filter trims the rest
+        c_time, c_id = bind(cursor[0]), bind(cursor[1])
+        where.append(f"bs.time < {c_time} + {b}")
+        outer = f"WHERE (b.time, b.index_id) < ({c_time}, {c_id})"
+    q = f"""
+        SELECT * FROM (
+            SELECT time_bucket({b}, bs.time) AS time, bs.index_id,
+                   round(AVG(bs.bias_score), 2)::float8 AS bias_score,
+                   round(AVG(bs.confidence_pct), 2)::float8 AS confidence_pct,
+                   last(bs.risk_flag, bs.time) AS risk_flag,
+                   MIN(i.code) AS index_code,
+                   COUNT(*) AS points
+            FROM bias_score bs
+            JOIN index i ON i.id = bs.index_id
+            WHERE {" AND ".join(where)}
+            GROUP BY 1, 2
+        ) b
+        {outer}
+        ORDER BY b.time DESC, b.index_id DESC
+        LIMIT {bind(min(limit, MAX_PAGE_ROWS) + 1)}
+    """
+    return q, params
@@ -0,0 +1,86 @@
+"""
+Latest-state payloads (bias summary, macro latest), rendered once per data version and
+cached as encoded JSON bytes. The stream broadcaster re-renders them as soon as a pipeline
+event invalidates their namespace, so the first poll after new data is already a hit.
+"""
+from datetime import date
+from typing import Any
+
+import structlog
+
+from services.api.responses import dumps, records
+from services.core.cache import get_cache
+from services.core.db import prepared
+
+log = structlog.get_logger(__name__)
+
+MACRO_LATEST_DEFAULT_DAYS = 30
+
+BIAS_SUMMARY_SQL = prepared("bias_summary", """
+    SELECT bs.time, i.code AS index, i.name, bs.bias_score::float8 AS bias_score,
+           bs.confidence_pct::float8 AS confidence_pct, bs.risk_flag, r.code AS regime
+    FROM bias_score bs
+    JOIN index i ON i.id = bs.index_id
+    LEFT JOIN market_regime r ON r.id = bs.regime_id
+    WHERE bs.time = (SELECT MAX(time) FROM bias_score)
+    ORDER BY i.code
+""")
+
+MACRO_LATEST_SQL = prepared("macro_latest", """
+    SELECT DISTINCT ON (m.id)
+        m.code, m.name, m.category, m.unit, m.direction, o.release_date,
+        o.actual::float8 AS actual, o.forecast::float8 AS forecast,
+        o.previous::float8 AS previous, o.surprise::float8 AS surprise,
+        o.surprise_normalized::float8 AS surprise_normalized
+    FROM macro_observation o
+    JOIN macro_indicator m ON m.id = o.indicator_id
+    WHERE o.release_date >= CURRENT_DATE - $1::int
+    ORDER BY m.id, o.release_date DESC
+""")
+
+
+async def build_bias_summary() -> dict[str, Any]:
+    from services.core.db import fetch_all
+
+    rows = await fetch_all(BIAS_SUMMARY_SQL)
+    if not rows:
+        return {"date": None, "scores": [], "message": "No bias scores yet. Run ingestion, then processing, then bias engine."}
+    scores = records(rows)
+    t = None
+    for s in scores:
+        t = s.pop("time")
+    return {"date": t.date() if t else None, "scores": scores}
+
+
+async def build_macro_latest(days: int) -> dict[str, Any]:
+    from services.core.db import fetch_all
+
+    rows = await fetch_all(MACRO_LATEST_SQL, days)
+    items = records(rows)
+    return {"observations": items, "count": len(items)}
+
+
+async def render_bias_summary() -> bytes:
+    return dumps(await build_bias_summary())
+
+
+async def render_macro_latest(days: int) -> bytes:
+    return dumps(await build_macro_latest(days))
+
+
+def macro_latest_key(days: int) -> str:
+    # The window is relative to CURRENT_DATE, so the day is part of the key
+    return f"latest:{date.today().isoformat()}:{days}"
+
+
+async def warm(namespace: str) -> None:
+    """Render the default latest payload of a namespace into the cache. Never raises."""
+    try:
+        cache = await get_cache()
+        if namespace == "bias":
+            await cache.get_or_set("bias", "summary", render_bias_summary)
+        elif namespace == "macro":
+            days = MACRO_LATEST_DEFAULT_DAYS
+            await cache.get_or_set("macro", macro_latest_key(days), lambda: render_macro_latest(days))
+    except Exception as e:
+        log.warning("payload_warm_failed", namespace=namespace, error=str(e))
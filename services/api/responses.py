@@ -0,0 +1,42 @@
+"""
+JSON fast path for read endpoints. Queries cast numerics to float8 and alias columns to
+their payload names, so rows become payloads with dict(r) and are encoded once by orjson
+(datetimes and dates natively); handlers return the bytes, skipping jsonable_encoder.
+"""
+from collections.abc import Iterable, Mapping
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+
+def records(rows: Iterable[Mapping[str, Any]]) -> list[dict[str, Any]]:
+    """Rows whose SQL already yields payload-ready columns -> list of dicts."""
+    return [dict(r) for r in rows]
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; the app's default response class."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(body: bytes | Any, headers: Mapping[str, str] | None = None) -> Response:
+    """Response from pre-encoded bytes (or anything dumps() accepts)."""
+    if not isinstance(body, bytes):
+        body = dumps(body)
+    return Response(content=body, media_type="application/json", headers=dict(headers or {}))
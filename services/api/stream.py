@@ -0,0 +1,168 @@
+"""
+Push endpoints: Server-Sent Events and WebSocket fan-out of pipeline events.
+One LISTEN connection per API process feeds every connected client, replacing N pollers.
+Events also refresh the local response cache (entries dropped, data version re-read), so the
+in-process LRU fallback stays fresh,
+and re-render the latest-state payloads so the next poll is served from cache.
+"""
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+
+import asyncpg
+import structlog
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from services.api.payloads import warm
+from services.core.cache import refresh
+from services.core.db import _database_url_for_asyncpg
+from services.core.events import BIAS_COMPUTED, CHANNELS, MACRO_DATA_UPDATED
+
+log = structlog.get_logger(__name__)
+
+router = APIRouter(prefix="/api/v1", tags=["stream"])
+
+QUEUE_SIZE = 100
+HEARTBEAT_SECONDS = 15.0
+RECONNECT_SECONDS = 5.0
+
+_CACHE_NAMESPACE = {BIAS_COMPUTED: "bias", MACRO_DATA_UPDATED: "macro"}
+
+
+class Broadcaster:
+    """Holds the LISTEN connection and a bounded queue per subscriber."""
+
+    def __init__(self, prewarm: bool = False) -> None:
+        self.prewarm = prewarm
+        self._subscribers: set[asyncio.Queue] = set()
+        self._task: asyncio.Task | None = None
+        self._background: set[asyncio.Task] = set()
+        self._seq = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        q: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue) -> None:
+        self._subscribers.discard(q)
+
+    def dispatch(self, channel: str, payload: str) -> None:
+        """Fan one event out to every subscriber; slow clients lose their oldest events."""
+        self._seq += 1
+        try:
+            data = json.loads(payload) if payload else {}
+        except ValueError:
+            data = {"raw": payload}
+        event = {"id": self._seq, "event": channel, "data": data}
+        for q in self._subscribers:
+            if q.full():
+                q.get_nowait()
+            q.put_nowait(event)
+        ns = _CACHE_NAMESPACE.get(channel)
+        if ns:
+            task = asyncio.get_running_loop().create_task(self._refresh(ns))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    async def _refresh(self, namespace: str) -> None:
+        await refresh(namespace)
+        if self.prewarm:
+            await warm(namespace)
+
+    def _on_notify(self, conn: Any, pid: int, channel: str, payload: str) -> None:
+        self.dispatch(channel, payload)
+
+    async def ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            conn: asyncpg.Connection | None = None
+            try:
+                conn = await asyncpg.connect(_database_url_for_asyncpg())
+                closed = asyncio.Event()
+                conn.add_termination_listener(lambda _c: closed.set())
+                for channel in CHANNELS:
+                    await conn.add_listener(channel, self._on_notify)
+                log.info("stream_listening", channels=CHANNELS)
+                await closed.wait()
+            except asyncio.CancelledError:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+                raise
+            except Exception as e:
+                log.warning("stream_listener_error", error=str(e))
+            await asyncio.sleep(RECONNECT_SECONDS)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+
+broadcaster = Broadcaster(prewarm=True)
+
+
+def format_sse(event: dict[str, Any]) -> str:
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+
+async def sse_events(q: asyncio.Queue) -> AsyncIterator[str]:
+    try:
+        yield ": connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(q.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(event)
+    finally:
+        broadcaster.unsubscribe(q)
+
+
+@router.get("/stream")
+async def stream_sse() -> StreamingResponse:
+    """Server-Sent Events: bias_computed and macro_data_updated as they are committed."""
+    await broadcaster.ensure_started()
+    q = broadcaster.subscribe()
+    return StreamingResponse(
+        sse_events(q),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def stream_ws(ws: WebSocket) -> None:
+    """WebSocket variant of /stream: one JSON message {id, event, data} per event."""
+    await ws.accept()
+    await broadcaster.ensure_started()
+    q = broadcaster.subscribe()
+
+    async def send_events() -> None:
+        while True:
+            await ws.send_json(await q.get())
+
+    sender = asyncio.create_task(send_events())
+    try:
+        # Reading notices a client disconnect even while no events are flowing
+        while True:
+            await ws.receive_text()
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        sender.cancel()
+        broadcaster.unsubscribe(q)
@@ -0,0 +1 @@
+# Backtest: stored bias scores against local index closes (read-only)
@@ -0,0 +1,334 @@
+"""
+Vectorized backtest of bias signals against index closes.
+
+Alignment: bias_score for day d is known at the end of that UTC day (plus --lag-hours).
+Each close (an instant in the index's own timezone) takes the latest bias already known at
+that instant, so an Asian close on d+1 trades on day d's bias, while a New York close on d
+still trades on d-1. Returns are close-to-close over the index's own trading days.
+
+Strategies: position = sign(bias) when |bias| >= threshold and confidence >= min_confidence,
+else flat; threshold 0 is plain sign-following. The sweep evaluates every
+(horizon, min_confidence, threshold) combination for all indices at once:
+  - trades / hit_rate / mean_return: per signal close, the signed forward return over the horizon
+  - sharpe: annualized, of the daily returns of holding each signal for `horizon` days
+    (overlapping 1/horizon slices); the "all" column is the equal-weight portfolio
+Trade stats come from suffix sums over closes ranked by |bias|, so any number of thresholds
+costs one sort per confidence level; the Sharpe paths are broadcast in chunks over a
+(closes x indices x thresholds) array. Neither loops over combinations in Python.
+"""
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Any
+
+import numpy as np
+
+from services.backtest.prices import DEFAULT_CLOSE, PriceSeries
+
+TRADING_DAYS = 252
+BUCKET_EDGES = (-100.0, -50.0, -20.0, -5.0, 5.0, 20.0, 50.0, 100.0)
+MAX_STALE_DAYS = 3
+CHUNK_CELLS = 1 << 21  # thresholds x closes x indices per broadcast step
+
+
+@dataclass
+class Panel:
+    """Closes and the bias in force at each close; column n has lengths[n] rows, then NaN padding."""
+
+    codes: list[str]
+    index_ids: list[int]
+    days: np.ndarray  # (D,) union of local trading days, datetime64[D]
+    row: np.ndarray  # (T, N) position of each close in days, -1 = padding
+    close: np.ndarray  # (T, N)
+    bias: np.ndarray  # (T, N), NaN = no signal
+    confidence: np.ndarray  # (T, N)
+    lengths: np.ndarray  # (N,)
+
+    def forward(self, horizon: int) -> np.ndarray:
+        """close[t + horizon] / close[t] - 1 over each index's own closes (NaN past the end)."""
+        out = np.full(self.close.shape, np.nan)
+        if horizon < len(self.close):
+            out[:-horizon] = self.close[horizon:] / self.close[:-horizon] - 1.0
+        return out
+
+
+def align(
+    prices: dict[str, PriceSeries],
+    indices: dict[str, tuple[int, str]],
+    bias: dict[str, np.ndarray],
+    close_times: dict[str, time] | None = None,
+    lag_hours: float = 0.0,
+    max_stale_days: int = MAX_STALE_DAYS,
+) -> Panel:
+    """
+    prices by code, indices as code -> (index_id, timezone), bias as read_history("bias_score")
+    columns. A close gets a signal only while the bias it uses is at most max_stale_days old and
+    the day after the last loaded bias has not been published yet.
+    """
+    close_times = close_times or {}
+    codes = [c for c in prices if c in indices]
+    lag = np.timedelta64(int(round(lag_hours * 3600)), "s")
+    columns = []
+    for code in codes:
+        index_id, tz = indices[code]
+        series = prices[code]
+        instants, local_days = series.instants(tz, close_times.get(code, close_times.get("*", DEFAULT_CLOSE)))
+        order = np.argsort(instants, kind="stable")
+        instants, local_days, closes = instants[order], local_days[order], series.close[order]
+        mask = bias["index_id"] == index_id
+        bias_days = bias["time"][mask].astype("datetime64[D]")
+        known = (bias_days + np.timedelta64(1, "D")).astype("datetime64[us]") + lag
+        values = np.full(len(instants), np.nan)
+        conf = np.full(len(instants), np.nan)
+        if len(known):
+            k = np.searchsorted(known, instants, side="right") - 1
+            ok = (k >= 0) & (instants < known[-1] + np.timedelta64(1, "D"))
+            kk = np.maximum(k, 0)
+            ok &= instants - known[kk] <= np.timedelta64(max_stale_days, "D")
+            values[ok] = bias["bias_score"][mask][kk[ok]]
+            if "confidence_pct" in bias:
+                conf[ok] = bias["confidence_pct"][mask][kk[ok]]
+        columns.append((local_days, closes, values, conf))
+
+    n = len(codes)
+    length = max((len(c[1]) for c in columns), default=0)
+    days = np.unique(np.concatenate([c[0] for c in columns])) if columns else np.array([], dtype="datetime64[D]")
+    panel = Panel(
+        codes=codes,
+        index_ids=[indices[c][0] for c in codes],
+        days=days,
+        row=np.full((length, n), -1, dtype=np.int64),
+        close=np.full((length, n), np.nan),
+        bias=np.full((length, n), np.nan),
+        confidence=np.full((length, n), np.nan),
+        lengths=np.array([len(c[1]) for c in columns], dtype=np.int64),
+    )
+    for j, (local_days, closes, values, conf) in enumerate(columns):
+        m = len(closes)
+        panel.row[:m, j] = np.searchsorted(days, local_days)
+        panel.close[:m, j] = closes
+        panel.bias[:m, j] = values
+        panel.confidence[:m, j] = conf
+    return panel
+
+
+@dataclass
+class Grid:
+    thresholds: np.ndarray  # |bias| needed for a position; 0 = follow the sign
+    horizons: np.ndarray  # holding period in trading days
+    min_confidence: np.ndarray = field(default_factory=lambda: np.array([0.0]))
+
+    def __post_init__(self) -> None:
+        self.thresholds = np.asarray(self.thresholds, dtype=np.float64)
+        self.horizons = np.asarray(self.horizons, dtype=np.int64)
+        self.min_confidence = np.asarray(self.min_confidence, dtype=np.float64)
+        if len(self.horizons) and self.horizons.min() < 1:
+            raise ValueError("horizons must be >= 1 trading day")
+
+    @property
+    def shape(self) -> tuple[int, int, int]:
+        return len(self.horizons), len(self.min_confidence), len(self.thresholds)
+
+    @property
+    def size(self) -> int:
+        h, c, k = self.shape
+        return h * c * k
+
+
+@dataclass
+class SweepResult:
+    """Metric arrays of shape (horizons, min_confidence, thresholds, indices + 1); the last column is all indices."""
+
+    grid: Grid
+    codes: list[str]
+    trades: np.ndarray
+    hit_rate: np.ndarray
+    mean_return: np.ndarray
+    sharpe: np.ndarray
+
+    METRICS = ("trades", "hit_rate", "mean_return", "sharpe")
+
+    def rows(self) -> list[dict[str, Any]]:
+        """One dict per (combination, index or "all")."""
+        names = self.codes + ["all"]
+        out = []
+        for (h, c, k, n), trades in np.ndenumerate(self.trades):
+            out.append({
+                "horizon": int(self.grid.horizons[h]),
+                "min_confidence": float(self.grid.min_confidence[c]),
+                "threshold": float(self.grid.thresholds[k]),
+                "index": names[n],
+                "trades": int(trades),
+                **{m: _num(getattr(self, m)[h, c, k, n]) for m in self.METRICS[1:]},
+            })
+        return out
+
+    def best(self, metric: str = "sharpe", n: int = 10, min_trades: int = 30) -> list[dict[str, Any]]:
+        """Top combinations for all indices together by metric, among those with >= min_trades trades."""
+        values = np.where(self.trades[..., -1] >= min_trades, getattr(self, metric)[..., -1], np.nan)
+        flat = np.argsort(np.where(np.isnan(values), -np.inf, values), axis=None)[::-1][:n]
+        out = []
+        for i in flat:
+            h, c, k = np.unravel_index(i, values.shape)
+            if np.isnan(values[h, c, k]):
+                break
+            out.append({
+                "horizon": int(self.grid.horizons[h]),
+                "min_confidence": float(self.grid.min_confidence[c]),
+                "threshold": float(self.grid.thresholds[k]),
+                "trades": int(self.trades[h, c, k, -1]),
+                **{m: _num(getattr(self, m)[h, c, k, -1]) for m in self.METRICS[1:]},
+            })
+        return out
+
+
+def _num(x: float) -> float | None:
+    return None if np.isnan(x) else round(float(x), 6)
+
+
+def sweep(panel: Panel, grid: Grid, chunk_cells: int = CHUNK_CELLS) -> SweepResult:
+    """Evaluate every grid combination on the panel (see module docstring for the metrics)."""
+    t_len, n = panel.close.shape
+    h_len, c_len, k_len = grid.shape
+    shape = (h_len, c_len, k_len, n + 1)
+    trades = np.zeros(shape)
+    hits = np.zeros(shape)
+    total = np.zeros(shape)
+    sharpe = np.full(shape, np.nan)
+
+    has_bias = ~np.isnan(panel.bias)
+    sign = np.sign(np.where(has_bias, panel.bias, 0.0))
+    r1 = panel.forward(1)
+    live = has_bias & ~np.isnan(r1)
+    r1 = np.where(live, r1, 0.0)
+    days_live = live.sum(axis=0)
+    # equal-weight portfolio: indices trading on each union day
+    port_count = np.zeros(len(panel.days))
+    for j in range(n):
+        m = panel.lengths[j]
+        np.add.at(port_count, panel.row[:m, j], live[:m, j])
+    port_days = port_count > 0
+    fwd = []
+    for h in grid.horizons:
+        f = panel.forward(int(h))
+        valid = has_bias & ~np.isnan(f)
+        signed = np.where(valid, sign * f, 0.0)
+        fwd.append(np.stack([valid, signed > 0, signed]).astype(np.float64))  # (3, T, N)
+
+    step = max(1, chunk_cells // max(1, t_len * n))
+    for c, min_conf in enumerate(grid.min_confidence):
+        eligible = sign != 0 if min_conf <= 0 else (sign != 0) & (panel.confidence >= min_conf)
+        strength = np.where(eligible, np.abs(np.where(has_bias, panel.bias, 0.0)), -1.0)
+        # trade stats: suffix sums over closes sorted by strength, one lookup per threshold
+        order = np.argsort(strength, axis=0, kind="stable")
+        ranked = np.take_along_axis(strength, order, axis=0)
+        first = np.stack([np.searchsorted(ranked[:, j], grid.thresholds) for j in range(n)], axis=1)  # (K, N)
+        for h in range(h_len):
+            by_rank = np.take_along_axis(fwd[h], order[None], axis=1)
+            suffix = np.concatenate([np.cumsum(by_rank[:, ::-1], axis=1)[:, ::-1], np.zeros((3, 1, n))], axis=1)
+            stats = np.take_along_axis(suffix, np.broadcast_to(first[None], (3, k_len, n)), axis=1)
+            trades[h, c, :, :n], hits[h, c, :, :n], total[h, c, :, :n] = stats
+
+        # Sharpe: positions broadcast over a chunk of thresholds, laid out (T, N, K) so the
+        # per-index rows scatter into the portfolio's days as contiguous blocks
+        for k0 in range(0, k_len, step):
+            ks = slice(k0, min(k_len, k0 + step))
+            position = np.where(strength[..., None] >= grid.thresholds[ks], sign[..., None], 0.0)
+            cum = np.cumsum(position, axis=0)
+            for h, horizon in enumerate(grid.horizons):
+                daily = cum.copy()  # overlapping 1/h slices of the last h signals
+                daily[horizon:] -= cum[:-horizon]
+                daily *= r1[..., None] / horizon
+                sharpe[h, c, ks, :n] = _sharpe(daily.sum(axis=0), np.einsum("tnk,tnk->nk", daily, daily), days_live[:, None]).T
+                port = np.zeros((len(panel.days), daily.shape[2]))
+                for j in range(n):
+                    m = panel.lengths[j]
+                    port[panel.row[:m, j]] += daily[:m, j]
+                port = port[port_days] / port_count[port_days, None]
+                sharpe[h, c, ks, n] = _sharpe(port.sum(axis=0), np.einsum("dk,dk->k", port, port), port.shape[0])
+
+    trades[..., n] = trades[..., :n].sum(axis=-1)
+    hits[..., n] = hits[..., :n].sum(axis=-1)
+    total[..., n] = total[..., :n].sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        hit_rate = np.where(trades > 0, hits / trades, np.nan)
+        mean_return = np.where(trades > 0, total / trades, np.nan)
+    return SweepResult(grid, list(panel.codes), trades, hit_rate, mean_return, sharpe)
+
+
+def _sharpe(total: np.ndarray, squares: np.ndarray, count: Any) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        var = squares / count - mean * mean
+        out = mean / np.sqrt(var) * np.sqrt(TRADING_DAYS)
+    return np.where((np.asarray(count) >= 2) & (var > 1e-18), out, np.nan)
+
+
+def bucket_returns(
+    panel: Panel, horizons: Sequence[int], edges: Sequence[float] = BUCKET_EDGES
+) -> list[dict[str, Any]]:
+    """Forward return by bias bucket: count, mean (unsigned) return and sign hit rate per horizon and index."""
+    t_len, n = panel.close.shape
+    inner = np.asarray(edges[1:-1], dtype=np.float64)
+    b_len = len(inner) + 1
+    labels = [f"[{edges[i]:g}, {edges[i + 1]:g})" for i in range(b_len)]
+    has_bias = ~np.isnan(panel.bias)
+    bucket = np.digitize(np.where(has_bias, panel.bias, 0.0), inner)
+    ids = bucket + b_len * np.arange(n)[None, :]
+    names = panel.codes + ["all"]
+    out = []
+    for horizon in horizons:
+        f = panel.forward(int(horizon))
+        valid = has_bias & ~np.isnan(f)
+        sel = ids[valid]
+        count = np.bincount(sel, minlength=b_len * n).reshape(n, b_len)
+        total = np.bincount(sel, weights=f[valid], minlength=b_len * n).reshape(n, b_len)
+        hit = np.bincount(sel, weights=(np.sign(panel.bias[valid]) * f[valid] > 0), minlength=b_len * n).reshape(n, b_len)
+        count = np.vstack([count, count.sum(axis=0)])
+        total = np.vstack([total, total.sum(axis=0)])
+        hit = np.vstack([hit, hit.sum(axis=0)])
+        for j, name in enumerate(names):
+            for b, label in enumerate(labels):
+                cnt = int(count[j, b])
+                out.append({
+                    "horizon": int(horizon),
+                    "index": name,
+                    "bucket": label,
+                    "count": cnt,
+                    "mean_return": round(float(total[j, b] / cnt), 6) if cnt else None,
+                    "hit_rate": round(float(hit[j, b] / cnt), 6) if cnt else None,
+                })
+    return out
+
+
+def _day(stamp: date | datetime) -> date:
+    return stamp.date() if isinstance(stamp, datetime) else stamp
+
+
+async def load_panel(
+    prices: dict[str, PriceSeries],
+    start: date | None = None,
+    end: date | None = None,
+    close_times: dict[str, time] | None = None,
+    lag_hours: float = 0.0,
+) -> Panel:
+    """Panel for the price codes that exist in the index table, with bias_score from read_history."""
+    from services.core.archive import read_history
+    from services.core.db import fetch_all
+
+    rows = await fetch_all("SELECT id, code, timezone FROM index WHERE code = ANY($1::text[])", list(prices))
+    indices = {r["code"]: (int(r["id"]), r["timezone"]) for r in rows}
+    missing = sorted(set(prices) - set(indices))
+    if missing:
+        import structlog
+
+        structlog.get_logger(__name__).warning("backtest_unknown_codes", codes=missing)
+    if not indices:
+        raise ValueError("none of the price codes is in the index table")
+    start = start or min(_day(prices[c].stamps[0]) for c in indices) - timedelta(days=MAX_STALE_DAYS + 1)
+    end = end or max(_day(prices[c].stamps[-1]) for c in indices)
+    bias = await read_history(
+        "bias_score", start, end, keys=[i for i, _ in indices.values()],
+        columns=("time", "index_id", "bias_score", "confidence_pct"),
+    )
+    return align({c: prices[c] for c in indices}, indices, bias, close_times, lag_hours)
@@ -0,0 +1,111 @@
+"""
+Index closes from local files for the backtest: CSV or Parquet, either long
+(date, code, close) or wide (date, then one column per index code). The date column holds
+trading days, whose close is at the index's close time in its own timezone, or close
+timestamps (naive ones are local to the index). Codes are index.code values.
+"""
+import csv
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import date, datetime, time, timezone
+from pathlib import Path
+from typing import Any
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+DEFAULT_CLOSE = time(16, 0)
+DATE_COLUMNS = ("date", "time", "timestamp")
+CODE_COLUMNS = ("code", "index", "symbol")
+CLOSE_COLUMNS = ("close", "adj_close")
+
+
+@dataclass(frozen=True)
+class PriceSeries:
+    code: str
+    stamps: tuple[date | datetime, ...]  # trading day or close timestamp
+    close: np.ndarray
+
+    def instants(self, tz: str, close_time: time = DEFAULT_CLOSE) -> tuple[np.ndarray, np.ndarray]:
+        """(close instants in UTC as datetime64[us], local trading days as datetime64[D])."""
+        zone = ZoneInfo(tz)
+        utc, days = [], []
+        for s in self.stamps:
+            if not isinstance(s, datetime):
+                s = datetime.combine(s, close_time)
+            local = s.replace(tzinfo=zone) if s.tzinfo is None else s.astimezone(zone)
+            utc.append(local.astimezone(timezone.utc).replace(tzinfo=None))
+            days.append(local.date())
+        return np.array(utc, dtype="datetime64[us]"), np.array(days, dtype="datetime64[D]")
+
+
+def _stamp(value: Any) -> date | datetime:
+    if isinstance(value, (date, datetime)):
+        return value
+    text = str(value).strip()
+    parsed = datetime.fromisoformat(text)
+    return parsed.date() if len(text) <= 10 else parsed
+
+
+def _number(value: Any) -> float | None:
+    if value is None or value == "":
+        return None
+    x = float(value)
+    return x if np.isfinite(x) and x > 0 else None
+
+
+def _pick(columns: dict[str, list[Any]], names: Sequence[str]) -> str | None:
+    lowered = {c.lower(): c for c in columns}
+    return next((lowered[n] for n in names if n in lowered), None)
+
+
+def _read_columns(path: Path) -> dict[str, list[Any]]:
+    if path.suffix.lower() in (".parquet", ".pq"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet prices need pyarrow (pip install 'macroedge[export]')") from e
+        return pq.read_table(path).to_pydict()
+    with path.open(newline="") as f:
+        reader = csv.DictReader(f)
+        columns: dict[str, list[Any]] = {name: [] for name in reader.fieldnames or []}
+        for row in reader:
+            for name in columns:
+                columns[name].append(row[name])
+    return columns
+
+
+def load_prices(path: Path | str, codes: Sequence[str] | None = None) -> dict[str, PriceSeries]:
+    """Closes per index code; rows without a positive close are skipped, a repeated stamp keeps the last."""
+    path = Path(path)
+    columns = _read_columns(path)
+    date_col = _pick(columns, DATE_COLUMNS)
+    if date_col is None:
+        raise ValueError(f"{path}: no date column (one of {', '.join(DATE_COLUMNS)})")
+    stamps = [_stamp(v) for v in columns[date_col]]
+    code_col = _pick(columns, CODE_COLUMNS)
+    points: dict[str, dict[date | datetime, float]] = {}
+    if code_col is not None:
+        close_col = _pick(columns, CLOSE_COLUMNS)
+        if close_col is None:
+            raise ValueError(f"{path}: long layout needs a close column (one of {', '.join(CLOSE_COLUMNS)})")
+        for s, code, value in zip(stamps, columns[code_col], columns[close_col]):
+            x = _number(value)
+            if x is not None:
+                points.setdefault(str(code), {})[s] = x
+    else:
+        for code in columns:
+            if code == date_col:
+                continue
+            series = points.setdefault(code, {})
+            for s, value in zip(stamps, columns[code]):
+                x = _number(value)
+                if x is not None:
+                    series[s] = x
+    out = {}
+    for code, series in points.items():
+        if codes is not None and code not in codes or not series:
+            continue
+        ordered = sorted(series.items(), key=lambda p: p[0] if isinstance(p[0], datetime) else datetime.combine(p[0], time()))
+        out[code] = PriceSeries(code, tuple(s for s, _ in ordered), np.array([x for _, x in ordered]))
+    return out
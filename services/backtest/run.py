@@ -0,0 +1,114 @@
+"""
+Backtest stored bias scores against index closes from a local CSV/Parquet file.
+Run: PYTHONPATH=. python -m services.backtest.run prices.csv [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+     [--thresholds 0:80:0.5] [--horizons 1,5,10,20] [--min-confidence 0,40,70]
+     [--close-time 16:00] [--close-time SYN_IDX_002=15:00] [--lag-hours 0] [--top 10] [--out grid.csv]
+Prints the bias-bucket report and the best combinations (all indices); --out writes every
+(combination, index) row as CSV.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import time
+from datetime import date, time as dtime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+
+def parse_values(text: str) -> np.ndarray:
+    """"a,b,c" or "start:stop:step" (stop included)."""
+    if ":" in text:
+        start, stop, step = (float(x) for x in text.split(":"))
+        return np.round(np.arange(start, stop + step / 2, step), 10)
+    return np.array([float(x) for x in text.split(",") if x.strip()])
+
+
+def parse_close_times(values: list[str]) -> dict[str, dtime]:
+    """["16:00", "CODE=15:00"] -> {"*": 16:00, "CODE": 15:00}."""
+    out = {}
+    for v in values:
+        code, _, hhmm = v.rpartition("=")
+        out[code or "*"] = dtime.fromisoformat(hhmm)
+    return out
+
+
+async def run_backtest(
+    prices_path: Path,
+    start: date | None,
+    end: date | None,
+    thresholds: np.ndarray,
+    horizons: np.ndarray,
+    min_confidence: np.ndarray,
+    close_times: dict[str, dtime] | None = None,
+    lag_hours: float = 0.0,
+    top: int = 10,
+    out: Path | None = None,
+) -> dict[str, Any]:
+    from services.backtest.engine import Grid, bucket_returns, load_panel, sweep
+    from services.backtest.prices import load_prices
+
+    t0 = time.perf_counter()
+    panel = await load_panel(load_prices(prices_path), start, end, close_times, lag_hours)
+    t1 = time.perf_counter()
+    grid = Grid(thresholds, horizons, min_confidence)
+    result = sweep(panel, grid)
+    t2 = time.perf_counter()
+    if out:
+        rows = result.rows()
+        with out.open("w", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=list(rows[0]))
+            w.writeheader()
+            w.writerows(rows)
+    return {
+        "indices": panel.codes,
+        "closes": int(panel.lengths.sum()),
+        "signals": int((~np.isnan(panel.bias)).sum()),
+        "combinations": grid.size,
+        "load_seconds": round(t1 - t0, 3),
+        "sweep_seconds": round(t2 - t1, 3),
+        "buckets": [b for b in bucket_returns(panel, grid.horizons) if b["index"] == "all"],
+        "best": result.best(n=top),
+    }
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    from services.core.db import close_pool
+
+    try:
+        r = await run_backtest(
+            Path(args.prices),
+            date.fromisoformat(args.from_date) if args.from_date else None,
+            date.fromisoformat(args.to_date) if args.to_date else None,
+            parse_values(args.thresholds),
+            parse_values(args.horizons).astype(int),
+            parse_values(args.min_confidence),
+            parse_close_times(args.close_time),
+            args.lag_hours,
+            args.top,
+            Path(args.out) if args.out else None,
+        )
+        print(json.dumps(r, indent=2))
+    finally:
+        await close_pool()
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("prices", help="CSV or Parquet with index closes (long or wide layout)")
+    p.add_argument("--from", dest="from_date", help="First bias day (default: first close)")
+    p.add_argument("--to", dest="to_date", help="Last bias day (default: last close)")
+    p.add_argument("--thresholds", default="0:80:1", help="|bias| thresholds, a,b,c or start:stop:step")
+    p.add_argument("--horizons", default="1,5,10,20", help="Holding periods in trading days")
+    p.add_argument("--min-confidence", default="0,40,70", help="Minimum confidence_pct values")
+    p.add_argument("--close-time", action="append", default=[], help="[CODE=]HH:MM local close (default 16:00)")
+    p.add_argument("--lag-hours", type=float, default=0.0, help="Publication delay after the end of the bias day (UTC)")
+    p.add_argument("--top", type=int, default=10)
+    p.add_argument("--out", help="Write the full grid as CSV")
+    asyncio.run(main_async(p.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
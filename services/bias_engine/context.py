@@ -0,0 +1,249 @@
+"""
+Scoring context: everything the scorer needs that does not change between indices or dates.
+Loaded once (fixed number of queries), immutable, picklable — safe to share across tasks,
+threads and worker processes (CLI run, API scenario calls, backfills).
+"""
+import json
+from array import array
+from collections.abc import Collection
+from dataclasses import dataclass
+from typing import Any
+
+from services.bias_engine.scorer import (
+    compute_confidence,
+    risk_flag_from_thresholds,
+    score_bounded,
+    score_raw,
+    signed_surprise,
+)
+from services.core.config import get_settings
+from services.core.db import get_conn
+
+DEFAULT_LAMBDA = 2.0
+
+
+def _regime_multipliers(raw: Any) -> dict[str, float]:
+    """regime_weights JSONB arrives as str from asyncpg (no codec) or as dict."""
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            return {}
+    if not isinstance(raw, dict):
+        return {}
+    out: dict[str, float] = {}
+    for code, m in raw.items():
+        try:
+            out[code] = float(m)
+        except (TypeError, ValueError):
+            pass
+    return out
+
+
+@dataclass(frozen=True, slots=True)
+class ScoringContext:
+    """
+    Per-index and per-indicator data held positionally in compact arrays:
+    index j -> index_ids[j], index_codes[j], lambdas[j];
+    indicator k -> indicator_ids[k], indicator_codes[k], directions[k].
+    weights[regime][j] = (indicator positions, normalized weights) for index j.
+    """
+
+    regime_ids: dict[str, int]
+    index_ids: tuple[int, ...]
+    index_codes: tuple[str, ...]
+    index_regions: tuple[str, ...]
+    lambdas: array
+    indicator_ids: tuple[int, ...]
+    indicator_codes: tuple[str, ...]
+    indicator_pos: dict[int, int]
+    directions: tuple[str, ...]
+    weights: dict[str, tuple[tuple[array, array], ...]]
+    confidence_params: dict[str, float]
+    risk_thresholds: dict[str, float]
+
+    @classmethod
+    def from_rows(
+        cls,
+        regimes: list[Any],
+        indices: list[Any],
+        indicators: list[Any],
+        weight_rows: list[Any],
+        cfg: dict[str, Any],
+    ) -> "ScoringContext":
+        """Build from DB rows (asyncpg Records or dicts) and the bias engine config."""
+        regime_ids = {r["code"]: r["id"] for r in regimes}
+        index_ids = tuple(r["id"] for r in indices)
+        index_codes = tuple(r["code"] for r in indices)
+        index_regions = tuple(r.get("region") or "" for r in indices)
+        lambda_cfg = cfg.get("scoring", {}).get("lambda", {})
+        lambdas = array("d", (float(lambda_cfg.get(code, DEFAULT_LAMBDA)) for code in index_codes))
+        indicator_ids = tuple(r["id"] for r in indicators)
+        indicator_codes = tuple(r["code"] for r in indicators)
+        indicator_pos = {ind_id: k for k, ind_id in enumerate(indicator_ids)}
+        directions = tuple(r["direction"] or "positive" for r in indicators)
+
+        index_pos = {idx_id: j for j, idx_id in enumerate(index_ids)}
+        # Raw (position, base weight, multipliers) per index; rows for unknown ids are dropped
+        raw: list[list[tuple[int, float, dict[str, float]]]] = [[] for _ in index_ids]
+        for r in weight_rows:
+            j = index_pos.get(r["index_id"])
+            k = indicator_pos.get(r["indicator_id"])
+            if j is None or k is None:
+                continue
+            raw[j].append((k, float(r["weight"]), _regime_multipliers(r["regime_weights"])))
+
+        weights: dict[str, tuple[tuple[array, array], ...]] = {}
+        for code in set(regime_ids) | {"neutral"}:
+            per_index = []
+            for entries in raw:
+                positions = array("l", (k for k, _, _ in entries))
+                w = [base * mult.get(code, 1.0) for _, base, mult in entries]
+                total = sum(w)
+                if total > 0:
+                    w = [x / total for x in w]
+                per_index.append((positions, array("d", w)))
+            weights[code] = tuple(per_index)
+
+        conf_cfg = cfg.get("confidence", {})
+        vol_cfg = cfg.get("volatility", {})
+        confidence_params = {
+            "min_indicators_expected": conf_cfg.get("min_indicators_expected", 5),
+            "vix_min": vol_cfg.get("vix_min", 10),
+            "vix_max": vol_cfg.get("vix_max", 40),
+        }
+        rf = cfg.get("risk_flag", {})
+        risk_thresholds = {
+            "confidence_high": rf.get("confidence_high", 70),
+            "confidence_low": rf.get("confidence_low", 40),
+            "bias_moderate_abs": rf.get("bias_moderate_abs", 50),
+            "vix_high": rf.get("vix_high", 35),
+            "vix_critical": rf.get("vix_critical", 45),
+        }
+        return cls(
+            regime_ids=regime_ids,
+            index_ids=index_ids,
+            index_codes=index_codes,
+            index_regions=index_regions,
+            lambdas=lambdas,
+            indicator_ids=indicator_ids,
+            indicator_codes=indicator_codes,
+            indicator_pos=indicator_pos,
+            directions=directions,
+            weights=weights,
+            confidence_params=confidence_params,
+            risk_thresholds=risk_thresholds,
+        )
+
+    def regime_id(self, regime_code: str, default: int = 5) -> int:
+        """market_regime.id for code; default is the neutral id from the migration."""
+        return self.regime_ids.get(regime_code) or default
+
+    def surprise_vector(self, surprises: list[dict[str, Any]]) -> tuple[array, bytearray]:
+        """Signed surprises by indicator position, plus presence mask."""
+        n = len(self.indicator_ids)
+        values = array("d", bytes(8 * n))
+        present = bytearray(n)
+        for s in surprises:
+            k = self.indicator_pos.get(s["indicator_id"])
+            if k is None:
+                continue
+            values[k] = signed_surprise(self.directions[k], s["surprise_normalized"])
+            present[k] = 1
+        return values, present
+
+    def score_index(
+        self,
+        j: int,
+        values: array,
+        present: bytearray,
+        vix: float | None = None,
+        regime_code: str = "neutral",
+    ) -> dict[str, Any]:
+        """Bias score, confidence, risk_flag for index at position j. Pure, no I/O."""
+        per_index = self.weights.get(regime_code) or self.weights["neutral"]
+        positions, w = per_index[j]
+        weighted = [(w[i], values[k]) for i, k in enumerate(positions) if present[k]]
+        S_raw = score_raw(weighted)
+        S = score_bounded(S_raw, self.lambdas[j])
+        n_used = len(weighted)
+        confidence = compute_confidence(n_used, vix, params=self.confidence_params)
+        risk = risk_flag_from_thresholds(
+            confidence, abs(S), vix, regime_code, thresholds=self.risk_thresholds
+        )
+        return {
+            "bias_score": round(S, 2),
+            "regime_id": self.regime_id(regime_code),
+            "confidence_pct": confidence,
+            "risk_flag": risk,
+            "components_json": {"S_raw": S_raw, "n_indicators": n_used},
+        }
+
+    def score(
+        self,
+        surprises: list[dict[str, Any]],
+        vix: float | None = None,
+        regime_code: str = "neutral",
+        regions: Collection[str] | None = None,
+        index_ids: Collection[int] | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Score every index in context order (only those in regions / index_ids, if given).
+        Each result carries index_id and index code.
+        """
+        values, present = self.surprise_vector(surprises)
+        return [
+            {
+                "index_id": self.index_ids[j],
+                "index": self.index_codes[j],
+                **self.score_index(j, values, present, vix, regime_code),
+            }
+            for j in range(len(self.index_ids))
+            if (regions is None or self.index_regions[j] in regions)
+            and (index_ids is None or self.index_ids[j] in index_ids)
+        ]
+
+    def indices_for(self, indicator_ids: Collection[int]) -> list[int]:
+        """Ids of the indices with a weight on any of the indicators (in any regime)."""
+        positions = {self.indicator_pos[i] for i in indicator_ids if i in self.indicator_pos}
+        per_index = self.weights["neutral"]
+        return [
+            self.index_ids[j]
+            for j, (pos, _) in enumerate(per_index)
+            if positions.intersection(pos)
+        ]
+
+    def regions(self) -> list[str]:
+        """Distinct index regions, in first-seen order."""
+        return list(dict.fromkeys(self.index_regions))
+
+
+async def load_scoring_context() -> ScoringContext:
+    """Load regimes, indices, indicators and weights: four queries on one connection."""
+    async with get_conn(readonly=True) as conn:
+        regimes = await conn.fetch("SELECT id, code FROM market_regime")
+        indices = await conn.fetch("SELECT id, code, region FROM index ORDER BY id")
+        indicators = await conn.fetch("SELECT id, code, direction FROM macro_indicator ORDER BY id")
+        weight_rows = await conn.fetch(
+            "SELECT indicator_id, index_id, weight, regime_weights FROM index_indicator_weight"
+        )
+    return ScoringContext.from_rows(
+        regimes, indices, indicators, weight_rows, get_settings().get_bias_engine_config()
+    )
+
+
+_context: ScoringContext | None = None
+
+
+async def get_scoring_context(refresh: bool = False) -> ScoringContext:
+    """Process-wide shared context for long-lived callers (API, workers)."""
+    global _context
+    if _context is None or refresh:
+        _context = await load_scoring_context()
+    return _context
+
+
+def invalidate_scoring_context() -> None:
+    """Drop the shared context (e.g. after weights are re-seeded)."""
+    global _context
+    _context = None
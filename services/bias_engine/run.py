@@ -1,21 +1,36 @@
 """
 Run bias computation: optional seed, then compute scores for all indices.
-Run: PYTHONPATH=. python -m services.bias_engine.run [--seed] [--date YYYY-MM-DD]
+Run: PYTHONPATH=. python -m services.bias_engine.run [--seed] [--date YYYY-MM-DD] [--from YYYY-MM-DD]
+     [--features] [--profile [sample|cprofile]]
 """
 import argparse
 import asyncio
 from datetime import date, datetime
 
 
-async def main_async(seed: bool, as_of: date | None) -> None:
+async def main_async(
+    seed: bool,
+    as_of: date | None,
+    from_date: date | None = None,
+    profile: str | None = None,
+    features: bool = False,
+) -> None:
+    from services.core.profiling import profiled
+
     if seed:
         from services.bias_engine.seed_weights import run_seed
 
         r = await run_seed()
         print("Seed:", r)
+    if from_date:
+        from services.bias_engine.scorer import run_bias_backfill
+
+        r = await profiled("bias_backfill", run_bias_backfill(from_date, as_of or date.today(), features), profile)
+        print("Backfill:", r)
+        return
     from services.bias_engine.scorer import run_bias_computation
 
-    r = await run_bias_computation(as_of)
+    r = await profiled("bias", run_bias_computation(as_of), profile)
     print("Bias:", r)
 
 
@@ -23,6 +38,10 @@ def main() -> None:
     p = argparse.ArgumentParser()
     p.add_argument("--seed", action="store_true", help="Seed indices and weights first")
     p.add_argument("--date", type=str, help="As-of date YYYY-MM-DD (default today)")
+    p.add_argument("--from", dest="from_date", type=str, help="Backfill from YYYY-MM-DD up to --date")
+    p.add_argument("--features", action="store_true", help="Backfill from the daily_feature rows")
+    p.add_argument("--profile", nargs="?", const="sample", choices=["sample", "cprofile"],
+                   help="Write a profile to PROFILE_DIR (default mode: sample)")
     args = p.parse_args()
     as_of = None
     if args.date:
@@ -30,7 +49,13 @@ def main() -> None:
             as_of = date.fromisoformat(args.date)
         except ValueError:
             as_of = date.today()
-    asyncio.run(main_async(seed=args.seed, as_of=as_of))
+    from_date = None
+    if args.from_date:
+        try:
+            from_date = date.fromisoformat(args.from_date)
+        except ValueError:
+            p.error(f"invalid --from date: {args.from_date}")
+    asyncio.run(main_async(seed=args.seed, as_of=as_of, from_date=from_date, profile=args.profile, features=args.features))
 
 
 if __name__ == "__main__":
@@ -1,19 +1,16 @@
 """
 Bias scoring: load observations + weights, compute score, regime, confidence, risk flag.
 """
+import json
 from datetime import date, datetime, timedelta, timezone
 from math import tanh
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from services.core.config import get_settings
 from services.core.db import get_conn
 
-
-async def get_regime_id(code: str) -> int | None:
-    """Return market_regime.id for code (e.g. 'neutral')."""
-    async with get_conn() as conn:
-        row = await conn.fetchrow("SELECT id FROM market_regime WHERE code = $1", code)
-        return row["id"] if row else None
+if TYPE_CHECKING:
+    from services.bias_engine.context import ScoringContext
 
 
 async def get_vix_latest(as_of: date) -> float | None:
@@ -30,6 +27,25 @@ async def get_vix_latest(as_of: date) -> float | None:
         return float(row["value"]) if row and row["value"] is not None else None
 
 
+# Embedded backend (no DISTINCT ON in SQLite): same rows via ROW_NUMBER()
+LATEST_SURPRISES_SQLITE = """
+    SELECT indicator_id, direction, surprise_normalized, release_date FROM (
+        SELECT
+            o.indicator_id,
+            m.direction,
+            o.surprise_normalized,
+            o.release_date,
+            ROW_NUMBER() OVER (PARTITION BY o.indicator_id ORDER BY o.release_date DESC) AS rn
+        FROM macro_observation o
+        JOIN macro_indicator m ON m.id = o.indicator_id
+        WHERE o.release_date >= $1 AND o.release_date <= $2
+          AND o.time >= $3 AND o.time < $4
+          AND o.surprise_normalized IS NOT NULL
+    ) WHERE rn = 1
+    ORDER BY indicator_id
+"""
+
+
 async def get_latest_surprises(as_of: date, max_days_back: int = 14) -> list[dict[str, Any]]:
     """
     For each indicator, the most recent observation with surprise_normalized on or before as_of.
@@ -37,7 +53,9 @@ async def get_latest_surprises(as_of: date, max_days_back: int = 14) -> list[dic
     """
     start = as_of - timedelta(days=max_days_back)
     async with get_conn() as conn:
+        # time is release_date at UTC midnight: the time bounds let TimescaleDB skip chunks
         rows = await conn.fetch(
+            LATEST_SURPRISES_SQLITE if getattr(conn, "dialect", None) == "sqlite" else
             """
             SELECT DISTINCT ON (o.indicator_id)
                 o.indicator_id,
@@ -47,11 +65,14 @@ async def get_latest_surprises(as_of: date, max_days_back: int = 14) -> list[dic
             FROM macro_observation o
             JOIN macro_indicator m ON m.id = o.indicator_id
             WHERE o.release_date >= $1 AND o.release_date <= $2
+              AND o.time >= $3 AND o.time < $4
               AND o.surprise_normalized IS NOT NULL
             ORDER BY o.indicator_id, o.release_date DESC
             """,
             start,
             as_of,
+            datetime(start.year, start.month, start.day, tzinfo=timezone.utc),
+            datetime(as_of.year, as_of.month, as_of.day, tzinfo=timezone.utc) + timedelta(days=1),
         )
     return [
         {
@@ -64,33 +85,93 @@ async def get_latest_surprises(as_of: date, max_days_back: int = 14) -> list[dic
     ]
 
 
-async def get_weights_for_index(index_id: int, regime_code: str = "neutral") -> list[dict[str, Any]]:
-    """Weights for index. regime_weights multiplier applied if present."""
-    async with get_conn() as conn:
-        rows = await conn.fetch(
-            """
-            SELECT indicator_id, weight, regime_weights
-            FROM index_indicator_weight
-            WHERE index_id = $1
-            """,
-            index_id,
+class SurpriseHistory:
+    """
+    Normalized surprises per indicator and VIX over a date range, loaded in one read each
+    (surprises through services.core.archive.read_history). latest() and vix() answer
+    get_latest_surprises() and get_vix_latest() from memory, so a backfill does not query
+    once per day. services.processing.features.FeatureMatrix offers the same two methods.
+    """
+
+    def __init__(
+        self,
+        cols: dict[str, Any],
+        directions: dict[int, str],
+        vix: list[tuple[datetime, float]] | None = None,
+    ):
+        import numpy as np
+
+        vix = vix or []
+        self.vix_times = np.array(
+            [t.astimezone(timezone.utc).replace(tzinfo=None) for t, _ in vix], dtype="datetime64[us]"
         )
-    result = []
-    for r in rows:
-        w = float(r["weight"])
-        rw = r["regime_weights"]
-        if isinstance(rw, dict) and regime_code in rw:
-            try:
-                w *= float(rw[regime_code])
-            except (TypeError, ValueError):
-                pass
-        result.append({"indicator_id": r["indicator_id"], "weight": w})
-    # Normalize
-    total = sum(x["weight"] for x in result)
-    if total and total > 0:
-        for x in result:
-            x["weight"] = x["weight"] / total
-    return result
+        self.vix_values = [v for _, v in vix]
+
+        keep = ~np.isnan(cols["surprise_normalized"])
+        ids = cols["indicator_id"][keep]
+        days = cols["release_date"][keep].astype("datetime64[D]")
+        values = cols["surprise_normalized"][keep]
+        order = np.lexsort((days, ids))
+        ids, days, values = ids[order], days[order], values[order]
+        bounds = np.flatnonzero(np.diff(ids)) + 1
+        self.series = [
+            (int(i[0]), d, v)
+            for i, d, v in zip(np.split(ids, bounds), np.split(days, bounds), np.split(values, bounds))
+            if len(i)
+        ]
+        self.directions = directions
+
+    @classmethod
+    async def load(cls, start: date, end: date, ctx: "ScoringContext", max_days_back: int = 14) -> "SurpriseHistory":
+        from services.core.archive import read_history
+
+        cols = await read_history(
+            "macro_observation",
+            start - timedelta(days=max_days_back),
+            end,
+            columns=["time", "indicator_id", "release_date", "surprise_normalized"],
+        )
+        lo = datetime(start.year, start.month, start.day, tzinfo=timezone.utc)
+        vix = []
+        async with get_conn() as conn:
+            seed = await conn.fetchrow(
+                "SELECT time, value FROM volatility_snapshot WHERE symbol = 'VIX' AND time <= $1 ORDER BY time DESC LIMIT 1",
+                lo,
+            )
+            rows = await conn.fetch(
+                "SELECT time, value FROM volatility_snapshot WHERE symbol = 'VIX' AND time > $1 AND time <= $2 ORDER BY time",
+                lo,
+                datetime(end.year, end.month, end.day, tzinfo=timezone.utc),
+            )
+        for r in ([seed] if seed else []) + list(rows):
+            vix.append((r["time"], float(r["value"])))
+        return cls(cols, dict(zip(ctx.indicator_ids, ctx.directions)), vix)
+
+    def latest(self, as_of: date, max_days_back: int = 14) -> list[dict[str, Any]]:
+        """Same rows as get_latest_surprises(as_of, max_days_back)."""
+        import numpy as np
+
+        day = np.datetime64(as_of, "D")
+        first = day - np.timedelta64(max_days_back, "D")
+        out = []
+        for ind_id, days, values in self.series:
+            i = int(np.searchsorted(days, day, side="right")) - 1
+            if i < 0 or days[i] < first:
+                continue
+            out.append({
+                "indicator_id": ind_id,
+                "direction": self.directions.get(ind_id) or "positive",
+                "surprise_normalized": float(values[i]),
+                "release_date": days[i].item(),
+            })
+        return out
+
+    def vix(self, as_of: date) -> float | None:
+        """Same value as get_vix_latest(as_of)."""
+        import numpy as np
+
+        i = int(np.searchsorted(self.vix_times, np.datetime64(as_of, "us"), side="right")) - 1
+        return self.vix_values[i] if i >= 0 else None
 
 
 def signed_surprise(direction: str, surprise_norm: float) -> float:
@@ -110,22 +191,26 @@ def score_bounded(raw: float, lambda_j: float) -> float:
     return 100.0 * tanh(raw / max(0.01, lambda_j))
 
 
-async def compute_confidence(
-    as_of: date,
+def compute_confidence(
     n_indicators_used: int,
-    min_expected: int = 5,
-    stale_days: int = 7,
     vix: float | None = None,
+    params: dict[str, Any] | None = None,
 ) -> float:
-    """C = coverage * nu, in [0, 100]. coverage = n_used / min_expected; nu from VIX."""
-    cfg = get_settings().get_bias_engine_config()
-    conf_cfg = cfg.get("confidence", {})
-    min_expected = conf_cfg.get("min_indicators_expected", min_expected)
-    stale_days = conf_cfg.get("stale_release_days", stale_days)
+    """
+    C = coverage * nu, in [0, 100]. coverage = n_used / min_expected; nu from VIX.
+    params: min_indicators_expected, vix_min, vix_max (default: read from config).
+    """
+    if params is None:
+        cfg = get_settings().get_bias_engine_config()
+        params = {
+            "min_indicators_expected": cfg.get("confidence", {}).get("min_indicators_expected", 5),
+            "vix_min": cfg.get("volatility", {}).get("vix_min", 10),
+            "vix_max": cfg.get("volatility", {}).get("vix_max", 40),
+        }
+    min_expected = params.get("min_indicators_expected", 5)
     coverage = min(1.0, n_indicators_used / max(1, min_expected))
-    vol_cfg = cfg.get("volatility", {})
-    vix_min = vol_cfg.get("vix_min", 10)
-    vix_max = vol_cfg.get("vix_max", 40)
+    vix_min = params.get("vix_min", 10)
+    vix_max = params.get("vix_max", 40)
     if vix is not None:
         nu = 1.0 - min(1.0, max(0.0, (vix - vix_min) / max(1, vix_max - vix_min)))
     else:
@@ -138,10 +223,12 @@ def risk_flag_from_thresholds(
     bias_abs: float,
     vix: float | None,
     regime_code: str,
+    thresholds: dict[str, Any] | None = None,
 ) -> str:
-    """Low / Medium / High from config thresholds."""
-    cfg = get_settings().get_bias_engine_config()
-    rf = cfg.get("risk_flag", {})
+    """Low / Medium / High from thresholds (default: risk_flag section of config)."""
+    rf = thresholds
+    if rf is None:
+        rf = get_settings().get_bias_engine_config().get("risk_flag", {})
     c_high = rf.get("confidence_high", 70)
     c_low = rf.get("confidence_low", 40)
     s_mod = rf.get("bias_moderate_abs", 50)
@@ -156,94 +243,128 @@ def risk_flag_from_thresholds(
     return "medium"
 
 
-async def compute_bias_for_index(
-    index_id: int,
-    index_code: str,
-    as_of: date,
-    surprises: list[dict[str, Any]],
-    regime_id: int,
-    regime_code: str = "neutral",
-    vix: float | None = None,
+async def write_bias_scores(as_of: date, scores: list[dict[str, Any]]) -> None:
+    """Upsert one bias_score row per index for as_of, in a single round trip."""
+    ts = datetime(as_of.year, as_of.month, as_of.day, tzinfo=timezone.utc)
+    async with get_conn() as conn:
+        await conn.executemany(
+            """
+            INSERT INTO bias_score (time, index_id, bias_score, regime_id, confidence_pct, risk_flag, components_json)
+            VALUES ($1, $2, $3, $4, $5, $6, $7)
+            ON CONFLICT (time, index_id)
+            DO UPDATE SET
+                bias_score = EXCLUDED.bias_score,
+                regime_id = EXCLUDED.regime_id,
+                confidence_pct = EXCLUDED.confidence_pct,
+                risk_flag = EXCLUDED.risk_flag,
+                components_json = EXCLUDED.components_json
+            """,
+            [
+                (
+                    ts,
+                    out["index_id"],
+                    out["bias_score"],
+                    out["regime_id"],
+                    out["confidence_pct"],
+                    out["risk_flag"],
+                    json.dumps(out["components_json"]),
+                )
+                for out in scores
+            ],
+        )
+
+
+async def scored_index_ids(as_of: date) -> set[int]:
+    """Indices that already have a bias_score row for as_of."""
+    async with get_conn(readonly=True) as conn:
+        rows = await conn.fetch(
+            "SELECT index_id FROM bias_score WHERE time = $1",
+            datetime(as_of.year, as_of.month, as_of.day, tzinfo=timezone.utc),
+        )
+    return {r["index_id"] for r in rows}
+
+
+async def run_bias_computation(
+    as_of: date | None = None,
+    ctx: "ScoringContext | None" = None,
+    regions: list[str] | None = None,
+    index_ids: list[int] | None = None,
+    history: Any = None,
+    notify: bool = True,
 ) -> dict[str, Any]:
     """
-    Compute bias score, confidence, risk_flag for one index.
-    surprises: from get_latest_surprises(); each has indicator_id, direction, surprise_normalized.
-    """
-    weights = await get_weights_for_index(index_id, regime_code)
-    by_ind = {s["indicator_id"]: s for s in surprises}
-    weighted: list[tuple[float, float]] = []
-    for w in weights:
-        ind_id = w["indicator_id"]
-        s = by_ind.get(ind_id)
-        if s is None:
-            continue
-        signed = signed_surprise(s["direction"], s["surprise_normalized"])
-        weighted.append((w["weight"], signed))
-    S_raw = score_raw(weighted)
-    cfg = get_settings().get_bias_engine_config()
-    lambdas = cfg.get("scoring", {}).get("lambda", {})
-    lambda_j = float(lambdas.get(index_code, 2.0))
-    S = score_bounded(S_raw, lambda_j)
-    n_used = len(weighted)
-    confidence = await compute_confidence(as_of, n_used, vix=vix)
-    risk = risk_flag_from_thresholds(confidence, abs(S), vix, regime_code)
-    return {
-        "bias_score": round(S, 2),
-        "regime_id": regime_id,
-        "confidence_pct": confidence,
-        "risk_flag": risk,
-        "components_json": {"S_raw": S_raw, "n_indicators": n_used},
-    }
-
-
-async def run_bias_computation(as_of: date | None = None) -> dict[str, Any]:
-    """
-    Compute bias for all indices and write to bias_score.
+    Compute bias for all indices (or those in regions / index_ids) and write to bias_score.
     as_of: date to use for latest observations; default today.
+    ctx: preloaded ScoringContext (backfills pass one for all dates); loaded fresh if None.
+    history: preloaded inputs covering as_of (SurpriseHistory or FeatureMatrix, for backfills);
+    queried if None.
+    notify: invalidate the bias cache and publish bias_computed. Backfills pass False and
+    call notify_bias_range once for the whole range.
     """
+    from services.bias_engine.context import load_scoring_context
+    from services.core.cache import invalidate
+    from services.core.events import BIAS_COMPUTED, publish
+
     as_of = as_of or date.today()
+    ctx = ctx or await load_scoring_context()
     regime_code = "neutral"
-    regime_id = await get_regime_id(regime_code)
-    if not regime_id:
-        regime_id = 5  # fallback neutral id from migration
-    vix = await get_vix_latest(as_of)
-    surprises = await get_latest_surprises(as_of)
-    async with get_conn() as conn:
-        index_rows = await conn.fetch("SELECT id, code FROM index")
-    ts = datetime(as_of.year, as_of.month, as_of.day, tzinfo=timezone.utc)
-    results = []
-    for row in index_rows:
-        index_id = row["id"]
-        index_code = row["code"]
-        out = await compute_bias_for_index(
-            index_id,
-            index_code,
-            as_of,
-            surprises,
-            regime_id,
-            regime_code,
-            vix,
-        )
-        async with get_conn() as conn:
-            await conn.execute(
-                """
-                INSERT INTO bias_score (time, index_id, bias_score, regime_id, confidence_pct, risk_flag, components_json)
-                VALUES ($1, $2, $3, $4, $5, $6, $7)
-                ON CONFLICT (time, index_id)
-                DO UPDATE SET
-                    bias_score = EXCLUDED.bias_score,
-                    regime_id = EXCLUDED.regime_id,
-                    confidence_pct = EXCLUDED.confidence_pct,
-                    risk_flag = EXCLUDED.risk_flag,
-                    components_json = EXCLUDED.components_json
-                """,
-                ts,
-                index_id,
-                out["bias_score"],
-                out["regime_id"],
-                out["confidence_pct"],
-                out["risk_flag"],
-                out["components_json"],
-            )
-        results.append({"index": index_code, **out})
+    if history is not None:
+        vix, surprises = history.vix(as_of), history.latest(as_of)
+    else:
+        vix, surprises = await get_vix_latest(as_of), await get_latest_surprises(as_of)
+    scores = ctx.score(surprises, vix, regime_code, regions=regions, index_ids=index_ids)
+    await write_bias_scores(as_of, scores)
+    results = [{k: v for k, v in out.items() if k != "index_id"} for out in scores]
+    if not notify:
+        return {"date": as_of.isoformat(), "scores": results}
+    await invalidate("bias", since=as_of)
+    await publish(
+        BIAS_COMPUTED,
+        {
+            "date": as_of.isoformat(),
+            "scores": [
+                {k: out[k] for k in ("index", "bias_score", "confidence_pct", "risk_flag")}
+                for out in results
+            ],
+        },
+    )
     return {"date": as_of.isoformat(), "scores": results}
+
+
+async def notify_bias_range(start: date, end: date) -> None:
+    """One cache invalidation and one bias_computed event for scores rewritten over [start, end]."""
+    from services.core.cache import invalidate
+    from services.core.events import BIAS_COMPUTED, publish
+
+    await invalidate("bias", since=start)
+    await publish(BIAS_COMPUTED, {"from": start.isoformat(), "to": end.isoformat()})
+
+
+async def run_bias_backfill(start: date, end: date, features: bool = False) -> dict[str, Any]:
+    """
+    Recompute bias for every date in [start, end] with one shared ScoringContext and one
+    read of the inputs: surprises (archived years from Parquet, the rest from the database)
+    and VIX, or with features=True the materialized daily_feature rows (must cover the range).
+    Notifies once at the end, not per day.
+    """
+    from services.bias_engine.context import load_scoring_context
+    from services.core.archive import decompress_range
+
+    ctx = await load_scoring_context()
+    await decompress_range("bias_score", start, end)
+    if features:
+        from services.processing.features import FeatureMatrix
+
+        history = await FeatureMatrix.load(start, end, ctx)
+        if not history.covers(start, end):
+            raise ValueError(f"daily_feature does not cover {start}..{end}; build it first")
+    else:
+        history = await SurpriseHistory.load(start, end, ctx)
+    d = start
+    days = 0
+    while d <= end:
+        await run_bias_computation(d, ctx, history=history, notify=False)
+        days += 1
+        d += timedelta(days=1)
+    await notify_bias_range(start, end)
+    return {"from": start.isoformat(), "to": end.isoformat(), "days": days}
@@ -70,6 +70,9 @@ async def seed_index_indicator_weights() -> None:
 
 async def run_seed() -> dict[str, any]:
     """Seed indices and equal weights. Call after ingestion has created macro_indicator."""
+    from services.bias_engine.context import invalidate_scoring_context
+
     await seed_indices()
     await seed_index_indicator_weights()
+    invalidate_scoring_context()
     return {"status": "ok", "message": "Indices and weights seeded"}
@@ -0,0 +1,403 @@
+"""
+Parquet archive tier for cold history (macro_observation, bias_score).
+
+Closed years (entirely older than ARCHIVE_HOT_DAYS) are exported once to
+  ARCHIVE_DIR/<table>/year=YYYY/<key>=<id>/part-0.parquet   (zstd, sorted by time)
+and recorded in ARCHIVE_DIR/<table>/_manifest.json, whose "through" date is the boundary:
+read_history() serves [start, through) from the files and [through, end] from the
+database, so callers (bias replays, research) see one series either way.
+
+Files are opened through a memory-mapped filesystem and only the partitions a query needs
+(years x keys) are read; non-null numeric columns come out as NumPy views of the decoded
+Arrow buffers. Rows revised in the database after their year was archived are not seen by
+readers until that year is re-exported (run --year YYYY --force). --drop removes archived
+chunks from the database (TimescaleDB drop_chunks); API history endpoints then stop at the
+boundary. Needs pyarrow for the archive itself; with no manifest everything reads from
+the database. decompress_range() opens compressed chunks for backfills that rewrite them.
+
+Run: PYTHONPATH=. python -m services.core.archive run [--hot-days 730] [--table T] [--year Y --force] [--drop]
+     PYTHONPATH=. python -m services.core.archive status
+"""
+import argparse
+import asyncio
+import json
+import shutil
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import structlog
+
+from services.core.config import get_settings
+
+log = structlog.get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class ArchiveTable:
+    name: str
+    key: str
+    columns: tuple[tuple[str, str], ...]  # (name, type) as in services.api.export
+
+
+TABLES = {
+    t.name: t
+    for t in (
+        ArchiveTable(
+            "macro_observation",
+            "indicator_id",
+            (
+                ("time", "timestamp"), ("indicator_id", "int32"), ("release_date", "date"),
+                ("actual", "float64"), ("forecast", "float64"), ("previous", "float64"),
+                ("surprise", "float64"), ("surprise_normalized", "float64"), ("data_version", "int32"),
+            ),
+        ),
+        ArchiveTable(
+            "bias_score",
+            "index_id",
+            (
+                ("time", "timestamp"), ("index_id", "int32"), ("bias_score", "float64"), ("regime_id", "int32"),
+                ("confidence_pct", "float64"), ("risk_flag", "string"), ("components_json", "string"),
+            ),
+        ),
+    )
+}
+
+_NUMPY_TYPES = {"timestamp": "datetime64[us]", "date": "datetime64[D]", "float64": "float64", "int32": "int32", "string": "object"}
+
+
+def _require_pyarrow() -> None:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise RuntimeError("The Parquet archive requires pyarrow (pip install pyarrow)") from None
+
+
+def _arrow_schema(columns: Sequence[tuple[str, str]]) -> Any:
+    import pyarrow as pa
+
+    types = {
+        "timestamp": pa.timestamp("us", tz="UTC"),
+        "date": pa.date32(),
+        "string": pa.string(),
+        "float64": pa.float64(),
+        "int32": pa.int32(),
+    }
+    return pa.schema([(name, types[t]) for name, t in columns])
+
+
+def _midnight(d: date) -> datetime:
+    return datetime(d.year, d.month, d.day, tzinfo=timezone.utc)
+
+
+def _directory(directory: Path | None) -> Path:
+    return Path(directory or get_settings().archive_dir)
+
+
+def _manifest_path(table: str, directory: Path | None) -> Path:
+    return _directory(directory) / table / "_manifest.json"
+
+
+def load_manifest(table: str, directory: Path | None = None) -> dict[str, Any]:
+    path = _manifest_path(table, directory)
+    if not path.exists():
+        return {"table": table, "years": {}, "through": None}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _through(years: Sequence[int]) -> date | None:
+    """Boundary after the contiguous run of archived years starting at the oldest."""
+    archived = set(years)
+    if not archived:
+        return None
+    y = min(archived)
+    while y in archived:
+        y += 1
+    return date(y, 1, 1)
+
+
+def archive_boundary(table: str, directory: Path | None = None) -> date | None:
+    """Rows with time before this date are read from the archive (None: no archive)."""
+    through = load_manifest(table, directory).get("through")
+    return date.fromisoformat(through) if through else None
+
+
+def _row_value(value: Any, type_: str) -> Any:
+    if value is None:
+        return None
+    if type_ == "float64":
+        return float(value)
+    if type_ == "string" and not isinstance(value, str):
+        return json.dumps(value)
+    return value
+
+
+async def archive_year(table: str, year: int, directory: Path | None = None) -> dict[str, Any]:
+    """Export one year of table to Parquet, one file per key; replaces an earlier export of that year."""
+    _require_pyarrow()
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from services.core.db import get_conn
+
+    spec = TABLES[table]
+    names = [name for name, _ in spec.columns]
+    async with get_conn(readonly=True) as conn:
+        rows = await conn.fetch(
+            f"SELECT {', '.join(names)} FROM {table} WHERE time >= $1 AND time < $2 ORDER BY {spec.key}, time",
+            _midnight(date(year, 1, 1)),
+            _midnight(date(year + 1, 1, 1)),
+        )
+    by_key: dict[int, list[Any]] = {}
+    for r in rows:
+        by_key.setdefault(r[spec.key], []).append(r)
+    schema = _arrow_schema([c for c in spec.columns if c[0] != spec.key])
+    base = _directory(directory) / table
+    final = base / f"year={year}"
+    tmp = base / f".year={year}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    for key, key_rows in by_key.items():
+        part = tmp / f"{spec.key}={key}"
+        part.mkdir(parents=True)
+        arrays = [
+            pa.array([_row_value(r[field.name], t) for r in key_rows], type=field.type)
+            for field, (_, t) in zip(schema, [c for c in spec.columns if c[0] != spec.key])
+        ]
+        pq.write_table(pa.Table.from_arrays(arrays, schema=schema), part / "part-0.parquet", compression="zstd")
+    if by_key:
+        # An empty result leaves an earlier export alone (e.g. --force after --drop)
+        shutil.rmtree(final, ignore_errors=True)
+        tmp.rename(final)
+    return {"year": year, "rows": len(rows), "keys": len(by_key)}
+
+
+def _write_manifest(table: str, manifest: dict[str, Any], directory: Path | None) -> None:
+    years = [int(y) for y in manifest["years"]]
+    through = _through(years)
+    manifest["through"] = through.isoformat() if through else None
+    path = _manifest_path(table, directory)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    tmp.replace(path)
+
+
+async def drop_archived(table: str, through: date) -> str:
+    """Remove rows before the boundary from the database (whole chunks on TimescaleDB)."""
+    from services.core.db import get_conn
+
+    async with get_conn() as conn:
+        if getattr(conn, "dialect", None) == "sqlite":
+            return await conn.execute(f"DELETE FROM {table} WHERE time < $1", _midnight(through))
+        rows = await conn.fetch("SELECT drop_chunks($1::regclass, older_than => $2)", table, _midnight(through))
+        return f"DROP {len(rows)} chunks"
+
+
+async def decompress_range(table: str, start: date, end: date) -> int:
+    """
+    Decompress the chunks of table overlapping [start, end] before a backfill rewrites them
+    (updates into compressed chunks fail or are slow). Returns chunks decompressed; a no-op
+    on the embedded backend.
+    """
+    from services.core.db import get_conn
+
+    async with get_conn() as conn:
+        if getattr(conn, "dialect", None) == "sqlite":
+            return 0
+        rows = await conn.fetch(
+            """
+            SELECT decompress_chunk(format('%I.%I', chunk_schema, chunk_name)::regclass, if_compressed => true)
+            FROM timescaledb_information.chunks
+            WHERE hypertable_name = $1 AND is_compressed AND range_end > $2 AND range_start < $3
+            """,
+            table,
+            _midnight(start),
+            _midnight(end) + timedelta(days=1),
+        )
+    if rows:
+        log.info("chunks_decompressed", table=table, chunks=len(rows), start=start.isoformat(), end=end.isoformat())
+    return len(rows)
+
+
+async def run_archive(
+    tables: Sequence[str] | None = None,
+    hot_days: int | None = None,
+    years: Sequence[int] | None = None,
+    force: bool = False,
+    drop: bool = False,
+    directory: Path | None = None,
+) -> dict[str, Any]:
+    """
+    Archive every closed year not yet archived (or only years; force re-exports them).
+    Returns per table: exported years, the boundary and, with drop, the drop status.
+    """
+    from services.core.db import fetch_one
+
+    hot_days = get_settings().archive_hot_days if hot_days is None else hot_days
+    first_hot_year = (date.today() - timedelta(days=hot_days)).year
+    out: dict[str, Any] = {}
+    for table in tables or list(TABLES):
+        manifest = load_manifest(table, directory)
+        if years:
+            todo = [y for y in years if y < first_hot_year and (force or str(y) not in manifest["years"])]
+        else:
+            row = await fetch_one(f"SELECT time FROM {table} ORDER BY time LIMIT 1")
+            first = row["time"].year if row else first_hot_year
+            todo = [y for y in range(first, first_hot_year) if force or str(y) not in manifest["years"]]
+        exported = []
+        for y in todo:
+            r = await archive_year(table, y, directory)
+            if not r["rows"] and str(y) in manifest["years"]:
+                continue
+            manifest["years"][str(y)] = {
+                "rows": r["rows"], "keys": r["keys"], "exported_at": datetime.now(timezone.utc).isoformat()
+            }
+            _write_manifest(table, manifest, directory)
+            exported.append(r)
+            log.info("archive_year_written", table=table, **r)
+        _write_manifest(table, manifest, directory)
+        out[table] = {"exported": exported, "through": manifest["through"]}
+        if drop and manifest["through"]:
+            out[table]["dropped"] = await drop_archived(table, date.fromisoformat(manifest["through"]))
+    return out
+
+
+def read_cold(
+    table: str,
+    start: date,
+    end: date,
+    keys: Sequence[int] | None = None,
+    columns: Sequence[str] | None = None,
+    directory: Path | None = None,
+) -> Any:
+    """Archived rows with start <= time's day <= end as an Arrow table (memory-mapped files)."""
+    _require_pyarrow()
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+
+    spec = TABLES[table]
+    names = list(columns or [name for name, _ in spec.columns])
+    base = _directory(directory) / table
+    files = []
+    for year in range(start.year, end.year + 1):
+        year_dir = base / f"year={year}"
+        if not year_dir.is_dir():
+            continue
+        if keys is None:
+            files.extend(sorted(str(p) for p in year_dir.glob("*/part-*.parquet")))
+        else:
+            files.extend(str(p) for k in sorted(set(keys)) for p in (year_dir / f"{spec.key}={k}").glob("part-*.parquet"))
+    schema = _arrow_schema(spec.columns)
+    if not files:
+        return schema.empty_table().select(names)
+    dataset = ds.dataset(
+        files,
+        schema=schema,
+        format="parquet",
+        filesystem=pafs.LocalFileSystem(use_mmap=True),
+        partitioning=ds.partitioning(pa.schema([schema.field(spec.key)]), flavor="hive"),
+        partition_base_dir=str(base),
+    )
+    time_field = ds.field("time")
+    data = dataset.to_table(
+        columns=names,
+        filter=(time_field >= pa.scalar(_midnight(start), schema.field("time").type))
+        & (time_field < pa.scalar(_midnight(end + timedelta(days=1)), schema.field("time").type)),
+    )
+    return data.sort_by([("time", "ascending"), (spec.key, "ascending")]) if spec.key in names else data.sort_by("time")
+
+
+def to_numpy(data: Any) -> dict[str, np.ndarray]:
+    """Arrow table -> column arrays: views of single-chunk non-null numeric columns, else copies (nulls as NaN/None)."""
+    return {name: data.column(name).to_numpy() for name in data.column_names}
+
+
+def _rows_to_numpy(rows: Sequence[Any], columns: Sequence[tuple[str, str]]) -> dict[str, np.ndarray]:
+    out = {}
+    for name, type_ in columns:
+        values = [r[name] for r in rows]
+        if type_ == "timestamp":
+            values = [v.astimezone(timezone.utc).replace(tzinfo=None) if v.tzinfo else v for v in values]
+        elif type_ == "float64":
+            values = [np.nan if v is None else float(v) for v in values]
+        elif type_ == "int32" and any(v is None for v in values):
+            values, type_ = [np.nan if v is None else float(v) for v in values], "float64"
+        out[name] = np.array(values, dtype=_NUMPY_TYPES[type_])
+    return out
+
+
+async def read_history(
+    table: str,
+    start: date,
+    end: date,
+    keys: Sequence[int] | None = None,
+    columns: Sequence[str] | None = None,
+    directory: Path | None = None,
+) -> dict[str, np.ndarray]:
+    """
+    Rows with start <= time's day <= end as column arrays sorted by (time, key): days
+    before the archive boundary from Parquet, the rest from the database.
+    """
+    from services.core.db import fetch_all
+
+    spec = TABLES[table]
+    selected = [c for c in spec.columns if columns is None or c[0] in columns]
+    names = [name for name, _ in selected]
+    parts = []
+    through = archive_boundary(table, directory)
+    if through is not None and start < through:
+        parts.append(to_numpy(read_cold(table, start, min(end, through - timedelta(days=1)), keys, names, directory)))
+    hot_start = max(start, through) if through is not None else start
+    if hot_start <= end:
+        query = f"SELECT {', '.join(names)} FROM {table} WHERE time >= $1 AND time < $2"
+        args: list[Any] = [_midnight(hot_start), _midnight(end + timedelta(days=1))]
+        if keys is not None:
+            query += f" AND {spec.key} = ANY($3::int[])"
+            args.append(list(keys))
+        parts.append(_rows_to_numpy(await fetch_all(query, *args), selected))
+    if len(parts) == 1:
+        merged = parts[0]
+    else:
+        merged = {name: np.concatenate([p[name] for p in parts]) for name in names}
+    if "time" in merged and len(merged["time"]):
+        order = np.lexsort((merged[spec.key], merged["time"])) if spec.key in merged else np.argsort(merged["time"], kind="stable")
+        merged = {name: values[order] for name, values in merged.items()}
+    return merged
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    from services.core.db import close_pool
+
+    try:
+        if args.cmd == "run":
+            print(json.dumps(
+                await run_archive(args.tables, args.hot_days, args.years, args.force, args.drop), indent=2, default=str
+            ))
+        else:
+            for table in TABLES:
+                manifest = load_manifest(table)
+                rows = sum(y["rows"] for y in manifest["years"].values())
+                print(f"{table:<20} through={manifest['through']} years={len(manifest['years'])} rows={rows}")
+    finally:
+        await close_pool()
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run", help="Export closed years to Parquet")
+    r.add_argument("--table", action="append", dest="tables", choices=sorted(TABLES))
+    r.add_argument("--hot-days", type=int, help="Keep this many recent days hot (default ARCHIVE_HOT_DAYS)")
+    r.add_argument("--year", action="append", dest="years", type=int, help="Only this year (repeatable)")
+    r.add_argument("--force", action="store_true", help="Re-export years already archived")
+    r.add_argument("--drop", action="store_true", help="Then drop archived chunks from the database")
+    sub.add_parser("status", help="Archive boundary and size per table")
+    asyncio.run(main_async(p.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Event bus for pipeline workers (see docs/DATA_FLOW.md, section 7).
+
+Consumers read in groups: every group sees each event once, and consumers in the same group
+share the work. Backends (EVENT_BUS_BACKEND):
+
+- redis:    Redis Streams (XADD / XREADGROUP / XACK). Durable: events published while a
+            worker is down are delivered when it starts; unacked events are redelivered
+            to the same consumer after a crash.
+- postgres: NOTIFY / LISTEN (the default, no extra infrastructure). At most once: events
+            published while no worker is listening are lost; the daily batch catches up.
+- memory:   in-process queues, for tests and single-process runs.
+
+Every backend except memory also NOTIFYs, so API processes (services/api/stream.py)
+keep pushing events to SSE/WebSocket clients whichever bus the workers use.
+"""
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Any
+
+import structlog
+
+from services.core.config import get_settings
+
+log = structlog.get_logger(__name__)
+
+STREAM_PREFIX = "macroedge:events"
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_BYTES = 7900
+
+
+@dataclass
+class Event:
+    channel: str
+    data: dict[str, Any]
+    id: str = ""
+    group: str = field(default="", repr=False)
+
+
+def encode(data: dict[str, Any]) -> str:
+    return json.dumps(data, default=str)
+
+
+def decode(raw: str | bytes | None) -> dict[str, Any]:
+    if not raw:
+        return {}
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        return {"raw": raw if isinstance(raw, str) else raw.decode(errors="replace")}
+    return data if isinstance(data, dict) else {"value": data}
+
+
+def notify_bodies(data: dict[str, Any], limit: int = MAX_NOTIFY_BYTES) -> list[str]:
+    """
+    JSON payloads of at most limit bytes carrying data: an oversized event is split in halves
+    of its longest list field (indicator_ids, scores) until each part fits, other fields
+    repeated. Only what cannot be split that way loses its list/dict fields ("truncated").
+    """
+    body = encode(data)
+    if len(body.encode()) <= limit:
+        return [body]
+    lists = [k for k, v in data.items() if isinstance(v, list) and len(v) > 1]
+    if not lists:
+        return [encode({"truncated": True, **{k: v for k, v in data.items() if not isinstance(v, (list, dict))}})]
+    key = max(lists, key=lambda k: len(encode(data[k])))
+    half = len(data[key]) // 2
+    return notify_bodies({**data, key: data[key][:half]}, limit) + notify_bodies({**data, key: data[key][half:]}, limit)
+
+
+async def notify(channel: str, data: dict[str, Any]) -> None:
+    """pg_notify with a JSON payload, as several notifications if it would not fit in one."""
+    from services.core.db import get_conn
+
+    async with get_conn() as conn:
+        for body in notify_bodies(data):
+            await conn.execute("SELECT pg_notify($1, $2)", channel, body)
+
+
+class MemoryBus:
+    """In-process fan-out: one queue per (channel, group), created by ensure_group / first read."""
+
+    def __init__(self) -> None:
+        self._queues: dict[tuple[str, str], asyncio.Queue] = {}
+        self._seq = 0
+
+    async def publish(self, channel: str, data: dict[str, Any]) -> str:
+        return self.deliver(channel, data)
+
+    def deliver(self, channel: str, data: dict[str, Any]) -> str:
+        self._seq += 1
+        event_id = str(self._seq)
+        for (ch, group), q in self._queues.items():
+            if ch == channel:
+                q.put_nowait(Event(channel, data, event_id, group))
+        return event_id
+
+    async def ensure_group(self, channel: str, group: str) -> None:
+        self._queues.setdefault((channel, group), asyncio.Queue())
+
+    async def read(
+        self, channel: str, group: str, consumer: str, count: int = 100, timeout: float = 5.0
+    ) -> list[Event]:
+        """Up to count events, waiting at most timeout for the first one."""
+        await self.ensure_group(channel, group)
+        q = self._queues[(channel, group)]
+        try:
+            first = await asyncio.wait_for(q.get(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        events = [first]
+        while len(events) < count and not q.empty():
+            events.append(q.get_nowait())
+        return events
+
+    async def ack(self, events: list[Event]) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
+
+
+class PostgresBus(MemoryBus):
+    """NOTIFY to publish; one LISTEN connection feeds the local group queues."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._conn: Any = None
+        self._listening: set[str] = set()
+        self._lock = asyncio.Lock()
+
+    async def publish(self, channel: str, data: dict[str, Any]) -> str:
+        await notify(channel, data)
+        return ""
+
+    async def ensure_group(self, channel: str, group: str) -> None:
+        await super().ensure_group(channel, group)
+        async with self._lock:
+            if channel in self._listening:
+                return
+            if self._conn is None or self._conn.is_closed():
+                import asyncpg
+
+                from services.core.db import _database_url_for_asyncpg
+
+                self._conn = await asyncpg.connect(_database_url_for_asyncpg())
+                self._listening.clear()
+            await self._conn.add_listener(channel, self._on_notify)
+            self._listening.add(channel)
+
+    def _on_notify(self, conn: Any, pid: int, channel: str, payload: str) -> None:
+        self.deliver(channel, decode(payload))
+
+    async def close(self) -> None:
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+        self._listening.clear()
+
+
+class RedisStreamsBus:
+    """One stream per channel, capped at maxlen entries (approximate trimming)."""
+
+    def __init__(self, client: Any, maxlen: int = 10000, mirror_notify: bool = True):
+        self.client = client
+        self.maxlen = maxlen
+        self.mirror_notify = mirror_notify
+        self._groups: set[tuple[str, str]] = set()
+        # (channel, group, consumer) whose pending (unacked) entries were already re-read
+        self._recovered: set[tuple[str, str, str]] = set()
+
+    @staticmethod
+    def stream(channel: str) -> str:
+        return f"{STREAM_PREFIX}:{channel}"
+
+    async def publish(self, channel: str, data: dict[str, Any]) -> str:
+        event_id = await self.client.xadd(
+            self.stream(channel), {"data": encode(data)}, maxlen=self.maxlen, approximate=True
+        )
+        if self.mirror_notify:
+            try:
+                await notify(channel, data)
+            except Exception as e:
+                log.warning("event_notify_failed", channel=channel, error=str(e))
+        return event_id.decode() if isinstance(event_id, bytes) else str(event_id)
+
+    async def ensure_group(self, channel: str, group: str) -> None:
+        if (channel, group) in self._groups:
+            return
+        try:
+            # "$": a new group starts with events published from now on
+            await self.client.xgroup_create(self.stream(channel), group, id="$", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._groups.add((channel, group))
+
+    async def read(
+        self, channel: str, group: str, consumer: str, count: int = 100, timeout: float = 5.0
+    ) -> list[Event]:
+        await self.ensure_group(channel, group)
+        stream = self.stream(channel)
+        key = (channel, group, consumer)
+        resp = None
+        if key not in self._recovered:
+            # After a restart, first re-deliver what this consumer read but never acked
+            resp = await self.client.xreadgroup(group, consumer, {stream: "0"}, count=count)
+            if not resp or not resp[0][1]:
+                self._recovered.add(key)
+                resp = None
+        if resp is None:
+            resp = await self.client.xreadgroup(
+                group, consumer, {stream: ">"}, count=count, block=max(1, int(timeout * 1000))
+            )
+        out = []
+        for entry_id, fields in resp[0][1] if resp else []:
+            eid = entry_id.decode() if isinstance(entry_id, bytes) else str(entry_id)
+            raw = fields.get(b"data", fields.get("data")) if fields else None
+            out.append(Event(channel, decode(raw), eid, group))
+        return out
+
+    async def ack(self, events: list[Event]) -> None:
+        by_key: dict[tuple[str, str], list[str]] = {}
+        for e in events:
+            by_key.setdefault((e.channel, e.group), []).append(e.id)
+        for (channel, group), ids in by_key.items():
+            await self.client.xack(self.stream(channel), group, *ids)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+EventBus = MemoryBus | PostgresBus | RedisStreamsBus
+
+_bus: EventBus | None = None
+
+
+async def get_bus() -> EventBus:
+    """Process-wide bus per EVENT_BUS_BACKEND; redis falls back to postgres if unreachable."""
+    global _bus
+    if _bus is None:
+        settings = get_settings()
+        mode = settings.event_bus_backend
+        if mode == "memory" or (mode == "postgres" and settings.db_backend == "embedded"):
+            # Embedded backend: no server to LISTEN/NOTIFY through, and one process anyway
+            _bus = MemoryBus()
+        elif mode == "redis":
+            from services.core.cache import _connect_redis
+
+            client = await _connect_redis(settings.redis_url)
+            if client is None:
+                log.warning("event_bus_redis_unavailable", fallback="postgres")
+                _bus = PostgresBus()
+            else:
+                _bus = RedisStreamsBus(client, settings.event_stream_maxlen)
+        else:
+            _bus = PostgresBus()
+    return _bus
+
+
+def set_bus(bus: EventBus | None) -> None:
+    """Install a bus (tests, single-process runs) or reset to the configured one."""
+    global _bus
+    _bus = bus
+
+
+async def close_bus() -> None:
+    global _bus
+    if _bus is not None:
+        await _bus.close()
+        _bus = None
@@ -0,0 +1,420 @@
+"""
+Response cache for read endpoints: Redis when available, in-process LRU otherwise.
+Entries live in namespaces ("bias", "macro"); pipeline stages invalidate a whole
+namespace when they commit, TTL only bounds staleness if an invalidation is missed.
+
+Each namespace also has a version record {"v": counter, "ts": epoch seconds} persisted in
+the data_version table: pipeline stages bump it when they invalidate after a commit, and
+API processes refreshing on events only re-read it. Every worker therefore sees the same
+record, and it changes only with the data. Each bump also logs the earliest day the write
+changed (data_change), so derived state can be recomputed from that day only. It is the cheap key behind ETag/Last-Modified on
+the API (cached here, so a 304 needs no DB query while the cached copy lives) and is part
+of every entry key, so a build that raced an invalidation can never be served under the
+new version.
+"""
+import asyncio
+import json
+import secrets
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from datetime import date, datetime, timezone
+from typing import Any
+
+import structlog
+
+from services.core.config import get_settings
+
+log = structlog.get_logger(__name__)
+
+KEY_PREFIX = "macroedge:cache"
+
+# Redis values are JSON text; pre-encoded bytes payloads are stored behind this marker
+_BYTES_MARKER = b"\x00"
+
+
+def new_version() -> dict[str, Any]:
+    return {"v": secrets.token_hex(8), "ts": time.time()}
+
+
+# data_change rows kept per namespace; a reader further behind than this rebuilds
+CHANGE_LOG_VERSIONS = 5000
+
+# Process-local records, only while data_version cannot be read (validators then differ per worker)
+_local_versions: dict[str, dict[str, Any]] = {}
+
+
+def _record(row: Any) -> dict[str, Any]:
+    if row is None:
+        return {"v": "0", "ts": 0.0}
+    return {"v": str(row["version"]), "ts": row["updated_at"].timestamp()}
+
+
+async def load_version(namespace: str) -> dict[str, Any]:
+    """Persisted version record of a namespace ("0" before the first write)."""
+    from services.core.db import get_conn
+
+    try:
+        async with get_conn(readonly=True) as conn:
+            row = await conn.fetchrow("SELECT version, updated_at FROM data_version WHERE namespace = $1", namespace)
+    except Exception as e:
+        log.warning("cache_version_load_failed", namespace=namespace, error=str(e))
+        return _local_versions.setdefault(namespace, new_version())
+    return _record(row)
+
+
+async def bump_version(namespace: str, since: date | None = None) -> dict[str, Any]:
+    """
+    Increment the persisted version after a write and log since, the earliest day it
+    changed (None: unknown). A new local record if the database is unreachable.
+    """
+    from services.core.db import get_conn
+
+    try:
+        async with get_conn() as conn:
+            async with conn.transaction():
+                row = await conn.fetchrow(
+                    """
+                    INSERT INTO data_version (namespace, version, updated_at) VALUES ($1, 1, $2)
+                    ON CONFLICT (namespace) DO UPDATE SET version = data_version.version + 1, updated_at = $2
+                    RETURNING version, updated_at
+                    """,
+                    namespace,
+                    datetime.now(timezone.utc),
+                )
+                await conn.execute(
+                    "INSERT INTO data_change (namespace, version, since) VALUES ($1, $2, $3)",
+                    namespace,
+                    row["version"],
+                    since,
+                )
+                await conn.execute(
+                    "DELETE FROM data_change WHERE namespace = $1 AND version <= $2",
+                    namespace,
+                    row["version"] - CHANGE_LOG_VERSIONS,
+                )
+    except Exception as e:
+        log.warning("cache_version_bump_failed", namespace=namespace, error=str(e))
+        _local_versions[namespace] = new_version()
+        return _local_versions[namespace]
+    return _record(row)
+
+
+async def changed_since(namespace: str, after: str, through: str) -> date | None:
+    """
+    Earliest day changed by the writes after version `after` up to `through`, from the
+    data_change log. None when unknown (local versions, a write without a day, pruned rows).
+    """
+    from services.core.db import get_conn
+
+    try:
+        lo, hi = int(after), int(through)
+    except (TypeError, ValueError):
+        return None
+    if hi <= lo:
+        return None
+    try:
+        async with get_conn(readonly=True) as conn:
+            row = await conn.fetchrow(
+                """
+                SELECT COUNT(*) AS n, COUNT(since) AS known, MIN(since) AS since
+                FROM data_change WHERE namespace = $1 AND version > $2 AND version <= $3
+                """,
+                namespace,
+                lo,
+                hi,
+            )
+    except Exception as e:
+        log.warning("cache_change_log_failed", namespace=namespace, error=str(e))
+        return None
+    if row is None or row["n"] != hi - lo or row["known"] != row["n"]:
+        return None
+    since = row["since"]
+    return since if isinstance(since, date) else date.fromisoformat(str(since)[:10])
+
+
+class MemoryCache:
+    """In-process LRU with per-entry TTL. Keys are (namespace, key)."""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: int = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict[tuple[str, str], tuple[float, Any]] = OrderedDict()
+        self._versions: dict[str, tuple[float, dict[str, Any]]] = {}
+
+    async def get(self, namespace: str, key: str) -> Any | None:
+        item = self._data.get((namespace, key))
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[(namespace, key)]
+            return None
+        self._data.move_to_end((namespace, key))
+        return value
+
+    async def set(self, namespace: str, key: str, value: Any) -> None:
+        self._data[(namespace, key)] = (time.monotonic() + self.ttl_seconds, value)
+        self._data.move_to_end((namespace, key))
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def invalidate(self, namespace: str, version: dict[str, Any] | None = None) -> None:
+        """Drop the namespace; store version, or forget it so the next read reloads it."""
+        for k in [k for k in self._data if k[0] == namespace]:
+            del self._data[k]
+        if version is None:
+            self._versions.pop(namespace, None)
+        else:
+            await self.set_version(namespace, version)
+
+    async def version(self, namespace: str) -> dict[str, Any] | None:
+        # Expires like entries: another process may have committed without reaching us
+        item = self._versions.get(namespace)
+        if item is None or item[0] < time.monotonic():
+            return None
+        return item[1]
+
+    async def set_version(self, namespace: str, version: dict[str, Any]) -> None:
+        self._versions[namespace] = (time.monotonic() + self.ttl_seconds, version)
+
+    async def close(self) -> None:
+        self._data.clear()
+        self._versions.clear()
+
+
+class RedisCache:
+    """
+    One Redis hash per namespace: HGET/HSET per entry, DEL drops the namespace atomically.
+    Fields carry their own expiry (the hash TTL only bounds how long an idle namespace lives),
+    so writing one entry never extends the others.
+    """
+
+    def __init__(self, client: Any, ttl_seconds: int = 300):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def _ns_key(namespace: str) -> str:
+        return f"{KEY_PREFIX}:{namespace}"
+
+    async def get(self, namespace: str, key: str) -> Any | None:
+        raw = await self.client.hget(self._ns_key(namespace), key)
+        if raw is None:
+            return None
+        expires_at, _, raw = raw.partition(b":")
+        if int(expires_at) < time.time():
+            await self.client.hdel(self._ns_key(namespace), key)
+            return None
+        if raw[:1] == _BYTES_MARKER:
+            return bytes(raw[1:])
+        return json.loads(raw)
+
+    async def set(self, namespace: str, key: str, value: Any) -> None:
+        ns_key = self._ns_key(namespace)
+        data = _BYTES_MARKER + value if isinstance(value, bytes) else json.dumps(value, default=str).encode()
+        data = f"{int(time.time()) + self.ttl_seconds}:".encode() + data
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.hset(ns_key, key, data)
+            pipe.expire(ns_key, self.ttl_seconds)
+            await pipe.execute()
+
+    async def invalidate(self, namespace: str, version: dict[str, Any] | None = None) -> None:
+        version_key = f"{self._ns_key(namespace)}:version"
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(self._ns_key(namespace))
+            if version is None:
+                pipe.delete(version_key)
+            else:
+                pipe.set(version_key, json.dumps(version))
+            await pipe.execute()
+
+    async def version(self, namespace: str) -> dict[str, Any] | None:
+        raw = await self.client.get(f"{self._ns_key(namespace)}:version")
+        return None if raw is None else json.loads(raw)
+
+    async def set_version(self, namespace: str, version: dict[str, Any]) -> None:
+        await self.client.set(f"{self._ns_key(namespace)}:version", json.dumps(version), nx=True)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class ResponseCache:
+    """
+    Facade used by the API and pipeline. Picks Redis or memory per CACHE_BACKEND
+    (auto | redis | memory | none). A Redis error serves that call from memory and skips
+    Redis for retry_seconds; the first call after that tries it again, after dropping the
+    namespaces invalidated meanwhile (Redis missed those invalidations).
+    """
+
+    def __init__(
+        self, backend: MemoryCache | RedisCache | None, fallback: MemoryCache, retry_seconds: float = 30.0
+    ):
+        self.backend = backend
+        self.fallback = fallback
+        self.retry_seconds = retry_seconds
+        self._retry_at = 0.0
+        self._missed: set[str] = set()
+        self._inflight: dict[tuple[str, str], asyncio.Future] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    async def _call(self, op: str, *args: Any) -> Any:
+        if self.backend is self.fallback:
+            return await getattr(self.fallback, op)(*args)
+        if time.monotonic() >= self._retry_at:
+            try:
+                while self._missed:
+                    ns = next(iter(self._missed))
+                    await self.backend.invalidate(ns)
+                    self._missed.discard(ns)
+                return await getattr(self.backend, op)(*args)
+            except Exception as e:
+                log.warning("cache_backend_error", op=op, error=str(e), fallback="memory", retry_seconds=self.retry_seconds)
+                self._retry_at = time.monotonic() + self.retry_seconds
+        if op == "invalidate":
+            self._missed.add(args[0])
+        return await getattr(self.fallback, op)(*args)
+
+    async def get(self, namespace: str, key: str) -> Any | None:
+        if self.backend is None:
+            return None
+        return await self._call("get", namespace, key)
+
+    async def set(self, namespace: str, key: str, value: Any) -> None:
+        if self.backend is not None:
+            await self._call("set", namespace, key, value)
+
+    async def invalidate(self, namespace: str, version: dict[str, Any] | None = None) -> None:
+        if self.backend is not None:
+            await self._call("invalidate", namespace, version)
+        else:
+            await self.fallback.invalidate(namespace, version)
+
+    async def version(self, namespace: str) -> dict[str, Any]:
+        """Current version record of a namespace (served even when caching is disabled)."""
+        if self.backend is None:
+            record = await self.fallback.version(namespace)
+        else:
+            record = await self._call("version", namespace)
+        if record is None:
+            record = await load_version(namespace)
+            if self.backend is None:
+                await self.fallback.set_version(namespace, record)
+            else:
+                await self._call("set_version", namespace, record)
+        return record
+
+    async def get_or_set(
+        self,
+        namespace: str,
+        key: str,
+        build: Callable[[], Awaitable[Any]],
+        version: dict[str, Any] | None = None,
+    ) -> Any:
+        """
+        Cached value, or build it once (concurrent misses in this process share one build).
+        version: namespace version already read by the caller, saves a round trip.
+        """
+        if self.backend is None:
+            return await build()
+        version = version or await self.version(namespace)
+        key = f"{version['v']}:{key}"
+        value = await self.get(namespace, key)
+        if value is not None:
+            return value
+        pending = self._inflight.get((namespace, key))
+        if pending is not None:
+            return await asyncio.shield(pending)
+        pending = asyncio.get_running_loop().create_future()
+        self._inflight[(namespace, key)] = pending
+        try:
+            value = await build()
+            await self.set(namespace, key, value)
+            pending.set_result(value)
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except Exception as e:
+            pending.set_exception(e)
+            pending.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._inflight[(namespace, key)]
+        return value
+
+    async def close(self) -> None:
+        if self.backend is not None and self.backend is not self.fallback:
+            await self.backend.close()
+        await self.fallback.close()
+
+
+async def _connect_redis(url: str) -> Any | None:
+    try:
+        import redis.asyncio as redis_asyncio
+    except ImportError:
+        return None
+    client = redis_asyncio.from_url(url)
+    try:
+        await client.ping()
+    except Exception as e:
+        log.warning("cache_redis_unavailable", url=url, error=str(e))
+        await client.aclose()
+        return None
+    return client
+
+
+_cache: ResponseCache | None = None
+
+
+async def get_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        settings = get_settings()
+        fallback = MemoryCache(settings.cache_max_entries, settings.cache_ttl_seconds)
+        mode = settings.cache_backend
+        backend: MemoryCache | RedisCache | None
+        if mode == "none":
+            backend = None
+        elif mode == "memory":
+            backend = fallback
+        else:
+            client = await _connect_redis(settings.redis_url)
+            if client is None and mode == "redis":
+                log.warning("cache_redis_required_but_unavailable", fallback="memory")
+            backend = RedisCache(client, settings.cache_ttl_seconds) if client else fallback
+        _cache = ResponseCache(backend, fallback)
+    return _cache
+
+
+async def invalidate(*namespaces: str, since: date | None = None) -> None:
+    """
+    Called by pipeline stages after commit: bumps the persisted versions; since is the
+    earliest day the write changed, if known. Never fails the caller.
+    """
+    try:
+        cache = await get_cache()
+        for ns in namespaces:
+            await cache.invalidate(ns, await bump_version(ns, since))
+    except Exception as e:
+        log.warning("cache_invalidate_failed", namespaces=namespaces, error=str(e))
+
+
+async def refresh(*namespaces: str) -> None:
+    """Called by readers told of another process's write: drop entries, re-read the versions."""
+    try:
+        cache = await get_cache()
+        for ns in namespaces:
+            await cache.invalidate(ns)
+    except Exception as e:
+        log.warning("cache_refresh_failed", namespaces=namespaces, error=str(e))
+
+
+async def close_cache() -> None:
+    global _cache
+    if _cache is not None:
+        await _cache.close()
+        _cache = None
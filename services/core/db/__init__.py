@@ -0,0 +1,303 @@
+"""
+Async database pools (asyncpg) for TimescaleDB/PostgreSQL.
+
+One write pool on the primary, plus one read pool per replica when DATABASE_REPLICA_URLS
+is set. get_conn() is the primary; get_conn(readonly=True), fetch_one and fetch_all follow
+the read preference of the current context: "primary" by default (pipeline jobs read
+what they just wrote), "replica" inside the API (see use_replicas). After a write in a
+replica-preferring context, its reads stay on the primary for DB_READ_AFTER_WRITE_SECONDS.
+Statements are timed per query name (services.core.query_metrics).
+
+DB_BACKEND=embedded swaps all of this for one in-process SQLite connection (see
+services.core.db.embedded): get_conn() yields it and there are no pools or replicas.
+"""
+import contextvars
+import itertools
+import time
+from collections import deque
+from collections.abc import AsyncGenerator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any
+
+import asyncpg
+import structlog
+
+from services.core.config import get_settings
+from services.core.metrics import Gauge, Histogram
+from services.core.query_metrics import (
+    QUERY_NAMES,
+    SlowQueryConfig,
+    on_query,
+    record_acquire,
+    record_rows,
+    status_rows,
+)
+
+log = structlog.get_logger(__name__)
+
+POOL_ACQUIRE_SECONDS = Histogram(
+    "db_pool_acquire_seconds", "Time waiting for a pooled connection", ("pool",)
+)
+
+# Fixed queries prepared on every new connection (name -> SQL), see prepared()
+PREPARED_QUERIES: dict[str, str] = {}
+
+PRIMARY = "primary"
+REPLICA = "replica"
+
+_read_preference: contextvars.ContextVar[str] = contextvars.ContextVar("db_read_preference", default=PRIMARY)
+_pinned_until: contextvars.ContextVar[float] = contextvars.ContextVar("db_pinned_until", default=0.0)
+
+
+def prepared(name: str, query: str) -> str:
+    """
+    Register a fixed query to be prepared when each pooled connection opens; returns the
+    SQL unchanged. Executing the same string later hits asyncpg's statement cache, so the
+    first request on a connection skips the parse/plan round trip.
+    """
+    PREPARED_QUERIES[name] = query
+    QUERY_NAMES[query] = name
+    return query
+
+
+def _asyncpg_url(url: str) -> str:
+    # Convert sqlalchemy-style postgresql+asyncpg:// to postgres:// for asyncpg
+    if "postgresql+asyncpg://" in url:
+        url = url.replace("postgresql+asyncpg://", "postgres://", 1)
+    elif url.startswith("postgresql://"):
+        url = url.replace("postgresql://", "postgres://", 1)
+    return url
+
+
+def _database_url_for_asyncpg() -> str:
+    return _asyncpg_url(get_settings().database_url)
+
+
+def _replica_urls() -> list[str]:
+    raw = get_settings().database_replica_urls
+    return [_asyncpg_url(u.strip()) for u in raw.split(",") if u.strip()]
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    conn.add_query_logger(on_query)
+    for name, query in PREPARED_QUERIES.items():
+        try:
+            # Connection.prepare() bypasses the statement cache; _prepare(use_cache=True) fills it
+            await conn._prepare(query, use_cache=True)
+        except Exception as e:
+            # e.g. a table from a migration not yet applied; the query prepares lazily later
+            log.warning("db_prepare_failed", query=name, error=str(e))
+
+
+_pool: asyncpg.Pool | None = None
+_embedded: bool | None = None
+_replica_pools: list[asyncpg.Pool] | None = None
+_replica_cycle: Iterator[asyncpg.Pool] | None = None
+_acquire_timeout: float | None = None
+_read_after_write_seconds: float = 0.0
+# (monotonic time, seconds waited) of recent acquires, for load shedding in the API
+_recent_waits: deque[tuple[float, float]] = deque(maxlen=256)
+
+
+async def _create_pool(url: str) -> asyncpg.Pool:
+    settings = get_settings()
+    return await asyncpg.create_pool(
+        url,
+        min_size=settings.db_pool_min_size,
+        max_size=settings.db_pool_max_size,
+        command_timeout=settings.db_command_timeout,
+        max_inactive_connection_lifetime=settings.db_max_inactive_connection_lifetime,
+        statement_cache_size=settings.db_statement_cache_size,
+        init=_init_connection,
+    )
+
+
+def is_embedded() -> bool:
+    """True when DB_BACKEND=embedded (resolved once per process, reset by close_pool)."""
+    global _embedded
+    if _embedded is None:
+        _embedded = get_settings().db_backend == "embedded"
+    return _embedded
+
+
+async def get_pool() -> asyncpg.Pool:
+    """The primary (write) pool."""
+    global _pool, _acquire_timeout, _read_after_write_seconds
+    if _pool is None:
+        settings = get_settings()
+        _acquire_timeout = settings.db_pool_acquire_timeout
+        _read_after_write_seconds = settings.db_read_after_write_seconds
+        SlowQueryConfig.load()
+        _pool = await _create_pool(_database_url_for_asyncpg())
+    return _pool
+
+
+async def get_replica_pools() -> list[asyncpg.Pool]:
+    """Read pools, one per reachable replica (empty when none are configured)."""
+    global _replica_pools, _replica_cycle
+    if _replica_pools is None:
+        pools = []
+        for url in _replica_urls():
+            try:
+                pools.append(await _create_pool(url))
+            except Exception as e:
+                log.warning("db_replica_unavailable", host=url.rsplit("@", 1)[-1], error=str(e))
+        _replica_pools = pools
+        _replica_cycle = itertools.cycle(pools) if pools else None
+    return _replica_pools
+
+
+async def get_read_pool() -> tuple[str, asyncpg.Pool]:
+    """(role, pool) for a read in the current context: a replica (round robin) or the primary."""
+    if _read_preference.get() == REPLICA and _pinned_until.get() <= time.monotonic():
+        await get_replica_pools()
+        if _replica_cycle is not None:
+            return REPLICA, next(_replica_cycle)
+    return PRIMARY, await get_pool()
+
+
+@contextmanager
+def use_replicas() -> Iterator[None]:
+    """Route reads in this context (and tasks started from it) to replicas."""
+    token = _read_preference.set(REPLICA)
+    try:
+        yield
+    finally:
+        _read_preference.reset(token)
+
+
+@contextmanager
+def use_primary() -> Iterator[None]:
+    """Route reads in this context to the primary (e.g. right after a write elsewhere)."""
+    token = _read_preference.set(PRIMARY)
+    try:
+        yield
+    finally:
+        _read_preference.reset(token)
+
+
+def pin_primary(seconds: float | None = None) -> None:
+    """Keep this context's reads on the primary for a while (replicas may lag a write)."""
+    window = _read_after_write_seconds if seconds is None else seconds
+    if window > 0:
+        _pinned_until.set(time.monotonic() + window)
+
+
+async def warm_pool() -> None:
+    """Open min_size connections (and prepare fixed queries) on every pool before the first request."""
+    if is_embedded():
+        from services.core.db.embedded import get_embedded
+
+        get_embedded()
+        return
+    t0 = time.perf_counter()
+    pool = await get_pool()
+    replicas = await get_replica_pools()
+    log.info(
+        "db_pool_warm",
+        size=pool.get_size(),
+        replicas=len(replicas),
+        prepared=len(PREPARED_QUERIES),
+        seconds=round(time.perf_counter() - t0, 3),
+    )
+
+
+async def close_pool() -> None:
+    global _pool, _replica_pools, _replica_cycle, _embedded
+    if _embedded:
+        from services.core.db.embedded import close_embedded
+
+        await close_embedded()
+    _embedded = None
+    for pool in _replica_pools or []:
+        await pool.close()
+    _replica_pools = None
+    _replica_cycle = None
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+Gauge("db_pool_size", "Open pooled connections (primary)", fn=lambda: _pool.get_size() if _pool else 0)
+Gauge("db_pool_idle", "Idle pooled connections (primary)", fn=lambda: _pool.get_idle_size() if _pool else 0)
+Gauge("db_pool_max_size", "Pool size limit (primary)", fn=lambda: _pool.get_max_size() if _pool else 0)
+Gauge(
+    "db_replica_pool_size", "Open pooled connections across replicas",
+    fn=lambda: sum(p.get_size() for p in _replica_pools or []),
+)
+Gauge(
+    "db_replica_pool_idle", "Idle pooled connections across replicas",
+    fn=lambda: sum(p.get_idle_size() for p in _replica_pools or []),
+)
+
+
+async def _acquire(role: str, pool: asyncpg.Pool, query: str | None = None) -> asyncpg.Connection:
+    t0 = time.perf_counter()
+    conn = await pool.acquire(timeout=_acquire_timeout)
+    waited = time.perf_counter() - t0
+    _recent_waits.append((time.monotonic(), waited))
+    POOL_ACQUIRE_SECONDS.observe(waited, pool=role)
+    if query is not None:
+        record_acquire(query, waited)
+    return conn
+
+
+def recent_pool_wait(window_seconds: float = 2.0) -> float:
+    """Mean pool wait over the last window (0 when idle, so shedding stops on its own)."""
+    cutoff = time.monotonic() - window_seconds
+    waits = [w for t, w in _recent_waits if t >= cutoff]
+    return sum(waits) / len(waits) if waits else 0.0
+
+
+@asynccontextmanager
+async def get_conn(readonly: bool = False, query: str | None = None) -> AsyncGenerator[asyncpg.Connection, None]:
+    """
+    Pooled connection. Default: the primary, and a replica-preferring context is pinned
+    to the primary afterwards (it presumably wrote). readonly=True: routed like fetch_all.
+    query: the statement about to run, to attribute pool wait to it in metrics.
+    """
+    if is_embedded():
+        from services.core.db.embedded import get_embedded
+
+        yield get_embedded()
+        return
+    role, pool = await get_read_pool() if readonly else (PRIMARY, await get_pool())
+    try:
+        conn = await _acquire(role, pool, query)
+    except Exception as e:
+        if role != REPLICA:
+            raise
+        # A replica that went away must not fail reads; the primary can serve them
+        log.warning("db_replica_acquire_failed", error=str(e), fallback=PRIMARY)
+        role, pool = PRIMARY, await get_pool()
+        conn = await _acquire(role, pool, query)
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+        if not readonly and _read_preference.get() == REPLICA:
+            pin_primary()
+
+
+async def fetch_one(
+    query: str,
+    *args: Any,
+) -> asyncpg.Record | None:
+    async with get_conn(readonly=True, query=query) as conn:
+        row = await conn.fetchrow(query, *args)
+    record_rows(query, 0 if row is None else 1)
+    return row
+
+
+async def fetch_all(query: str, *args: Any) -> list[asyncpg.Record]:
+    async with get_conn(readonly=True, query=query) as conn:
+        rows = await conn.fetch(query, *args)
+    record_rows(query, len(rows))
+    return rows
+
+
+async def execute(query: str, *args: Any) -> str:
+    async with get_conn(query=query) as conn:
+        status = await conn.execute(query, *args)
+    record_rows(query, status_rows(status))
+    return status
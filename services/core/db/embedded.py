@@ -0,0 +1,311 @@
+"""
+Embedded backend: the pipeline in-process on SQLite, no Postgres server.
+
+With DB_BACKEND=embedded, get_conn() hands out one shared EmbeddedConnection on the file
+EMBEDDED_DB_PATH (":memory:" for a throwaway store). It has the asyncpg methods the
+pipeline modules call (fetch, fetchrow, fetchval, execute, executemany, transaction,
+copy_records_to_table) and rewrites their Postgres SQL on the way in: $n placeholders,
+::casts, NOW(), IS [NOT] DISTINCT FROM, = ANY($n), the "index" table name; STDDEV is
+registered. The one statement with no SQLite equivalent (DISTINCT ON in the scorer)
+checks conn.dialect and uses its own variant.
+
+Series tables are WITHOUT ROWID and clustered on their (time, key) primary key, so a
+date-range read is one ordered range scan. Statements run synchronously on the event loop:
+this is for research, tests and CI (one process, one writer), not for the API.
+Tables move in and out as Parquet (pyarrow) with export_parquet / import_parquet.
+"""
+import json
+import re
+import sqlite3
+from collections.abc import AsyncIterator, Iterable, Sequence
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import structlog
+
+log = structlog.get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS data_source (
+    id INTEGER PRIMARY KEY, code TEXT UNIQUE NOT NULL, name TEXT NOT NULL, provider TEXT NOT NULL,
+    config_json TEXT, timezone TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS macro_indicator (
+    id INTEGER PRIMARY KEY, code TEXT UNIQUE NOT NULL, name TEXT NOT NULL, category TEXT, unit TEXT,
+    source_id INTEGER REFERENCES data_source(id), direction TEXT DEFAULT 'positive',
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS "index" (
+    id INTEGER PRIMARY KEY, code TEXT UNIQUE NOT NULL, name TEXT NOT NULL, region TEXT NOT NULL,
+    currency TEXT NOT NULL, timezone TEXT NOT NULL, created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS index_indicator_weight (
+    id INTEGER PRIMARY KEY, indicator_id INTEGER NOT NULL, index_id INTEGER NOT NULL,
+    weight REAL NOT NULL CHECK (weight >= 0 AND weight <= 1), regime_weights TEXT,
+    UNIQUE (indicator_id, index_id)
+);
+CREATE TABLE IF NOT EXISTS market_regime (id INTEGER PRIMARY KEY, code TEXT UNIQUE NOT NULL, name TEXT NOT NULL);
+INSERT OR IGNORE INTO market_regime (code, name) VALUES
+    ('risk_on', 'Risk-On'), ('risk_off', 'Risk-Off'), ('inflationary', 'Inflationary'),
+    ('recessionary', 'Recessionary'), ('neutral', 'Neutral');
+CREATE TABLE IF NOT EXISTS macro_observation (
+    time TIMESTAMPTZ NOT NULL, indicator_id INTEGER NOT NULL, release_date DATE NOT NULL,
+    actual REAL, forecast REAL, previous REAL, surprise REAL, surprise_normalized REAL,
+    data_version INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (time, indicator_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_macro_obs_indicator_release ON macro_observation (indicator_id, release_date DESC);
+CREATE INDEX IF NOT EXISTS idx_macro_obs_release_scored
+    ON macro_observation (release_date DESC, indicator_id, surprise_normalized)
+    WHERE surprise_normalized IS NOT NULL;
+CREATE TABLE IF NOT EXISTS macro_rolling_stats (
+    time TIMESTAMPTZ NOT NULL, indicator_id INTEGER NOT NULL, window_days INTEGER NOT NULL,
+    mean_actual REAL, std_actual REAL, trend_slope REAL,
+    PRIMARY KEY (time, indicator_id, window_days)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS bias_score (
+    time TIMESTAMPTZ NOT NULL, index_id INTEGER NOT NULL,
+    bias_score REAL NOT NULL CHECK (bias_score >= -100 AND bias_score <= 100),
+    regime_id INTEGER, confidence_pct REAL NOT NULL CHECK (confidence_pct >= 0 AND confidence_pct <= 100),
+    risk_flag TEXT NOT NULL, components_json TEXT,
+    PRIMARY KEY (time, index_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_bias_score_index_time ON bias_score (index_id, time DESC);
+CREATE TABLE IF NOT EXISTS yield_curve_snapshot (
+    time TIMESTAMPTZ NOT NULL, region TEXT NOT NULL, yield_2y REAL, yield_10y REAL, spread_2y10y REAL,
+    PRIMARY KEY (time, region)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS volatility_snapshot (
+    time TIMESTAMPTZ NOT NULL, symbol TEXT NOT NULL, value REAL NOT NULL,
+    PRIMARY KEY (time, symbol)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_volatility_symbol_time ON volatility_snapshot (symbol, time DESC);
+CREATE TABLE IF NOT EXISTS daily_feature (
+    time TIMESTAMPTZ PRIMARY KEY, indicator_ids JSON NOT NULL, surprise JSON NOT NULL, days_since JSON NOT NULL,
+    surprise_ewm JSON NOT NULL, surprise_ewm_var JSON NOT NULL, vix REAL, regions JSON NOT NULL,
+    spread_2y10y JSON NOT NULL, computed_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS data_version (namespace TEXT PRIMARY KEY, version INTEGER NOT NULL, updated_at TIMESTAMPTZ NOT NULL);
+CREATE TABLE IF NOT EXISTS data_change (
+    namespace TEXT NOT NULL, version INTEGER NOT NULL, since DATE, PRIMARY KEY (namespace, version)
+);
+"""
+
+# Metadata first, so ids exist before the rows that reference them
+TABLES = [
+    "data_source", "macro_indicator", "index", "index_indicator_weight", "market_regime",
+    "macro_observation", "macro_rolling_stats", "bias_score", "yield_curve_snapshot", "volatility_snapshot",
+    "daily_feature",
+]
+
+
+def _to_timestamp(raw: bytes) -> datetime:
+    value = datetime.fromisoformat(raw.decode())
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+sqlite3.register_converter("TIMESTAMPTZ", _to_timestamp)
+sqlite3.register_converter("DATE", lambda raw: date.fromisoformat(raw.decode()))
+sqlite3.register_converter("JSON", json.loads)  # Postgres arrays are stored as JSON lists
+
+_PLACEHOLDER = re.compile(r"\$(\d+)")
+_CAST = re.compile(r"::\s*[A-Za-z_][A-Za-z0-9_]*(\[\])?")
+_NOW = re.compile(r"\bNOW\(\)", re.IGNORECASE)
+_DISTINCT_FROM = re.compile(r"\bIS\s+(NOT\s+)?DISTINCT\s+FROM\b", re.IGNORECASE)
+_ANY = re.compile(r"=\s*ANY\((\?\d+)\)", re.IGNORECASE)
+_INDEX_TABLE = re.compile(r"\b(FROM|JOIN|INTO|UPDATE|TABLE)\s+index\b", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def translate(sql: str) -> str:
+    """Postgres SQL as used by the pipeline modules -> SQLite."""
+    sql = _PLACEHOLDER.sub(r"?\1", sql)
+    sql = _CAST.sub("", sql)
+    sql = _NOW.sub("CURRENT_TIMESTAMP", sql)
+    sql = _DISTINCT_FROM.sub(lambda m: "IS" if m.group(1) else "IS NOT", sql)
+    sql = _ANY.sub(r"IN (SELECT value FROM json_each(\1))", sql)  # list params arrive as JSON
+    return _INDEX_TABLE.sub(lambda m: f'{m.group(1)} "index"', sql)
+
+
+def _param(value: Any) -> Any:
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.isoformat(sep=" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, default=str)
+    return value
+
+
+def _params(args: Sequence[Any]) -> tuple[Any, ...]:
+    return tuple(_param(a) for a in args)
+
+
+class _StdDev:
+    """STDDEV (sample, like Postgres): SQLite has no built-in one. Welford's update."""
+
+    def __init__(self) -> None:
+        self.n, self.mean, self.m2 = 0, 0.0, 0.0
+
+    def step(self, value: float | None) -> None:
+        if value is None:
+            return
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    def finalize(self) -> float | None:
+        return (self.m2 / (self.n - 1)) ** 0.5 if self.n > 1 else None
+
+
+class Record(dict):
+    """Row by column name or position, like asyncpg.Record (dict(r), r.get() work too)."""
+
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, int):
+            return list(self.values())[key]
+        return super().__getitem__(key)
+
+
+def _record(cursor: sqlite3.Cursor, row: tuple[Any, ...]) -> Record:
+    return Record(zip([d[0] for d in cursor.description], row))
+
+
+class EmbeddedConnection:
+    dialect = "sqlite"
+
+    def __init__(self, path: str | Path = ":memory:"):
+        self.path = str(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(
+            self.path, detect_types=sqlite3.PARSE_DECLTYPES, isolation_level=None, check_same_thread=False
+        )
+        self._db.row_factory = _record
+        self._db.create_aggregate("stddev", 1, _StdDev)
+        for pragma in ("journal_mode = WAL", "synchronous = NORMAL", "temp_store = MEMORY", "cache_size = -65536"):
+            self._db.execute(f"PRAGMA {pragma}")
+        self._db.executescript(SCHEMA)
+
+    def _run(self, sql: str, args: Sequence[Any]) -> sqlite3.Cursor:
+        return self._db.execute(translate(sql), _params(args))
+
+    async def execute(self, sql: str, *args: Any) -> str:
+        """Run one statement; returns an asyncpg-style status ("INSERT 0 1", "UPDATE 3")."""
+        if not args and ";" in sql.strip().rstrip(";"):
+            self._db.executescript(translate(sql))
+            return "OK"
+        cur = self._run(sql, args)
+        verb = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+        n = max(cur.rowcount, 0)
+        return f"INSERT 0 {n}" if verb == "INSERT" else f"{verb} {n}"
+
+    async def executemany(self, sql: str, args: Iterable[Sequence[Any]]) -> None:
+        async with self.transaction():
+            self._db.executemany(translate(sql), (_params(a) for a in args))
+
+    async def fetch(self, sql: str, *args: Any) -> list[Record]:
+        return self._run(sql, args).fetchall()
+
+    async def fetchrow(self, sql: str, *args: Any) -> Record | None:
+        rows = self._run(sql, args).fetchall()
+        return rows[0] if rows else None
+
+    async def fetchval(self, sql: str, *args: Any, column: int = 0) -> Any:
+        row = await self.fetchrow(sql, *args)
+        return None if row is None else row[column]
+
+    async def copy_records_to_table(
+        self, table: str, *, records: Iterable[Sequence[Any]], columns: Sequence[str]
+    ) -> str:
+        cols = ", ".join(columns)
+        marks = ", ".join("?" for _ in columns)
+        async with self.transaction():
+            cur = self._db.executemany(
+                f'INSERT INTO "{table}" ({cols}) VALUES ({marks})', (_params(r) for r in records)
+            )
+        return f"COPY {max(cur.rowcount, 0)}"
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        """BEGIN/COMMIT (ROLLBACK on error); inside an open transaction it just joins it."""
+        if self._db.in_transaction:
+            yield
+            return
+        self._db.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    async def close(self) -> None:
+        self._db.close()
+
+    async def export_parquet(self, directory: Path, tables: Sequence[str] = TABLES) -> dict[str, int]:
+        """One zstd Parquet file per table. Needs pyarrow."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        directory.mkdir(parents=True, exist_ok=True)
+        counts = {}
+        for table in tables:
+            cur = self._db.execute(f'SELECT * FROM "{table}"')
+            names = [d[0] for d in cur.description]
+            rows = cur.fetchall()
+            data = pa.table({n: [r[n] for r in rows] for n in names})
+            pq.write_table(data, directory / f"{table}.parquet", compression="zstd")
+            counts[table] = len(rows)
+        return counts
+
+    async def import_parquet(self, directory: Path, tables: Sequence[str] = TABLES) -> dict[str, int]:
+        """Load the tables present in directory (rows with an existing key replace it). Needs pyarrow."""
+        import pyarrow.parquet as pq
+
+        counts = {}
+        async with self.transaction():
+            for table in tables:
+                path = directory / f"{table}.parquet"
+                if not path.exists():
+                    continue
+                data = pq.read_table(path)
+                cols = ", ".join(data.column_names)
+                marks = ", ".join("?" for _ in data.column_names)
+                self._db.executemany(
+                    f'INSERT OR REPLACE INTO "{table}" ({cols}) VALUES ({marks})',
+                    (_params(tuple(r.values())) for r in data.to_pylist()),
+                )
+                counts[table] = data.num_rows
+        return counts
+
+
+_conn: EmbeddedConnection | None = None
+
+
+def get_embedded() -> EmbeddedConnection:
+    """The process-wide embedded store (EMBEDDED_DB_PATH), opened and schema'd on first use."""
+    global _conn
+    if _conn is None:
+        from services.core.config import get_settings
+
+        _conn = EmbeddedConnection(get_settings().embedded_db_path)
+        log.info("embedded_db_open", path=_conn.path)
+    return _conn
+
+
+async def close_embedded() -> None:
+    global _conn
+    if _conn is not None:
+        await _conn.close()
+        _conn = None
@@ -0,0 +1,32 @@
+"""
+Pipeline events (see docs/DATA_FLOW.md): published on the event bus (services.core.bus) so
+workers can react to new data, and with Postgres NOTIFY so any process holding a LISTEN
+connection (the API broadcaster) learns about it without polling.
+
+macro_data_updated carries the affected indicators, so consumers recompute only those:
+  {"stage": "ingestion" | "processing", "indicator_ids": [...], "since": "YYYY-MM-DD", ...}
+
+bias_computed carries one day's scores, or only the range for a backfill (one event per run):
+  {"date": "YYYY-MM-DD", "scores": [...]}  |  {"from": "YYYY-MM-DD", "to": "YYYY-MM-DD"}
+"""
+from typing import Any
+
+import structlog
+
+from services.core.bus import get_bus
+
+log = structlog.get_logger(__name__)
+
+MACRO_DATA_UPDATED = "macro_data_updated"
+BIAS_COMPUTED = "bias_computed"
+
+CHANNELS = (MACRO_DATA_UPDATED, BIAS_COMPUTED)
+
+
+async def publish(channel: str, payload: dict[str, Any]) -> None:
+    """Publish a JSON payload. Never fails the caller: events are best-effort."""
+    try:
+        bus = await get_bus()
+        await bus.publish(channel, payload)
+    except Exception as e:
+        log.warning("event_publish_failed", channel=channel, error=str(e))
@@ -0,0 +1,190 @@
+"""
+In-process metrics in the Prometheus text format (served at /metrics by the API).
+Counters, gauges and cumulative histograms with optional labels; no external dependency.
+"""
+import math
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+# Seconds; covers a pooled acquire (~µs) up to a saturated pool or slow query
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], le: str | None = None) -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in zip(names, values)]
+    if le is not None:
+        parts.append(f'le="{le}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        return tuple(str(labels.get(k, "")) for k in self.labelnames)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self._values: dict[tuple[str, ...], float] = {}
+        super().__init__(name, help, labelnames)
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterator[str]:
+        for key, v in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {_fmt(v)}"
+
+
+class Gauge(_Metric):
+    """Set explicitly, or computed at scrape time by fn (unlabelled)."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        fn: Callable[[], float] | None = None,
+    ):
+        self._values: dict[tuple[str, ...], float] = {}
+        self.fn = fn
+        super().__init__(name, help, labelnames)
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: Any) -> float:
+        if self.fn is not None:
+            return float(self.fn())
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterator[str]:
+        if self.fn is not None:
+            yield f"{self.name} {_fmt(self.fn())}"
+            return
+        for key, v in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {_fmt(v)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label set: [count per bucket (non-cumulative)..., sum, count]
+        self._series: dict[tuple[str, ...], list[float]] = {}
+        super().__init__(name, help, labelnames)
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        i = next(i for i, b in enumerate(self.buckets) if value <= b)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def count(self, **labels: Any) -> int:
+        s = self._series.get(self._key(labels))
+        return int(s[-1]) if s else 0
+
+    def total(self, **labels: Any) -> float:
+        s = self._series.get(self._key(labels))
+        return s[-2] if s else 0.0
+
+    def samples(self) -> Iterator[str]:
+        for key, s in sorted(self._series.items()):
+            cumulative = 0.0
+            for b, n in zip(self.buckets, s):
+                cumulative += n
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, _fmt(b))} {_fmt(cumulative)}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(s[-2])}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {_fmt(s[-1])}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> _Metric | None:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,303 @@
+"""
+Opt-in profiling for pipeline stages, scripts and API requests.
+
+A session profiles one awaitable and writes to PROFILE_DIR:
+  <stamp>-<name>.folded      sample mode: collapsed stacks of the event-loop thread, one
+                             "frame;frame;frame count" line per stack (flamegraph.pl,
+                             speedscope, inferno)
+  <stamp>-<name>.prof        cprofile mode: pstats dump (snakeviz, flameprof, gprof2dot)
+  <stamp>-<name>.tasks.json  both modes: per asyncio task created during the session, wall
+                             time, CPU time in its own steps, step count and longest step
+                             (a long step blocked the loop)
+
+Nothing here runs unless asked: callers pass mode=None to get the plain awaitable back,
+and the API middleware is only installed when API_PROFILING_ENABLED is set. One session
+runs at a time per process (cProfile and the task factory are process/loop wide); a
+request asking for a profile while one is running is served unprofiled. For the same
+reason a request profile also records whatever else the loop ran meanwhile.
+"""
+import asyncio
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, TypeVar
+
+import structlog
+
+from services.core.config import get_settings
+
+log = structlog.get_logger(__name__)
+
+T = TypeVar("T")
+
+MODES = ("sample", "cprofile")
+
+_active = threading.Lock()
+
+
+class StepTimer:
+    """Await a coroutine, timing each of its steps (send/throw): CPU, wall, count, longest."""
+
+    def __init__(self, coro: Awaitable[Any]):
+        self.coro = coro
+        self.cpu = 0.0
+        self.busy = 0.0
+        self.steps = 0
+        self.max_step = 0.0
+
+    def __await__(self):
+        it = self.coro.__await__()
+        value: Any = None
+        exc: BaseException | None = None
+        while True:
+            c0, w0 = time.thread_time(), time.perf_counter()
+            try:
+                yielded = it.throw(exc) if exc is not None else it.send(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                step = time.perf_counter() - w0
+                self.cpu += time.thread_time() - c0
+                self.busy += step
+                self.steps += 1
+                self.max_step = max(self.max_step, step)
+            value, exc = None, None
+            try:
+                value = yield yielded
+            except BaseException as e:
+                exc = e
+
+    def record(self, task: str, coro: str, wall: float) -> dict[str, Any]:
+        return {
+            "task": task,
+            "coro": coro,
+            "wall_s": round(wall, 6),
+            "cpu_s": round(self.cpu, 6),
+            "busy_s": round(self.busy, 6),
+            "steps": self.steps,
+            "max_step_ms": round(self.max_step * 1000, 3),
+        }
+
+
+def _frame_label(code: Any, prefixes: list[str]) -> str:
+    path = code.co_filename
+    for prefix in prefixes:
+        if path.startswith(prefix):
+            path = path[len(prefix):]
+            break
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class Sampler(threading.Thread):
+    """Samples one thread's Python stack every interval seconds into folded-stack counts."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts: Counter[str] = Counter()
+        self._halt = threading.Event()
+        # Longest sys.path entry first, so labels show the module path relative to it
+        self._prefixes = sorted((p.rstrip(os.sep) + os.sep for p in sys.path if p), key=len, reverse=True)
+        self._labels: dict[Any, str] = {}
+
+    def run(self) -> None:
+        while not self._halt.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = self._labels.get(code)
+                if label is None:
+                    label = self._labels[code] = _frame_label(code, self._prefixes)
+                stack.append(label)
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._halt.set()
+        self.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.counts.most_common())
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_")[:120] or "profile"
+
+
+class ProfileSession:
+    """Profile one awaitable (see module docstring). Use profiled() rather than this directly."""
+
+    def __init__(self, name: str, mode: str = "sample", directory: Path | None = None, interval: float | None = None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}; expected one of {MODES}")
+        settings = get_settings()
+        self.name = name
+        self.mode = mode
+        self.directory = Path(directory or settings.profile_dir)
+        self.interval = interval or settings.profile_sample_interval_ms / 1000.0
+        self.stem = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S.%f}-{_slug(name)}"
+        self.tasks: list[dict[str, Any]] = []
+        self.paths: dict[str, str] = {}
+
+    def _task_factory(self, previous: Callable[..., asyncio.Task] | None) -> Callable[..., asyncio.Task]:
+        session = self
+
+        async def tracked(coro: Any) -> Any:
+            timer = StepTimer(coro)
+            t0 = time.perf_counter()
+            try:
+                return await timer
+            finally:
+                task = asyncio.current_task()
+                session.tasks.append(timer.record(
+                    task.get_name() if task else "?",
+                    getattr(coro, "__qualname__", type(coro).__name__),
+                    time.perf_counter() - t0,
+                ))
+
+        def factory(loop: asyncio.AbstractEventLoop, coro: Any, **kwargs: Any) -> asyncio.Task:
+            if previous is not None:
+                return previous(loop, tracked(coro), **kwargs)
+            return asyncio.Task(tracked(coro), loop=loop, **kwargs)
+
+        return factory
+
+    async def run(self, awaitable: Awaitable[T]) -> T:
+        loop = asyncio.get_running_loop()
+        previous = loop.get_task_factory()
+        loop.set_task_factory(self._task_factory(previous))
+        sampler = profiler = None
+        if self.mode == "sample":
+            sampler = Sampler(threading.get_ident(), self.interval)
+            sampler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        timer = StepTimer(awaitable)
+        t0 = time.perf_counter()
+        try:
+            return await timer
+        finally:
+            wall = time.perf_counter() - t0
+            if profiler is not None:
+                profiler.disable()
+            if sampler is not None:
+                sampler.stop()
+            loop.set_task_factory(previous)
+            self.tasks.insert(0, timer.record(self.name, "<profiled>", wall))
+            self._write(sampler, profiler)
+
+    def _write(self, sampler: Sampler | None, profiler: cProfile.Profile | None) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        base = self.directory / self.stem
+        if sampler is not None:
+            path = base.with_name(base.name + ".folded")
+            path.write_text(sampler.folded(), encoding="utf-8")
+            self.paths["folded"] = str(path)
+        if profiler is not None:
+            path = base.with_name(base.name + ".prof")
+            profiler.dump_stats(path)
+            self.paths["prof"] = str(path)
+        path = base.with_name(base.name + ".tasks.json")
+        ordered = self.tasks[:1] + sorted(self.tasks[1:], key=lambda t: t["cpu_s"], reverse=True)
+        path.write_text(json.dumps({"name": self.name, "mode": self.mode, "tasks": ordered}, indent=2), encoding="utf-8")
+        self.paths["tasks"] = str(path)
+        log.info("profile_written", name=self.name, mode=self.mode, **self.paths)
+
+
+async def profiled(
+    name: str,
+    awaitable: Awaitable[T],
+    mode: str | None = None,
+    directory: Path | None = None,
+) -> T:
+    """Await awaitable, profiled if mode is set (and no other session is running)."""
+    if not mode:
+        return await awaitable
+    if not _active.acquire(blocking=False):
+        log.warning("profile_busy", name=name)
+        return await awaitable
+    try:
+        return await ProfileSession(name, mode, directory).run(awaitable)
+    finally:
+        _active.release()
+
+
+def profiled_fn(
+    name: str, fn: Callable[..., Awaitable[T]], mode: str | None, directory: Path | None = None
+) -> Callable[..., Awaitable[T]]:
+    """fn wrapped so each call is profiled under name (fn itself if mode is None)."""
+    if not mode:
+        return fn
+
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        return await profiled(name, fn(*args, **kwargs), mode, directory)
+
+    return wrapper
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests that ask for it: header X-Profile: 1|sample|cprofile or query
+    ?profile=1|sample|cprofile. The response carries X-Profile-Id (the file stem), or
+    X-Profile: busy if another profile was running. Install only when API_PROFILING_ENABLED.
+
+    The session covers the whole event loop for the request's duration, not the request
+    alone: the stacks (or pstats) and the task timings include every request, broadcaster
+    and background task that ran meanwhile, so profile against an otherwise idle instance.
+    In .tasks.json the first entry is this request's own wall/CPU time; tasks created by
+    other requests show up as their own entries.
+    """
+
+    def __init__(self, app: Any, directory: Path | None = None):
+        self.app = app
+        self.directory = directory
+
+    @staticmethod
+    def _requested(scope: dict[str, Any]) -> str | None:
+        value = None
+        for k, v in scope.get("headers", ()):
+            if k == b"x-profile":
+                value = v.decode("latin-1")
+        if value is None:
+            for part in scope.get("query_string", b"").decode("latin-1").split("&"):
+                key, _, v = part.partition("=")
+                if key == "profile":
+                    value = v or "1"
+        if value is None or value.lower() in ("", "0", "false", "off"):
+            return None
+        return value if value in MODES else "sample"
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        mode = self._requested(scope) if scope["type"] == "http" else None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+        if not _active.acquire(blocking=False):
+            await self.app(scope, receive, self._with_header(send, b"x-profile", b"busy"))
+            return
+        try:
+            session = ProfileSession(f"{scope['method']} {scope['path']}", mode, self.directory)
+            await session.run(self.app(scope, receive, self._with_header(send, b"x-profile-id", session.stem.encode())))
+        finally:
+            _active.release()
+
+    @staticmethod
+    def _with_header(send: Any, name: bytes, value: bytes) -> Any:
+        async def wrapped(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", ()), (name, value)]}
+            await send(message)
+
+        return wrapped
@@ -0,0 +1,147 @@
+"""
+Per-query instrumentation for services.core.db. Every statement on a pooled connection is
+timed by an asyncpg query logger (so raw get_conn() users are covered too); fetch_one,
+fetch_all and execute add row counts and pool wait. Queries slower than DB_SLOW_QUERY_MS
+are logged, optionally with the plan: EXPLAIN ANALYZE for the fixed reads registered with
+db.prepared() (ANALYZE executes the statement again), plain EXPLAIN for everything else, so
+a slow pg_notify() or drop_chunks() call is never run twice.
+
+Query names: the name given to db.prepared(), else "<verb>:<first table>" from the SQL,
+which keeps label cardinality bounded for dynamically built queries.
+"""
+import asyncio
+import re
+import time
+from functools import lru_cache
+from typing import Any
+
+import structlog
+
+from services.core.metrics import Counter, Histogram
+
+log = structlog.get_logger(__name__)
+
+QUERY_SECONDS = Histogram("db_query_seconds", "Statement execution time", ("query",))
+QUERY_ROWS = Histogram(
+    "db_query_rows", "Rows returned or affected", ("query",),
+    buckets=(0, 1, 10, 100, 1000, 10000, 100000),
+)
+QUERY_ACQUIRE_SECONDS = Histogram("db_query_acquire_seconds", "Pool wait before a named query", ("query",))
+QUERY_ERRORS = Counter("db_query_errors_total", "Statements that raised", ("query",))
+SLOW_QUERIES = Counter("db_slow_queries_total", "Statements over the slow-query threshold", ("query",))
+
+# SQL text -> name, filled by db.prepared()
+QUERY_NAMES: dict[str, str] = {}
+
+_TABLE_RE = re.compile(r"\b(?:from|into|update|join)\s+([a-z_][\w.]*)", re.IGNORECASE)
+_VERB_RE = re.compile(r"^\s*(\w+)")
+_STATUS_COUNT_RE = re.compile(r"(\d+)\s*$")
+
+MAX_LOGGED_SQL = 500
+
+
+class SlowQueryConfig:
+    """Slow-query settings, read once when the pool is created (not per statement)."""
+
+    threshold_seconds: float = 0.5
+    explain: bool = False
+    explain_interval_seconds: float = 300.0
+
+    @classmethod
+    def load(cls) -> None:
+        from services.core.config import get_settings
+
+        settings = get_settings()
+        cls.threshold_seconds = settings.db_slow_query_ms / 1000.0
+        cls.explain = settings.db_slow_query_explain
+        cls.explain_interval_seconds = settings.db_slow_query_explain_interval_seconds
+
+
+@lru_cache(maxsize=1024)
+def _derived_name(query: str) -> str:
+    verb_m = _VERB_RE.match(query)
+    verb = verb_m.group(1).lower() if verb_m else "sql"
+    if verb == "with":
+        verb = "select"
+    table_m = _TABLE_RE.search(query)
+    return f"{verb}:{table_m.group(1).lower()}" if table_m else verb
+
+
+def query_name(query: str) -> str:
+    return QUERY_NAMES.get(query) or _derived_name(query)
+
+
+def status_rows(status: str) -> int:
+    """Row count from a command status like 'UPDATE 3' / 'INSERT 0 5' (0 if none)."""
+    m = _STATUS_COUNT_RE.search(status or "")
+    return int(m.group(1)) if m else 0
+
+
+def record_rows(query: str, rows: int) -> None:
+    QUERY_ROWS.observe(rows, query=query_name(query))
+
+
+def record_acquire(query: str, seconds: float) -> None:
+    QUERY_ACQUIRE_SECONDS.observe(seconds, query=query_name(query))
+
+
+_last_explain: dict[str, float] = {}
+_explain_tasks: set[asyncio.Task] = set()
+
+
+def on_query(record: Any) -> None:
+    """asyncpg query logger callback (LoggedQuery: query, args, elapsed, exception, ...)."""
+    query = record.query
+    if query.lstrip()[:7].upper() == "EXPLAIN":
+        return
+    name = query_name(query)
+    QUERY_SECONDS.observe(record.elapsed, query=name)
+    if record.exception is not None:
+        QUERY_ERRORS.inc(query=name)
+    if record.elapsed < SlowQueryConfig.threshold_seconds:
+        return
+    SLOW_QUERIES.inc(query=name)
+    log.warning(
+        "slow_query",
+        query=name,
+        ms=round(record.elapsed * 1000, 1),
+        sql=" ".join(query.split())[:MAX_LOGGED_SQL],
+        args=len(record.args or ()),
+    )
+    if SlowQueryConfig.explain and _explainable(query) and _explain_due(name):
+        task = asyncio.get_running_loop().create_task(
+            explain_analyze(name, query, record.args or (), analyze=query in QUERY_NAMES)
+        )
+        _explain_tasks.add(task)
+        task.add_done_callback(_explain_tasks.discard)
+
+
+def _explainable(query: str) -> bool:
+    # Statements EXPLAIN accepts; whether to ANALYZE is decided by the allowlist (QUERY_NAMES)
+    return _derived_name(query).split(":", 1)[0] in ("select", "insert", "update", "delete")
+
+
+def _explain_due(name: str) -> bool:
+    now = time.monotonic()
+    if now - _last_explain.get(name, -1e9) < SlowQueryConfig.explain_interval_seconds:
+        return False
+    _last_explain[name] = now
+    return True
+
+
+async def explain_analyze(name: str, query: str, args: Any, analyze: bool = False) -> str | None:
+    """
+    Log the plan of a slow statement, from a read connection. analyze re-runs it under
+    EXPLAIN ANALYZE: only for queries registered with db.prepared() (fixed reads).
+    """
+    from services.core.db import get_conn
+
+    try:
+        async with get_conn(readonly=True) as conn:
+            rows = await conn.fetch(f"EXPLAIN (ANALYZE, BUFFERS) {query}" if analyze else f"EXPLAIN {query}", *args)
+    except Exception as e:
+        log.warning("slow_query_explain_failed", query=name, error=str(e))
+        return None
+    plan = "\n".join(r[0] for r in rows)
+    log.warning("slow_query_plan", query=name, plan=plan)
+    return plan
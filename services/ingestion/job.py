@@ -1,12 +1,16 @@
 """
 Daily ingestion job: seed metadata from config, fetch FRED series, normalize, store.
-Run: PYTHONPATH=. python -m services.ingestion.job
+Run: PYTHONPATH=. python -m services.ingestion.job [--indicator CODE ...]
 """
+import argparse
 import asyncio
+from collections.abc import Awaitable, Callable, Collection
 from datetime import date, timedelta
 from typing import Any
 
+from services.core.cache import invalidate
 from services.core.config import get_settings
+from services.core.events import MACRO_DATA_UPDATED, publish
 from services.ingestion.connectors.fred import FREDConnector
 from services.ingestion.normalizer import normalize_observation, parse_fred_observation
 from services.ingestion.storage import (
@@ -36,11 +40,15 @@ async def seed_metadata() -> dict[str, int]:
     return code_to_id
 
 
-async def run_fred_ingestion(indicator_id: int, series_id: str, limit: int = 100) -> int:
-    """Fetch FRED series, normalize, store. Returns number of observations written."""
+async def run_fred_ingestion(indicator_id: int, series_id: str, limit: int = 100) -> dict[str, Any]:
+    """
+    Fetch FRED series, normalize, store. Returns {"written": observations stored,
+    "changed": new or revised ones, "since": earliest changed release_date or None}.
+    """
+    out: dict[str, Any] = {"written": 0, "changed": 0, "since": None}
     client = FREDConnector()
     if not client.api_key:
-        return 0
+        return out
     end = date.today()
     start = end - timedelta(days=365 * 2)
     observations = await client.get_series_observations(
@@ -50,7 +58,6 @@ async def run_fred_ingestion(indicator_id: int, series_id: str, limit: int = 100
         limit=limit,
         sort_order="asc",
     )
-    written = 0
     prev_value: float | None = None
     for obs in observations:
         release_date, value = parse_fred_observation(obs)
@@ -63,7 +70,7 @@ async def run_fred_ingestion(indicator_id: int, series_id: str, limit: int = 100
             previous=prev_value,
             forecast=None,
         )
-        await upsert_macro_observation(
+        changed = await upsert_macro_observation(
             indicator_id=indicator_id,
             release_date=release_date,
             actual=row["actual"],
@@ -72,23 +79,33 @@ async def run_fred_ingestion(indicator_id: int, series_id: str, limit: int = 100
             surprise=row["surprise"],
             surprise_normalized=row["surprise_normalized"],
         )
-        written += 1
+        out["written"] += 1
+        if changed:
+            out["changed"] += 1
+            if out["since"] is None or release_date < out["since"]:
+                out["since"] = release_date
         if value is not None:
             prev_value = value
-    return written
+    return out
 
 
-async def run_daily_ingestion() -> dict[str, Any]:
-    """Full ingestion: seed metadata, then fetch all FRED indicators from config."""
-    code_to_id = await seed_metadata()
+async def run_fred_source(code_to_id: dict[str, int], codes: Collection[str] | None = None) -> dict[str, Any]:
+    """
+    Fetch every FRED indicator from config (or only those in codes). code_to_id: from seed_metadata().
+    "changed" maps indicator_id to the earliest new/revised release_date.
+    """
     settings = get_settings()
     ind_cfg = settings.get_indicators_config()
     indicators = ind_cfg.get("indicators", [])
-    results: dict[str, Any] = {"indicators_processed": 0, "observations_written": 0, "errors": []}
+    results: dict[str, Any] = {
+        "indicators_processed": 0, "observations_written": 0, "observations_changed": 0, "changed": {}, "errors": [],
+    }
     for ind in indicators:
         if ind.get("source") != "FRED":
             continue
         code = ind.get("code")
+        if codes is not None and code not in codes:
+            continue
         series_id = ind.get("series_id")
         if not code or not series_id:
             results["errors"].append(f"Missing code or series_id: {ind}")
@@ -97,16 +114,77 @@ async def run_daily_ingestion() -> dict[str, Any]:
         if not indicator_id:
             continue
         try:
-            n = await run_fred_ingestion(indicator_id, series_id)
+            r = await run_fred_ingestion(indicator_id, series_id)
             results["indicators_processed"] += 1
-            results["observations_written"] += n
+            results["observations_written"] += r["written"]
+            results["observations_changed"] += r["changed"]
+            if r["since"] is not None:
+                results["changed"][indicator_id] = r["since"]
         except Exception as e:
             results["errors"].append(f"{code}: {e}")
     return results
 
 
+# Source key (indicators config "source") -> ingester; sources are independent of each other
+INGESTERS: dict[str, Callable[..., Awaitable[dict[str, Any]]]] = {
+    "FRED": run_fred_source,
+}
+
+
+def configured_sources() -> list[str]:
+    """Sources used in the indicators config that have an ingester, in config order."""
+    indicators = get_settings().get_indicators_config().get("indicators", [])
+    return [s for s in dict.fromkeys(ind.get("source") for ind in indicators) if s in INGESTERS]
+
+
+async def run_source_ingestion(
+    source: str, code_to_id: dict[str, int], codes: Collection[str] | None = None
+) -> dict[str, Any]:
+    """
+    Ingest one source. If anything changed, invalidate the macro cache and publish
+    macro_data_updated with the changed indicator ids, so workers recompute only those.
+    """
+    results = await INGESTERS[source](code_to_id, codes)
+    changed: dict[int, date] = results.pop("changed")
+    results["indicator_ids"] = sorted(changed)
+    results["since"] = min(changed.values()).isoformat() if changed else None
+    if changed:
+        await invalidate("macro", since=min(changed.values()))
+        await publish(
+            MACRO_DATA_UPDATED,
+            {
+                "stage": "ingestion",
+                "source": source,
+                "observations_written": results["observations_written"],
+                "observations_changed": results["observations_changed"],
+                "indicator_ids": results["indicator_ids"],
+                "since": results["since"],
+            },
+        )
+    return results
+
+
+async def run_daily_ingestion(codes: Collection[str] | None = None) -> dict[str, Any]:
+    """Full ingestion: seed metadata, then fetch all configured sources (or only the given indicator codes)."""
+    code_to_id = await seed_metadata()
+    results: dict[str, Any] = {
+        "indicators_processed": 0, "observations_written": 0, "observations_changed": 0,
+        "indicator_ids": [], "errors": [],
+    }
+    for source in configured_sources():
+        r = await run_source_ingestion(source, code_to_id, codes)
+        for key in ("indicators_processed", "observations_written", "observations_changed"):
+            results[key] += r[key]
+        results["indicator_ids"].extend(r["indicator_ids"])
+        results["errors"].extend(r["errors"])
+    return results
+
+
 def main() -> None:
-    result = asyncio.run(run_daily_ingestion())
+    p = argparse.ArgumentParser()
+    p.add_argument("--indicator", action="append", dest="codes", help="Only this indicator code (repeatable)")
+    args = p.parse_args()
+    result = asyncio.run(run_daily_ingestion(args.codes))
     print(result)
 
 
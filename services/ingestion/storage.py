@@ -5,6 +5,7 @@ from datetime import date
 from typing import Any
 
 from services.core.db import get_conn
+from services.core.query_metrics import status_rows
 
 
 async def ensure_data_source(code: str, name: str, provider: str, timezone: str) -> int:
@@ -75,6 +76,13 @@ async def ensure_macro_indicator(
         return row["id"]
 
 
+async def get_source_timezones() -> dict[str, str]:
+    """data_source code -> IANA timezone of its release times."""
+    async with get_conn() as conn:
+        rows = await conn.fetch("SELECT code, timezone FROM data_source")
+    return {r["code"]: r["timezone"] for r in rows if r["timezone"]}
+
+
 async def upsert_macro_observation(
     indicator_id: int,
     release_date: date,
@@ -84,13 +92,16 @@ async def upsert_macro_observation(
     surprise: float | None,
     surprise_normalized: float | None = None,
     data_version: int = 1,
-) -> None:
-    """Insert or update one macro_observation. time = release_date at UTC midnight."""
+) -> bool:
+    """
+    Insert or update one macro_observation. time = release_date at UTC midnight.
+    Returns whether the row is new or its values changed (an identical re-fetch is a no-op).
+    """
     from datetime import datetime, timezone
 
     ts = datetime(release_date.year, release_date.month, release_date.day, tzinfo=timezone.utc)
     async with get_conn() as conn:
-        await conn.execute(
+        status = await conn.execute(
             """
             INSERT INTO macro_observation (
                 time, indicator_id, release_date, actual, forecast, previous,
@@ -105,6 +116,10 @@ async def upsert_macro_observation(
                 surprise = EXCLUDED.surprise,
                 surprise_normalized = EXCLUDED.surprise_normalized,
                 data_version = EXCLUDED.data_version
+            WHERE (macro_observation.actual, macro_observation.forecast, macro_observation.previous,
+                   macro_observation.surprise, macro_observation.data_version)
+                IS DISTINCT FROM
+                  (EXCLUDED.actual, EXCLUDED.forecast, EXCLUDED.previous, EXCLUDED.surprise, EXCLUDED.data_version)
             """,
             ts,
             indicator_id,
@@ -116,3 +131,4 @@ async def upsert_macro_observation(
             surprise_normalized,
             data_version,
         )
+    return status_rows(status) > 0
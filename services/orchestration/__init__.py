@@ -0,0 +1 @@
+# Orchestration: DAG runner and pipeline definitions
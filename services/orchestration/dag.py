@@ -0,0 +1,271 @@
+"""
+Small async DAG executor for batch pipelines.
+
+A Stage declares the keys it needs and the keys it provides; a stage runs as soon as every
+stage providing its inputs has finished, so independent stages run concurrently (bounded by
+`concurrency`). After each successful stage its outputs are checkpointed (JSON file per run);
+re-running the same run key skips completed stages, feeds their saved outputs downstream and
+resumes from whatever failed. A failed stage skips its dependents; independent branches
+still finish.
+
+Every stage emits one structured record (status, wall/CPU seconds, rows, output keys) and
+the run ends with a summary record, for tracking regressions across runs.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+import traceback
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, TextIO
+
+import structlog
+
+log = structlog.get_logger(__name__)
+
+DONE = "done"
+CACHED = "cached"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    fn receives {key: value} for `needs` and returns a dict containing every key in
+    `provides` (plus anything else worth keeping in the checkpoint). Values must be JSON
+    serializable. rows: result key holding the stage's row count, if any.
+    """
+
+    name: str
+    fn: Callable[[dict[str, Any]], Awaitable[dict[str, Any]]]
+    needs: tuple[str, ...] = ()
+    provides: tuple[str, ...] = ()
+    rows: str | None = None
+
+
+class Pipeline:
+    """A validated set of stages: unique names, one producer per key, no missing inputs or cycles."""
+
+    def __init__(self, name: str, stages: list[Stage]):
+        self.name = name
+        self.stages = {s.name: s for s in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Duplicate stage names")
+        self.producer: dict[str, str] = {}
+        for s in stages:
+            for key in s.provides:
+                if key in self.producer:
+                    raise ValueError(f"Key {key!r} provided by both {self.producer[key]!r} and {s.name!r}")
+                self.producer[key] = s.name
+        self.deps: dict[str, set[str]] = {}
+        for s in stages:
+            missing = [k for k in s.needs if k not in self.producer]
+            if missing:
+                raise ValueError(f"Stage {s.name!r} needs {missing} which no stage provides")
+            self.deps[s.name] = {self.producer[k] for k in s.needs}
+        self.order = self._toposort()
+
+    def _toposort(self) -> list[str]:
+        order: list[str] = []
+        remaining = {name: set(deps) for name, deps in self.deps.items()}
+        while remaining:
+            ready = sorted(n for n, d in remaining.items() if not d)
+            if not ready:
+                raise ValueError(f"Cycle between stages: {sorted(remaining)}")
+            for n in ready:
+                order.append(n)
+                del remaining[n]
+            for d in remaining.values():
+                d.difference_update(ready)
+        return order
+
+    def dependents(self, name: str) -> set[str]:
+        """Stages that (transitively) depend on name."""
+        out: set[str] = set()
+        frontier = {name}
+        while frontier:
+            frontier = {n for n, d in self.deps.items() if d & frontier} - out
+            out |= frontier
+        return out
+
+
+class CheckpointStore:
+    """Completed stages and their outputs for one run, as a JSON file written atomically."""
+
+    def __init__(self, directory: Path, pipeline: str, run_key: str):
+        self.path = Path(directory) / f"{pipeline}-{run_key}.json"
+        self.stages: dict[str, dict[str, Any]] = {}
+
+    def load(self) -> "CheckpointStore":
+        if self.path.exists():
+            self.stages = json.loads(self.path.read_text(encoding="utf-8")).get("stages", {})
+        return self
+
+    def clear(self) -> None:
+        self.stages = {}
+        self.path.unlink(missing_ok=True)
+
+    def completed(self, name: str) -> dict[str, Any] | None:
+        entry = self.stages.get(name)
+        return entry if entry and entry.get("status") == DONE else None
+
+    def save(self, name: str, outputs: dict[str, Any], result: dict[str, Any]) -> None:
+        self.stages[name] = {
+            "status": DONE,
+            "outputs": outputs,
+            "result": result,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"stages": self.stages}, indent=2, default=str), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+class CpuTimed:
+    """
+    Await a coroutine and count the CPU time spent in its own steps (thread_time around each
+    send/throw), so concurrent stages on one event loop are not charged for each other.
+    Work in executor threads is not included.
+    """
+
+    def __init__(self, coro: Awaitable[Any]):
+        self.coro = coro
+        self.cpu = 0.0
+
+    def __await__(self):
+        it = self.coro.__await__()
+        value: Any = None
+        exc: BaseException | None = None
+        while True:
+            t0 = time.thread_time()
+            try:
+                yielded = it.throw(exc) if exc is not None else it.send(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.cpu += time.thread_time() - t0
+            value, exc = None, None
+            try:
+                value = yield yielded
+            except BaseException as e:
+                exc = e
+
+
+@dataclass
+class StageReport:
+    stage: str
+    status: str
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    rows: int | None = None
+    outputs: list[str] = field(default_factory=list)
+    error: str | None = None
+
+    def record(self, pipeline: str, run_key: str) -> dict[str, Any]:
+        return {"event": "stage", "pipeline": pipeline, "run": run_key, **self.__dict__}
+
+
+def json_lines(stream: TextIO | None = None) -> Callable[[dict[str, Any]], None]:
+    """Emitter writing one JSON object per line (default: stdout)."""
+
+    def emit(record: dict[str, Any]) -> None:
+        out = stream or sys.stdout
+        out.write(json.dumps(record, default=str) + "\n")
+        out.flush()
+
+    return emit
+
+
+async def run_pipeline(
+    pipeline: Pipeline,
+    checkpoints: CheckpointStore,
+    concurrency: int = 4,
+    emit: Callable[[dict[str, Any]], None] | None = None,
+) -> dict[str, Any]:
+    """
+    Run every stage not already checkpointed. Returns the summary record
+    ({"status": "done" | "failed", "stages": {name: status}, ...}); never raises for stage errors.
+    """
+    emit = emit or json_lines()
+    run_key = checkpoints.path.stem.removeprefix(f"{pipeline.name}-")
+    values: dict[str, Any] = {}
+    status: dict[str, str] = {}
+    reports: list[StageReport] = []
+    sem = asyncio.Semaphore(max(1, concurrency))
+    t_start = time.perf_counter()
+
+    def finish(report: StageReport) -> None:
+        status[report.stage] = report.status
+        reports.append(report)
+        emit(report.record(pipeline.name, run_key))
+
+    for name in pipeline.order:
+        saved = checkpoints.completed(name)
+        if saved is not None:
+            values.update(saved["outputs"])
+            finish(StageReport(name, CACHED, outputs=sorted(saved["outputs"])))
+
+    async def run_stage(stage: Stage) -> None:
+        async with sem:
+            t0 = time.perf_counter()
+            cpu = 0.0
+            try:
+                timed = CpuTimed(stage.fn({k: values[k] for k in stage.needs}))
+                try:
+                    result = await timed
+                finally:
+                    cpu = timed.cpu
+                missing = [k for k in stage.provides if k not in result]
+                if missing:
+                    raise KeyError(f"stage did not return {missing}")
+            except Exception as e:
+                log.error("stage_failed", stage=stage.name, error=str(e), tb=traceback.format_exc())
+                finish(StageReport(
+                    stage.name, FAILED, round(time.perf_counter() - t0, 4), round(cpu, 4),
+                    error=f"{type(e).__name__}: {e}",
+                ))
+                for dep in pipeline.dependents(stage.name):
+                    if dep not in status:
+                        finish(StageReport(dep, SKIPPED, error=f"upstream {stage.name} failed"))
+                return
+            wall = time.perf_counter() - t0
+            outputs = {k: result[k] for k in stage.provides}
+            checkpoints.save(stage.name, outputs, result)
+            values.update(outputs)
+            rows = result.get(stage.rows) if stage.rows else None
+            finish(StageReport(
+                stage.name, DONE, round(wall, 4), round(cpu, 4),
+                rows=int(rows) if rows is not None else None, outputs=sorted(outputs),
+            ))
+
+    running: dict[str, asyncio.Task] = {}
+    while True:
+        for name in pipeline.order:
+            if name in status or name in running:
+                continue
+            if all(status.get(d) in (DONE, CACHED) for d in pipeline.deps[name]):
+                running[name] = asyncio.create_task(run_stage(pipeline.stages[name]))
+        if not running:
+            break
+        finished, _ = await asyncio.wait(running.values(), return_when=asyncio.FIRST_COMPLETED)
+        for name in [n for n, t in running.items() if t in finished]:
+            running.pop(name).result()
+
+    ok = all(s in (DONE, CACHED) for s in status.values())
+    summary = {
+        "event": "pipeline",
+        "pipeline": pipeline.name,
+        "run": run_key,
+        "status": DONE if ok else FAILED,
+        "wall_s": round(time.perf_counter() - t_start, 4),
+        "cpu_s": round(sum(r.cpu_s for r in reports), 4),
+        "stages": {name: status.get(name, SKIPPED) for name in pipeline.order},
+    }
+    emit(summary)
+    return summary
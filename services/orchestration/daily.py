@@ -0,0 +1,113 @@
+"""
+The daily pipeline as a DAG:
+
+  seed_metadata -> ingest:<source> (one per source, concurrent) -> normalize_surprises
+  [seed_weights] -> bias:<region> (one per index region, concurrent, after normalization)
+  normalize_surprises -> features (daily_feature rows from the first re-normalized release)
+
+Keys passed between stages are small JSON values (indicator ids, counts); the data itself
+stays in the database.
+"""
+from datetime import date
+from typing import Any
+
+from services.core.config import get_settings
+from services.orchestration.dag import Pipeline, Stage
+
+PIPELINE_NAME = "daily"
+
+
+def _ingest_stage(source: str) -> Stage:
+    async def ingest(inputs: dict[str, Any]) -> dict[str, Any]:
+        from services.ingestion.job import run_source_ingestion
+
+        r = await run_source_ingestion(source, inputs["indicator_ids"])
+        return {**r, f"ingested:{source}": r["observations_written"]}
+
+    return Stage(
+        f"ingest:{source}", ingest,
+        needs=("indicator_ids",), provides=(f"ingested:{source}",), rows="observations_written",
+    )
+
+
+def _bias_stage(region: str, as_of: date, needs: tuple[str, ...]) -> Stage:
+    async def bias(inputs: dict[str, Any]) -> dict[str, Any]:
+        from services.bias_engine.context import get_scoring_context
+        from services.bias_engine.scorer import run_bias_computation
+
+        ctx = await get_scoring_context()
+        r = await run_bias_computation(as_of, ctx, regions=[region])
+        return {**r, "indices": len(r["scores"]), f"bias:{region}": [s["index"] for s in r["scores"]]}
+
+    return Stage(f"bias:{region}", bias, needs=needs, provides=(f"bias:{region}",), rows="indices")
+
+
+async def _seed_metadata(inputs: dict[str, Any]) -> dict[str, Any]:
+    from services.ingestion.job import seed_metadata
+
+    ids = await seed_metadata()
+    return {"indicator_ids": ids, "indicators": len(ids)}
+
+
+async def _normalize(inputs: dict[str, Any]) -> dict[str, Any]:
+    from services.processing.surprise import run_surprise_normalization
+
+    r = await run_surprise_normalization()
+    return {**r, "surprises_normalized": r["rows_updated"], "normalized_since": r["since"]}
+
+
+def _features_stage(as_of: date) -> Stage:
+    async def features(inputs: dict[str, Any]) -> dict[str, Any]:
+        from services.processing.features import refresh_features
+
+        since = inputs["normalized_since"]
+        r = await refresh_features(date.fromisoformat(since) if since else None, as_of)
+        return {**r, "features": r["days"]}
+
+    return Stage("features", features, needs=("normalized_since",), provides=("features",), rows="days")
+
+
+async def _seed_weights(inputs: dict[str, Any]) -> dict[str, Any]:
+    from services.bias_engine.context import invalidate_scoring_context
+    from services.bias_engine.seed_weights import run_seed
+
+    r = await run_seed()
+    invalidate_scoring_context()
+    return {"result": r, "weights_seeded": True}
+
+
+def index_regions() -> list[str]:
+    """Regions of the configured indices, in config order."""
+    indices = get_settings().get_indices_config().get("indices", [])
+    return [r for r in dict.fromkeys(i.get("region") or "" for i in indices)]
+
+
+def build_daily_pipeline(
+    as_of: date,
+    skip_ingestion: bool = False,
+    skip_bias: bool = False,
+    seed_weights: bool = False,
+) -> Pipeline:
+    """Stages for one day. Sources and regions come from the indicators / indices config."""
+    from services.ingestion.job import configured_sources
+
+    stages: list[Stage] = []
+    normalize_needs: tuple[str, ...] = ()
+    if not skip_ingestion:
+        stages.append(Stage("seed_metadata", _seed_metadata, provides=("indicator_ids",), rows="indicators"))
+        for source in configured_sources():
+            stages.append(_ingest_stage(source))
+            normalize_needs += (f"ingested:{source}",)
+    stages.append(Stage(
+        "normalize_surprises", _normalize,
+        needs=normalize_needs, provides=("surprises_normalized", "normalized_since"), rows="rows_updated",
+    ))
+    if not skip_bias:
+        bias_needs: tuple[str, ...] = ("surprises_normalized",)
+        if seed_weights:
+            stages.append(Stage("seed_weights", _seed_weights, provides=("weights_seeded",)))
+            bias_needs += ("weights_seeded",)
+        for region in index_regions():
+            stages.append(_bias_stage(region, as_of, bias_needs))
+    stages.append(_features_stage(as_of))
+    return Pipeline(PIPELINE_NAME, stages)
@@ -0,0 +1,451 @@
+"""
+Postgres-backed work queue for backfills that outgrow one process.
+
+A backfill (full-history normalization, a multi-year bias replay, re-ingesting every series)
+is split into units, one indicator or one date range each, and enqueued as rows of
+job_queue (migrations/004). Any number of workers on any host that reaches the primary
+claim units with SELECT ... FOR UPDATE SKIP LOCKED, heartbeat while a unit runs and report
+its progress. A unit whose worker stops heartbeating for JOB_QUEUE_STALE_SECONDS is put
+back by whichever worker reaps next and retried, up to max_attempts, with backoff. Units are
+idempotent (upserts), so a unit that ran twice after a lost heartbeat is harmless.
+
+Run:
+  PYTHONPATH=. python -m services.orchestration.queue enqueue normalize [--indicator CODE ...] [--since YYYY-MM-DD]
+  PYTHONPATH=. python -m services.orchestration.queue enqueue bias --from YYYY-MM-DD [--to YYYY-MM-DD] [--chunk-days 30]
+  PYTHONPATH=. python -m services.orchestration.queue enqueue ingest [--indicator CODE ...]
+  PYTHONPATH=. python -m services.orchestration.queue work [--concurrency 2] [--kind bias] [--drain]
+  PYTHONPATH=. python -m services.orchestration.queue status [--batch NAME]
+  PYTHONPATH=. python -m services.orchestration.queue retry --batch NAME
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+from collections.abc import Awaitable, Callable, Collection
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Any
+
+import structlog
+
+from services.core.config import get_settings
+from services.core.db import get_conn
+
+log = structlog.get_logger(__name__)
+
+# "Full history" for normalization units: earlier than any stored release. Safe to rewrite
+# because each release is normalized against its own trailing window (no later data).
+FULL_HISTORY = date(1900, 1, 1)
+
+Progress = Callable[[float, str | None], None]
+JobHandler = Callable[[dict[str, Any], Progress], Awaitable[dict[str, Any] | None]]
+
+
+@dataclass
+class Job:
+    """A claimed unit. (id, claimed_by, attempts) is the lease: updates from a stale claim match nothing."""
+
+    id: int
+    batch: str
+    kind: str
+    params: dict[str, Any]
+    attempts: int
+    max_attempts: int
+    worker: str = ""
+    progress: float = 0.0
+    note: str | None = None
+
+    def report(self, fraction: float, note: str | None = None) -> None:
+        """Progress callback for handlers; written with the next heartbeat, not per call."""
+        self.progress = max(0.0, min(1.0, fraction))
+        self.note = note
+
+
+def date_chunks(start: date, end: date, days: int) -> list[tuple[date, date]]:
+    """[start, end] as consecutive inclusive ranges of at most days days."""
+    if days < 1:
+        raise ValueError("days must be >= 1")
+    out = []
+    lo = start
+    while lo <= end:
+        hi = min(end, lo + timedelta(days=days - 1))
+        out.append((lo, hi))
+        lo = hi + timedelta(days=1)
+    return out
+
+
+def ingest_units(codes: Collection[str] | None = None) -> list[dict[str, Any]]:
+    """One unit per configured indicator (or per code in codes) of a source with an ingester."""
+    from services.ingestion.job import INGESTERS
+
+    indicators = get_settings().get_indicators_config().get("indicators", [])
+    return [
+        {"source": ind["source"], "codes": [ind["code"]]}
+        for ind in indicators
+        if ind.get("source") in INGESTERS and ind.get("code") and (codes is None or ind["code"] in codes)
+    ]
+
+
+async def normalize_units(codes: Collection[str] | None = None, since: date | None = None) -> list[dict[str, Any]]:
+    """One unit per indicator in the DB (or per code in codes)."""
+    async with get_conn(readonly=True) as conn:
+        rows = await conn.fetch("SELECT id, code FROM macro_indicator ORDER BY id")
+    since_iso = (since or FULL_HISTORY).isoformat()
+    return [
+        {"indicator_id": r["id"], "code": r["code"], "since": since_iso}
+        for r in rows
+        if codes is None or r["code"] in codes
+    ]
+
+
+def bias_units(start: date, end: date, chunk_days: int = 30) -> list[dict[str, Any]]:
+    return [{"start": lo.isoformat(), "end": hi.isoformat()} for lo, hi in date_chunks(start, end, chunk_days)]
+
+
+# ---------- queue operations (each one statement on the primary) ----------
+
+CLAIM_SQL = """
+UPDATE job_queue q
+SET status = 'running', claimed_by = $1, claimed_at = NOW(), heartbeat_at = NOW(),
+    attempts = q.attempts + 1, progress = 0, progress_note = NULL
+WHERE q.id = (
+    SELECT id FROM job_queue
+    WHERE status = 'queued' AND run_after <= NOW()
+      AND ($2::text[] IS NULL OR kind = ANY($2::text[]))
+    ORDER BY priority DESC, id
+    FOR UPDATE SKIP LOCKED
+    LIMIT 1
+)
+RETURNING q.id, q.batch, q.kind, q.params, q.attempts, q.max_attempts
+"""
+
+
+async def enqueue(
+    kind: str,
+    units: list[dict[str, Any]],
+    batch: str | None = None,
+    priority: int = 0,
+    max_attempts: int = 3,
+) -> str:
+    """Insert units as one batch. Returns the batch name."""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    batch = batch or f"{kind}-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}"
+    async with get_conn() as conn:
+        await conn.execute(
+            """
+            INSERT INTO job_queue (batch, kind, params, priority, max_attempts)
+            SELECT $1, $2, p, $3, $4 FROM unnest($5::jsonb[]) AS p
+            """,
+            batch,
+            kind,
+            priority,
+            max_attempts,
+            [json.dumps(u) for u in units],
+        )
+    return batch
+
+
+async def claim(worker: str, kinds: Collection[str] | None = None) -> Job | None:
+    """Take the next runnable unit, skipping rows other workers hold locked. None if there is none."""
+    async with get_conn() as conn:
+        row = await conn.fetchrow(CLAIM_SQL, worker, list(kinds) if kinds else None)
+    if row is None:
+        return None
+    params = row["params"]
+    return Job(
+        id=row["id"],
+        batch=row["batch"],
+        kind=row["kind"],
+        params=json.loads(params) if isinstance(params, str) else dict(params),
+        attempts=row["attempts"],
+        max_attempts=row["max_attempts"],
+        worker=worker,
+    )
+
+
+async def heartbeat(job: Job) -> bool:
+    """Extend the lease and record progress. False if the unit was reaped (another worker may own it)."""
+    async with get_conn() as conn:
+        row = await conn.fetchrow(
+            """
+            UPDATE job_queue SET heartbeat_at = NOW(), progress = $4, progress_note = $5
+            WHERE id = $1 AND claimed_by = $2 AND attempts = $3 AND status = 'running'
+            RETURNING id
+            """,
+            job.id, job.worker, job.attempts, job.progress, job.note,
+        )
+    return row is not None
+
+
+async def complete(job: Job, result: dict[str, Any] | None) -> None:
+    async with get_conn() as conn:
+        await conn.execute(
+            """
+            UPDATE job_queue
+            SET status = 'done', progress = 1, result = $4::jsonb, error = NULL, finished_at = NOW()
+            WHERE id = $1 AND claimed_by = $2 AND attempts = $3 AND status = 'running'
+            """,
+            job.id, job.worker, job.attempts, json.dumps(result, default=str),
+        )
+
+
+async def fail(job: Job, error: str, backoff_seconds: float) -> None:
+    """Requeue after backoff * attempts, or mark failed once max_attempts is used up."""
+    async with get_conn() as conn:
+        await conn.execute(
+            """
+            UPDATE job_queue
+            SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+                run_after = NOW() + make_interval(secs => $5 * attempts),
+                finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE NOW() END,
+                error = $4
+            WHERE id = $1 AND claimed_by = $2 AND attempts = $3 AND status = 'running'
+            """,
+            job.id, job.worker, job.attempts, error, float(backoff_seconds),
+        )
+
+
+async def reap(stale_seconds: float) -> int:
+    """Requeue (or fail, if out of attempts) running units with no heartbeat for stale_seconds."""
+    async with get_conn() as conn:
+        rows = await conn.fetch(
+            """
+            UPDATE job_queue
+            SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+                run_after = NOW(),
+                finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE NOW() END,
+                error = 'worker ' || COALESCE(claimed_by, '?') || ' stopped heartbeating'
+            WHERE status = 'running' AND heartbeat_at < NOW() - make_interval(secs => $1)
+            RETURNING id, claimed_by, status
+            """,
+            float(stale_seconds),
+        )
+    for r in rows:
+        log.warning("job_reaped", job_id=r["id"], worker=r["claimed_by"], status=r["status"])
+    return len(rows)
+
+
+async def retry_failed(batch: str) -> int:
+    """Put a batch's failed units back in the queue with fresh attempts."""
+    async with get_conn() as conn:
+        result = await conn.execute(
+            """
+            UPDATE job_queue
+            SET status = 'queued', attempts = 0, run_after = NOW(), finished_at = NULL
+            WHERE batch = $1 AND status = 'failed'
+            """,
+            batch,
+        )
+    return int(result.split()[-1])
+
+
+async def batch_status(batch: str | None = None, limit: int = 20) -> list[dict[str, Any]]:
+    """Per batch: unit counts by status and overall progress (done units + running fractions)."""
+    async with get_conn(readonly=True) as conn:
+        rows = await conn.fetch(
+            """
+            SELECT batch, MIN(kind) AS kind, COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE status = 'queued') AS queued,
+                   COUNT(*) FILTER (WHERE status = 'running') AS running,
+                   COUNT(*) FILTER (WHERE status = 'done') AS done,
+                   COUNT(*) FILTER (WHERE status = 'failed') AS failed,
+                   SUM(CASE status WHEN 'done' THEN 1 WHEN 'running' THEN progress ELSE 0 END)
+                       / COUNT(*) AS progress,
+                   COUNT(DISTINCT claimed_by) AS workers,
+                   MIN(created_at) AS created_at, MAX(finished_at) AS finished_at
+            FROM job_queue
+            WHERE ($1::text IS NULL OR batch = $1)
+            GROUP BY batch
+            ORDER BY MIN(created_at) DESC
+            LIMIT $2
+            """,
+            batch,
+            limit,
+        )
+    return [dict(r) for r in rows]
+
+
+# ---------- unit handlers ----------
+
+async def job_normalize(params: dict[str, Any], progress: Progress) -> dict[str, Any]:
+    from services.processing.surprise import run_surprise_normalization
+
+    since = date.fromisoformat(params["since"]) if params.get("since") else None
+    return await run_surprise_normalization(indicator_ids=[int(params["indicator_id"])], since=since)
+
+
+async def job_bias(params: dict[str, Any], progress: Progress) -> dict[str, Any]:
+    from services.bias_engine.context import load_scoring_context
+    from services.bias_engine.scorer import SurpriseHistory, notify_bias_range, run_bias_computation
+    from services.core.archive import decompress_range
+
+    start, end = date.fromisoformat(params["start"]), date.fromisoformat(params["end"])
+    await decompress_range("bias_score", start, end)
+    ctx = await load_scoring_context()
+    history = await SurpriseHistory.load(start, end, ctx)
+    days = (end - start).days + 1
+    for i in range(days):
+        d = start + timedelta(days=i)
+        await run_bias_computation(d, ctx, history=history, notify=False)
+        progress((i + 1) / days, d.isoformat())
+    await notify_bias_range(start, end)
+    return {"from": params["start"], "to": params["end"], "days": days}
+
+
+async def job_ingest(params: dict[str, Any], progress: Progress) -> dict[str, Any]:
+    from services.ingestion.job import run_source_ingestion, seed_metadata
+
+    code_to_id = await seed_metadata()
+    return await run_source_ingestion(params["source"], code_to_id, params.get("codes"))
+
+
+HANDLERS: dict[str, JobHandler] = {
+    "normalize": job_normalize,
+    "bias": job_bias,
+    "ingest": job_ingest,
+}
+
+
+# ---------- worker ----------
+
+async def run_unit(job: Job, handler: JobHandler, heartbeat_seconds: float, backoff_seconds: float) -> str:
+    """Run one claimed unit, heartbeating meanwhile. Returns done | failed | lost."""
+    task = asyncio.create_task(handler(job.params, job.report))
+    while True:
+        finished, _ = await asyncio.wait({task}, timeout=heartbeat_seconds)
+        if finished:
+            break
+        try:
+            alive = await heartbeat(job)
+        except Exception as e:
+            # A transient DB error must not kill the unit; the reaper decides if it is dead
+            log.warning("job_heartbeat_failed", job_id=job.id, error=str(e))
+            continue
+        if not alive:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            log.warning("job_lease_lost", job_id=job.id, worker=job.worker)
+            return "lost"
+    try:
+        result = task.result()
+    except Exception as e:
+        await fail(job, f"{type(e).__name__}: {e}", backoff_seconds)
+        log.error("job_failed", job_id=job.id, kind=job.kind, attempt=job.attempts, error=str(e))
+        return "failed"
+    await complete(job, result)
+    log.info("job_done", job_id=job.id, kind=job.kind, batch=job.batch)
+    return "done"
+
+
+async def work(
+    worker: str,
+    kinds: Collection[str] | None = None,
+    stop: asyncio.Event | None = None,
+    drain: bool = False,
+) -> dict[str, int]:
+    """
+    Claim and run units until stop is set (or, with drain, until nothing is runnable).
+    A unit in progress when stop is set runs to the end.
+    """
+    settings = get_settings()
+    stop = stop or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    counts = {"done": 0, "failed": 0, "lost": 0}
+    next_reap = 0.0
+    while not stop.is_set():
+        if loop.time() >= next_reap:
+            await reap(settings.job_queue_stale_seconds)
+            next_reap = loop.time() + settings.job_queue_stale_seconds / 2
+        job = await claim(worker, kinds)
+        if job is None:
+            if drain:
+                break
+            try:
+                await asyncio.wait_for(stop.wait(), settings.job_queue_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        outcome = await run_unit(
+            job,
+            HANDLERS[job.kind],
+            settings.job_queue_heartbeat_seconds,
+            settings.job_queue_retry_backoff_seconds,
+        )
+        counts[outcome] += 1
+    return counts
+
+
+async def run_workers(concurrency: int, kinds: Collection[str] | None = None, drain: bool = False) -> dict[str, int]:
+    """concurrency workers in this process until SIGINT/SIGTERM (or drained). Start more processes/hosts to scale."""
+    from services.core.db import close_pool
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    log.info("queue_workers_started", worker=prefix, concurrency=concurrency, kinds=kinds)
+    results = await asyncio.gather(*(work(f"{prefix}-{i}", kinds, stop, drain) for i in range(concurrency)))
+    await close_pool()
+    return {k: sum(r[k] for r in results) for k in results[0]} if results else {}
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    if args.cmd == "enqueue":
+        if args.kind == "normalize":
+            since = date.fromisoformat(args.since) if args.since else None
+            units = await normalize_units(args.codes, since)
+        elif args.kind == "bias":
+            if not args.from_date:
+                raise SystemExit("enqueue bias needs --from")
+            end = date.fromisoformat(args.to_date) if args.to_date else date.today()
+            units = bias_units(date.fromisoformat(args.from_date), end, args.chunk_days)
+        else:
+            units = ingest_units(args.codes)
+        batch = await enqueue(args.kind, units, args.batch, args.priority, args.max_attempts)
+        print(f"{batch}: {len(units)} units")
+    elif args.cmd == "work":
+        print(await run_workers(args.concurrency, args.kinds, args.drain))
+    elif args.cmd == "retry":
+        print(f"{await retry_failed(args.batch)} units requeued")
+    else:
+        for b in await batch_status(args.batch):
+            print(
+                f"{b['batch']:<32} {b['kind']:<10} {float(b['progress'] or 0):6.1%}  "
+                f"queued={b['queued']} running={b['running']} done={b['done']} failed={b['failed']} "
+                f"workers={b['workers']}"
+            )
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest="cmd", required=True)
+    e = sub.add_parser("enqueue", help="Split a backfill into units and enqueue them")
+    e.add_argument("kind", choices=sorted(HANDLERS))
+    e.add_argument("--indicator", action="append", dest="codes", help="Only this indicator code (repeatable)")
+    e.add_argument("--since", help="normalize: from this release date (default: full history)")
+    e.add_argument("--from", dest="from_date", help="bias: first date YYYY-MM-DD")
+    e.add_argument("--to", dest="to_date", help="bias: last date (default today)")
+    e.add_argument("--chunk-days", type=int, default=30, help="bias: days per unit")
+    e.add_argument("--batch", help="Batch name (default kind-timestamp)")
+    e.add_argument("--priority", type=int, default=0)
+    e.add_argument("--max-attempts", type=int, default=3)
+    w = sub.add_parser("work", help="Claim and run units")
+    w.add_argument("--concurrency", type=int, default=1)
+    w.add_argument("--kind", action="append", dest="kinds", choices=sorted(HANDLERS))
+    w.add_argument("--drain", action="store_true", help="Exit when nothing is runnable")
+    s = sub.add_parser("status", help="Progress per batch")
+    s.add_argument("--batch")
+    r = sub.add_parser("retry", help="Requeue a batch's failed units")
+    r.add_argument("--batch", required=True)
+    asyncio.run(main_async(p.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+"""
+Resident scheduler: one long-lived process instead of a cron job per stage.
+
+Kept warm across runs: the DB pool (with prepared statements), the parsed settings,
+indicator metadata (code -> id, source timezones) and the scoring context. Each source is
+ingested a few minutes after its release times (config: indicators.yaml "sources", local to
+data_source.timezone, so DST is handled by the zone rules). A run that changed data
+normalizes and rescores just the affected indicators / indices in-process (and refreshes
+daily_feature from the first changed release). The full daily
+DAG runs once a day as the catch-up path.
+
+A control API on localhost (SCHEDULER_CONTROL_PORT) shows schedules and runs and takes
+manual triggers. The daemon publishes the same events as the batch jobs; do not also run
+services.orchestration.workers against the same database, or downstream work is done twice.
+
+Run: PYTHONPATH=. python -m services.orchestration.scheduler
+"""
+import asyncio
+import itertools
+import signal
+import time as _time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import structlog
+
+from services.core.config import Settings, get_settings, pin_settings
+
+log = structlog.get_logger(__name__)
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+HISTORY_SIZE = 100
+# Wake up at least this often, so wall-clock jumps (suspend, NTP) cannot delay a run much
+MAX_SLEEP_SECONDS = 60.0
+
+
+@dataclass(frozen=True)
+class ReleaseSchedule:
+    """Local release times of one source; next_run() returns UTC."""
+
+    source: str
+    tz: ZoneInfo
+    times: tuple[time, ...]
+    weekdays: frozenset[int] = frozenset(range(5))
+    delay: timedelta = timedelta(minutes=5)
+
+    def next_run(self, after: datetime) -> datetime | None:
+        """First run strictly after `after` (aware), or None when no times are configured."""
+        if not self.times or not self.weekdays:
+            return None
+        local_day = after.astimezone(self.tz).date()
+        for offset in range(8):
+            day = local_day + timedelta(days=offset)
+            if day.weekday() not in self.weekdays:
+                continue
+            for t in self.times:
+                run = (datetime.combine(day, t, tzinfo=self.tz) + self.delay).astimezone(timezone.utc)
+                if run > after:
+                    return run
+        return None
+
+
+def _parse_time(raw: Any) -> time:
+    if isinstance(raw, int):
+        # YAML 1.1 reads an unquoted 8:30 as sexagesimal (510)
+        return time(raw // 60, raw % 60)
+    return time.fromisoformat(str(raw))
+
+
+def load_schedules(sources_cfg: dict[str, Any], db_timezones: dict[str, str]) -> list[ReleaseSchedule]:
+    """Schedules from the "sources" config; data_source.timezone wins over the config value."""
+    out = []
+    for source, cfg in (sources_cfg or {}).items():
+        tz_name = db_timezones.get(source) or cfg.get("timezone") or "UTC"
+        try:
+            tz = ZoneInfo(tz_name)
+        except ZoneInfoNotFoundError:
+            log.warning("scheduler_bad_timezone", source=source, timezone=tz_name, fallback="UTC")
+            tz = ZoneInfo("UTC")
+        days = cfg.get("weekdays") or WEEKDAYS[:5]
+        out.append(ReleaseSchedule(
+            source=source,
+            tz=tz,
+            times=tuple(sorted(_parse_time(t) for t in cfg.get("release_times") or ())),
+            weekdays=frozenset(WEEKDAYS.index(str(d).lower()[:3]) for d in days),
+            delay=timedelta(minutes=float(cfg.get("delay_minutes", 5))),
+        ))
+    return out
+
+
+class WarmState:
+    """What each cron invocation used to rebuild: settings, metadata, scoring context."""
+
+    def __init__(self) -> None:
+        self.settings: Settings | None = None
+        self.code_to_id: dict[str, int] = {}
+        self.timezones: dict[str, str] = {}
+        self.ctx: Any = None
+        self.loaded_at: datetime | None = None
+
+    async def load(self) -> None:
+        from services.bias_engine.context import get_scoring_context
+        from services.ingestion.job import seed_metadata
+        from services.ingestion.storage import get_source_timezones
+
+        pin_settings(None)
+        self.settings = get_settings()
+        pin_settings(self.settings)
+        self.code_to_id = await seed_metadata()
+        self.timezones = await get_source_timezones()
+        self.ctx = await get_scoring_context(refresh=True)
+        self.loaded_at = datetime.now(timezone.utc)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "loaded_at": self.loaded_at,
+            "indicators": len(self.code_to_id),
+            "indices": len(self.ctx.index_ids) if self.ctx is not None else 0,
+            "timezones": self.timezones,
+        }
+
+
+@dataclass
+class Run:
+    id: int
+    job: str
+    params: dict[str, Any]
+    trigger: str
+    status: str = "queued"
+    queued_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: datetime | None = None
+    seconds: float | None = None
+    result: dict[str, Any] | None = None
+    error: str | None = None
+
+
+def _scalars(result: dict[str, Any] | None) -> dict[str, Any] | None:
+    """Keep run history small: top-level scalars (and nested dicts of scalars) only."""
+    if result is None:
+        return None
+    out: dict[str, Any] = {}
+    for k, v in result.items():
+        if isinstance(v, dict):
+            out[k] = _scalars(v)
+        elif not isinstance(v, list):
+            out[k] = v
+        else:
+            out[k] = len(v)
+    return out
+
+
+class Scheduler:
+    """Timer loop plus job runner; jobs of the same name (and source) never overlap."""
+
+    def __init__(self, state: WarmState | None = None) -> None:
+        self.state = state or WarmState()
+        self.schedules: list[ReleaseSchedule] = []
+        self.daily_at: time | None = None
+        self.daily_tz: ZoneInfo = ZoneInfo("UTC")
+        self.jobs: dict[str, Callable[..., Awaitable[dict[str, Any] | None]]] = {
+            "ingest": self.job_ingest,
+            "processing": self.job_processing,
+            "bias": self.job_bias,
+            "daily": self.job_daily,
+            "reload": self.job_reload,
+        }
+        self.runs: deque[Run] = deque(maxlen=HISTORY_SIZE)
+        self._ids = itertools.count(1)
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._wake = asyncio.Event()
+        self._stop = asyncio.Event()
+
+    # ---- schedule ----
+
+    def configure(self) -> None:
+        settings = self.state.settings or get_settings()
+        sources_cfg = settings.get_indicators_config().get("sources", {})
+        self.schedules = load_schedules(sources_cfg, self.state.timezones)
+        self.daily_at = _parse_time(settings.scheduler_daily_time) if settings.scheduler_daily_time else None
+        self.daily_tz = ZoneInfo(settings.scheduler_daily_timezone)
+        self._wake.set()
+
+    def upcoming(self, now: datetime | None = None) -> list[tuple[datetime, str, dict[str, Any]]]:
+        """(when UTC, job, params) for the next run of every schedule, soonest first."""
+        now = now or datetime.now(timezone.utc)
+        out = []
+        for s in self.schedules:
+            when = s.next_run(now)
+            if when is not None:
+                out.append((when, "ingest", {"source": s.source}))
+        if self.daily_at is not None:
+            daily = ReleaseSchedule("daily", self.daily_tz, (self.daily_at,), frozenset(range(7)), timedelta(0))
+            when = daily.next_run(now)
+            if when is not None:
+                out.append((when, "daily", {}))
+        return sorted(out, key=lambda x: x[0])
+
+    async def run_forever(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            now = datetime.now(timezone.utc)
+            upcoming = self.upcoming(now)
+            wait = MAX_SLEEP_SECONDS
+            if upcoming:
+                wait = min(wait, max(0.0, (upcoming[0][0] - now).total_seconds()))
+            try:
+                await asyncio.wait_for(self._wake.wait(), wait)
+                continue  # reconfigured or stopping
+            except asyncio.TimeoutError:
+                pass
+            now = datetime.now(timezone.utc)
+            for when, job, params in upcoming:
+                if when <= now:
+                    self.trigger(job, params, trigger="schedule")
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    # ---- runs ----
+
+    def trigger(self, job: str, params: dict[str, Any] | None = None, trigger: str = "manual") -> Run:
+        """Queue a job run in the background; returns its record (see .runs)."""
+        if job not in self.jobs:
+            raise KeyError(job)
+        run = Run(next(self._ids), job, dict(params or {}), trigger)
+        self.runs.append(run)
+        task = asyncio.get_running_loop().create_task(self._execute(run))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return run
+
+    def get_run(self, run_id: int) -> Run | None:
+        return next((r for r in self.runs if r.id == run_id), None)
+
+    async def _execute(self, run: Run) -> None:
+        lock_key = f"{run.job}:{run.params.get('source', '')}"
+        lock = self._locks.setdefault(lock_key, asyncio.Lock())
+        async with lock:
+            run.status = "running"
+            run.started_at = datetime.now(timezone.utc)
+            t0 = _time.perf_counter()
+            try:
+                run.result = _scalars(await self.jobs[run.job](**run.params))
+                run.status = "done"
+            except Exception as e:
+                run.status = "failed"
+                run.error = f"{type(e).__name__}: {e}"
+                log.error("scheduler_job_failed", job=run.job, params=run.params, error=run.error)
+            run.seconds = round(_time.perf_counter() - t0, 3)
+        log.info("scheduler_job", id=run.id, job=run.job, trigger=run.trigger, status=run.status, seconds=run.seconds)
+
+    async def wait_idle(self) -> None:
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    # ---- jobs ----
+
+    async def job_ingest(self, source: str, codes: list[str] | None = None) -> dict[str, Any]:
+        """Ingest one source, then normalize, rescore and refresh features for only what changed."""
+        from services.ingestion.job import run_source_ingestion
+        from services.orchestration.workers import normalize_indicators, rescore_indices
+        from services.processing.features import refresh_features
+
+        result: dict[str, Any] = {"ingest": await run_source_ingestion(source, self.state.code_to_id, codes)}
+        ids = result["ingest"]["indicator_ids"]
+        if ids:
+            since = result["ingest"]["since"]
+            result["processing"] = await normalize_indicators(ids, date.fromisoformat(since) if since else None)
+            result["bias"] = await rescore_indices(ids, ctx=self.state.ctx)
+            changed = result["processing"]["since"]
+            result["features"] = await refresh_features(date.fromisoformat(changed) if changed else None)
+        return result
+
+    async def job_processing(self, indicator_ids: list[int] | None = None) -> dict[str, Any]:
+        from services.processing.surprise import run_surprise_normalization
+
+        return await run_surprise_normalization(indicator_ids=indicator_ids)
+
+    async def job_bias(self, as_of: str | None = None) -> dict[str, Any]:
+        from services.bias_engine.scorer import run_bias_computation
+
+        return await run_bias_computation(date.fromisoformat(as_of) if as_of else None, self.state.ctx)
+
+    async def job_daily(self, as_of: str | None = None, fresh: bool = False) -> dict[str, Any]:
+        from services.orchestration.dag import CheckpointStore, run_pipeline
+        from services.orchestration.daily import build_daily_pipeline
+
+        day = date.fromisoformat(as_of) if as_of else date.today()
+        pipeline = build_daily_pipeline(day)
+        store = CheckpointStore(get_settings().pipeline_checkpoint_dir, pipeline.name, day.isoformat())
+        if fresh:
+            store.clear()
+        else:
+            store.load()
+        summary = await run_pipeline(pipeline, store, emit=lambda r: log.info("pipeline_record", record=r))
+        # Seeding or new indices during the DAG: keep the warm state in step
+        await self.state.load()
+        return summary
+
+    async def job_reload(self) -> dict[str, Any]:
+        """Re-read settings and config, reload metadata and the scoring context."""
+        await self.state.load()
+        self.configure()
+        return self.state.summary()
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "state": self.state.summary(),
+            "next_runs": [
+                {"at": when, "job": job, **params} for when, job, params in self.upcoming()
+            ],
+            "schedules": [
+                {
+                    "source": s.source,
+                    "timezone": s.tz.key,
+                    "release_times": [t.isoformat("minutes") for t in s.times],
+                    "weekdays": [WEEKDAYS[d] for d in sorted(s.weekdays)],
+                    "delay_minutes": s.delay.total_seconds() / 60,
+                }
+                for s in self.schedules
+            ],
+            "running": [asdict(r) for r in self.runs if r.status in ("queued", "running")],
+        }
+
+
+def create_control_app(scheduler: Scheduler) -> Any:
+    """Local HTTP control surface (bind to localhost only: it has no authentication)."""
+    from fastapi import FastAPI, HTTPException, Query
+
+    app = FastAPI(title="MacroEdge scheduler", docs_url="/docs", redoc_url=None)
+
+    @app.get("/status")
+    async def status() -> dict[str, Any]:
+        return scheduler.status()
+
+    @app.get("/runs")
+    async def runs(limit: int = Query(20, ge=1, le=HISTORY_SIZE)) -> list[dict[str, Any]]:
+        return [asdict(r) for r in list(scheduler.runs)[-limit:][::-1]]
+
+    @app.get("/runs/{run_id}")
+    async def run(run_id: int) -> dict[str, Any]:
+        r = scheduler.get_run(run_id)
+        if r is None:
+            raise HTTPException(status_code=404, detail="Unknown run")
+        return asdict(r)
+
+    def _queued(r: Run) -> dict[str, Any]:
+        return {"id": r.id, "job": r.job, "params": r.params, "status": r.status, "href": f"/runs/{r.id}"}
+
+    @app.post("/trigger/ingest/{source}", status_code=202)
+    async def trigger_ingest(source: str, indicator: list[str] | None = Query(None)) -> dict[str, Any]:
+        from services.ingestion.job import INGESTERS
+
+        if source not in INGESTERS:
+            raise HTTPException(status_code=404, detail=f"No ingester for source {source}")
+        return _queued(scheduler.trigger("ingest", {"source": source, "codes": indicator}))
+
+    @app.post("/trigger/processing", status_code=202)
+    async def trigger_processing() -> dict[str, Any]:
+        return _queued(scheduler.trigger("processing"))
+
+    @app.post("/trigger/bias", status_code=202)
+    async def trigger_bias(as_of: date | None = Query(None, alias="date")) -> dict[str, Any]:
+        return _queued(scheduler.trigger("bias", {"as_of": as_of.isoformat() if as_of else None}))
+
+    @app.post("/trigger/daily", status_code=202)
+    async def trigger_daily(as_of: date | None = Query(None, alias="date"), fresh: bool = False) -> dict[str, Any]:
+        return _queued(scheduler.trigger("daily", {"as_of": as_of.isoformat() if as_of else None, "fresh": fresh}))
+
+    @app.post("/reload", status_code=202)
+    async def reload() -> dict[str, Any]:
+        return _queued(scheduler.trigger("reload"))
+
+    return app
+
+
+async def serve() -> None:
+    """Warm up, then run the timer loop and the control API until SIGINT/SIGTERM."""
+    import uvicorn
+
+    from services.core.db import close_pool, warm_pool
+
+    scheduler = Scheduler()
+    await warm_pool()
+    await scheduler.state.load()
+    scheduler.configure()
+    settings = scheduler.state.settings
+    server = uvicorn.Server(uvicorn.Config(
+        create_control_app(scheduler),
+        host=settings.scheduler_control_host,
+        port=settings.scheduler_control_port,
+        log_level="warning",
+    ))
+    # uvicorn would install its own handlers; the daemon owns shutdown
+    server.install_signal_handlers = lambda: None
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, scheduler.stop)
+        except NotImplementedError:
+            pass
+    log.info(
+        "scheduler_started",
+        control=f"http://{settings.scheduler_control_host}:{settings.scheduler_control_port}",
+        next_runs=[f"{when.isoformat()} {job} {p.get('source', '')}".strip() for when, job, p in scheduler.upcoming()],
+    )
+    api = asyncio.create_task(server.serve())
+    try:
+        await scheduler.run_forever()
+    finally:
+        server.should_exit = True
+        await api
+        await scheduler.wait_idle()
+        await close_pool()
+
+
+def main() -> None:
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Event-driven incremental workers: a release propagates to scores without a pipeline run.
+
+  ingestion  --macro_data_updated (stage=ingestion, indicator_ids)-->  processing worker
+             normalizes surprises for those indicators only
+  processing --macro_data_updated (stage=processing, indicator_ids)--> bias worker
+             rescores only the indices that weight those indicators -> bias_computed
+  processing --macro_data_updated (stage=processing, since)-->         features worker
+             rebuilds daily_feature rows from the first re-normalized release
+
+Events arriving within EVENT_BATCH_WINDOW_MS of each other are coalesced into one
+recompute (a release batch touching several indicators). A batch is acked only after its
+handler succeeded; on the redis bus an unacked batch is redelivered when the worker restarts.
+
+Run: PYTHONPATH=. python -m services.orchestration.workers [--only processing|bias|features]
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import time
+from collections.abc import Awaitable, Callable, Collection
+from datetime import date
+from typing import TYPE_CHECKING, Any
+
+import structlog
+
+from services.core.bus import Event, EventBus, get_bus
+from services.core.config import get_settings
+from services.core.events import MACRO_DATA_UPDATED
+
+if TYPE_CHECKING:
+    from services.bias_engine.context import ScoringContext
+
+log = structlog.get_logger(__name__)
+
+Handler = Callable[[list[Event]], Awaitable[dict[str, Any] | None]]
+
+
+def merge_changes(events: list[Event], stage: str) -> tuple[set[int], date | None]:
+    """Union of indicator_ids and earliest since over the events from one stage."""
+    ids: set[int] = set()
+    since: date | None = None
+    for e in events:
+        if e.data.get("stage") != stage:
+            continue
+        ids.update(int(i) for i in e.data.get("indicator_ids") or ())
+        raw = e.data.get("since")
+        if raw:
+            try:
+                d = date.fromisoformat(raw)
+            except ValueError:
+                continue
+            since = d if since is None or d < since else since
+    return ids, since
+
+
+async def normalize_indicators(indicator_ids: Collection[int], since: date | None = None) -> dict[str, Any]:
+    """Re-normalize surprises for these indicators only."""
+    from services.processing.surprise import run_surprise_normalization
+
+    return await run_surprise_normalization(indicator_ids=indicator_ids, since=since)
+
+
+async def rescore_indices(
+    indicator_ids: Collection[int],
+    as_of: date | None = None,
+    ctx: "ScoringContext | None" = None,
+) -> dict[str, Any] | None:
+    """
+    Rescore the indices that weight these indicators (every index on the first update of a
+    day, so the day's snapshot is complete). None if nothing is affected.
+    """
+    from services.bias_engine.context import load_scoring_context
+    from services.bias_engine.scorer import run_bias_computation, scored_index_ids
+
+    as_of = as_of or date.today()
+    ctx = ctx or await load_scoring_context()
+    targets = set(ctx.indices_for(indicator_ids))
+    targets |= set(ctx.index_ids) - await scored_index_ids(as_of)
+    if not targets:
+        return None
+    return await run_bias_computation(as_of, ctx, index_ids=sorted(targets))
+
+
+async def handle_processing(events: list[Event]) -> dict[str, Any] | None:
+    ids, since = merge_changes(events, "ingestion")
+    if not ids:
+        return None
+    return await normalize_indicators(ids, since)
+
+
+async def handle_bias(events: list[Event], as_of: date | None = None) -> dict[str, Any] | None:
+    ids, _ = merge_changes(events, "processing")
+    if not ids:
+        return None
+    # Fresh context per batch (four small queries), so re-seeded weights apply immediately
+    return await rescore_indices(ids, as_of)
+
+
+async def handle_features(events: list[Event]) -> dict[str, Any] | None:
+    from services.processing.features import refresh_features
+
+    ids, since = merge_changes(events, "processing")
+    if not ids:
+        return None
+    return await refresh_features(since)
+
+
+# name -> (consumer group, handler); all consume macro_data_updated
+WORKERS: dict[str, tuple[str, Handler]] = {
+    "processing": ("processing", handle_processing),
+    "bias": ("bias_engine", handle_bias),
+    "features": ("features", handle_features),
+}
+
+
+async def consume(
+    bus: EventBus,
+    channel: str,
+    group: str,
+    consumer: str,
+    handler: Handler,
+    batch_window: float = 0.5,
+    stop: asyncio.Event | None = None,
+    poll_timeout: float = 5.0,
+) -> None:
+    """Read, coalesce, handle, ack, until stop is set."""
+    await bus.ensure_group(channel, group)
+    loop = asyncio.get_running_loop()
+    while stop is None or not stop.is_set():
+        events = await bus.read(channel, group, consumer, timeout=poll_timeout)
+        if not events:
+            continue
+        deadline = loop.time() + batch_window
+        while (remaining := deadline - loop.time()) > 0:
+            more = await bus.read(channel, group, consumer, timeout=remaining)
+            if not more:
+                break
+            events.extend(more)
+        t0 = time.perf_counter()
+        try:
+            result = await handler(events)
+        except Exception as e:
+            log.error("worker_batch_failed", group=group, events=len(events), error=str(e))
+            continue
+        await bus.ack(events)
+        log.info(
+            "worker_batch",
+            group=group,
+            events=len(events),
+            seconds=round(time.perf_counter() - t0, 3),
+            result={k: v for k, v in (result or {}).items() if not isinstance(v, (list, dict))},
+        )
+
+
+async def run_workers(names: list[str]) -> None:
+    """Run the named workers in this process until SIGINT/SIGTERM."""
+    settings = get_settings()
+    bus = await get_bus()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+    consumer = f"{socket.gethostname()}-{os.getpid()}"
+    tasks = [
+        asyncio.create_task(consume(
+            bus, MACRO_DATA_UPDATED, WORKERS[name][0], consumer, WORKERS[name][1],
+            batch_window=settings.event_batch_window_ms / 1000.0, stop=stop, poll_timeout=1.0,
+        ))
+        for name in names
+    ]
+    log.info("workers_started", workers=names, backend=type(bus).__name__, consumer=consumer)
+    await stop.wait()
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    from services.core.bus import close_bus
+    from services.core.db import close_pool
+
+    await close_bus()
+    await close_pool()
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--only", action="append", choices=sorted(WORKERS), help="Run only this worker (repeatable)")
+    args = p.parse_args()
+    asyncio.run(run_workers(args.only or list(WORKERS)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Rolling correlation matrices between indices' bias scores and between indicator surprises.
+Pairwise-complete Pearson correlation over a calendar-day window, from running sums that
+are updated in O(N^2) per new day, so advancing the as-of date never rescans the window.
+A write to the inputs (new data version) re-pushes only the days from the earliest one it
+changed (services.core.cache.changed_since).
+"""
+import asyncio
+from collections import OrderedDict, deque
+from datetime import date, timedelta
+from typing import Any
+
+import numpy as np
+
+KINDS = ("bias", "surprise")
+
+# Cache namespace whose data version covers each kind's inputs
+NAMESPACES = {"bias": "bias", "surprise": "macro"}
+
+# A surprise stays "current" for this many days after its release (as in the scorer)
+SURPRISE_STALE_DAYS = 14
+
+
+def pairwise_corr(x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Correlation of the columns of x (T x N, NaN = missing) using, for each pair, only the
+    rows where both are present. Returns (corr N x N with NaN where undefined, pair counts).
+    """
+    m = ~np.isnan(x)
+    x0 = np.where(m, x, 0.0)
+    mf = m.astype(np.float64)
+    return _corr_from_sums(mf.T @ mf, x0.T @ mf, (x0 * x0).T @ mf, x0.T @ x0)
+
+
+def _corr_from_sums(
+    n: np.ndarray, sx: np.ndarray, sxx: np.ndarray, sxy: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    # sx[i, j] = sum of x_i over rows where x_j is present too (likewise sxx)
+    cov = n * sxy - sx * sx.T
+    var_i = n * sxx - sx * sx
+    var_j = var_i.T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = cov / np.sqrt(var_i * var_j)
+    corr[(n < 2) | (var_i <= 1e-12) | (var_j <= 1e-12)] = np.nan
+    np.clip(corr, -1.0, 1.0, out=corr)
+    return corr, n
+
+
+class RollingCorrelation:
+    """Running pairwise sums over the last `window` rows; push() is O(N^2)."""
+
+    def __init__(self, n_series: int, window: int):
+        self.window = window
+        self._rows: deque[np.ndarray] = deque()
+        shape = (n_series, n_series)
+        self._n = np.zeros(shape)
+        self._sx = np.zeros(shape)
+        self._sxx = np.zeros(shape)
+        self._sxy = np.zeros(shape)
+
+    def _apply(self, row: np.ndarray, sign: float) -> None:
+        m = ~np.isnan(row)
+        if not m.any():
+            return
+        x0 = np.where(m, row, 0.0)
+        mf = m.astype(np.float64)
+        self._n += sign * np.outer(mf, mf)
+        self._sx += sign * np.outer(x0, mf)
+        self._sxx += sign * np.outer(x0 * x0, mf)
+        self._sxy += sign * np.outer(x0, x0)
+
+    def drop_last(self, count: int) -> None:
+        """Take back the newest count rows (to push corrected ones)."""
+        for _ in range(count):
+            self._apply(self._rows.pop(), -1.0)
+
+    def push(self, row: np.ndarray) -> None:
+        self._rows.append(row)
+        self._apply(row, 1.0)
+        if len(self._rows) > self.window:
+            self._apply(self._rows.popleft(), -1.0)
+
+    def matrix(self) -> tuple[np.ndarray, np.ndarray]:
+        return _corr_from_sums(self._n, self._sx, self._sxx, self._sxy)
+
+
+def pivot_daily(
+    rows: list[Any],
+    start: date,
+    end: date,
+    labels: list[str],
+) -> np.ndarray:
+    """(day, label, value) rows -> dense array over days start..end (inclusive) x labels."""
+    pos = {label: k for k, label in enumerate(labels)}
+    out = np.full(((end - start).days + 1, len(labels)), np.nan)
+    for r in rows:
+        k = pos.get(r["label"])
+        t = (r["day"] - start).days
+        if k is not None and 0 <= t < len(out) and r["value"] is not None:
+            out[t, k] = r["value"]
+    return out
+
+
+def forward_fill(x: np.ndarray, last: np.ndarray, age: np.ndarray, stale_days: int) -> np.ndarray:
+    """Carry each column's last value forward for up to stale_days. Mutates last/age (the carry state)."""
+    out = np.empty_like(x)
+    for t in range(len(x)):
+        seen = ~np.isnan(x[t])
+        last[seen] = x[t][seen]
+        age[seen] = 0
+        age[~seen] += 1
+        out[t] = np.where(age <= stale_days, last, np.nan)
+    return out
+
+
+async def load_daily_values(kind: str, start_excl: date, end: date) -> list[Any]:
+    """Rows of (day, label, value) with start_excl < day <= end."""
+    from datetime import datetime, time, timezone
+
+    from services.core.db import fetch_all
+
+    if kind == "bias":
+        return await fetch_all(
+            """
+            SELECT (bs.time AT TIME ZONE 'UTC')::date AS day, i.code AS label, bs.bias_score::float8 AS value
+            FROM bias_score bs
+            JOIN index i ON i.id = bs.index_id
+            WHERE bs.time > $1 AND bs.time <= $2
+            """,
+            datetime.combine(start_excl, time.max, tzinfo=timezone.utc),
+            datetime.combine(end, time.max, tzinfo=timezone.utc),
+        )
+    return await fetch_all(
+        """
+        SELECT o.release_date AS day, m.code AS label, o.surprise_normalized::float8 AS value
+        FROM macro_observation o
+        JOIN macro_indicator m ON m.id = o.indicator_id
+        WHERE o.release_date > $1 AND o.release_date <= $2
+          AND o.surprise_normalized IS NOT NULL
+        """,
+        start_excl,
+        end,
+    )
+
+
+class _State:
+    """Incremental state for one (kind, window): rolling sums plus forward-fill carry."""
+
+    def __init__(self, labels: list[str], window: int):
+        self.labels = labels
+        self.as_of: date = date.min
+        self.version: str | None = None
+        self.rolling = RollingCorrelation(len(labels), window)
+        self.last = np.full(len(labels), np.nan)
+        self.age = np.full(len(labels), np.iinfo(np.int32).max // 2, dtype=np.int64)
+
+
+class CorrelationCache:
+    """
+    Results per (kind, window, as_of, data version); rolling state per (kind, window).
+    A later as_of within one window of the state advances it with only the new days. Under a
+    new data version the days from the earliest changed one are pushed again as well; a
+    change before the window, an unknown one, new labels or a far jump rebuild.
+    """
+
+    def __init__(self, max_results: int = 256):
+        self.max_results = max_results
+        self._results: OrderedDict[tuple, dict[str, Any]] = OrderedDict()
+        self._states: dict[tuple[str, int], _State] = {}
+        self._lock = asyncio.Lock()
+
+    def clear(self) -> None:
+        self._results.clear()
+        self._states.clear()
+
+    async def get(self, kind: str, window: int, as_of: date, version: str = "") -> dict[str, Any]:
+        key = (kind, window, as_of, version)
+        hit = self._results.get(key)
+        if hit is not None:
+            self._results.move_to_end(key)
+            return hit
+        async with self._lock:
+            return await self._compute(key, kind, window, as_of, version)
+
+    async def _compute(self, key: tuple, kind: str, window: int, as_of: date, version: str) -> dict[str, Any]:
+        hit = self._results.get(key)
+        if hit is not None:
+            return hit
+        state = self._states.get((kind, window))
+        advanced = False
+        if state is not None and state.as_of <= as_of <= state.as_of + timedelta(days=window):
+            since: date | None = state.as_of + timedelta(days=1)
+            if state.version != version:
+                # A new version can rewrite days <= state.as_of: redo them from the earliest change
+                from services.core.cache import changed_since
+
+                changed = await changed_since(NAMESPACES[kind], state.version, version)
+                since = min(since, changed) if changed else None
+            if since is not None and since > state.as_of - timedelta(days=window - 1):
+                advanced = await self._advance(state, kind, as_of, since)
+        if not advanced:
+            fresh = await self._build(kind, window, as_of)
+            # Keep the newest state for incremental use; historical requests don't displace it
+            if state is None or as_of >= state.as_of:
+                self._states[(kind, window)] = fresh
+            state = fresh
+        state.version = version
+        result = self._payload(kind, window, as_of, state)
+        self._results[key] = result
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+        return result
+
+    async def _build(self, kind: str, window: int, as_of: date) -> _State:
+        start = as_of - timedelta(days=window - 1)
+        lookback = SURPRISE_STALE_DAYS if kind == "surprise" else 0
+        rows = await load_daily_values(kind, start - timedelta(days=lookback + 1), as_of)
+        labels = sorted({r["label"] for r in rows})
+        state = _State(labels, window)
+        x = pivot_daily(rows, start - timedelta(days=lookback), as_of, labels)
+        if kind == "surprise":
+            x = forward_fill(x, state.last, state.age, SURPRISE_STALE_DAYS)[lookback:]
+        for row in x:
+            state.rolling.push(row)
+        state.as_of = as_of
+        return state
+
+    async def _advance(self, state: _State, kind: str, as_of: date, since: date) -> bool:
+        """
+        Push days [since, as_of], first taking back the pushed ones from since on (since <=
+        state.as_of: rewritten data). False if new labels appeared (caller rebuilds).
+        """
+        if since > as_of:
+            state.as_of = as_of
+            return True
+        redo = max(0, (state.as_of - since).days + 1)
+        # Rewritten days: the forward-fill carry restarts from the raw values before since
+        lookback = SURPRISE_STALE_DAYS if kind == "surprise" and redo else 0
+        rows = await load_daily_values(kind, since - timedelta(days=lookback + 1), as_of)
+        if any(r["label"] not in state.labels for r in rows):
+            return False
+        x = pivot_daily(rows, since - timedelta(days=lookback), as_of, state.labels)
+        if kind == "surprise":
+            if lookback:
+                state.last[:] = np.nan
+                state.age[:] = np.iinfo(np.int32).max // 2
+            x = forward_fill(x, state.last, state.age, SURPRISE_STALE_DAYS)[lookback:]
+        state.rolling.drop_last(redo)
+        for row in x:
+            state.rolling.push(row)
+        state.as_of = as_of
+        return True
+
+    @staticmethod
+    def _payload(kind: str, window: int, as_of: date, state: _State) -> dict[str, Any]:
+        corr, n = state.rolling.matrix()
+        return {
+            "kind": kind,
+            "window_days": window,
+            "as_of": as_of.isoformat(),
+            "labels": state.labels,
+            "matrix": [[None if np.isnan(v) else round(float(v), 4) for v in row] for row in corr],
+            "observations": [int(v) for v in np.diag(n)],
+        }
+
+
+correlation_cache = CorrelationCache()
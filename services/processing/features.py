@@ -0,0 +1,364 @@
+"""
+Materialized daily feature matrix (table daily_feature): one row per day, per-indicator
+arrays aligned with that row's indicator_ids:
+
+  surprise          latest surprise_normalized released on or before the day (NaN: none yet)
+  days_since        days since that release (-1: none yet)
+  surprise_ewm      exponentially weighted mean / variance of surprise_normalized over
+  surprise_ewm_var  releases (FEATURE_EWM_HALFLIFE releases)
+  vix               latest VIX stamped at or before the day's UTC midnight
+  regions, spread_2y10y   same for the 2Y/10Y spread, per region
+
+Row d is row d-1 advanced by day d's releases and market data, so appending a day is
+O(indicators) and needs no history; a range rebuild reads releases, VIX and yields once
+each and writes rows in one batch. Consumers read a contiguous range with FeatureMatrix.load
+(scorer-compatible latest() / vix(), plus the raw matrices for regime models and backtests).
+
+Surprises normalized again (new release, revision) invalidate rows from that release on:
+the daily pipeline and the features worker call refresh_features(since) after normalization.
+
+Run: PYTHONPATH=. python -m services.processing.features build [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+"""
+import argparse
+import asyncio
+import math
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+import structlog
+
+from services.core.config import get_settings
+from services.core.db import fetch_all, get_conn
+
+if TYPE_CHECKING:
+    from services.bias_engine.context import ScoringContext
+
+log = structlog.get_logger(__name__)
+
+
+def _midnight(d: date) -> datetime:
+    return datetime(d.year, d.month, d.day, tzinfo=timezone.utc)
+
+
+def _day(value: Any) -> date:
+    return value.astimezone(timezone.utc).date() if isinstance(value, datetime) else value
+
+
+def _known_on(t: datetime) -> date:
+    """First day whose UTC midnight is at or after t (what get_vix_latest sees: no look-ahead)."""
+    t = t.astimezone(timezone.utc)
+    return t.date() if t.time() == datetime.min.time() else t.date() + timedelta(days=1)
+
+
+def ewm_alpha(halflife: float) -> float:
+    """Per-release decay for a halflife in releases."""
+    return 1.0 - 0.5 ** (1.0 / halflife)
+
+
+@dataclass(frozen=True)
+class FeatureRow:
+    day: date
+    indicator_ids: np.ndarray  # int64, sorted
+    surprise: np.ndarray
+    days_since: np.ndarray  # int64
+    surprise_ewm: np.ndarray
+    surprise_ewm_var: np.ndarray
+    vix: float | None
+    regions: tuple[str, ...]
+    spread_2y10y: np.ndarray
+
+    @classmethod
+    def empty(cls, day: date, indicator_ids: list[int]) -> "FeatureRow":
+        n = len(indicator_ids)
+        nan = np.full(n, np.nan)
+        return cls(day, np.array(sorted(indicator_ids), dtype=np.int64), nan, np.full(n, -1, dtype=np.int64),
+                   nan.copy(), nan.copy(), None, (), np.empty(0))
+
+    @classmethod
+    def from_record(cls, r: Any) -> "FeatureRow":
+        return cls(
+            _day(r["time"]),
+            np.asarray(r["indicator_ids"], dtype=np.int64),
+            np.asarray(r["surprise"], dtype=float),
+            np.asarray(r["days_since"], dtype=np.int64),
+            np.asarray(r["surprise_ewm"], dtype=float),
+            np.asarray(r["surprise_ewm_var"], dtype=float),
+            None if r["vix"] is None else float(r["vix"]),
+            tuple(r["regions"]),
+            np.asarray(r["spread_2y10y"], dtype=float),
+        )
+
+    def with_indicators(self, indicator_ids: list[int]) -> "FeatureRow":
+        """Same state over another indicator set (new indicators start empty)."""
+        ids = np.array(sorted(indicator_ids), dtype=np.int64)
+        if np.array_equal(ids, self.indicator_ids):
+            return self
+        out = FeatureRow.empty(self.day, list(ids))
+        pos = {int(i): k for k, i in enumerate(self.indicator_ids)}
+        src = np.array([pos.get(int(i), -1) for i in ids])
+        have = src >= 0
+        for name in ("surprise", "days_since", "surprise_ewm", "surprise_ewm_var"):
+            getattr(out, name)[have] = getattr(self, name)[src[have]]
+        return replace(out, vix=self.vix, regions=self.regions, spread_2y10y=self.spread_2y10y)
+
+    def advance(
+        self,
+        day: date,
+        releases: list[tuple[int, float]],
+        vix: float | None,
+        spreads: dict[str, float],
+        alpha: float,
+    ) -> "FeatureRow":
+        """The row for day (> self.day): carry forward, then apply day's releases (position, value) and market data."""
+        gap = (day - self.day).days
+        surprise = self.surprise.copy()
+        days_since = np.where(self.days_since >= 0, self.days_since + gap, -1)
+        ewm, var = self.surprise_ewm.copy(), self.surprise_ewm_var.copy()
+        for k, value in releases:
+            surprise[k] = value
+            days_since[k] = 0
+            if math.isnan(ewm[k]):
+                ewm[k], var[k] = value, 0.0
+            else:
+                diff = value - ewm[k]
+                incr = alpha * diff
+                ewm[k] += incr
+                var[k] = (1 - alpha) * (var[k] + diff * incr)
+        regions, spread = self.regions, self.spread_2y10y
+        if spreads:
+            merged = dict(zip(regions, spread.tolist())) | spreads
+            regions = tuple(sorted(merged))
+            spread = np.array([merged[r] for r in regions])
+        return FeatureRow(day, self.indicator_ids, surprise, days_since, ewm, var,
+                          self.vix if vix is None else vix, regions, spread)
+
+    def params(self) -> tuple[Any, ...]:
+        return (
+            _midnight(self.day),
+            self.indicator_ids.tolist(),
+            self.surprise.tolist(),
+            self.days_since.tolist(),
+            self.surprise_ewm.tolist(),
+            self.surprise_ewm_var.tolist(),
+            self.vix,
+            list(self.regions),
+            self.spread_2y10y.tolist(),
+        )
+
+
+UPSERT_SQL = """
+    INSERT INTO daily_feature (
+        time, indicator_ids, surprise, days_since, surprise_ewm, surprise_ewm_var, vix, regions, spread_2y10y, computed_at
+    )
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, NOW())
+    ON CONFLICT (time) DO UPDATE SET
+        indicator_ids = EXCLUDED.indicator_ids,
+        surprise = EXCLUDED.surprise,
+        days_since = EXCLUDED.days_since,
+        surprise_ewm = EXCLUDED.surprise_ewm,
+        surprise_ewm_var = EXCLUDED.surprise_ewm_var,
+        vix = EXCLUDED.vix,
+        regions = EXCLUDED.regions,
+        spread_2y10y = EXCLUDED.spread_2y10y,
+        computed_at = EXCLUDED.computed_at
+"""
+
+COLUMNS = "time, indicator_ids, surprise, days_since, surprise_ewm, surprise_ewm_var, vix, regions, spread_2y10y"
+
+
+async def load_row(day: date) -> FeatureRow | None:
+    async with get_conn(readonly=True) as conn:
+        r = await conn.fetchrow(f"SELECT {COLUMNS} FROM daily_feature WHERE time = $1", _midnight(day))
+    return FeatureRow.from_record(r) if r else None
+
+
+async def _inputs(start: date, end: date) -> tuple[dict[date, list[tuple[int, float]]], dict[date, float], dict[date, dict[str, float]]]:
+    """Releases (indicator_id, surprise_normalized), VIX and spreads per day in [start, end]."""
+    from services.core.archive import read_history
+
+    obs = await read_history(
+        "macro_observation", start, end, columns=["time", "indicator_id", "release_date", "surprise_normalized"]
+    )
+    releases: dict[date, list[tuple[int, float]]] = {}
+    for ind, day, value in zip(obs["indicator_id"].tolist(), obs["release_date"].tolist(), obs["surprise_normalized"].tolist()):
+        if not math.isnan(value):
+            releases.setdefault(day, []).append((ind, value))
+    # Market data stamped in (midnight before start, midnight of end] is known on days start..end
+    lo, hi = _midnight(start - timedelta(days=1)), _midnight(end)
+    vix = {
+        _known_on(r["time"]): float(r["value"])
+        for r in await fetch_all(
+            "SELECT time, value FROM volatility_snapshot WHERE symbol = 'VIX' AND time > $1 AND time <= $2 ORDER BY time",
+            lo, hi,
+        )
+    }
+    spreads: dict[date, dict[str, float]] = {}
+    for r in await fetch_all(
+        """
+        SELECT time, region, spread_2y10y FROM yield_curve_snapshot
+        WHERE time > $1 AND time <= $2 AND spread_2y10y IS NOT NULL ORDER BY time
+        """,
+        lo, hi,
+    ):
+        spreads.setdefault(_known_on(r["time"]), {})[r["region"]] = float(r["spread_2y10y"])
+    return releases, vix, spreads
+
+
+async def _first_day() -> date | None:
+    async with get_conn(readonly=True) as conn:
+        r = await conn.fetchrow("SELECT release_date FROM macro_observation ORDER BY time LIMIT 1")
+    return r["release_date"] if r else None
+
+
+async def build_features(start: date, end: date | None = None) -> dict[str, Any]:
+    """
+    (Re)build rows for [start, end], continuing from the row for start - 1. Without that
+    row, state is replayed from the first observation (rows before start are not written),
+    and a start before the first observation is moved up to it.
+    """
+    end = end or date.today()
+    alpha = ewm_alpha(get_settings().feature_ewm_halflife)
+    async with get_conn(readonly=True) as conn:
+        indicator_ids = [r["id"] for r in await conn.fetch("SELECT id FROM macro_indicator ORDER BY id")]
+    prev = await load_row(start - timedelta(days=1))
+    if prev is None:
+        first = await _first_day()
+        if first and first > start:
+            start = first  # no empty rows for the days before any data (since=FULL_HISTORY)
+        prev = FeatureRow.empty(min(first or start, start) - timedelta(days=1), indicator_ids)
+    prev = prev.with_indicators(indicator_ids)
+    releases, vix, spreads = await _inputs(prev.day + timedelta(days=1), end)
+    pos = {int(i): k for k, i in enumerate(prev.indicator_ids)}
+    rows = []
+    d = prev.day + timedelta(days=1)
+    while d <= end:
+        todays = [(pos[i], v) for i, v in releases.get(d, ()) if i in pos]
+        prev = prev.advance(d, todays, vix.get(d), spreads.get(d, {}), alpha)
+        if d >= start:
+            rows.append(prev.params())
+        d += timedelta(days=1)
+    async with get_conn() as conn:
+        await conn.executemany(UPSERT_SQL, rows)
+    log.info("features_built", start=start.isoformat(), end=end.isoformat(), days=len(rows))
+    return {"from": start.isoformat(), "to": end.isoformat(), "days": len(rows), "indicators": len(indicator_ids)}
+
+
+async def refresh_features(since: date | None, end: date | None = None) -> dict[str, Any]:
+    """Rebuild from since (changed surprises) through end; only the new days if since is None."""
+    end = end or date.today()
+    if since is None:
+        async with get_conn(readonly=True) as conn:
+            last = await conn.fetchval("SELECT time FROM daily_feature ORDER BY time DESC LIMIT 1")
+        since = _day(last) + timedelta(days=1) if last else end
+    if since > end:
+        return {"from": since.isoformat(), "to": end.isoformat(), "days": 0}
+    return await build_features(since, end)
+
+
+@dataclass
+class FeatureMatrix:
+    """Feature rows for consecutive days as (days x indicators) matrices."""
+
+    days: np.ndarray  # datetime64[D]
+    indicator_ids: np.ndarray
+    surprise: np.ndarray
+    days_since: np.ndarray
+    surprise_ewm: np.ndarray
+    surprise_ewm_std: np.ndarray
+    vix_values: np.ndarray  # NaN: none yet
+    regions: tuple[str, ...]
+    spread_2y10y: np.ndarray  # days x regions
+    directions: dict[int, str]
+
+    @classmethod
+    async def load(cls, start: date, end: date, ctx: "ScoringContext | None" = None) -> "FeatureMatrix":
+        """Rows in [start, end] with one range read, aligned to the union of their indicators and regions."""
+        rows = [
+            FeatureRow.from_record(r)
+            for r in await fetch_all(
+                f"SELECT {COLUMNS} FROM daily_feature WHERE time >= $1 AND time < $2 ORDER BY time",
+                _midnight(start), _midnight(end + timedelta(days=1)),
+            )
+        ]
+        ids = sorted({int(i) for r in rows for i in r.indicator_ids})
+        rows = [r.with_indicators(ids) for r in rows]
+        regions = tuple(sorted({g for r in rows for g in r.regions}))
+        spread = np.full((len(rows), len(regions)), np.nan)
+        col = {g: j for j, g in enumerate(regions)}
+        for t, r in enumerate(rows):
+            for g, v in zip(r.regions, r.spread_2y10y.tolist()):
+                spread[t, col[g]] = v
+        n = len(ids)
+
+        def stack(name: str, dtype: Any) -> np.ndarray:
+            return np.array([getattr(r, name) for r in rows], dtype=dtype).reshape(len(rows), n)
+
+        return cls(
+            days=np.array([r.day for r in rows], dtype="datetime64[D]"),
+            indicator_ids=np.array(ids, dtype=np.int64),
+            surprise=stack("surprise", float),
+            days_since=stack("days_since", np.int64),
+            surprise_ewm=stack("surprise_ewm", float),
+            surprise_ewm_std=np.sqrt(stack("surprise_ewm_var", float)),
+            vix_values=np.array([np.nan if r.vix is None else r.vix for r in rows], dtype=float),
+            regions=regions,
+            spread_2y10y=spread,
+            directions=dict(zip(ctx.indicator_ids, ctx.directions)) if ctx else {},
+        )
+
+    def covers(self, start: date, end: date) -> bool:
+        """One row per day from start to end."""
+        return len(self.days) == (end - start).days + 1 and len(self.days) > 0 and self.days[0] == np.datetime64(start)
+
+    def _row(self, as_of: date) -> int:
+        t = int(np.searchsorted(self.days, np.datetime64(as_of, "D")))
+        if t >= len(self.days) or self.days[t] != np.datetime64(as_of, "D"):
+            raise KeyError(f"no feature row for {as_of}")
+        return t
+
+    def latest(self, as_of: date, max_days_back: int = 14) -> list[dict[str, Any]]:
+        """Same rows as scorer.get_latest_surprises(as_of, max_days_back)."""
+        t = self._row(as_of)
+        since = self.days_since[t]
+        return [
+            {
+                "indicator_id": int(self.indicator_ids[k]),
+                "direction": self.directions.get(int(self.indicator_ids[k])) or "positive",
+                "surprise_normalized": float(self.surprise[t, k]),
+                "release_date": as_of - timedelta(days=int(since[k])),
+            }
+            for k in np.flatnonzero((since >= 0) & (since <= max_days_back))
+        ]
+
+    def vix(self, as_of: date) -> float | None:
+        """Same value as scorer.get_vix_latest(as_of)."""
+        v = self.vix_values[self._row(as_of)]
+        return None if np.isnan(v) else float(v)
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    from services.core.db import close_pool
+
+    try:
+        end = date.fromisoformat(args.to_date) if args.to_date else date.today()
+        if args.from_date:
+            print(await build_features(date.fromisoformat(args.from_date), end))
+        else:
+            print(await refresh_features(None, end))
+    finally:
+        await close_pool()
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="Build rows (default: append the days after the last row)")
+    b.add_argument("--from", dest="from_date", help="Rebuild from this date")
+    b.add_argument("--to", dest="to_date", help="Last day (default today)")
+    asyncio.run(main_async(p.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,28 @@
 """
 Compute rolling mean/std of surprise per indicator and update surprise_normalized.
 Formula: normalized = (surprise - mean) / max(eps, std), capped to [-cap, +cap].
+Stats are point-in-time: each release uses the window ending at its own release_date,
+so re-normalizing old history (replays, full-history backfills) sees no later data.
 """
+from collections.abc import Collection, Sequence
 from datetime import date, datetime, timedelta, timezone
 from math import tanh
+from typing import Any
 
+import numpy as np
+
+from services.core.archive import decompress_range
+from services.core.cache import invalidate
 from services.core.config import get_settings
 from services.core.db import get_conn
+from services.core.events import MACRO_DATA_UPDATED, publish
+
+
+def _time_bounds(start: date, end: date) -> tuple[datetime, datetime]:
+    """[start, end] as a half-open time range (time is release_date at UTC midnight), for chunk exclusion."""
+    lo = datetime(start.year, start.month, start.day, tzinfo=timezone.utc)
+    hi = datetime(end.year, end.month, end.day, tzinfo=timezone.utc) + timedelta(days=1)
+    return lo, hi
 
 
 async def get_surprise_rolling_stats(
@@ -26,11 +42,13 @@ async def get_surprise_rolling_stats(
             WHERE indicator_id = $1
               AND release_date >= $2
               AND release_date <= $3
+              AND time >= $4 AND time < $5
               AND surprise IS NOT NULL
             """,
             indicator_id,
             start,
             as_of_date,
+            *_time_bounds(start, as_of_date),
         )
     if not row or row["mean_surprise"] is None:
         return None, None
@@ -39,6 +57,35 @@ async def get_surprise_rolling_stats(
     return mean_val, std_val
 
 
+def point_in_time_stats(
+    release_dates: Sequence[date],
+    surprises: Sequence[float],
+    window_days: int = 252,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (mean, std) per release over the releases in [release_date - window_days, release_date],
+    as get_surprise_rolling_stats at that date. Inputs sorted by release_date; std is the
+    sample std (NaN with one release), mean NaN never occurs since the window holds the release.
+    """
+    days = np.asarray(release_dates, dtype="datetime64[D]")
+    x = np.asarray(surprises, dtype=np.float64)
+    if not len(x):
+        return np.array([]), np.array([])
+    shift = x.mean()
+    x = x - shift  # centred sums keep the variance well conditioned
+    cs = np.concatenate([[0.0], np.cumsum(x)])
+    css = np.concatenate([[0.0], np.cumsum(x * x)])
+    lo = np.searchsorted(days, days - np.timedelta64(window_days, "D"), side="left")
+    hi = np.searchsorted(days, days, side="right")
+    n = (hi - lo).astype(np.float64)
+    total = cs[hi] - cs[lo]
+    mean = total / n
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var = (css[hi] - css[lo] - total * mean) / (n - 1)
+    std = np.where(n > 1, np.sqrt(np.maximum(var, 0.0)), np.nan)
+    return mean + shift, std
+
+
 def normalize_surprise(
     surprise: float,
     mean: float | None,
@@ -80,45 +127,94 @@ async def run_surprise_normalization(
     window_days: int | None = None,
     cap: float = 3.0,
     max_days_back: int = 30,
-) -> dict[str, int]:
+    indicator_ids: Collection[int] | None = None,
+    since: date | None = None,
+) -> dict[str, Any]:
     """
-    For each indicator, compute rolling mean/std of surprise, then update
-    surprise_normalized for observations in the last max_days_back days.
-    Returns counts: indicators_processed, rows_updated.
+    For each indicator (or only indicator_ids), update surprise_normalized for observations
+    in the last max_days_back days (or from since, if earlier: a revised old release or a
+    replay), each against the rolling mean/std of the window ending at its release_date.
+    Only values that changed are written. Returns counts: indicators_processed, rows_updated,
+    plus the indicator_ids that were updated and since, the earliest changed release date
+    (None if nothing changed).
     """
     cfg = get_settings().get_bias_engine_config()
     surprise_cfg = cfg.get("surprise", {})
     window_days = window_days or surprise_cfg.get("rolling_window_days", 252)
     cap = surprise_cfg.get("cap_std_multiple", cap)
 
-    async with get_conn() as conn:
-        indicator_rows = await conn.fetch("SELECT id FROM macro_indicator")
-    indicators = [r["id"] for r in indicator_rows]
+    if indicator_ids is None:
+        async with get_conn() as conn:
+            indicator_rows = await conn.fetch("SELECT id FROM macro_indicator")
+        indicators = [r["id"] for r in indicator_rows]
+    else:
+        indicators = sorted(set(indicator_ids))
     end_date = date.today()
     start_date = end_date - timedelta(days=max_days_back)
+    if since is not None and since < start_date:
+        start_date = since
+    stats_start = start_date - timedelta(days=window_days)
+    # Past the compression window only for replays and full-history units
+    await decompress_range("macro_observation", start_date, end_date)
     rows_updated = 0
+    updated_ids = []
+    first_changed: date | None = None
     for ind_id in indicators:
-        mean_s, std_s = await get_surprise_rolling_stats(ind_id, end_date, window_days)
         async with get_conn() as conn:
             obs = await conn.fetch(
                 """
-                SELECT time, release_date, surprise
+                SELECT time, release_date, surprise, surprise_normalized
                 FROM macro_observation
                 WHERE indicator_id = $1
                   AND release_date >= $2
                   AND release_date <= $3
+                  AND time >= $4 AND time < $5
                   AND surprise IS NOT NULL
-                ORDER BY release_date DESC
+                ORDER BY release_date
                 """,
                 ind_id,
-                start_date,
+                stats_start,
                 end_date,
+                *_time_bounds(stats_start, end_date),
             )
-        for row in obs:
-            sur = row["surprise"]
-            if sur is None:
+            if not obs:
                 continue
-            norm = normalize_surprise(float(sur), mean_s, std_s, cap=cap)
-            await update_surprise_normalized(ind_id, row["release_date"], norm)
-            rows_updated += 1
-    return {"indicators_processed": len(indicators), "rows_updated": rows_updated}
+            release_dates = [r["release_date"] for r in obs]
+            means, stds = point_in_time_stats(release_dates, [float(r["surprise"]) for r in obs], window_days)
+            updates = []
+            for r, m, sd in zip(obs, means.tolist(), stds.tolist()):
+                if r["release_date"] < start_date:
+                    continue
+                value = normalize_surprise(float(r["surprise"]), m, None if np.isnan(sd) else sd, cap=cap)
+                old = r["surprise_normalized"]
+                # Tolerance: the centring shift depends on the rows read, so unchanged stats
+                # can differ in the last bits between runs
+                if old is None or abs(float(old) - value) > 1e-9:
+                    updates.append((r["time"], ind_id, value))
+                    first_changed = min(first_changed or r["release_date"], r["release_date"])
+            if not updates:
+                continue
+            await conn.executemany(
+                "UPDATE macro_observation SET surprise_normalized = $3 WHERE time = $1 AND indicator_id = $2",
+                updates,
+            )
+        rows_updated += len(updates)
+        updated_ids.append(ind_id)
+    if updated_ids:
+        # A no-op run keeps the validators and wakes no worker
+        await invalidate("macro", since=first_changed)
+        await publish(
+            MACRO_DATA_UPDATED,
+            {
+                "stage": "processing",
+                "rows_updated": rows_updated,
+                "indicator_ids": updated_ids,
+                "since": first_changed.isoformat(),
+            },
+        )
+    return {
+        "indicators_processed": len(indicators),
+        "rows_updated": rows_updated,
+        "indicator_ids": updated_ids,
+        "since": first_changed.isoformat() if first_changed else None,
+    }
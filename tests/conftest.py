@@ -8,3 +8,25 @@ import pytest
 ROOT = Path(__file__).resolve().parent.parent
 if str(ROOT) not in os.environ.get("PYTHONPATH", ""):
     os.environ.setdefault("PYTHONPATH", str(ROOT))
+
+# Tests never talk to a real Redis; the in-process LRU keeps cache behaviour deterministic
+os.environ.setdefault("CACHE_BACKEND", "memory")
+# No database in unit/API tests: don't open the pool in the API lifespan
+os.environ.setdefault("DB_POOL_WARMUP", "false")
+# Events go to in-process queues instead of NOTIFY on a database that is not there
+os.environ.setdefault("EVENT_BUS_BACKEND", "memory")
+
+
+@pytest.fixture
+async def embedded(monkeypatch):
+    """A fresh in-memory embedded store behind get_conn() (DB_BACKEND=embedded)."""
+    from services.core import bus
+    from services.core.db import close_pool
+
+    monkeypatch.setenv("DB_BACKEND", "embedded")
+    monkeypatch.setenv("EMBEDDED_DB_PATH", ":memory:")
+    await close_pool()
+    bus.set_bus(None)
+    yield
+    await close_pool()
+    bus.set_bus(None)
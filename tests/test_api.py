@@ -12,6 +12,16 @@ if str(ROOT) not in os.environ.get("PYTHONPATH", ""):
     os.environ["PYTHONPATH"] = str(ROOT) + os.pathsep + os.environ.get("PYTHONPATH", "")
 
 
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    """Each test starts with an empty response cache."""
+    import services.core.cache as cache_mod
+
+    cache_mod._cache = None
+    yield
+    cache_mod._cache = None
+
+
 @pytest.fixture
 def client_no_db():
     """TestClient with DB mocked so fetch_all returns [] (no real DB needed)."""
@@ -89,3 +99,261 @@ def test_macro_latest_structure(client_no_db):
     assert "count" in j
     assert isinstance(j["observations"], list)
     assert j["count"] == 0
+
+
+def test_bias_scenario_uses_shared_context():
+    from services.bias_engine.context import ScoringContext
+
+    ctx = ScoringContext.from_rows(
+        [{"id": 5, "code": "neutral"}],
+        [{"id": 1, "code": "SPX", "region": "US"}],
+        [{"id": 7, "code": "GDP_QOQ", "direction": "positive"}],
+        [{"indicator_id": 7, "index_id": 1, "weight": 1.0, "regime_weights": None}],
+        {},
+    )
+    with patch("services.bias_engine.context.get_scoring_context", new_callable=AsyncMock, return_value=ctx):
+        r = client.post("/api/v1/bias/scenario", json={"surprises": {"GDP_QOQ": 1.0, "FOO": 2.0}})
+    assert r.status_code == 200
+    j = r.json()
+    assert j["unknown_indicators"] == ["FOO"]
+    assert j["scores"][0]["index"] == "SPX"
+    assert j["scores"][0]["bias_score"] > 0
+
+    with patch("services.bias_engine.context.get_scoring_context", new_callable=AsyncMock, return_value=ctx):
+        r = client.post("/api/v1/bias/scenario", json={"surprises": {"GDP_QOQ": 1.0}, "regime": "risk_of"})
+    assert r.status_code == 422
+    assert r.json()["detail"] == {"unknown_regime": "risk_of", "regimes": ["neutral"]}
+
+
+def test_summary_cached_until_invalidated():
+    from services.core.cache import invalidate
+
+    mock = AsyncMock(return_value=[])
+    with patch("services.core.db.fetch_all", mock):
+        with TestClient(app) as c:
+            assert c.get("/api/v1/bias/summary").status_code == 200
+            assert c.get("/api/v1/bias/summary").status_code == 200
+            assert mock.await_count == 1
+            c.portal.call(invalidate, "bias")
+            assert c.get("/api/v1/bias/summary").status_code == 200
+            assert mock.await_count == 2
+
+
+def test_conditional_get_returns_304_without_db():
+    from services.core.cache import invalidate
+
+    mock = AsyncMock(return_value=[])
+    with patch("services.core.db.fetch_all", mock):
+        with TestClient(app) as c:
+            r = c.get("/api/v1/bias/history?limit=5")
+            etag = r.headers["etag"]
+            assert r.headers["last-modified"]
+            assert mock.await_count == 1
+            r = c.get("/api/v1/bias/history?limit=5", headers={"If-None-Match": etag})
+            assert r.status_code == 304
+            assert mock.await_count == 1
+            # Different query -> different ETag
+            r = c.get("/api/v1/bias/history?limit=6", headers={"If-None-Match": etag})
+            assert r.status_code == 200
+            c.portal.call(invalidate, "bias")
+            r = c.get("/api/v1/bias/history?limit=5", headers={"If-None-Match": etag})
+            assert r.status_code == 200
+            assert r.headers["etag"] != etag
+
+
+def test_if_modified_since(client_no_db):
+    r = client_no_db.get("/api/v1/macro/latest")
+    lm = r.headers["last-modified"]
+    r = client_no_db.get("/api/v1/macro/latest", headers={"If-Modified-Since": lm})
+    assert r.status_code == 304
+    r = client_no_db.get("/api/v1/macro/latest", headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"})
+    assert r.status_code == 200
+
+
+def _fake_batches(batches):
+    async def gen(query, params, batch_rows=5000):
+        for b in batches:
+            yield b
+
+    return gen
+
+
+def test_export_csv_streams_batches():
+    from datetime import datetime, timezone
+
+    t = datetime(2024, 1, 2, tzinfo=timezone.utc)
+    batches = [[(t, "SPX", 12.5, 80.0, "low", "neutral")], [(t, "DAX", -3.0, 50.0, "medium", None)]]
+    with patch("services.api.export.stream_batches", _fake_batches(batches)):
+        r = client.get("/api/v1/export/csv?dataset=bias&from_date=2024-01-01")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    lines = r.text.strip().splitlines()
+    assert lines[0] == "time,index,bias_score,confidence_pct,risk_flag,regime"
+    assert lines[1].startswith("2024-01-02T00:00:00+00:00,SPX,12.5")
+    assert len(lines) == 3
+
+
+def test_export_parquet_roundtrip():
+    pq = pytest.importorskip("pyarrow.parquet")
+    import io
+    from datetime import date
+
+    batches = [[(date(2024, 1, 2), "CPI_YOY", 3.1, 3.0, 2.9, 0.1, 0.5, 1)]] * 3
+    with patch("services.api.export.stream_batches", _fake_batches(batches)):
+        r = client.get("/api/v1/export/parquet?dataset=macro")
+    assert r.status_code == 200
+    table = pq.read_table(io.BytesIO(r.content))
+    assert table.num_rows == 3
+    assert table.column("indicator").to_pylist() == ["CPI_YOY"] * 3
+
+
+def test_export_rejects_bad_input():
+    assert client.get("/api/v1/export/csv?dataset=nope").status_code == 400
+    assert client.get("/api/v1/export/csv?from_date=not-a-date").status_code == 400
+
+
+def test_bias_history_pages_with_cursor():
+    from datetime import datetime, timedelta, timezone
+
+    t0 = datetime(2024, 1, 10, tzinfo=timezone.utc)
+    rows = [
+        {"time": t0 - timedelta(days=k), "index_id": 1, "index_code": "SPX",
+         "bias_score": 10.0, "confidence_pct": 80.0, "risk_flag": "low"}
+        for k in range(3)
+    ]
+    mock = AsyncMock(return_value=rows)
+    with patch("services.core.db.fetch_all", mock):
+        r = client.get("/api/v1/bias/history?index=SPX&limit=2")
+    j = r.json()
+    assert j["count"] == 2
+    assert j["next_cursor"]
+    with patch("services.core.db.fetch_all", AsyncMock(return_value=rows[2:])) as mock:
+        r = client.get(f"/api/v1/bias/history?index=SPX&limit=2&cursor={j['next_cursor']}")
+    assert r.json()["next_cursor"] is None
+    assert t0 - timedelta(days=1) in mock.await_args.args
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=-5", "max_points=0", "max_points=1001"])
+def test_bias_history_rejects_out_of_range_params(query):
+    assert client.get(f"/api/v1/bias/history?{query}").status_code == 422
+
+
+@pytest.mark.parametrize("path", ["/api/v1/volatility/history", "/api/v1/yield-curve/history"])
+def test_market_history_bounds_max_points(path):
+    assert client.get(f"{path}?max_points=0").status_code == 422
+    assert client.get(f"{path}?max_points=10001").status_code == 422
+
+
+def test_bias_history_clamps_large_limit_and_pages():
+    from datetime import datetime, timedelta, timezone
+
+    t0 = datetime(2024, 1, 10, tzinfo=timezone.utc)
+    rows = [
+        {"time": t0 - timedelta(days=k), "index_id": 1, "index_code": "SPX",
+         "bias_score": 10.0, "confidence_pct": 80.0, "risk_flag": "low"}
+        for k in range(1001)
+    ]
+    with patch("services.core.db.fetch_all", AsyncMock(return_value=rows)) as mock:
+        r = client.get("/api/v1/bias/history?index=SPX&limit=5000")
+    assert r.status_code == 200 and mock.await_args.args[-1] == 1001
+    j = r.json()
+    assert j["count"] == 1000 and j["next_cursor"]
+
+
+def test_websocket_receives_broadcast_events():
+    from services.api.stream import broadcaster
+
+    with patch.object(broadcaster, "ensure_started", new_callable=AsyncMock):
+        with TestClient(app) as c:
+            with c.websocket_connect("/api/v1/ws") as ws:
+                c.portal.call(_wait_for_subscriber, broadcaster)
+                c.portal.call(_dispatch, broadcaster, "bias_computed", '{"date": "2024-01-02"}')
+                msg = ws.receive_json()
+    assert msg["event"] == "bias_computed"
+    assert msg["data"] == {"date": "2024-01-02"}
+    assert broadcaster.subscriber_count == 0
+
+
+async def _wait_for_subscriber(b):
+    import asyncio
+
+    while b.subscriber_count == 0:
+        await asyncio.sleep(0.01)
+
+
+async def _dispatch(b, channel, payload):
+    b.dispatch(channel, payload)
+
+
+def test_bias_matrix_columnar_layout():
+    from datetime import datetime, timezone
+
+    t1 = datetime(2024, 1, 2, tzinfo=timezone.utc)
+    t2 = datetime(2024, 1, 3, tzinfo=timezone.utc)
+    rows = [
+        {"index_code": "DAX", "dates": [t1, t2], "bias": [5.0, None], "confidence": [60.0, None], "risk_flag": ["medium", None]},
+        {"index_code": "SPX", "dates": [t1, t2], "bias": [10.0, 12.0], "confidence": [80.0, 82.0], "risk_flag": ["low", "low"]},
+    ]
+    with patch("services.core.db.fetch_all", AsyncMock(return_value=rows)) as mock:
+        r = client.get("/api/v1/bias/matrix?from_date=2024-01-01&to_date=2024-01-31&indices=SPX,DAX")
+    assert r.status_code == 200
+    j = r.json()
+    assert j["dates"] == ["2024-01-02", "2024-01-03"]
+    assert j["indices"] == ["DAX", "SPX"]
+    assert j["series"]["DAX"]["bias"] == [5.0, None]
+    assert j["series"]["SPX"]["risk_flag"] == ["low", "low"]
+    assert mock.await_args.args[3] == ["DAX", "SPX"]
+
+
+def test_bias_matrix_empty_and_bad_dates(client_no_db):
+    j = client_no_db.get("/api/v1/bias/matrix").json()
+    assert j["dates"] == [] and j["series"] == {}
+    assert client_no_db.get("/api/v1/bias/matrix?from_date=x").status_code == 400
+
+
+def test_correlation_rejects_bad_input():
+    assert client.get("/api/v1/correlation?kind=nope").status_code == 400
+    assert client.get("/api/v1/correlation?window=1").status_code == 400
+    assert client.get("/api/v1/correlation?as_of=yesterday").status_code == 400
+
+
+def test_volatility_history_from_weekly_aggregate():
+    from datetime import datetime, timezone
+
+    rows = [{"time": datetime(2024, 1, 1, tzinfo=timezone.utc), "open": 13.0, "high": 15.5,
+             "low": 12.9, "close": 14.1, "points": 5}]
+    with patch("services.core.db.fetch_all", AsyncMock(return_value=rows)) as mock:
+        r = client.get("/api/v1/volatility/history?symbol=VIX&bucket=1%20week")
+    j = r.json()
+    assert j["source"] == "volatility_weekly"
+    assert j["points"][0]["close"] == 14.1
+    assert "FROM volatility_weekly" in mock.await_args.args[0]
+
+
+def test_summary_prewarmed_on_event():
+    from datetime import datetime, timezone
+
+    from services.api.stream import broadcaster
+
+    rows = [{"time": datetime(2024, 1, 2, tzinfo=timezone.utc), "index": "SPX", "name": "S&P 500",
+             "bias_score": 12.5, "confidence_pct": 80.0, "risk_flag": "low", "regime": "neutral"}]
+    mock = AsyncMock(return_value=rows)
+    with patch("services.core.db.fetch_all", mock):
+        with TestClient(app) as c:
+            c.portal.call(broadcaster._refresh, "bias")
+            assert mock.await_count == 1
+            r = c.get("/api/v1/bias/summary")
+            assert mock.await_count == 1
+    assert r.json() == {
+        "date": "2024-01-02",
+        "scores": [{"index": "SPX", "name": "S&P 500", "bias_score": 12.5, "confidence_pct": 80.0,
+                    "risk_flag": "low", "regime": "neutral"}],
+    }
+
+
+def test_metrics_endpoint():
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    assert "# TYPE db_pool_acquire_seconds histogram" in r.text
+    assert "db_pool_size 0" in r.text
@@ -0,0 +1,85 @@
+"""Unit tests for per-route admission control and latency metrics."""
+import asyncio
+from unittest.mock import patch
+
+import httpx
+from fastapi import FastAPI
+
+import services.api.middleware as mw
+
+
+def _app(**limits):
+    app = FastAPI()
+    gate = asyncio.Event()
+
+    @app.get("/slow/{item}")
+    async def slow(item: str):
+        await gate.wait()
+        return {"item": item}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    app.add_middleware(mw.AdmissionMiddleware, pool_wait_budget=0, **limits)
+    return app, gate
+
+
+def _client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def test_queue_full_429_then_queued_requests_complete():
+    app, gate = _app(max_concurrency=1, max_queue=1, queue_timeout=5)
+    async with _client(app) as c:
+        first = asyncio.create_task(c.get("/slow/a"))
+        second = asyncio.create_task(c.get("/slow/b"))
+        await asyncio.sleep(0.05)
+        third = await c.get("/slow/c")
+        assert third.status_code == 429
+        assert third.headers["retry-after"] == "1"
+        gate.set()
+        assert (await first).status_code == 200
+        assert (await second).status_code == 200
+    assert mw.SHED.value(route="/slow/{item}", reason="queue_full") >= 1
+    assert mw.REQUEST_SECONDS.count(route="/slow/{item}", method="GET", status="200") >= 2
+
+
+async def test_queue_timeout_503():
+    app, gate = _app(max_concurrency=1, max_queue=5, queue_timeout=0.05)
+    async with _client(app) as c:
+        first = asyncio.create_task(c.get("/slow/a"))
+        await asyncio.sleep(0.02)
+        r = await c.get("/slow/b")
+        assert r.status_code == 503
+        assert r.json()["reason"] == "queue_timeout"
+        gate.set()
+        assert (await first).status_code == 200
+
+
+async def test_pool_wait_budget_sheds_but_probes_pass():
+    app = FastAPI()
+
+    @app.get("/data")
+    async def data():
+        return {}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    app.add_middleware(mw.AdmissionMiddleware, pool_wait_budget=0.1)
+    async with _client(app) as c:
+        with patch.object(mw, "recent_pool_wait", return_value=0.5):
+            r = await c.get("/data")
+            assert r.status_code == 503
+            assert r.json()["reason"] == "db_saturated"
+            assert (await c.get("/health")).status_code == 200
+        assert (await c.get("/data")).status_code == 200
+
+
+async def test_unknown_paths_share_a_label():
+    app, _ = _app()
+    async with _client(app) as c:
+        assert (await c.get("/nope/1")).status_code == 404
+    assert mw.REQUEST_SECONDS.count(route=mw.UNMATCHED, method="GET", status="404") >= 1
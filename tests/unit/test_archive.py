@@ -0,0 +1,77 @@
+"""Unit tests for the Parquet archive tier: export of closed years and hot/cold reads."""
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from scripts.synth_data import SynthSpec, generate, load
+
+pytest.importorskip("pyarrow")
+
+SPEC = SynthSpec(indicators=5, indices=3, years=3, seed=11)
+
+
+@pytest.fixture
+async def store(embedded, monkeypatch, tmp_path):
+    from services.core.db import get_conn
+    from services.processing.surprise import run_surprise_normalization
+
+    monkeypatch.setenv("ARCHIVE_DIR", str(tmp_path / "archive"))
+    async with get_conn() as conn:
+        await load(conn, generate(SPEC))
+    await run_surprise_normalization(since=SPEC.start)
+    return tmp_path / "archive"
+
+
+def _same(a, b):
+    assert a.keys() == b.keys()
+    for name in a:
+        if a[name].dtype.kind == "f":
+            np.testing.assert_array_equal(a[name], b[name])
+        else:
+            assert list(a[name]) == list(b[name]), name
+
+
+async def test_closed_years_are_archived_by_year_and_key(store, tmp_path):
+    from services.core.archive import archive_boundary, run_archive
+
+    r = await run_archive(["macro_observation"], hot_days=365)
+    first_hot = (date.today() - timedelta(days=365)).year
+    assert [e["year"] for e in r["macro_observation"]["exported"]] == list(range(SPEC.start.year, first_hot))
+    assert archive_boundary("macro_observation") == date(first_hot, 1, 1)
+    parts = sorted(p.relative_to(store).parts[1:3] for p in store.glob("macro_observation/year=*/*/part-0.parquet"))
+    assert parts[0] == (f"year={SPEC.start.year}", "indicator_id=1") and len({k for _, k in parts}) == 5
+    # Nothing new to do on a second run
+    assert (await run_archive(["macro_observation"], hot_days=365))["macro_observation"]["exported"] == []
+
+
+async def test_read_history_spans_archive_and_database(store, tmp_path):
+    from services.core.archive import drop_archived, read_history, run_archive
+
+    start, end = SPEC.start + timedelta(days=40), date.today()
+    everything = await read_history("macro_observation", start, end, directory=tmp_path / "empty")
+    assert len(everything["time"]) > 100
+
+    await run_archive(["macro_observation"], hot_days=365)
+    _same(await read_history("macro_observation", start, end), everything)
+    through = (await run_archive(["macro_observation"], hot_days=365))["macro_observation"]["through"]
+    await drop_archived("macro_observation", date.fromisoformat(through))
+    mixed = await read_history("macro_observation", start, end)
+    _same(mixed, everything)
+
+    one = await read_history("macro_observation", start, end, keys=[2], columns=["time", "indicator_id", "actual"])
+    assert set(one) == {"time", "indicator_id", "actual"} and set(one["indicator_id"]) == {2}
+    assert len(one["time"]) == int((everything["indicator_id"] == 2).sum())
+
+
+async def test_backfill_history_matches_per_day_queries(store):
+    from services.bias_engine.context import load_scoring_context
+    from services.bias_engine.scorer import SurpriseHistory, get_latest_surprises
+    from services.core.archive import run_archive
+
+    await run_archive(["macro_observation"], hot_days=365)
+    ctx = await load_scoring_context()
+    days = [date.today() - timedelta(days=n) for n in (0, 3, 17, 200)]
+    history = await SurpriseHistory.load(min(days), max(days), ctx)
+    for d in days:
+        assert history.latest(d) == await get_latest_surprises(d)
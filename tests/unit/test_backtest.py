@@ -0,0 +1,141 @@
+"""Unit tests for the backtest: price loading, timezone alignment and the vectorized sweep."""
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+import pytest
+
+from services.backtest.engine import Grid, Panel, align, bucket_returns, sweep
+from services.backtest.prices import PriceSeries, load_prices
+
+
+def _bias(days: list[date], index_id: int, scores: list[float], confidence: float = 50.0) -> dict[str, np.ndarray]:
+    return {
+        "time": np.array(days, dtype="datetime64[D]").astype("datetime64[us]"),
+        "index_id": np.full(len(days), index_id),
+        "bias_score": np.array(scores, dtype=np.float64),
+        "confidence_pct": np.full(len(days), confidence),
+    }
+
+
+def test_load_prices_long_and_wide(tmp_path):
+    long = tmp_path / "long.csv"
+    long.write_text("date,code,close\n2024-01-03,B,11\n2024-01-02,A,100\n2024-01-02,B,10\n2024-01-03,A,\n")
+    wide = tmp_path / "wide.csv"
+    wide.write_text("Date,A,B\n2024-01-02T15:30:00,100,10\n2024-01-03T15:30:00,,11\n")
+    a = load_prices(long)
+    assert a["A"].stamps == (date(2024, 1, 2),) and a["B"].close.tolist() == [10.0, 11.0]
+    b = load_prices(wide, codes=["B"])
+    assert list(b) == ["B"] and b["B"].stamps[1] == datetime(2024, 1, 3, 15, 30)
+    utc, days = b["B"].instants("Asia/Tokyo")
+    assert str(utc[0]) == "2024-01-02T06:30:00.000000" and str(days[1]) == "2024-01-03"
+
+
+def test_align_uses_the_bias_known_at_each_local_close():
+    days = [date(2024, 3, 4) + timedelta(days=i) for i in range(4)]  # Mon..Thu
+    closes = np.array([100.0, 101.0, 102.0, 103.0])
+    prices = {c: PriceSeries(c, tuple(days), closes) for c in ("NY", "TK")}
+    indices = {"NY": (1, "America/New_York"), "TK": (2, "Asia/Tokyo")}
+    ny, tk = _bias(days, 1, [10, 20, 30, 40]), _bias(days, 2, [10, 20, 30, 40])
+    bias = {k: np.concatenate([ny[k], tk[k]]) for k in ny}
+    p = align(prices, indices, bias, close_times={"TK": time(15, 0)})
+    # New York closes at 21:00 UTC, before the day's bias is out; Tokyo closes the next morning UTC
+    assert np.isnan(p.bias[0, 0]) and p.bias[1:, 0].tolist() == [10, 20, 30]
+    assert np.isnan(p.bias[0, 1]) and p.bias[1:, 1].tolist() == [10, 20, 30]
+    late = align(prices, indices, bias, close_times={"TK": time(15, 0)}, lag_hours=8)
+    assert late.bias[1:, 0].tolist() == [10, 20, 30] and np.isnan(late.bias[1, 1]) and late.bias[2:, 1].tolist() == [10, 20]
+
+
+def _random_panel(rng: np.random.Generator, t_len: int = 120, lengths: tuple[int, ...] = (120, 100, 90)) -> Panel:
+    n = len(lengths)
+    close = np.full((t_len, n), np.nan)
+    bias = np.full((t_len, n), np.nan)
+    conf = np.full((t_len, n), np.nan)
+    row = np.full((t_len, n), -1)
+    for j, m in enumerate(lengths):
+        close[:m, j] = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, m)))
+        bias[:m, j] = rng.uniform(-100, 100, m)
+        bias[:5, j] = np.nan
+        conf[:m, j] = rng.uniform(0, 100, m)
+        row[:m, j] = np.sort(rng.choice(t_len + 20, m, replace=False))
+    days = np.arange(t_len + 20).astype("datetime64[D]")
+    return Panel(["A", "B", "C"], [1, 2, 3], days, row, close, bias, conf, np.array(lengths))
+
+
+def _reference(p: Panel, threshold: float, horizon: int, min_conf: float) -> tuple[list, list]:
+    """Per index then all: (trades, hit rate, mean return), and Sharpe, with plain loops."""
+    stats, daily_by_index = [], []
+    for j, m in enumerate(p.lengths):
+        c, b, conf = p.close[:m, j], p.bias[:m, j], p.confidence[:m, j]
+        pos = [np.sign(b[t]) if not np.isnan(b[t]) and abs(b[t]) >= threshold and (min_conf <= 0 or conf[t] >= min_conf) else 0.0 for t in range(m)]
+        trades = [pos[t] * (c[t + horizon] / c[t] - 1) for t in range(m - horizon) if pos[t] != 0]
+        stats.append(trades)
+        daily = {}
+        for t in range(m - 1):
+            if not np.isnan(b[t]):
+                held = sum(pos[t - i] for i in range(horizon) if t - i >= 0) / horizon
+                daily[p.row[t, j]] = held * (c[t + 1] / c[t] - 1)
+        daily_by_index.append(daily)
+    stats.append([x for s in stats for x in s])
+    sharpes = [_sr(list(d.values())) for d in daily_by_index]
+    port = {}
+    for d in daily_by_index:
+        for r, v in d.items():
+            port.setdefault(r, []).append(v)
+    sharpes.append(_sr([np.mean(v) for v in port.values()]))
+    return [(len(s), np.mean([x > 0 for x in s]), np.mean(s)) for s in stats], sharpes
+
+
+def _sr(x: list[float]) -> float:
+    return np.mean(x) / np.std(x) * np.sqrt(252)
+
+
+def test_sweep_matches_a_loop_reference():
+    p = _random_panel(np.random.default_rng(7))
+    grid = Grid(np.array([0.0, 25.0, 60.0]), np.array([1, 3]), np.array([0.0, 50.0]))
+    r = sweep(p, grid, chunk_cells=400)  # several threshold chunks
+    for h, horizon in enumerate(grid.horizons):
+        for c, min_conf in enumerate(grid.min_confidence):
+            for k, threshold in enumerate(grid.thresholds):
+                stats, sharpes = _reference(p, threshold, int(horizon), min_conf)
+                for j, (trades, hit, mean) in enumerate(stats):
+                    assert r.trades[h, c, k, j] == trades
+                    assert r.hit_rate[h, c, k, j] == pytest.approx(hit)
+                    assert r.mean_return[h, c, k, j] == pytest.approx(mean)
+                np.testing.assert_allclose(r.sharpe[h, c, k], sharpes, rtol=1e-9)
+    assert r.best(n=3, min_trades=1)[0]["sharpe"] == pytest.approx(np.nanmax(r.sharpe[..., -1]), abs=1e-6)
+    assert len(r.rows()) == grid.size * 4
+
+
+def test_buckets_and_a_large_grid():
+    rng = np.random.default_rng(1)
+    p = _random_panel(rng, 2600, (2600, 2500, 2550, 2600, 2450, 2600, 2500, 2600))
+    p.codes = [f"I{j}" for j in range(8)]
+    # bias predicts the next return: positive buckets go up, negative ones down
+    p.bias[:-1] = np.clip(np.sign(p.forward(1)[:-1]) * rng.uniform(0, 100, p.bias[:-1].shape), -100, 100)
+    report = [b for b in bucket_returns(p, [1]) if b["index"] == "all"]
+    assert sum(b["count"] for b in report) == int((~np.isnan(p.bias) & ~np.isnan(p.forward(1))).sum())
+    assert report[0]["mean_return"] < 0 < report[-1]["mean_return"] and report[-1]["hit_rate"] == 1.0
+    grid = Grid(np.arange(0, 100, 0.5), [1, 5, 10, 20, 60], [0, 20, 40, 60, 80])
+    r = sweep(p, grid)
+    assert grid.size == 5000 and r.hit_rate[0, 0, :, -1].min() == 1.0
+
+
+async def test_run_backtest_on_stored_scores(embedded, tmp_path):
+    from scripts.embedded import replay
+    from scripts.synth_data import SynthSpec, generate, load
+    from services.backtest.run import run_backtest
+    from services.core.db import get_conn
+
+    spec = SynthSpec(indicators=5, indices=2, years=1, seed=2)
+    async with get_conn() as conn:
+        await load(conn, generate(spec))
+    start = spec.end - timedelta(days=59)
+    await replay(start, spec.end)
+    days = [start + timedelta(days=i) for i in range(60) if (start + timedelta(days=i)).weekday() < 5]
+    rows = [f"{d.isoformat()},{c},{100 + i + j}" for i, d in enumerate(days) for j, c in enumerate(("SYN_IDX_000", "SYN_IDX_001", "OTHER"))]
+    path = tmp_path / "prices.csv"
+    path.write_text("date,code,close\n" + "\n".join(rows) + "\n")
+    r = await run_backtest(path, None, None, np.array([0.0, 10.0]), np.array([1, 5]), np.array([0.0]), out=tmp_path / "grid.csv")
+    assert r["indices"] == ["SYN_IDX_000", "SYN_IDX_001"] and r["closes"] == 2 * len(days)
+    assert r["signals"] == 2 * (len(days) - 1) and r["combinations"] == 4
+    assert len((tmp_path / "grid.csv").read_text().splitlines()) == 1 + 4 * 3
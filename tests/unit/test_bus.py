@@ -0,0 +1,109 @@
+"""Unit tests for the event bus backends (in-process queues, Redis Streams semantics)."""
+import asyncio
+from datetime import date
+
+from services.core.bus import Event, MemoryBus, RedisStreamsBus, decode
+
+
+class FakeStreams:
+    """The handful of Redis Streams commands RedisStreamsBus uses, with consumer-group semantics."""
+
+    def __init__(self):
+        self.streams: dict[str, list[tuple[bytes, dict]]] = {}
+        self.groups: dict[tuple[str, str], dict] = {}
+        self.seq = 0
+
+    async def xadd(self, name, fields, maxlen=None, approximate=True):
+        self.seq += 1
+        eid = f"{self.seq}-0".encode()
+        self.streams.setdefault(name, []).append((eid, {k.encode(): v.encode() for k, v in fields.items()}))
+        return eid
+
+    async def xgroup_create(self, name, group, id="$", mkstream=False):
+        if (name, group) in self.groups:
+            raise Exception("BUSYGROUP Consumer Group name already exists")
+        self.streams.setdefault(name, [])
+        self.groups[(name, group)] = {"last": len(self.streams[name]), "pending": {}}
+
+    async def xreadgroup(self, group, consumer, streams, count=None, block=None):
+        ((name, start),) = streams.items()
+        g = self.groups[(name, group)]
+        if start == "0":
+            entries = [e for e in self.streams[name] if g["pending"].get(e[0]) == consumer][:count]
+        else:
+            entries = self.streams[name][g["last"]:][:count]
+            g["last"] += len(entries)
+            for eid, _ in entries:
+                g["pending"][eid] = consumer
+        return [[name.encode(), entries]] if entries else []
+
+    async def xack(self, name, group, *ids):
+        for i in ids:
+            self.groups[(name, group)]["pending"].pop(i.encode(), None)
+
+    async def aclose(self):
+        pass
+
+
+async def test_memory_bus_fans_out_per_group():
+    bus = MemoryBus()
+    await bus.ensure_group("ch", "a")
+    await bus.ensure_group("ch", "b")
+    await bus.publish("ch", {"n": 1})
+    await bus.publish("other", {"n": 2})
+    await bus.publish("ch", {"n": 3})
+    a = await bus.read("ch", "a", "c1", timeout=0.1)
+    assert [e.data["n"] for e in a] == [1, 3]
+    assert [e.data["n"] for e in await bus.read("ch", "b", "c1", timeout=0.1)] == [1, 3]
+    assert await bus.read("ch", "a", "c1", timeout=0.01) == []
+
+
+async def test_memory_bus_read_waits_for_first_event():
+    bus = MemoryBus()
+    await bus.ensure_group("ch", "g")
+    reader = asyncio.create_task(bus.read("ch", "g", "c", timeout=1.0))
+    await asyncio.sleep(0.01)
+    await bus.publish("ch", {"x": 1})
+    (event,) = await reader
+    assert event.data == {"x": 1} and event.group == "g"
+
+
+async def test_redis_streams_group_ack_and_redelivery():
+    client = FakeStreams()
+    bus = RedisStreamsBus(client, mirror_notify=False)
+    await bus.ensure_group("ch", "g")
+    await bus.publish("ch", {"n": 1})
+    await bus.publish("ch", {"n": 2})
+    events = await bus.read("ch", "g", "w1", timeout=0.01)
+    assert [e.data["n"] for e in events] == [1, 2]
+    await bus.ack(events[:1])
+
+    # Worker restarts before acking n=2: the new bus instance re-reads it first
+    restarted = RedisStreamsBus(client, mirror_notify=False)
+    again = await restarted.read("ch", "g", "w1", timeout=0.01)
+    assert [e.data["n"] for e in again] == [2]
+    await restarted.ack(again)
+    await restarted.publish("ch", {"n": 3})
+    assert [e.data["n"] for e in await restarted.read("ch", "g", "w1", timeout=0.01)] == [3]
+
+
+def test_decode_tolerates_bad_payloads():
+    assert decode(None) == {}
+    assert decode(b'{"a": 1}') == {"a": 1}
+    assert decode("[1]") == {"value": [1]}
+    assert decode("not json") == {"raw": "not json"}
+    assert Event("c", {}).id == ""
+
+
+def test_oversized_notify_is_split_not_truncated():
+    from services.core.bus import MAX_NOTIFY_BYTES, notify_bodies
+    from services.orchestration.workers import merge_changes
+
+    data = {"stage": "processing", "indicator_ids": list(range(100000, 103000)), "since": "2024-03-01"}
+    bodies = notify_bodies(data)
+    assert len(bodies) > 1 and all(len(b.encode()) <= MAX_NOTIFY_BYTES for b in bodies)
+    events = [Event("macro_data_updated", decode(b)) for b in bodies]
+    assert not any("truncated" in e.data for e in events)
+    assert merge_changes(events, "processing") == (set(data["indicator_ids"]), date(2024, 3, 1))
+    assert notify_bodies({"n": 1}) == ['{"n": 1}']
+    assert decode(notify_bodies({"blob": {"x": "y" * MAX_NOTIFY_BYTES}, "n": 1})[0]) == {"truncated": True, "n": 1}
@@ -0,0 +1,180 @@
+"""Unit tests for the in-process response cache and the cache facade."""
+import asyncio
+
+from services.core.cache import MemoryCache, ResponseCache
+
+
+class TestMemoryCache:
+    async def test_lru_eviction(self):
+        c = MemoryCache(max_entries=2)
+        await c.set("bias", "a", 1)
+        await c.set("bias", "b", 2)
+        await c.get("bias", "a")
+        await c.set("bias", "c", 3)
+        assert await c.get("bias", "a") == 1
+        assert await c.get("bias", "b") is None
+
+    async def test_ttl_expiry(self):
+        c = MemoryCache(ttl_seconds=-1)
+        await c.set("bias", "a", 1)
+        assert await c.get("bias", "a") is None
+
+    async def test_invalidate_namespace_only(self):
+        c = MemoryCache()
+        await c.set("bias", "a", 1)
+        await c.set("macro", "a", 2)
+        await c.invalidate("bias")
+        assert await c.get("bias", "a") is None
+        assert await c.get("macro", "a") == 2
+
+    async def test_version_stored_until_invalidated(self):
+        c = MemoryCache()
+        assert await c.version("bias") is None
+        await c.set_version("bias", {"v": "3", "ts": 1.0})
+        assert await c.version("bias") == {"v": "3", "ts": 1.0}
+        await c.invalidate("bias", {"v": "4", "ts": 2.0})
+        assert await c.version("bias") == {"v": "4", "ts": 2.0}
+        await c.invalidate("bias")
+        assert await c.version("bias") is None
+
+
+async def test_version_is_persisted_and_shared_by_workers(embedded):
+    from services.core.cache import invalidate
+
+    workers = [ResponseCache(m, m) for m in (MemoryCache(), MemoryCache(ttl_seconds=-1))]
+    first = [await w.version("bias") for w in workers]
+    assert first[0] == first[1] == {"v": "0", "ts": 0.0}
+    # expiry re-reads the same record: no data change, no new validator
+    assert await workers[1].version("bias") == first[1]
+
+    await invalidate("bias")  # a writer commits (this process's cache is separate)
+    assert await workers[0].version("bias") == first[0]  # cached until refreshed or expired
+    for w in workers:
+        await w.invalidate("bias")  # what refresh() does in each API process on the event
+    after = [await w.version("bias") for w in workers]
+    assert after[0] == after[1] and after[0]["v"] == "1" and after[0]["ts"] > 0
+    assert await workers[0].version("macro") == first[0]
+
+
+async def test_changed_since_covers_the_missed_versions(embedded):
+    from datetime import date
+
+    from services.core.cache import changed_since, invalidate
+
+    await invalidate("bias", since=date(2024, 3, 5))
+    await invalidate("bias", since=date(2024, 3, 1))
+    await invalidate("macro", since=date(2020, 1, 1))
+    await invalidate("bias", since=date(2024, 3, 9))
+    assert await changed_since("bias", "0", "3") == date(2024, 3, 1)
+    assert await changed_since("bias", "2", "3") == date(2024, 3, 9)
+    assert await changed_since("bias", "3", "3") is None
+    assert await changed_since("bias", "3", "5") is None  # versions not in the log
+    assert await changed_since("bias", "a1b2", "3") is None  # process-local version
+    await invalidate("bias")  # a write that does not know its day
+    assert await changed_since("bias", "2", "4") is None
+
+
+class _FlakyBackend(MemoryCache):
+    """A Redis stand-in that fails while down."""
+
+    def __init__(self):
+        super().__init__()
+        self.down = True
+        self.calls = 0
+
+    async def get(self, namespace, key):
+        self.calls += 1
+        if self.down:
+            raise ConnectionError("redis down")
+        return await super().get(namespace, key)
+
+    async def invalidate(self, namespace, version=None):
+        if self.down:
+            raise ConnectionError("redis down")
+        await super().invalidate(namespace, version)
+
+
+class _FakeRedis:
+    """HGET/HSET/HDEL and a pipeline, enough for RedisCache entries."""
+
+    def __init__(self):
+        self.hashes: dict[str, dict[str, bytes]] = {}
+
+    async def hget(self, name, key):
+        return self.hashes.get(name, {}).get(key)
+
+    async def hdel(self, name, key):
+        self.hashes.get(name, {}).pop(key, None)
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipe:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            def hset(self, name, key, value):
+                redis.hashes.setdefault(name, {})[key] = value
+
+            def expire(self, name, seconds):
+                pass
+
+            async def execute(self):
+                return []
+
+        return Pipe()
+
+
+class TestResponseCache:
+    async def test_concurrent_misses_build_once(self):
+        mem = MemoryCache()
+        cache = ResponseCache(mem, mem)
+        calls = 0
+
+        async def build():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"ok": True}
+
+        out = await asyncio.gather(*(cache.get_or_set("bias", "summary", build) for _ in range(10)))
+        assert calls == 1
+        assert all(o == {"ok": True} for o in out)
+
+    async def test_backend_error_falls_back_per_call_and_retries_later(self):
+        mem, redis = MemoryCache(), _FlakyBackend()
+        cache = ResponseCache(redis, mem, retry_seconds=60)
+        assert await cache.get("bias", "summary") is None
+        assert cache.backend is redis and redis.calls == 1
+        await cache.set("bias", "summary", {"x": 1})
+        assert await cache.get("bias", "summary") == {"x": 1} and redis.calls == 1  # backing off
+        await redis.set("macro", "latest", {"stale": True})
+        await cache.invalidate("macro")  # missed by Redis while down
+        redis.down = False
+        cache._retry_at = 0.0  # backoff elapsed
+        assert await cache.get("macro", "latest") is None  # replayed before serving from Redis
+        assert redis.calls == 2
+
+    async def test_redis_entries_expire_individually(self, monkeypatch):
+        from services.core import cache as cache_mod
+
+        redis = cache_mod.RedisCache(_FakeRedis(), ttl_seconds=10)
+        now = 1_000_000.0
+        monkeypatch.setattr(cache_mod.time, "time", lambda: now)
+        await redis.set("bias", "old", {"n": 1})
+        now += 8
+        await redis.set("bias", "new", b"raw")
+        now += 5
+        assert await redis.get("bias", "old") is None and await redis.get("bias", "new") == b"raw"
+
+    async def test_disabled_always_builds(self):
+        cache = ResponseCache(None, MemoryCache())
+
+        async def build():
+            return 1
+
+        assert await cache.get_or_set("bias", "x", build) == 1
+        assert await cache.get("bias", "x") is None
@@ -0,0 +1,139 @@
+"""Unit tests for vectorized and rolling correlation."""
+from datetime import date, timedelta
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+
+from services.processing.correlation import (
+    NAMESPACES,
+    SURPRISE_STALE_DAYS,
+    CorrelationCache,
+    RollingCorrelation,
+    forward_fill,
+    pairwise_corr,
+)
+
+
+def _panel(t: int = 60, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    a = rng.normal(size=t)
+    return np.column_stack([a, 0.5 * a + rng.normal(size=t), -a, rng.normal(size=t)])
+
+
+class TestPairwiseCorr:
+    def test_matches_numpy_without_gaps(self):
+        x = _panel()
+        corr, n = pairwise_corr(x)
+        assert corr == pytest.approx(np.corrcoef(x, rowvar=False))
+        assert (n == len(x)).all()
+
+    def test_pairwise_complete_with_gaps(self):
+        x = _panel()
+        x[::3, 1] = np.nan
+        corr, n = pairwise_corr(x)
+        both = ~np.isnan(x[:, 1])
+        expected = np.corrcoef(x[both, 0], x[both, 1])[0, 1]
+        assert corr[0, 1] == pytest.approx(expected)
+        assert n[0, 1] == both.sum()
+
+    def test_constant_series_undefined(self):
+        x = _panel()
+        x[:, 3] = 1.0
+        corr, _ = pairwise_corr(x)
+        assert np.isnan(corr[0, 3])
+
+
+class TestRollingCorrelation:
+    def test_equals_batch_over_window(self):
+        x = _panel(100)
+        x[5:9, 2] = np.nan
+        rc = RollingCorrelation(4, window=30)
+        for row in x:
+            rc.push(row)
+        corr, _ = rc.matrix()
+        expected, _ = pairwise_corr(x[-30:])
+        np.testing.assert_allclose(corr, expected, atol=1e-9)
+
+
+def test_forward_fill_stale_limit():
+    x = np.array([[1.0], [np.nan], [np.nan], [np.nan]])
+    last, age = np.full(1, np.nan), np.full(1, 10**6)
+    out = forward_fill(x, last, age, stale_days=2)
+    assert out[:3, 0].tolist() == [1.0, 1.0, 1.0]
+    assert np.isnan(out[3, 0])
+
+
+class TestCorrelationCache:
+    async def test_incremental_advance_loads_only_new_days(self):
+        start = date(2024, 1, 1)
+        x = _panel(40)
+        rows = [
+            {"day": start + timedelta(days=t), "label": label, "value": x[t, k]}
+            for t in range(40)
+            for k, label in enumerate("ABCD")
+        ]
+        calls = []
+
+        async def fake_load(kind, start_excl, end):
+            calls.append((start_excl, end))
+            return [r for r in rows if start_excl < r["day"] <= end]
+
+        cache = CorrelationCache()
+        with patch("services.processing.correlation.load_daily_values", fake_load):
+            first = await cache.get("bias", 20, start + timedelta(days=30), "v1")
+            again = await cache.get("bias", 20, start + timedelta(days=30), "v1")
+            later = await cache.get("bias", 20, start + timedelta(days=35), "v1")
+        assert again is first
+        assert len(calls) == 2
+        assert calls[1] == (start + timedelta(days=30), start + timedelta(days=35))
+        expected, _ = pairwise_corr(x[16:36])
+        np.testing.assert_allclose(np.array(later["matrix"], dtype=float), expected, atol=1e-4)
+        assert later["labels"] == ["A", "B", "C", "D"]
+
+        # a new version may rewrite days already pushed: rebuild instead of advancing
+        x[33, 0] += 5.0
+        for r in rows:
+            if r["day"] == start + timedelta(days=33) and r["label"] == "A":
+                r["value"] = x[33, 0]
+        with patch("services.processing.correlation.load_daily_values", fake_load):
+            rewritten = await cache.get("bias", 20, start + timedelta(days=36), "v2")
+        assert calls[2][1] == start + timedelta(days=36) and calls[2][0] < start + timedelta(days=33)
+        expected, _ = pairwise_corr(x[17:37])
+        np.testing.assert_allclose(np.array(rewritten["matrix"], dtype=float), expected, atol=1e-4)
+
+    @pytest.mark.parametrize("kind", ["bias", "surprise"])
+    async def test_new_version_repushes_only_from_the_changed_day(self, kind):
+        start = date(2024, 1, 1)
+        x = _panel(60, seed=3)
+        x[::4, 1] = np.nan  # gaps for the surprise forward fill
+        rows = [
+            {"day": start + timedelta(days=t), "label": label, "value": x[t, k]}
+            for t in range(60)
+            for k, label in enumerate("ABCD")
+            if not np.isnan(x[t, k])
+        ]
+        calls = []
+
+        async def fake_load(kind, start_excl, end):
+            calls.append((start_excl, end))
+            return [r for r in rows if start_excl < r["day"] <= end]
+
+        changed = start + timedelta(days=40)
+        cache, fresh = CorrelationCache(), CorrelationCache()
+        with patch("services.processing.correlation.load_daily_values", fake_load), \
+             patch("services.core.cache.changed_since", AsyncMock(return_value=changed)) as since:
+            await cache.get(kind, 20, start + timedelta(days=45), "7")
+            for r in rows:
+                if r["day"] == changed:
+                    r["value"] += 3.0
+            calls.clear()
+            r = await cache.get(kind, 20, start + timedelta(days=50), "9")
+            since.assert_awaited_once_with(NAMESPACES[kind], "7", "9")
+            lookback = SURPRISE_STALE_DAYS if kind == "surprise" else 0
+            assert calls == [(changed - timedelta(days=lookback + 1), start + timedelta(days=50))]
+            expected = await fresh.get(kind, 20, start + timedelta(days=50), "9")
+        np.testing.assert_allclose(
+            np.array(r["matrix"], dtype=float), np.array(expected["matrix"], dtype=float), atol=1e-4
+        )
+        assert r["observations"] == expected["observations"]
@@ -0,0 +1,147 @@
+"""Unit tests for the pipeline DAG executor (ordering, concurrency, checkpoints, resume)."""
+import asyncio
+from datetime import date
+
+import pytest
+
+from services.orchestration.dag import CheckpointStore, CpuTimed, Pipeline, Stage, run_pipeline
+from services.orchestration.daily import build_daily_pipeline
+
+
+def _stage(name, needs=(), provides=(), log=None, fail=False, delay=0.0):
+    async def fn(inputs):
+        if log is not None:
+            log.append(("start", name, dict(inputs)))
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError(f"{name} broke")
+        if log is not None:
+            log.append(("end", name))
+        return {"n": len(inputs), **{k: f"{name}:{k}" for k in provides}}
+
+    return Stage(name, fn, needs=needs, provides=provides, rows="n")
+
+
+def _run(pipeline, store, records, **kw):
+    return run_pipeline(pipeline, store, emit=records.append, **kw)
+
+
+class TestPipeline:
+    def test_validation(self):
+        with pytest.raises(ValueError, match="no stage provides"):
+            Pipeline("p", [_stage("a", needs=("x",))])
+        with pytest.raises(ValueError, match="provided by both"):
+            Pipeline("p", [_stage("a", provides=("x",)), _stage("b", provides=("x",))])
+        with pytest.raises(ValueError, match="Cycle"):
+            Pipeline("p", [_stage("a", needs=("y",), provides=("x",)), _stage("b", needs=("x",), provides=("y",))])
+
+    def test_order_and_dependents(self):
+        p = Pipeline("p", [
+            _stage("c", needs=("a", "b"), provides=("c",)),
+            _stage("a", provides=("a",)),
+            _stage("b", needs=("a",), provides=("b",)),
+            _stage("d", provides=("d",)),
+        ])
+        assert p.order.index("a") < p.order.index("b") < p.order.index("c")
+        assert p.dependents("a") == {"b", "c"}
+        assert p.dependents("d") == set()
+
+
+async def test_independent_stages_run_concurrently(tmp_path):
+    log: list = []
+    p = Pipeline("p", [
+        _stage("src1", provides=("s1",), log=log, delay=0.05),
+        _stage("src2", provides=("s2",), log=log, delay=0.05),
+        _stage("join", needs=("s1", "s2"), provides=("j",), log=log),
+    ])
+    records: list = []
+    summary = await _run(p, CheckpointStore(tmp_path, "p", "k"), records)
+    assert summary["status"] == "done"
+    # both sources start before either ends; join sees both outputs
+    assert [e[0] for e in log[:2]] == ["start", "start"]
+    assert log[-2] == ("start", "join", {"s1": "src1:s1", "s2": "src2:s2"})
+    stage_records = {r["stage"]: r for r in records if r["event"] == "stage"}
+    assert stage_records["join"]["rows"] == 2
+    assert stage_records["src1"]["wall_s"] >= 0.04
+    assert records[-1]["event"] == "pipeline"
+
+
+async def test_concurrency_limit(tmp_path):
+    log: list = []
+    p = Pipeline("p", [_stage(f"s{i}", provides=(f"k{i}",), log=log, delay=0.01) for i in range(3)])
+    await _run(p, CheckpointStore(tmp_path, "p", "k"), [], concurrency=1)
+    assert [e[0] for e in log] == ["start", "end"] * 3
+
+
+async def test_failure_skips_dependents_then_resume(tmp_path):
+    calls: list = []
+    broken = {"b": True}
+
+    def stage(name, needs=(), provides=()):
+        async def fn(inputs):
+            calls.append(name)
+            if broken.get(name):
+                raise RuntimeError("boom")
+            return {k: name for k in provides}
+        return Stage(name, fn, needs=needs, provides=provides)
+
+    stages = [
+        stage("a", provides=("a",)),
+        stage("b", needs=("a",), provides=("b",)),
+        stage("c", needs=("b",), provides=("c",)),
+        stage("side", needs=("a",), provides=("side",)),
+    ]
+    records: list = []
+    summary = await _run(Pipeline("p", stages), CheckpointStore(tmp_path, "p", "2024-01-02"), records)
+    assert summary["status"] == "failed"
+    assert summary["stages"] == {"a": "done", "b": "failed", "c": "skipped", "side": "done"}
+    failed = next(r for r in records if r.get("stage") == "b")
+    assert failed["error"] == "RuntimeError: boom"
+
+    broken.clear()
+    calls.clear()
+    store = CheckpointStore(tmp_path, "p", "2024-01-02").load()
+    summary = await _run(Pipeline("p", stages), store, [])
+    assert summary["status"] == "done"
+    assert sorted(calls) == ["b", "c"]
+    assert summary["stages"]["a"] == "cached" and summary["stages"]["c"] == "done"
+
+
+async def test_missing_provided_key_fails_stage(tmp_path):
+    async def fn(inputs):
+        return {}
+
+    summary = await _run(Pipeline("p", [Stage("a", fn, provides=("x",))]), CheckpointStore(tmp_path, "p", "k"), [])
+    assert summary["stages"] == {"a": "failed"}
+
+
+async def test_cpu_timed_counts_own_steps_and_propagates():
+    async def busy():
+        sum(range(200_000))
+        await asyncio.sleep(0)
+        return 7
+
+    timed = CpuTimed(busy())
+    assert await timed == 7
+    assert timed.cpu > 0
+
+    async def boom():
+        await asyncio.sleep(0)
+        raise ValueError("x")
+
+    with pytest.raises(ValueError):
+        await CpuTimed(boom())
+
+
+def test_daily_pipeline_shape():
+    p = build_daily_pipeline(date(2024, 1, 2), seed_weights=True)
+    assert p.order[0] == "seed_metadata"
+    assert "ingest:FRED" in p.stages
+    assert p.deps["normalize_surprises"] == {"ingest:FRED"}
+    regions = [n for n in p.order if n.startswith("bias:")]
+    assert regions == ["bias:EU", "bias:JP", "bias:US"]
+    assert p.deps["bias:US"] == {"normalize_surprises", "seed_weights"}
+
+    p = build_daily_pipeline(date(2024, 1, 2), skip_ingestion=True, skip_bias=True)
+    assert p.order == ["normalize_surprises", "features"]
+    assert p.deps["features"] == {"normalize_surprises"}
@@ -0,0 +1,64 @@
+"""Unit tests for primary/replica read routing in services.core.db."""
+import itertools
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+import services.core.db as db
+
+
+def _pool(name):
+    pool = MagicMock(name=name)
+    conn = MagicMock(name=f"{name}-conn")
+    conn.fetch = AsyncMock(return_value=[name])
+    conn.execute = AsyncMock(return_value="OK")
+    pool.acquire = AsyncMock(return_value=conn)
+    pool.release = AsyncMock()
+    return pool
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    primary, r1, r2 = _pool("primary"), _pool("r1"), _pool("r2")
+    monkeypatch.setattr(db, "_pool", primary)
+    monkeypatch.setattr(db, "_replica_pools", [r1, r2])
+    monkeypatch.setattr(db, "_replica_cycle", itertools.cycle([r1, r2]))
+    monkeypatch.setattr(db, "_read_after_write_seconds", 60.0)
+    return primary, r1, r2
+
+
+async def test_reads_default_to_primary(pools):
+    assert await db.fetch_all("SELECT 1") == ["primary"]
+
+
+async def test_replica_preference_round_robins(pools):
+    with db.use_replicas():
+        assert await db.fetch_all("SELECT 1") == ["r1"]
+        assert await db.fetch_all("SELECT 1") == ["r2"]
+
+
+async def test_write_pins_reads_to_primary(pools):
+    with db.use_replicas():
+        await db.execute("UPDATE x SET y = 1")
+        assert await db.fetch_all("SELECT 1") == ["primary"]
+
+
+async def test_use_primary_overrides(pools):
+    with db.use_replicas(), db.use_primary():
+        assert await db.fetch_all("SELECT 1") == ["primary"]
+
+
+async def test_replica_failure_falls_back_to_primary(pools):
+    _, r1, _ = pools
+    r1.acquire = AsyncMock(side_effect=OSError("replica down"))
+    with db.use_replicas():
+        assert await db.fetch_all("SELECT 1") == ["primary"]
+
+
+async def test_no_replicas_configured(monkeypatch):
+    primary = _pool("primary")
+    monkeypatch.setattr(db, "_pool", primary)
+    monkeypatch.setattr(db, "_replica_pools", [])
+    monkeypatch.setattr(db, "_replica_cycle", None)
+    with db.use_replicas():
+        assert await db.fetch_all("SELECT 1") == ["primary"]
@@ -0,0 +1,99 @@
+"""Unit tests for the embedded (SQLite) backend: SQL translation and an in-process pipeline run."""
+from datetime import date, timedelta
+
+import pytest
+
+from scripts.synth_data import SynthSpec, generate, load
+from services.core.db.embedded import EmbeddedConnection, translate
+
+
+def test_translate_postgres_constructs():
+    assert translate("SELECT id FROM index WHERE code = $1") == 'SELECT id FROM "index" WHERE code = ?1'
+    assert translate("WHERE region = $2::text AND x = ANY($1::int[])") == "WHERE region = ?2 AND x IN (SELECT value FROM json_each(?1))"
+    assert translate("SET updated_at = NOW()") == "SET updated_at = CURRENT_TIMESTAMP"
+    assert translate("WHERE (a, b) IS DISTINCT FROM (c, d)") == "WHERE (a, b) IS NOT (c, d)"
+    assert translate("WHERE a IS NOT DISTINCT FROM b") == "WHERE a IS b"
+    # columns and aliases named like the table are left alone
+    assert translate("SELECT o.index_id FROM bias_score o") == "SELECT o.index_id FROM bias_score o"
+
+
+async def test_upsert_is_a_no_op_for_identical_values(embedded):
+    from services.ingestion.storage import ensure_data_source, ensure_macro_indicator, upsert_macro_observation
+
+    source = await ensure_data_source("T", "Test", "test", "UTC")
+    ind = await ensure_macro_indicator("T_CPI", "CPI", "inflation", "%", source)
+    assert await ensure_macro_indicator("T_CPI", "CPI", "inflation", "%", source) == ind
+    d = date(2024, 3, 12)
+    assert await upsert_macro_observation(ind, d, 3.2, 3.1, 3.0, 0.1)
+    assert not await upsert_macro_observation(ind, d, 3.2, 3.1, 3.0, 0.1)
+    assert await upsert_macro_observation(ind, d, 3.3, 3.1, 3.0, 0.2)
+
+
+async def test_pipeline_runs_in_process(embedded):
+    from scripts.embedded import replay
+    from services.bias_engine.scorer import get_latest_surprises
+    from services.core.db import fetch_all, fetch_one, get_conn
+
+    spec = SynthSpec(indicators=6, indices=3, years=2, seed=3)
+    async with get_conn() as conn:
+        await load(conn, generate(spec))
+    start = spec.end - timedelta(days=59)
+    r = await replay(start, spec.end)
+    assert r["bias"]["days"] == 60 and r["normalization"]["rows_updated"] > 0
+    row = await fetch_one("SELECT COUNT(*) AS n FROM bias_score")
+    assert row["n"] == 60 * 3
+    scores = await fetch_all("SELECT time, bias_score FROM bias_score ORDER BY time")
+    assert scores[0]["time"].date() == start and any(s["bias_score"] != 0 for s in scores)
+
+    latest = await get_latest_surprises(spec.end, max_days_back=90)
+    assert len({s["indicator_id"] for s in latest}) == len(latest) == 6
+    assert all(isinstance(s["release_date"], date) for s in latest)
+
+
+async def test_replay_of_past_data_uses_point_in_time_stats(embedded):
+    from scripts.embedded import replay
+    from services.core.db import fetch_all, fetch_one, get_conn
+
+    spec = SynthSpec(indicators=10, indices=2, years=2, seed=4, end=date(2022, 12, 31))
+    async with get_conn() as conn:
+        await load(conn, generate(spec))
+    start = date(2022, 1, 1)
+    r = await replay(start, spec.end)
+    row = await fetch_one(
+        "SELECT COUNT(*) AS n, SUM(CASE WHEN surprise_normalized <> 0 THEN 1 ELSE 0 END) AS nz "
+        "FROM macro_observation WHERE surprise_normalized IS NOT NULL"
+    )
+    assert row["n"] == r["normalization"]["rows_updated"] > 0 and row["nz"] > 0.9 * row["n"]
+    scores = await fetch_all("SELECT bias_score FROM bias_score")
+    assert len(scores) == 365 * 2 and sum(s["bias_score"] != 0 for s in scores) > 0.5 * len(scores)
+
+
+async def test_parquet_round_trip(tmp_path):
+    pytest.importorskip("pyarrow")
+    src, dst = EmbeddedConnection(), EmbeddedConnection()
+    await load(src, generate(SynthSpec(indicators=3, indices=2, years=1, seed=1)))
+    counts = await src.export_parquet(tmp_path)
+    assert await dst.import_parquet(tmp_path) == counts
+    q = "SELECT time, indicator_id, actual FROM macro_observation ORDER BY time, indicator_id"
+    assert await dst.fetch(q) == await src.fetch(q)
+
+
+async def test_normalization_without_changes_keeps_the_version_and_stays_quiet(embedded):
+    from services.core.bus import get_bus
+    from services.core.cache import load_version
+    from services.core.db import get_conn
+    from services.core.events import MACRO_DATA_UPDATED
+    from services.processing.surprise import run_surprise_normalization
+
+    spec = SynthSpec(indicators=3, indices=1, years=1, seed=6)
+    async with get_conn() as conn:
+        await load(conn, generate(spec))
+    bus = await get_bus()
+    await bus.ensure_group(MACRO_DATA_UPDATED, "test")
+    assert (await run_surprise_normalization(since=spec.start))["rows_updated"] > 0
+    version = await load_version("macro")
+    r = await run_surprise_normalization(since=spec.start)
+    assert r["rows_updated"] == 0 and r["indicator_ids"] == [] and r["since"] is None
+    assert await load_version("macro") == version
+    events = await bus.read(MACRO_DATA_UPDATED, "test", "c", timeout=0.1)
+    assert len(events) == 1 and events[0].data["rows_updated"] > 0
@@ -0,0 +1,124 @@
+"""Unit tests for the materialized daily feature matrix (built on the embedded backend)."""
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from scripts.synth_data import SynthSpec, generate, load
+from services.processing.features import FeatureRow, ewm_alpha
+
+SPEC = SynthSpec(indicators=5, indices=3, years=2, seed=5)
+
+
+def test_advance_carries_state_and_applies_releases():
+    row = FeatureRow.empty(date(2024, 1, 1), [7, 3])
+    alpha = ewm_alpha(1.0)
+    assert alpha == 0.5
+    row = row.advance(date(2024, 1, 2), [(0, 1.0)], 20.0, {"US": 0.5}, alpha)
+    row = row.advance(date(2024, 1, 5), [(0, 3.0)], None, {"EU": -0.1}, alpha)
+    assert row.indicator_ids.tolist() == [3, 7]
+    assert row.days_since.tolist() == [0, -1] and np.isnan(row.surprise[1])
+    assert row.surprise[0] == 3.0 and row.surprise_ewm[0] == 2.0 and row.surprise_ewm_var[0] == 1.0
+    assert row.vix == 20.0 and row.regions == ("EU", "US") and row.spread_2y10y.tolist() == [-0.1, 0.5]
+    wider = row.with_indicators([3, 5, 7])
+    assert wider.days_since.tolist() == [0, -1, -1] and wider.surprise[0] == 3.0
+
+
+@pytest.fixture
+async def store(embedded):
+    from services.core.db import get_conn
+    from services.processing.surprise import run_surprise_normalization
+
+    async with get_conn() as conn:
+        await load(conn, generate(SPEC))
+    await run_surprise_normalization(since=SPEC.start)
+
+
+async def test_matrix_matches_per_day_queries(store):
+    from services.bias_engine.context import load_scoring_context
+    from services.bias_engine.scorer import SurpriseHistory, get_latest_surprises, get_vix_latest
+    from services.processing.features import FeatureMatrix, build_features
+
+    end = SPEC.end
+    start = end - timedelta(days=89)
+    r = await build_features(start, end)
+    assert r["days"] == 90 and r["indicators"] == 5
+    ctx = await load_scoring_context()
+    matrix = await FeatureMatrix.load(start, end, ctx)
+    history = await SurpriseHistory.load(start, end, ctx)
+    assert matrix.covers(start, end) and matrix.surprise.shape == (90, 5) and matrix.spread_2y10y.shape[1] == 3
+    for d in (start, start + timedelta(days=1), start + timedelta(days=40), end):
+        expected = await get_latest_surprises(d)
+        assert matrix.latest(d) == expected == history.latest(d)
+        assert matrix.vix(d) == await get_vix_latest(d) == history.vix(d)
+
+
+async def test_append_is_incremental_and_matches_rebuild(store):
+    from services.core.db import execute
+    from services.processing.features import FeatureMatrix, build_features, refresh_features
+
+    end = SPEC.end
+    start = end - timedelta(days=59)
+    await build_features(start, end)
+    full = await FeatureMatrix.load(start, end)
+    cut = full.days[29].item()
+    await execute("DELETE FROM daily_feature WHERE time > $1", datetime(cut.year, cut.month, cut.day, tzinfo=timezone.utc))
+    r = await refresh_features(None, end)
+    assert r["days"] == 30
+    again = await FeatureMatrix.load(start, end)
+    for name in ("surprise", "days_since", "surprise_ewm", "surprise_ewm_std", "vix_values", "spread_2y10y"):
+        np.testing.assert_array_equal(getattr(again, name), getattr(full, name))
+
+
+async def test_backfill_from_features_gives_the_same_scores(store):
+    from services.bias_engine.scorer import run_bias_backfill
+    from services.core.db import execute, fetch_all
+    from services.processing.features import build_features
+
+    end = SPEC.end
+    start = end - timedelta(days=29)
+    q = "SELECT time, index_id, bias_score, confidence_pct, risk_flag FROM bias_score ORDER BY time, index_id"
+    with pytest.raises(ValueError, match="build it first"):
+        await run_bias_backfill(start, end, features=True)
+    await run_bias_backfill(start, end)
+    direct = [dict(r) for r in await fetch_all(q)]
+    await execute("DELETE FROM bias_score")
+    await build_features(start, end)
+    await run_bias_backfill(start, end, features=True)
+    assert [dict(r) for r in await fetch_all(q)] == direct and len(direct) == 30 * 3
+
+
+async def test_backfill_publishes_once(store):
+    from services.bias_engine.scorer import run_bias_backfill
+    from services.core.bus import get_bus
+    from services.core.events import BIAS_COMPUTED
+    from services.orchestration.queue import job_bias
+
+    bus = await get_bus()
+    await bus.ensure_group(BIAS_COMPUTED, "test")
+    end = SPEC.end
+    start = end - timedelta(days=29)
+    await run_bias_backfill(start, end)
+    await job_bias({"start": start.isoformat(), "end": end.isoformat()}, lambda *a: None)
+    events = await bus.read(BIAS_COMPUTED, "test", "c", timeout=0.1)
+    assert [e.data for e in events] == [{"from": start.isoformat(), "to": end.isoformat()}] * 2
+
+
+async def test_full_history_refresh_starts_at_the_first_observation(store):
+    from services.core.db import execute, fetch_one
+    from services.orchestration.queue import FULL_HISTORY
+    from services.processing.features import refresh_features
+    from services.processing.surprise import run_surprise_normalization
+
+    r = await run_surprise_normalization(since=FULL_HISTORY)
+    assert r["rows_updated"] == 0 and r["since"] is None  # nothing changed since the fixture ran
+    first = await fetch_one("SELECT release_date, time, indicator_id FROM macro_observation ORDER BY time LIMIT 1")
+    moved = await fetch_one(
+        "SELECT release_date, time, indicator_id FROM macro_observation WHERE surprise IS NOT NULL ORDER BY time DESC LIMIT 1 OFFSET 20"
+    )
+    await execute("UPDATE macro_observation SET surprise = surprise + 1 WHERE time = $1 AND indicator_id = $2", moved["time"], moved["indicator_id"])
+    r = await run_surprise_normalization(since=FULL_HISTORY)
+    assert r["since"] == moved["release_date"].isoformat() and r["rows_updated"] >= 1
+    built = await refresh_features(FULL_HISTORY, SPEC.end)
+    assert built["from"] == first["release_date"].isoformat()
+    assert built["days"] == (SPEC.end - first["release_date"]).days + 1
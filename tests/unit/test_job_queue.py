@@ -0,0 +1,176 @@
+"""Unit tests for the backfill work queue: unit planning, claim SQL, heartbeats/leases, retries."""
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+import services.orchestration.queue as q
+
+
+def test_bias_units_chunk_date_range():
+    assert q.bias_units(date(2024, 1, 1), date(2024, 1, 10), chunk_days=4) == [
+        {"start": "2024-01-01", "end": "2024-01-04"},
+        {"start": "2024-01-05", "end": "2024-01-08"},
+        {"start": "2024-01-09", "end": "2024-01-10"},
+    ]
+    assert q.date_chunks(date(2024, 1, 2), date(2024, 1, 1), 5) == []
+    with pytest.raises(ValueError):
+        q.date_chunks(date(2024, 1, 1), date(2024, 1, 2), 0)
+
+
+def test_ingest_units_one_per_indicator():
+    units = q.ingest_units()
+    assert units and all(u["source"] == "FRED" and len(u["codes"]) == 1 for u in units)
+    assert q.ingest_units(["CPI_YOY", "NOPE"]) == [{"source": "FRED", "codes": ["CPI_YOY"]}]
+
+
+async def test_claim_skips_locked_rows_and_parses_params(monkeypatch):
+    conn = MagicMock()
+    conn.fetchrow = AsyncMock(return_value={
+        "id": 7, "batch": "b", "kind": "bias", "params": '{"start": "2024-01-01", "end": "2024-01-31"}',
+        "attempts": 1, "max_attempts": 3,
+    })
+
+    @asynccontextmanager
+    async def fake_conn(*a, **kw):
+        yield conn
+
+    monkeypatch.setattr(q, "get_conn", fake_conn)
+    job = await q.claim("host-1-0", ["bias"])
+    sql, worker, kinds = conn.fetchrow.await_args.args
+    assert "FOR UPDATE SKIP LOCKED" in sql and worker == "host-1-0" and kinds == ["bias"]
+    assert job.params == {"start": "2024-01-01", "end": "2024-01-31"} and job.worker == "host-1-0"
+
+
+class FakeQueue:
+    """In-memory stand-in for the job_queue statements, with the same lease rules."""
+
+    def __init__(self, units, max_attempts=2):
+        self.rows = [
+            {"id": i, "kind": "k", "params": u, "status": "queued", "attempts": 0,
+             "max_attempts": max_attempts, "claimed_by": None, "progress": 0.0}
+            for i, u in enumerate(units, 1)
+        ]
+        self.heartbeats = 0
+
+    def _leased(self, job):
+        r = self.rows[job.id - 1]
+        return r["status"] == "running" and r["claimed_by"] == job.worker and r["attempts"] == job.attempts
+
+    async def claim(self, worker, kinds=None):
+        for r in self.rows:
+            if r["status"] == "queued":
+                r.update(status="running", claimed_by=worker, attempts=r["attempts"] + 1)
+                return q.Job(r["id"], "b", r["kind"], json.loads(json.dumps(r["params"])),
+                             r["attempts"], r["max_attempts"], worker)
+        return None
+
+    async def heartbeat(self, job):
+        self.heartbeats += 1
+        if self._leased(job):
+            self.rows[job.id - 1]["progress"] = job.progress
+            return True
+        return False
+
+    async def complete(self, job, result):
+        if self._leased(job):
+            self.rows[job.id - 1].update(status="done", result=result)
+
+    async def fail(self, job, error, backoff_seconds):
+        if self._leased(job):
+            r = self.rows[job.id - 1]
+            r.update(status="queued" if r["attempts"] < r["max_attempts"] else "failed", error=error)
+
+    async def reap(self, stale_seconds):
+        return 0
+
+
+@pytest.fixture
+def fake_queue(monkeypatch):
+    def install(units, handler, **kw):
+        fq = FakeQueue(units, **kw)
+        for name in ("claim", "heartbeat", "complete", "fail", "reap"):
+            monkeypatch.setattr(q, name, getattr(fq, name))
+        monkeypatch.setitem(q.HANDLERS, "k", handler)
+        return fq
+
+    return install
+
+
+async def test_workers_drain_queue_and_retry_failures(fake_queue):
+    seen: list[int] = []
+    flaky = {2}
+
+    async def handler(params, progress):
+        await asyncio.sleep(0.01)
+        if params["n"] in flaky:
+            flaky.discard(params["n"])
+            raise RuntimeError("connection reset")
+        if params["n"] == 4:
+            raise ValueError("bad series")
+        seen.append(params["n"])
+        progress(1.0, "ok")
+        return {"n": params["n"]}
+
+    fq = fake_queue([{"n": n} for n in range(1, 5)], handler)
+    results = await asyncio.gather(q.work("w-0", drain=True), q.work("w-1", drain=True))
+    assert sorted(seen) == [1, 2, 3]
+    assert [r["status"] for r in fq.rows] == ["done", "done", "done", "failed"]
+    assert fq.rows[3]["attempts"] == 2 and fq.rows[3]["error"] == "ValueError: bad series"
+    assert sum(r["done"] for r in results) == 3 and sum(r["failed"] for r in results) == 3
+
+
+async def test_lost_lease_cancels_unit(fake_queue):
+    cancelled = asyncio.Event()
+
+    async def slow(params, progress):
+        try:
+            progress(0.5, "halfway")
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    fq = fake_queue([{"n": 1}], slow)
+    job = await fq.claim("w-0")
+    unit = asyncio.create_task(q.run_unit(job, slow, heartbeat_seconds=0.01, backoff_seconds=0))
+    while fq.heartbeats == 0:
+        await asyncio.sleep(0.005)
+    assert fq.rows[0]["progress"] == 0.5
+    # Reaped (missed heartbeats) and claimed by another worker: the old lease no longer matches
+    fq.rows[0]["status"] = "queued"
+    assert (await fq.claim("w-1")).attempts == 2
+    assert await asyncio.wait_for(unit, 1) == "lost"
+    assert cancelled.is_set() and fq.rows[0]["claimed_by"] == "w-1"
+
+
+async def test_full_history_normalize_unit_has_no_look_ahead(embedded):
+    from scripts.synth_data import SynthSpec, generate, load
+    from services.core.db import execute, fetch_all, fetch_one, get_conn
+    from services.processing.surprise import get_surprise_rolling_stats, normalize_surprise
+
+    spec = SynthSpec(indicators=2, indices=1, years=3, seed=6, end=date(2021, 12, 31))
+    async with get_conn() as conn:
+        await load(conn, generate(spec))
+    ind = (await fetch_one("SELECT id FROM macro_indicator ORDER BY id LIMIT 1"))["id"]
+    unit = (await q.normalize_units())[0]
+    assert unit["since"] == q.FULL_HISTORY.isoformat()
+    q_rows = "SELECT release_date, surprise, surprise_normalized FROM macro_observation WHERE indicator_id = $1 ORDER BY time"
+
+    await q.job_normalize(unit, lambda *a: None)
+    full = await fetch_all(q_rows, ind)
+    assert all(r["surprise_normalized"] is not None for r in full)
+    for r in full[::10]:
+        mean, std = await get_surprise_rolling_stats(ind, r["release_date"])
+        assert r["surprise_normalized"] == pytest.approx(normalize_surprise(float(r["surprise"]), mean, std))
+
+    # dropping the last year must not change any earlier value
+    await execute("DELETE FROM macro_observation WHERE release_date >= $1", date(2021, 1, 1))
+    await q.job_normalize(unit, lambda *a: None)
+    kept = [r for r in full if r["release_date"] < date(2021, 1, 1)]
+    again = await fetch_all(q_rows, ind)
+    assert [r["release_date"] for r in again] == [r["release_date"] for r in kept]
+    assert [r["surprise_normalized"] for r in again] == pytest.approx([r["surprise_normalized"] for r in kept], rel=1e-9)
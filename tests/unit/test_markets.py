@@ -0,0 +1,59 @@
+"""Unit tests for yield curve / volatility series query selection."""
+from datetime import datetime, timezone
+
+from services.api.markets import build_series_query
+
+T0 = datetime(2000, 1, 1, tzinfo=timezone.utc)
+T1 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def test_raw_without_bucket():
+    q, params, source = build_series_query("volatility", "VIX", T0, T1, None)
+    assert source == "volatility_snapshot"
+    assert "time_bucket" not in q
+    assert params[:3] == ["VIX", T0, T1]
+
+
+def test_common_buckets_use_continuous_aggregates():
+    q, _, source = build_series_query("yield_curve", "US", T0, T1, "1 week")
+    assert source == "yield_curve_weekly"
+    assert "FROM yield_curve_weekly" in q
+    _, _, source = build_series_query("volatility", "VIX", None, None, "1 month")
+    assert source == "volatility_monthly"
+
+
+def test_other_buckets_aggregate_raw_chunks():
+    q, params, source = build_series_query("yield_curve", "US", T0, None, "3 days")
+    assert source == "yield_curve_snapshot"
+    assert "time_bucket" in q and "first(spread_2y10y, time)" in q
+    assert "3 days" in params
+
+
+def test_long_ranges_keep_the_newest_rows():
+    q, params, _ = build_series_query("volatility", "VIX", None, None, None, limit=50)
+    assert "ORDER BY time DESC LIMIT $2) t ORDER BY time" in q and params == ["VIX", 50]
+    q, _, _ = build_series_query("yield_curve", "US", None, None, "1 week")
+    assert "ORDER BY bucket DESC LIMIT" in q
+
+
+def test_multiples_of_weeks_and_months_roll_up_aggregates():
+    q, params, source = build_series_query("yield_curve", "US", T0, T1, "14 days")
+    assert source == "yield_curve_weekly"
+    assert "time_bucket($5::text::interval, bucket)" in q and "sum(points)" in q and "last(yield_2y, bucket)" in q
+    assert params == ["US", T0, "1 week", T1, "14 days", 10000]
+    _, _, source = build_series_query("volatility", "VIX", None, None, "3 months")
+    assert source == "volatility_monthly"
+
+
+async def test_max_points_buckets_of_a_week_or_more_use_the_weekly_aggregate():
+    from unittest.mock import AsyncMock, patch
+
+    from services.api.markets import _series
+
+    with patch("services.core.db.fetch_all", AsyncMock(return_value=[])) as mock:
+        r = await _series("volatility", "VIX", "2000-01-01", "2023-12-31", None, 200)
+    assert r["bucket"] == "7 weeks" and r["source"] == "volatility_weekly"
+    assert "7 weeks" in mock.await_args.args
+    with patch("services.core.db.fetch_all", AsyncMock(return_value=[])):
+        r = await _series("volatility", "VIX", "2023-01-01", "2023-12-31", None, 100)
+    assert r["bucket"] == "4 days" and r["source"] == "volatility_snapshot"
@@ -0,0 +1,58 @@
+"""Unit tests for the Prometheus text metrics and pool instrumentation."""
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from services.core.metrics import Counter, Gauge, Histogram, Registry
+
+
+def _isolated(monkeypatch):
+    import services.core.metrics as metrics
+
+    reg = Registry()
+    monkeypatch.setattr(metrics, "REGISTRY", reg)
+    return reg
+
+
+def test_histogram_cumulative_buckets(monkeypatch):
+    reg = _isolated(monkeypatch)
+    h = Histogram("t_seconds", "t", ("route",), buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 0.5, 3.0):
+        h.observe(v, route="/a")
+    text = reg.render()
+    assert 't_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 't_seconds_bucket{route="/a",le="1"} 3' in text
+    assert 't_seconds_bucket{route="/a",le="+Inf"} 4' in text
+    assert 't_seconds_count{route="/a"} 4' in text
+    assert h.total(route="/a") == 4.05
+
+
+def test_counter_and_gauge(monkeypatch):
+    reg = _isolated(monkeypatch)
+    c = Counter("c_total", "c")
+    c.inc()
+    c.inc(2)
+    Gauge("g", "g", fn=lambda: 7)
+    text = reg.render()
+    assert "# TYPE c_total counter\nc_total 3" in text
+    assert "g 7" in text
+
+
+async def test_get_conn_records_pool_wait():
+    import services.core.db as db
+
+    conn = MagicMock()
+    pool = MagicMock()
+    pool.acquire = AsyncMock(return_value=conn)
+    pool.release = AsyncMock()
+    before = db.POOL_ACQUIRE_SECONDS.count(pool="primary")
+    with patch.object(db, "get_pool", AsyncMock(return_value=pool)):
+        async with db.get_conn() as c:
+            assert c is conn
+    assert db.POOL_ACQUIRE_SECONDS.count(pool="primary") == before + 1
+    pool.release.assert_awaited_once_with(conn)
+
+
+def test_fixed_api_queries_registered_for_preparation():
+    import services.api.main  # noqa: F401
+    from services.core.db import PREPARED_QUERIES
+
+    assert {"bias_summary", "macro_latest", "bias_matrix"} <= set(PREPARED_QUERIES)
@@ -0,0 +1,97 @@
+"""Unit tests for migration ordering/tracking and the query-plan benchmark summary."""
+import pytest
+
+from scripts.bench_queries import plan_stats
+from scripts.migrate import MIGRATIONS_DIR, baseline, checksum, discover, fake_through, pending, split_statements
+
+
+def test_discover_orders_numerically(tmp_path):
+    for name in ("010_late.sql", "002_b.sql", "001_a.sql"):
+        (tmp_path / name).write_text("SELECT 1;")
+    assert [f.name for f in discover(tmp_path)] == ["001_a.sql", "002_b.sql", "010_late.sql"]
+
+
+def test_discover_rejects_unnumbered_and_duplicates(tmp_path):
+    (tmp_path / "001_a.sql").write_text("")
+    (tmp_path / "001_b.sql").write_text("")
+    with pytest.raises(ValueError, match="Duplicate"):
+        discover(tmp_path)
+    (tmp_path / "001_b.sql").unlink()
+    (tmp_path / "extra.sql").write_text("")
+    with pytest.raises(ValueError, match="prefix"):
+        discover(tmp_path)
+
+
+def test_repo_migrations_are_ordered():
+    names = [f.name for f in discover(MIGRATIONS_DIR)]
+    assert names[0].startswith("001_") and "003_compression_retention_indexes.sql" in names
+
+
+def test_split_statements_drops_comments():
+    sql = "-- header\nCREATE TABLE t (id int);\n\n-- note\nSELECT 1;\n-- trailing\n"
+    assert split_statements(sql) == ["CREATE TABLE t (id int);", "SELECT 1;"]
+    assert split_statements("-- a; b\nSELECT '--'; -- c; d\nSELECT 2;") == ["SELECT '--';", "SELECT 2;"]
+    for f in discover(MIGRATIONS_DIR):
+        for stmt in split_statements(f.read_text()):
+            assert stmt.split(None, 1)[0].upper() in {"CREATE", "ALTER", "SELECT", "DROP", "INSERT", "CALL"}, (f.name, stmt)
+
+
+def test_pending_skips_applied_and_warns_on_change(tmp_path, capsys):
+    a, b = tmp_path / "001_a.sql", tmp_path / "002_b.sql"
+    a.write_text("SELECT 1;")
+    b.write_text("SELECT 2;")
+    assert pending([a, b], {"001_a": checksum("SELECT 1;")}) == [b]
+    assert pending([a, b], {"001_a": "stale", "002_b": checksum("SELECT 2;")}) == []
+    assert "001_a.sql changed" in capsys.readouterr().out
+
+
+def test_pre_tracking_database_is_baselined_not_rerun():
+    files = discover(MIGRATIONS_DIR)
+    existing = {"macro_observation", "yield_curve_weekly"}
+    assert [f.stem for f in baseline(files, {}, existing)] == ["001_initial_schema", "002_market_aggregates"]
+    assert [f.stem for f in baseline(files, {}, {"macro_observation"})] == ["001_initial_schema"]
+    assert baseline(files, {}, set()) == []  # fresh database: run everything
+    assert baseline(files, {"001_initial_schema": "x"}, existing) == []  # already tracked
+
+
+def test_fake_through_version():
+    files = discover(MIGRATIONS_DIR)
+    assert [f.stem[:3] for f in fake_through(files, "002")] == ["001", "002"]
+    assert [f.stem[:3] for f in fake_through(files, "003_compression_retention_indexes")] == ["001", "002", "003"]
+    with pytest.raises(ValueError, match="No migration"):
+        fake_through(files, "999")
+
+
+def test_macro_observation_compresses_after_the_ingestion_lookback():
+    import re
+
+    sql = (MIGRATIONS_DIR / "007_compression_windows.sql").read_text()
+    stmts = split_statements(sql)
+    assert stmts[0].startswith("SELECT remove_compression_policy('macro_observation'")
+    days = int(re.search(r"INTERVAL '(\d+) days'", stmts[1]).group(1))
+    assert days > 365 * 2  # services.ingestion.job re-upserts two years per run
+
+
+def test_plan_stats_counts_scanned_rows_and_chunks():
+    explain = [{
+        "Execution Time": 1.25,
+        "Plan": {
+            "Node Type": "Unique", "Actual Rows": 3, "Actual Loops": 1,
+            "Shared Hit Blocks": 40, "Shared Read Blocks": 2,
+            "Plans": [
+                {"Node Type": "Seq Scan", "Relation Name": "_hyper_1_1_chunk", "Actual Rows": 10,
+                 "Actual Loops": 1, "Rows Removed by Filter": 90},
+                {"Node Type": "Index Only Scan", "Relation Name": "_hyper_1_2_chunk", "Actual Rows": 5,
+                 "Actual Loops": 1},
+                {"Node Type": "Index Scan", "Relation Name": "macro_indicator", "Actual Rows": 1,
+                 "Actual Loops": 3},
+            ],
+        },
+    }]
+    stats = plan_stats(explain)
+    assert stats["buffers"] == 42
+    assert stats["rows_read"] == 100 + 5 + 3
+    assert stats["rows_removed"] == 90
+    assert stats["chunks"] == 2
+    assert stats["scans"] == {"Seq Scan": 1, "Index Only Scan": 1, "Index Scan": 1}
+    assert stats["ms"] == 1.25
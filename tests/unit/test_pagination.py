@@ -0,0 +1,66 @@
+"""Unit tests for bias history keyset cursors, bucket parsing and query shape."""
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from services.api.pagination import (
+    bucket_for_max_points,
+    build_history_query,
+    decode_cursor,
+    encode_cursor,
+    normalize_bucket,
+)
+
+T = datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+
+class TestCursor:
+    def test_roundtrip(self):
+        assert decode_cursor(encode_cursor(T, 3)) == (T, 3)
+
+    def test_garbage_rejected(self):
+        with pytest.raises(HTTPException):
+            decode_cursor("not-a-cursor")
+
+
+class TestBucket:
+    def test_normalize(self):
+        assert normalize_bucket("1 week") == "1 week"
+        assert normalize_bucket("3days") == "3 days"
+        assert normalize_bucket(" 2 Months ") == "2 months"
+
+    @pytest.mark.parametrize("bad", ["0 days", "1 fortnight", "1 day; DROP TABLE x", ""])
+    def test_invalid(self, bad):
+        with pytest.raises(HTTPException):
+            normalize_bucket(bad)
+
+    def test_max_points(self):
+        start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        end = datetime(2023, 12, 31, tzinfo=timezone.utc)
+        assert bucket_for_max_points(start, end, 10000) is None
+        assert bucket_for_max_points(start, end, 200) == "8 days"
+
+
+class TestBuildHistoryQuery:
+    def test_first_page(self):
+        q, params = build_history_query(None, None, None, 50)
+        assert "ORDER BY bs.time DESC, bs.index_id DESC" in q
+        assert params == [51]
+
+    def test_keyset_all_indices(self):
+        q, params = build_history_query(None, None, None, 5000, cursor=(T, 2))
+        assert "(bs.time, bs.index_id) < ($1, $2)" in q
+        assert params == [T, 2, 1001]
+
+    def test_keyset_single_index_uses_time_only(self):
+        q, params = build_history_query("SPX", None, None, 10, cursor=(T, 2))
+        assert "bs.time < $2" in q
+        assert params == ["SPX", T, 11]
+
+    def test_bucketed(self):
+        q, params = build_history_query("SPX", T, None, 10, bucket="1 week", cursor=(T, 1))
+        assert "time_bucket($3::text::interval, bs.time)" in q
+        assert "(b.time, b.index_id) < ($4, $5)" in q
+        assert params == ["SPX", T, "1 week", T, 1, 11]
+
@@ -0,0 +1,78 @@
+"""Unit tests for the opt-in profiling hooks (sessions, task timings, API middleware)."""
+import asyncio
+import json
+import pstats
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from services.core.profiling import ProfilingMiddleware, profiled
+
+
+def _spin(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def _work() -> int:
+    async def blocker():
+        _spin(0.03)  # blocks the loop: shows up as a long step
+        return 1
+
+    t = asyncio.create_task(blocker(), name="blocker")
+    await asyncio.sleep(0.01)
+    _spin(0.02)
+    return await t + 1
+
+
+async def test_disabled_is_a_plain_await(tmp_path):
+    factory = asyncio.get_running_loop().get_task_factory()
+    assert await profiled("x", _work(), None, tmp_path) == 2
+    assert list(tmp_path.iterdir()) == []
+    assert asyncio.get_running_loop().get_task_factory() is factory
+
+
+async def test_sample_mode_writes_folded_stacks_and_task_timings(tmp_path):
+    assert await profiled("stage:normalize", _work(), "sample", tmp_path) == 2
+    folded = next(tmp_path.glob("*-stage_normalize.folded")).read_text().splitlines()
+    assert folded and all(line.rsplit(" ", 1)[1].isdigit() for line in folded)
+    assert any("_spin (" in line for line in folded)
+    tasks = json.loads(next(tmp_path.glob("*.tasks.json")).read_text())["tasks"]
+    assert tasks[0]["task"] == "stage:normalize" and tasks[0]["wall_s"] >= 0.05
+    blocker = next(t for t in tasks if t["task"] == "blocker")
+    assert blocker["coro"].endswith("blocker") and blocker["max_step_ms"] >= 25
+    assert asyncio.get_running_loop().get_task_factory() is None
+
+
+async def test_cprofile_mode_writes_pstats(tmp_path):
+    await profiled("bias", _work(), "cprofile", tmp_path)
+    stats = pstats.Stats(str(next(tmp_path.glob("*-bias.prof"))))
+    assert any(func[2] == "_spin" for func in stats.stats)
+
+
+async def test_middleware_profiles_only_requests_that_ask(tmp_path):
+    inner = FastAPI()
+    gate = asyncio.Event()
+
+    @inner.get("/slow")
+    async def slow(wait: bool = False):
+        if wait:
+            await gate.wait()
+        _spin(0.01)
+        return {"ok": True}
+
+    app = ProfilingMiddleware(inner, directory=tmp_path)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as c:
+        r = await c.get("/slow")
+        assert "x-profile-id" not in r.headers and list(tmp_path.iterdir()) == []
+
+        first = asyncio.create_task(c.get("/slow", params={"wait": "true", "profile": "1"}))
+        await asyncio.sleep(0.05)
+        busy = await c.get("/slow", headers={"X-Profile": "cprofile"})
+        assert busy.headers["x-profile"] == "busy"
+        gate.set()
+        r = await first
+        stem = r.headers["x-profile-id"]
+        assert stem.endswith("GET_slow") and (tmp_path / f"{stem}.folded").exists()
@@ -0,0 +1,79 @@
+"""Unit tests for per-query instrumentation and the slow-query log."""
+from collections import namedtuple
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import services.core.db as db
+import services.core.query_metrics as qm
+
+Logged = namedtuple("Logged", "query args timeout elapsed exception conn_addr conn_params")
+
+
+def _record(query, elapsed, exception=None, args=()):
+    return Logged(query, args, None, elapsed, exception, None, None)
+
+
+def test_query_names():
+    assert qm.query_name("SELECT * FROM bias_score bs JOIN index i ON true") == "select:bias_score"
+    assert qm.query_name("WITH d AS (SELECT 1) SELECT * FROM d") == "select:d"
+    assert qm.query_name("INSERT INTO macro_observation (a) VALUES ($1)") == "insert:macro_observation"
+    sql = db.prepared("test_named_query", "SELECT 42 FROM index")
+    assert qm.query_name(sql) == "test_named_query"
+
+
+def test_status_rows():
+    assert qm.status_rows("UPDATE 3") == 3
+    assert qm.status_rows("INSERT 0 5") == 5
+    assert qm.status_rows("CREATE TABLE") == 0
+
+
+async def test_slow_query_logged_and_explained(monkeypatch):
+    monkeypatch.setattr(qm.SlowQueryConfig, "threshold_seconds", 0.1)
+    monkeypatch.setattr(qm.SlowQueryConfig, "explain", True)
+    monkeypatch.setattr(qm, "_last_explain", {})
+    sql = "SELECT * FROM slow_table_a WHERE x = $1"
+    before = qm.SLOW_QUERIES.value(query="select:slow_table_a")
+    with patch.object(qm, "explain_analyze", AsyncMock()) as explain:
+        qm.on_query(_record(sql, 0.01))
+        qm.on_query(_record(sql, 0.5, args=(1,)))
+        qm.on_query(_record(sql, 0.5, args=(1,)))  # explain rate-limited per name
+        for task in list(qm._explain_tasks):
+            await task
+    assert qm.SLOW_QUERIES.value(query="select:slow_table_a") == before + 2
+    explain.assert_awaited_once_with("select:slow_table_a", sql, (1,), analyze=False)
+    assert qm.QUERY_SECONDS.count(query="select:slow_table_a") >= 3
+
+
+async def test_only_prepared_reads_are_explained_with_analyze(monkeypatch):
+    monkeypatch.setattr(qm.SlowQueryConfig, "threshold_seconds", 0.1)
+    monkeypatch.setattr(qm.SlowQueryConfig, "explain", True)
+    monkeypatch.setattr(qm, "_last_explain", {})
+    named = db.prepared("test_slow_named", "SELECT * FROM slow_table_b")
+    with patch.object(qm, "explain_analyze", AsyncMock()) as explain:
+        qm.on_query(_record(named, 0.5))
+        qm.on_query(_record("SELECT pg_notify($1, $2)", 0.5, args=("ch", "{}")))
+        qm.on_query(_record("SELECT drop_chunks($1::regclass, older_than => $2)", 0.5))
+        qm.on_query(_record("UPDATE slow_table_c SET x = 1", 0.5))
+        qm.on_query(_record("CREATE INDEX i ON slow_table_d (x)", 0.5))
+        for task in list(qm._explain_tasks):
+            await task
+    analyzed = {c.args[0]: c.kwargs["analyze"] for c in explain.await_args_list}
+    assert analyzed == {"test_slow_named": True, "select": False, "update:slow_table_c": False}
+
+
+def test_errors_counted():
+    before = qm.QUERY_ERRORS.value(query="select:err_table")
+    qm.on_query(_record("SELECT 1 FROM err_table", 0.0, exception=ValueError()))
+    assert qm.QUERY_ERRORS.value(query="select:err_table") == before + 1
+
+
+async def test_fetch_all_records_rows_and_acquire(monkeypatch):
+    conn = MagicMock()
+    conn.fetch = AsyncMock(return_value=[1, 2, 3])
+    pool = MagicMock()
+    pool.acquire = AsyncMock(return_value=conn)
+    pool.release = AsyncMock()
+    monkeypatch.setattr(db, "_pool", pool)
+    sql = "SELECT * FROM rows_table"
+    await db.fetch_all(sql)
+    assert qm.QUERY_ROWS.total(query="select:rows_table") == 3
+    assert qm.QUERY_ACQUIRE_SECONDS.count(query="select:rows_table") == 1
@@ -0,0 +1,22 @@
+"""Unit tests for the orjson response fast path."""
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import orjson
+
+from services.api.responses import dumps, json_response, records
+
+
+def test_dumps_native_types_match_isoformat():
+    t = datetime(2024, 1, 2, 21, 30, tzinfo=timezone.utc)
+    out = orjson.loads(dumps({"time": t, "date": t.date(), "x": Decimal("1.25"), 1: None}))
+    assert out == {"time": t.isoformat(), "date": "2024-01-02", "x": 1.25, "1": None}
+
+
+def test_records_and_prebuilt_bytes():
+    rows = [{"code": "CPI", "release_date": date(2024, 1, 11), "actual": 3.4}]
+    body = dumps({"observations": records(rows)})
+    r = json_response(body, {"ETag": '"x"'})
+    assert r.body is body
+    assert r.media_type == "application/json"
+    assert r.headers["etag"] == '"x"'
@@ -0,0 +1,92 @@
+"""Unit tests for the scheduler daemon: release-time math, job runs and the control API."""
+import asyncio
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import httpx
+
+from services.orchestration.scheduler import (
+    ReleaseSchedule,
+    Scheduler,
+    WarmState,
+    create_control_app,
+    load_schedules,
+)
+
+NY = ZoneInfo("America/New_York")
+UTC = timezone.utc
+
+
+def test_next_run_follows_dst_and_skips_weekends():
+    s = ReleaseSchedule("FRED", NY, (time(8, 30), time(10, 0)), frozenset(range(5)), timedelta(minutes=5))
+    # Friday 2024-03-08 after the 08:30 release (EST, UTC-5)
+    fri = datetime(2024, 3, 8, 13, 40, tzinfo=UTC)
+    assert s.next_run(fri) == datetime(2024, 3, 8, 15, 5, tzinfo=UTC)
+    # After the last Friday release: Monday, now EDT (UTC-4) after the 2024-03-10 switch
+    assert s.next_run(datetime(2024, 3, 8, 15, 5, tzinfo=UTC)) == datetime(2024, 3, 11, 12, 35, tzinfo=UTC)
+    assert ReleaseSchedule("X", NY, ()).next_run(fri) is None
+
+
+def test_load_schedules_prefers_db_timezone():
+    cfg = {
+        "FRED": {"timezone": "UTC", "release_times": ["10:00", 510], "weekdays": ["Mon", "wed"], "delay_minutes": 0},
+        "ECB": {"timezone": "Nowhere/Invalid", "release_times": ["14:15"]},
+    }
+    fred, ecb = load_schedules(cfg, {"FRED": "America/New_York"})
+    assert fred.tz.key == "America/New_York"
+    assert fred.times == (time(8, 30), time(10, 0))
+    assert fred.weekdays == frozenset({0, 2})
+    assert fred.delay == timedelta(0)
+    assert ecb.tz.key == "UTC" and ecb.weekdays == frozenset(range(5))
+
+
+def _scheduler(calls):
+    state = WarmState()
+    sched = Scheduler(state)
+
+    async def fake_ingest(source, codes=None):
+        calls.append((source, codes))
+        await asyncio.sleep(0.01)
+        return {"ingest": {"indicator_ids": [1, 2], "written": 3}}
+
+    async def broken():
+        raise RuntimeError("db down")
+
+    sched.jobs["ingest"] = fake_ingest
+    sched.jobs["processing"] = broken
+    sched.schedules = [ReleaseSchedule("FRED", NY, (time(8, 30),))]
+    return sched
+
+
+async def test_same_job_runs_do_not_overlap():
+    calls: list = []
+    sched = _scheduler(calls)
+    a = sched.trigger("ingest", {"source": "FRED"})
+    b = sched.trigger("ingest", {"source": "FRED", "codes": ["CPI_YOY"]})
+    await asyncio.sleep(0)
+    assert (a.status, b.status) == ("running", "queued")
+    failed = sched.trigger("processing")
+    await sched.wait_idle()
+    assert calls == [("FRED", None), ("FRED", ["CPI_YOY"])]
+    assert a.status == "done" and a.result == {"ingest": {"indicator_ids": 2, "written": 3}}
+    assert failed.status == "failed" and failed.error == "RuntimeError: db down"
+
+
+async def test_control_api_triggers_and_reports():
+    calls: list = []
+    sched = _scheduler(calls)
+    app = create_control_app(sched)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://ctl") as c:
+        r = await c.post("/trigger/ingest/FRED", params={"indicator": ["CPI_YOY", "PPI_YOY"]})
+        assert r.status_code == 202
+        run_id = r.json()["id"]
+        assert (await c.post("/trigger/ingest/NOPE")).status_code == 404
+        status = (await c.get("/status")).json()
+        assert status["schedules"][0]["timezone"] == "America/New_York"
+        assert status["next_runs"][0]["source"] == "FRED"
+        await sched.wait_idle()
+        run = (await c.get(f"/runs/{run_id}")).json()
+        assert run["status"] == "done" and run["trigger"] == "manual"
+        assert (await c.get("/runs/999")).status_code == 404
+        assert [r["id"] for r in (await c.get("/runs")).json()] == [run_id]
+    assert calls == [("FRED", ["CPI_YOY", "PPI_YOY"])]
@@ -2,6 +2,7 @@
 import pytest
 
 from services.bias_engine.scorer import (
+    compute_confidence,
     risk_flag_from_thresholds,
     score_bounded,
     score_raw,
@@ -62,3 +63,20 @@ class TestRiskFlagFromThresholds:
 
     def test_medium_else(self):
         assert risk_flag_from_thresholds(50, 60, None, "neutral") == "medium"
+
+    def test_explicit_thresholds(self):
+        rf = {"confidence_high": 90, "confidence_low": 10}
+        assert risk_flag_from_thresholds(75, 30, 15.0, "neutral", thresholds=rf) == "medium"
+        assert risk_flag_from_thresholds(20, 30, 15.0, "neutral", thresholds=rf) == "medium"
+
+
+class TestComputeConfidence:
+    PARAMS = {"min_indicators_expected": 4, "vix_min": 10, "vix_max": 40}
+
+    def test_coverage(self):
+        assert compute_confidence(2, None, params=self.PARAMS) == 50.0
+        assert compute_confidence(8, None, params=self.PARAMS) == 100.0
+
+    def test_vix_scales_down(self):
+        assert compute_confidence(4, 25.0, params=self.PARAMS) == 50.0
+        assert compute_confidence(4, 50.0, params=self.PARAMS) == 0.0
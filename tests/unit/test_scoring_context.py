@@ -0,0 +1,84 @@
+"""Unit tests for ScoringContext (pure scoring against preloaded metadata)."""
+import pickle
+
+import pytest
+
+from services.bias_engine.context import ScoringContext
+
+CFG = {
+    "scoring": {"lambda": {"SPX": 1.0, "DAX": 4.0}},
+    "confidence": {"min_indicators_expected": 2},
+    "volatility": {"vix_min": 10, "vix_max": 40},
+    "risk_flag": {"confidence_high": 70, "confidence_low": 40},
+}
+
+
+@pytest.fixture
+def ctx() -> ScoringContext:
+    regimes = [{"id": 1, "code": "risk_on"}, {"id": 5, "code": "neutral"}]
+    indices = [{"id": 10, "code": "SPX", "region": "US"}, {"id": 20, "code": "DAX", "region": "EU"}]
+    indicators = [
+        {"id": 100, "code": "GDP", "direction": "positive"},
+        {"id": 200, "code": "CPI", "direction": "negative"},
+    ]
+    weights = [
+        {"indicator_id": 100, "index_id": 10, "weight": 0.5, "regime_weights": '{"risk_on": 3}'},
+        {"indicator_id": 200, "index_id": 10, "weight": 0.5, "regime_weights": None},
+        {"indicator_id": 100, "index_id": 20, "weight": 1.0, "regime_weights": None},
+    ]
+    return ScoringContext.from_rows(regimes, indices, indicators, weights, CFG)
+
+
+class TestScoringContext:
+    def test_layout(self, ctx):
+        assert ctx.index_codes == ("SPX", "DAX")
+        assert ctx.index_regions == ("US", "EU")
+        assert list(ctx.lambdas) == [1.0, 4.0]
+        assert ctx.regime_id("risk_on") == 1
+        assert ctx.regime_id("unknown") == 5
+
+    def test_weights_normalized_per_regime(self, ctx):
+        _, w = ctx.weights["neutral"][0]
+        assert list(w) == pytest.approx([0.5, 0.5])
+        _, w = ctx.weights["risk_on"][0]
+        assert list(w) == pytest.approx([0.75, 0.25])
+
+    def test_score_signs_and_coverage(self, ctx):
+        surprises = [
+            {"indicator_id": 100, "surprise_normalized": 1.0},
+            {"indicator_id": 200, "surprise_normalized": 1.0},
+            {"indicator_id": 999, "surprise_normalized": 5.0},
+        ]
+        spx, dax = ctx.score(surprises)
+        # GDP +1 and CPI (negative direction) +1 cancel for SPX
+        assert spx["index"] == "SPX"
+        assert spx["bias_score"] == pytest.approx(0.0)
+        assert spx["components_json"]["n_indicators"] == 2
+        assert spx["confidence_pct"] == 100.0
+        assert dax["components_json"]["n_indicators"] == 1
+        assert dax["confidence_pct"] == 50.0
+        assert dax["bias_score"] > 0
+
+    def test_score_by_region(self, ctx):
+        assert ctx.regions() == ["US", "EU"]
+        surprises = [{"indicator_id": 100, "surprise_normalized": 1.0}]
+        (dax,) = ctx.score(surprises, regions=["EU"])
+        assert dax["index"] == "DAX"
+        assert dax == ctx.score(surprises)[1]
+
+    def test_indices_for_changed_indicators(self, ctx):
+        assert ctx.indices_for([100]) == [10, 20]
+        assert ctx.indices_for([200]) == [10]
+        assert ctx.indices_for([999]) == []
+        (spx,) = ctx.score([], index_ids={10})
+        assert spx["index"] == "SPX"
+
+    def test_missing_surprises_score_zero(self, ctx):
+        out = ctx.score([], vix=None)
+        assert all(o["bias_score"] == 0 for o in out)
+        assert all(o["risk_flag"] == "high" for o in out)
+
+    def test_picklable_for_worker_pools(self, ctx):
+        clone = pickle.loads(pickle.dumps(ctx))
+        surprises = [{"indicator_id": 100, "surprise_normalized": 0.7}]
+        assert clone.score(surprises, 20.0) == ctx.score(surprises, 20.0)
@@ -0,0 +1,36 @@
+"""Unit tests for the event broadcaster fan-out and SSE framing."""
+import asyncio
+
+from services.api.stream import QUEUE_SIZE, Broadcaster, format_sse
+
+
+class TestBroadcaster:
+    async def test_fan_out_to_all_subscribers(self):
+        b = Broadcaster()
+        q1, q2 = b.subscribe(), b.subscribe()
+        b.dispatch("bias_computed", '{"date": "2024-01-02"}')
+        e1, e2 = q1.get_nowait(), q2.get_nowait()
+        assert e1 == e2
+        assert e1["event"] == "bias_computed"
+        assert e1["data"] == {"date": "2024-01-02"}
+        await asyncio.sleep(0)  # let the cache invalidation task run
+
+    async def test_slow_subscriber_drops_oldest(self):
+        b = Broadcaster()
+        q = b.subscribe()
+        for _ in range(QUEUE_SIZE + 5):
+            b.dispatch("other", "{}")
+        assert q.qsize() == QUEUE_SIZE
+        assert q.get_nowait()["id"] == 6
+
+    async def test_unsubscribe(self):
+        b = Broadcaster()
+        q = b.subscribe()
+        b.unsubscribe(q)
+        b.dispatch("other", "{}")
+        assert q.empty()
+
+
+def test_format_sse():
+    out = format_sse({"id": 3, "event": "bias_computed", "data": {"a": 1}})
+    assert out == 'id: 3\nevent: bias_computed\ndata: {"a": 1}\n\n'
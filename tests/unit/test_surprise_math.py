@@ -1,7 +1,10 @@
 """Unit tests for processing surprise normalization (pure function)."""
+from datetime import date, timedelta
+
+import numpy as np
 import pytest
 
-from services.processing.surprise import normalize_surprise
+from services.processing.surprise import normalize_surprise, point_in_time_stats
 
 
 class TestNormalizeSurprise:
@@ -23,3 +26,20 @@ class TestNormalizeSurprise:
     def test_negative_cap(self):
         assert normalize_surprise(-2.0, 0.0, 1.0, cap=2.0) == pytest.approx(-2.0)
         assert normalize_surprise(-5.0, 0.0, 1.0, cap=2.0) == pytest.approx(-2.0)
+
+
+def test_point_in_time_stats_use_only_the_trailing_window():
+    rng = np.random.default_rng(0)
+    days = sorted(date(2020, 1, 1) + timedelta(days=int(d)) for d in rng.choice(2000, 150, replace=False))
+    x = rng.normal(50.0, 0.3, len(days))  # large mean vs spread: needs the centred sums
+    mean, std = point_in_time_stats(days, x, window_days=90)
+    for i, d in enumerate(days):
+        w = np.array([v for dd, v in zip(days, x) if d - timedelta(days=90) <= dd <= d])
+        assert mean[i] == pytest.approx(w.mean(), rel=1e-12)
+        if len(w) > 1:
+            assert std[i] == pytest.approx(w.std(ddof=1), rel=1e-9)
+        else:
+            assert np.isnan(std[i])
+    # later releases never change earlier stats
+    mean2, std2 = point_in_time_stats(days[:100], x[:100], window_days=90)
+    np.testing.assert_allclose(mean2, mean[:100], rtol=1e-12)
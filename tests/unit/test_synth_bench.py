@@ -0,0 +1,39 @@
+"""Unit tests for the synthetic benchmark dataset and baseline comparison."""
+from datetime import date
+
+from scripts.bench_suite import compare, latency, result
+from scripts.synth_data import SynthSpec, generate
+
+SPEC = SynthSpec(indicators=6, indices=3, years=2, seed=7, end=date(2024, 6, 28))
+
+
+def test_generate_is_deterministic_per_spec():
+    a, b = generate(SPEC), generate(SPEC)
+    assert a.observations == b.observations and a.weights == b.weights and a.vix == b.vix
+    assert generate(SynthSpec(6, 3, 2, seed=8, end=SPEC.end)).observations != a.observations
+
+
+def test_generate_shapes_and_consistency():
+    data = generate(SPEC)
+    counts = data.counts()
+    assert (counts["indicators"], counts["indices"]) == (6, 3)
+    # 5 monthly series x ~24 releases + 1 weekly series x ~104
+    assert 200 < counts["observations"] < 260
+    assert all(SPEC.start <= d <= SPEC.end and d.weekday() < 5 for _, d, *_ in data.observations)
+    for _, _, actual, forecast, _, surprise in data.observations:
+        assert abs(surprise - round(actual - forecast, 4)) < 1e-9
+    series = [o for o in data.observations if o[0] == "SYN_IND_000"]
+    assert series[0][4] is None and all(cur[4] == prev[2] for prev, cur in zip(series, series[1:]))
+    assert {r for _, r, _, _ in data.yields} == {"US", "EU", "JP"}
+    assert len(data.vix) == counts["yields"] // 3 and all(v > 0 for _, v in data.vix)
+
+
+def test_compare_flags_regressions_by_direction():
+    current = [result("norm", 800, 1.0), latency("score", [0.012, 0.012, 0.012]), result("new", 1, 1.0)]
+    baseline = [result("norm", 1000, 1.0), latency("score", [0.010, 0.010, 0.010])]
+    rows = {c["name"]: c for c in compare(current, baseline, tolerance=0.25)}
+    assert set(rows) == {"norm", "score"}
+    assert rows["norm"]["ratio"] == 0.8 and not rows["norm"]["regressed"]
+    assert rows["score"]["ratio"] == 1.2 and not rows["score"]["regressed"]
+    rows = {c["name"]: c for c in compare(current, baseline, tolerance=0.1)}
+    assert rows["norm"]["regressed"] and rows["score"]["regressed"]
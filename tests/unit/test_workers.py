@@ -0,0 +1,90 @@
+"""Unit tests for the incremental event workers (coalescing, targeting, ack)."""
+import asyncio
+from datetime import date
+from unittest.mock import AsyncMock, patch
+
+from services.bias_engine.context import ScoringContext
+from services.core.bus import Event, MemoryBus
+from services.orchestration.workers import consume, handle_bias, handle_processing, merge_changes
+
+
+def _ev(**data):
+    return Event("macro_data_updated", data)
+
+
+def test_merge_changes_filters_stage_and_takes_earliest_since():
+    events = [
+        _ev(stage="ingestion", indicator_ids=[1, 2], since="2024-03-05"),
+        _ev(stage="processing", indicator_ids=[9]),
+        _ev(stage="ingestion", indicator_ids=[2, 3], since="2024-03-01"),
+        _ev(stage="ingestion", since="bad"),
+    ]
+    assert merge_changes(events, "ingestion") == ({1, 2, 3}, date(2024, 3, 1))
+    assert merge_changes(events, "processing") == ({9}, None)
+
+
+async def test_processing_normalizes_only_changed_indicators():
+    run = AsyncMock(return_value={"rows_updated": 2})
+    with patch("services.processing.surprise.run_surprise_normalization", run):
+        assert await handle_processing([_ev(stage="processing", indicator_ids=[1])]) is None
+        await handle_processing([_ev(stage="ingestion", indicator_ids=[4, 5], since="2024-01-02")])
+    run.assert_awaited_once_with(indicator_ids={4, 5}, since=date(2024, 1, 2))
+
+
+def _ctx():
+    return ScoringContext.from_rows(
+        [{"id": 5, "code": "neutral"}],
+        [{"id": 10, "code": "SPX", "region": "US"}, {"id": 20, "code": "DAX", "region": "EU"}],
+        [{"id": 100, "code": "GDP", "direction": "positive"}, {"id": 200, "code": "CPI", "direction": "negative"}],
+        [
+            {"indicator_id": 100, "index_id": 10, "weight": 1.0, "regime_weights": None},
+            {"indicator_id": 200, "index_id": 20, "weight": 1.0, "regime_weights": None},
+        ],
+        {},
+    )
+
+
+async def test_bias_rescores_only_affected_indices():
+    compute = AsyncMock(return_value={"scores": []})
+    with patch("services.bias_engine.context.load_scoring_context", AsyncMock(return_value=_ctx())), \
+         patch("services.bias_engine.scorer.scored_index_ids", AsyncMock(return_value={10, 20})), \
+         patch("services.bias_engine.scorer.run_bias_computation", compute):
+        await handle_bias([_ev(stage="processing", indicator_ids=[200])], as_of=date(2024, 1, 2))
+    assert compute.await_args.kwargs["index_ids"] == [20]
+
+
+async def test_bias_first_update_of_day_scores_every_index():
+    compute = AsyncMock(return_value={"scores": []})
+    with patch("services.bias_engine.context.load_scoring_context", AsyncMock(return_value=_ctx())), \
+         patch("services.bias_engine.scorer.scored_index_ids", AsyncMock(return_value=set())), \
+         patch("services.bias_engine.scorer.run_bias_computation", compute):
+        await handle_bias([_ev(stage="processing", indicator_ids=[200])], as_of=date(2024, 1, 2))
+    assert compute.await_args.kwargs["index_ids"] == [10, 20]
+
+
+async def test_consume_coalesces_burst_and_acks_after_success():
+    bus = MemoryBus()
+    await bus.ensure_group("ch", "g")
+    batches: list[list[int]] = []
+    stop = asyncio.Event()
+    fail_once = {"armed": True}
+
+    async def handler(events):
+        if fail_once.pop("armed", False):
+            raise RuntimeError("db down")
+        batches.append([e.data["n"] for e in events])
+        if sum(len(b) for b in batches) >= 3:
+            stop.set()
+        return {"n": len(events)}
+
+    ack = AsyncMock()
+    bus.ack = ack
+    task = asyncio.create_task(consume(bus, "ch", "g", "c", handler, batch_window=0.05, stop=stop, poll_timeout=0.05))
+    await bus.publish("ch", {"n": 0})  # handler fails: batch not acked
+    await asyncio.sleep(0.1)
+    for n in (1, 2, 3):
+        await bus.publish("ch", {"n": n})
+        await asyncio.sleep(0.01)
+    await asyncio.wait_for(task, 2)
+    assert batches == [[1, 2, 3]]
+    assert ack.await_count == 1